@@ -82,6 +82,7 @@ except ImportError:
 import streamlit as st
 import os
 import hashlib
+import threading
 from datetime import datetime, timedelta, date, time
 import pandas as pd
 import base64
@@ -102,8 +103,36 @@ def _is_missing_column_error(exc):
     return "column" in msg and "does not exist" in msg
 
 
-def _execute_select_with_legacy_fallback(cursor, query, params, legacy_query=None, legacy_suffix=()):
-    """Executa SELECT com fallback para schema antigo quando colunas novas não existem."""
+# Colunas do schema novo de solicitacoes_correcao_registro (complemento de jornada)
+CORRECAO_COLUNAS_NOVAS = (
+    "solicitacoes_correcao_registro",
+    ("tipo_solicitacao", "data_referencia", "hora_inicio_solicitada", "hora_saida_solicitada"),
+)
+
+
+def _correcao_schema_novo():
+    """True/False conforme o schema sondado; None se não foi possível sondar."""
+    tabela, colunas = CORRECAO_COLUNAS_NOVAS
+    return tem_colunas(tabela, *colunas)
+
+
+def _execute_select_with_legacy_fallback(cursor, query, params, legacy_query=None, legacy_suffix=(), requer_colunas=None):
+    """Executa SELECT com fallback para schema antigo quando colunas novas não existem.
+
+    Com ``requer_colunas=(tabela, colunas)`` a variante é escolhida pelo schema
+    sondado uma vez por processo; a detecção por erro só é usada quando o
+    schema não pôde ser sondado.
+    """
+    def _executar_legado():
+        cursor.execute(legacy_query, params)
+        rows = cursor.fetchall()
+        if legacy_suffix:
+            return [tuple(row) + tuple(legacy_suffix) for row in rows]
+        return rows
+
+    if legacy_query and requer_colunas and tem_colunas(requer_colunas[0], *requer_colunas[1]) is False:
+        return _executar_legado()
+
     try:
         cursor.execute(query, params)
         return cursor.fetchall()
@@ -115,11 +144,9 @@ def _execute_select_with_legacy_fallback(cursor, query, params, legacy_query=Non
                     cursor.connection.rollback()
             except Exception:
                 pass
-            cursor.execute(legacy_query, params)
-            rows = cursor.fetchall()
-            if legacy_suffix:
-                return [tuple(row) + tuple(legacy_suffix) for row in rows]
-            return rows
+            # Schema mudou desde a sondagem (ou não foi sondado): ressondar depois.
+            invalidar_schema()
+            return _executar_legado()
         raise
 
 
@@ -140,6 +167,7 @@ def _try_upgrade_correcao_schema(conn) -> bool:
         cursor.execute("ALTER TABLE solicitacoes_correcao_registro ADD COLUMN IF NOT EXISTS hora_inicio_solicitada TEXT")
         cursor.execute("ALTER TABLE solicitacoes_correcao_registro ADD COLUMN IF NOT EXISTS hora_saida_solicitada TEXT")
         conn.commit()
+        invalidar_schema()
         return True
     except Exception:
         try:
@@ -152,6 +180,9 @@ def _try_upgrade_correcao_schema(conn) -> bool:
 load_dotenv()
 
 from database import get_connection as get_db_connection, return_connection as _return_conn, init_db, SQL_PLACEHOLDER
+from pending_counters import chaves_afetadas, sincronizar_contadores
+from notification_outbox import despertar_worker
+from schema_probe import tabela_existe, tem_colunas, invalidar_schema
 
 # Expoe placeholder no namespace atual para compatibilidade
 current_module = sys.modules[__name__]
@@ -508,7 +539,6 @@ def existe_solicitacao_correcao_pendente_cursor(
           AND COALESCE(registro_id, 0) = {SQL_PLACEHOLDER}
           AND COALESCE(CAST(data_hora_original AS TEXT), '') = {SQL_PLACEHOLDER}
           AND COALESCE(CAST(data_hora_nova AS TEXT), '') = {SQL_PLACEHOLDER}
-          AND COALESCE(tipo_solicitacao, 'ajuste_registro') = {SQL_PLACEHOLDER}
           AND status = 'pendente'
     """
     params = [
@@ -516,9 +546,19 @@ def existe_solicitacao_correcao_pendente_cursor(
         int(registro_id or 0),
         str(data_hora_original or ""),
         str(data_hora_nova or ""),
-        tipo_solicitacao,
     ]
 
+    if _correcao_schema_novo() is False:
+        # Schema antigo: só existem ajustes de registro e as colunas novas não existem.
+        if tipo_solicitacao != "ajuste_registro":
+            return None
+        cursor.execute(query, tuple(params))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    query += f" AND COALESCE(tipo_solicitacao, 'ajuste_registro') = {SQL_PLACEHOLDER}"
+    params.append(tipo_solicitacao)
+
     if data_referencia is not None:
         query += f" AND COALESCE(CAST(data_referencia AS TEXT), '') = {SQL_PLACEHOLDER}"
         params.append(str(data_referencia))
@@ -1155,6 +1195,59 @@ def verificar_login(usuario, senha):
         return None
 
 
+def _iniciar_prefetch_login(usuario, tipo_usuario):
+    """Dispara em paralelo as consultas da primeira tela após o login."""
+    try:
+        from login_prefetch import iniciar_prefetch
+        from db_optimized import get_notificacoes_funcionario, get_solicitacoes_he_pendentes
+    except Exception as e:
+        logger.debug("Prefetch pós-login indisponível: %s", e)
+        return None
+
+    hoje_str = hoje_br().strftime("%Y-%m-%d")
+    tarefas = {
+        # Aquecem caches (st.cache_data / st.cache_resource)
+        "sistemas": init_systems,
+        "notificacoes": lambda: get_notificacoes_funcionario(usuario),
+        "he_pendentes": lambda: get_solicitacoes_he_pendentes(usuario),
+        "mensagens_nao_lidas": lambda: obter_mensagens_nao_lidas_count_cached(usuario),
+    }
+    if tipo_usuario == 'gestor':
+        from dashboard_snapshot import obter_dashboard_snapshot
+        tarefas.update({
+            "badges": lambda: obter_badges_gestor_cached(usuario),
+            "he_aguardando": lambda: obter_solicitacoes_pendentes_count_cached(usuario),
+            "dashboard": obter_dashboard_snapshot,
+        })
+    else:
+        from jornada_semanal_system import obter_jornada_usuario
+        tarefas.update({
+            "projetos": obter_projetos_ativos,
+            # Consumidos uma única vez pela primeira tela (_valor_prefetch)
+            "hora_extra_ativa": lambda: _buscar_hora_extra_ativa(usuario),
+            "jornada": lambda: obter_jornada_usuario(usuario),
+            "registros_hoje": lambda: obter_registros_usuario(usuario, hoje_str, hoje_str),
+        })
+    return iniciar_prefetch(usuario, tarefas)
+
+
+def _valor_prefetch(nome, carregar):
+    """Usa o valor pré-carregado no login (uma vez) ou executa ``carregar``."""
+    prefetch = st.session_state.get('prefetch_login')
+    if prefetch is None:
+        return carregar()
+    from login_prefetch import consumir
+    return consumir(prefetch, nome, carregar)
+
+
+def _finalizar_prefetch_login(tela):
+    """Registra o tempo até a primeira tela pós-login e descarta o prefetch."""
+    prefetch = st.session_state.pop('prefetch_login', None)
+    if prefetch is not None:
+        from login_prefetch import registrar_primeira_tela
+        registrar_primeira_tela(prefetch, tela)
+
+
 @st.cache_data(ttl=300)  # Cache de 5 minutos para projetos
 def obter_projetos_ativos():
     """Obtém lista de projetos ativos (com cache)"""
@@ -1174,6 +1267,15 @@ def obter_projetos_ativos():
             _return_conn(conn)
 
 
+def _solicitar_refresh_dashboard() -> None:
+    """Antecipa o recálculo do snapshot do dashboard após eventos relevantes."""
+    try:
+        from dashboard_snapshot import solicitar_atualizacao_snapshot
+        solicitar_atualizacao_snapshot()
+    except Exception as e:
+        logger.debug("Refresh antecipado do dashboard não agendado: %s", e)
+
+
 def registrar_ponto(usuario, tipo, modalidade, projeto, atividade, data_registro=None, hora_registro=None, latitude=None, longitude=None, conn_external=None):
     """Registra ponto do usuário com GPS real.
     Se conn_external for fornecido, usa a conexão existente (transação do caller)."""
@@ -1245,6 +1347,7 @@ def registrar_ponto(usuario, tipo, modalidade, projeto, atividade, data_registro
 
         if owns_conn:
             conn.commit()
+        _solicitar_refresh_dashboard()
         return data_hora_registro
     except Exception:
         if owns_conn:
@@ -1323,48 +1426,18 @@ def obter_usuarios_ativos():
 
 @st.cache_data(ttl=300)  # Cache de 5 minutos para reduzir reconexões
 def obter_badges_gestor_cached(usuario: str):
-    """Obtém contadores de badges do gestor em uma única consulta com cache otimizado (300s para reduzir reconexões).
+    """Obtém contadores de badges do gestor lendo ``pending_counters`` (busca por chave).
     
     Com fallback automático para valores em cache de sessão se a consulta falhar.
     """
     try:
-        if REFACTORING_ENABLED:
-            row = execute_query(
-                f"""
-                SELECT
-                    (SELECT COUNT(*) FROM solicitacoes_horas_extras
-                     WHERE aprovador_solicitado = {SQL_PLACEHOLDER} AND status = 'pendente') AS he_aprovar,
-                    (SELECT COUNT(*) FROM atestado_horas
-                     WHERE status = 'pendente') AS atestados_pendentes,
-                    (SELECT COUNT(DISTINCT id) FROM solicitacoes_correcao_registro
-                     WHERE status = 'pendente') AS correcoes_pendentes
-                """,
-                (usuario,),
-                fetch_one=True,
-            )
-        else:
-            conn = get_connection()
-            try:
-                cursor = conn.cursor()
-                cursor.execute(
-                    f"""
-                    SELECT
-                        (SELECT COUNT(*) FROM solicitacoes_horas_extras
-                         WHERE aprovador_solicitado = {SQL_PLACEHOLDER} AND status = 'pendente') AS he_aprovar,
-                        (SELECT COUNT(*) FROM atestado_horas
-                         WHERE status = 'pendente') AS atestados_pendentes,
-                        (SELECT COUNT(DISTINCT id) FROM solicitacoes_correcao_registro
-                         WHERE status = 'pendente') AS correcoes_pendentes
-                    """,
-                    (usuario,),
-                )
-                row = cursor.fetchone()
-            finally:
-                _return_conn(conn)
-        
-        if not row:
-            return 0, 0, 0
-        result = (int(row[0] or 0), int(row[1] or 0), int(row[2] or 0))
+        from pending_counters import obter_contadores
+        contadores = obter_contadores(usuario)
+        result = (
+            contadores["he_aprovar"],
+            contadores["atestados_pendentes"],
+            contadores["correcoes_pendentes"],
+        )
         # Guardar último resultado bem-sucedido em session_state como fallback
         if 'badges_cache_fallback' not in st.session_state:
             st.session_state.badges_cache_fallback = {}
@@ -1410,60 +1483,25 @@ def invalidar_caches_notificacoes(usuario: str | None = None) -> None:
     except Exception:
         pass
 
+    # Pendências mudaram: antecipar o snapshot do dashboard do gestor.
+    _solicitar_refresh_dashboard()
+
 
 @st.cache_data(ttl=120)  # Cache de 2 minutos
 def obter_solicitacoes_pendentes_count_cached(usuario: str) -> int:
-    """Conta solicitações de HE aguardando aprovação com cache de 2 minutos para reduzir reconexões."""
-    if REFACTORING_ENABLED:
-        result = execute_query(
-            f"SELECT COUNT(*) FROM horas_extras_ativas WHERE aprovador = {SQL_PLACEHOLDER} AND status = 'aguardando_aprovacao'",
-            (usuario,),
-            fetch_one=True,
-        )
-        return int(result[0]) if result else 0
-
-    conn = get_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute(
-            f"""
-            SELECT COUNT(*) FROM horas_extras_ativas
-            WHERE aprovador = {SQL_PLACEHOLDER}
-              AND status = 'aguardando_aprovacao'
-            """,
-            (usuario,),
-        )
-        row = cursor.fetchone()
-        return int(row[0]) if row else 0
-    finally:
-        _return_conn(conn)
+    """Conta solicitações de HE aguardando aprovação a partir de ``pending_counters``."""
+    from pending_counters import obter_contadores
+    return obter_contadores(usuario)["he_ativas_aguardando"]
 
 
 @st.cache_data(ttl=120)  # Cache de 2 minutos
 def obter_mensagens_nao_lidas_count_cached(usuario: str) -> int:
-    """Conta mensagens diretas não lidas para o usuário com cache de 2 minutos para reduzir reconexões."""
+    """Conta mensagens diretas não lidas para o usuário a partir de ``pending_counters``."""
     if not usuario:
         return 0
 
-    if REFACTORING_ENABLED:
-        result = execute_query(
-            f"SELECT COUNT(*) FROM mensagens_diretas WHERE destinatario = {SQL_PLACEHOLDER} AND lida = FALSE",
-            (usuario,),
-            fetch_one=True,
-        )
-        return int(result[0]) if result else 0
-
-    conn = get_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute(
-            f"SELECT COUNT(*) FROM mensagens_diretas WHERE destinatario = {SQL_PLACEHOLDER} AND lida = FALSE",
-            (usuario,),
-        )
-        row = cursor.fetchone()
-        return int(row[0]) if row else 0
-    finally:
-        _return_conn(conn)
+    from pending_counters import obter_contadores
+    return obter_contadores(usuario)["mensagens_nao_lidas"]
 
 # Interface de login
 
@@ -1528,6 +1566,7 @@ def tela_login():
                         st.session_state.tipo_usuario = resultado[0]
                         st.session_state.nome_completo = resultado[1]
                         st.session_state.logged_in = True
+                        st.session_state.prefetch_login = _iniciar_prefetch_login(usuario, resultado[0])
                         log_user_action(usuario, "login", f"tipo={resultado[0]}")
                         st.success("✅ Login realizado com sucesso!")
                         st.rerun()
@@ -1791,24 +1830,29 @@ def iniciar_hora_extra_interface():
                     
                     # Registrar hora extra ativa
                     if REFACTORING_ENABLED:
+                        conn = get_connection()
+                        cursor = conn.cursor()
                         try:
                             agora = get_datetime_br()
                             agora_sem_tz = agora.replace(tzinfo=None)
                             
-                            insert_query = f"""
+                            cursor.execute(f"""
                                 INSERT INTO horas_extras_ativas
                                 (usuario, aprovador, justificativa, data_inicio, hora_inicio, status)
                                 VALUES ({SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, 'aguardando_aprovacao')
-                            """
-                            hora_extra_id = execute_update(insert_query, (
+                                RETURNING id
+                            """, (
                                 st.session_state.usuario,
                                 aprovador,
                                 justificativa,
                                 agora_sem_tz.strftime('%Y-%m-%d %H:%M:%S'),
                                 agora_sem_tz.strftime('%H:%M')
-                            ), return_id=True)
+                            ))
+                            hora_extra_id = cursor.fetchone()[0]
                             
-                            # Criar notificação para o gestor
+                            sincronizar_contadores(cursor, 'horas_extras_ativas', chaves=[aprovador])
+                            
+                            # Notificação para o gestor na mesma transação (outbox)
                             try:
                                 from notifications import NotificationManager
                                 notif_manager = NotificationManager()
@@ -1817,12 +1861,16 @@ def iniciar_hora_extra_interface():
                                     tipo='aprovacao_hora_extra',
                                     titulo=f"🕐 Solicitação de Hora Extra - {st.session_state.nome_completo}",
                                     mensagem=f"Justificativa: {justificativa}",
-                                    dados_extras={'hora_extra_id': hora_extra_id}
+                                    dados_extras={'hora_extra_id': hora_extra_id},
+                                    cursor=cursor,
                                 )
                             except Exception as e:
                                 # Não bloquear se notificação falhar
                                 print(f"Erro ao criar notificação: {e}")
                             
+                            conn.commit()
+                            despertar_worker()
+                            
                             log_security_event("HOUR_EXTRA_REQUESTED", usuario=st.session_state.usuario, context={"he_id": hora_extra_id, "aprovador": aprovador})
                             st.session_state.hora_extra_ativa_id = hora_extra_id
                             st.session_state.solicitar_horas_extras = False
@@ -1835,8 +1883,11 @@ def iniciar_hora_extra_interface():
                                 st.rerun()
                         
                         except Exception as e:
+                            conn.rollback()
                             log_error("Erro ao registrar hora extra", e, {"usuario": st.session_state.usuario, "aprovador": aprovador})
                             st.error(f"❌ Erro ao registrar hora extra: {e}")
+                        finally:
+                            _return_conn(conn)
                     else:
                         # Fallback original
                         conn = get_connection()
@@ -1862,9 +1913,9 @@ def iniciar_hora_extra_interface():
                             # Obter ID da hora extra criada
                             hora_extra_id = cursor.fetchone()[0]
                             
-                            conn.commit()
+                            sincronizar_contadores(cursor, 'horas_extras_ativas', ids=[hora_extra_id])
                             
-                            # Criar notificação para o gestor
+                            # Notificação para o gestor na mesma transação (outbox)
                             try:
                                 from notifications import NotificationManager
                                 notif_manager = NotificationManager()
@@ -1873,12 +1924,16 @@ def iniciar_hora_extra_interface():
                                     tipo='aprovacao_hora_extra',
                                     titulo=f"🕐 Solicitação de Hora Extra - {st.session_state.nome_completo}",
                                     mensagem=f"Justificativa: {justificativa}",
-                                    dados_extras={'hora_extra_id': hora_extra_id}
+                                    dados_extras={'hora_extra_id': hora_extra_id},
+                                    cursor=cursor,
                                 )
                             except Exception as e:
                                 # Não bloquear se notificação falhar
                                 print(f"Erro ao criar notificação: {e}")
                             
+                            conn.commit()
+                            despertar_worker()
+                            
                             st.session_state.hora_extra_ativa_id = hora_extra_id
                             st.session_state.solicitar_horas_extras = False
                             
@@ -1895,6 +1950,32 @@ def iniciar_hora_extra_interface():
                             _return_conn(conn)
 
 
+def _buscar_hora_extra_ativa(usuario):
+    """Retorna a hora extra aguardando aprovação/em execução do usuário (ou None)."""
+    if tabela_existe('horas_extras_ativas') is False:
+        return None
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        # Rede de segurança caso o schema não tenha sido sondado
+        try:
+            cursor.execute(f"""
+                SELECT id, aprovador, justificativa, data_inicio, status
+                FROM horas_extras_ativas
+                WHERE usuario = {SQL_PLACEHOLDER} AND status IN ('aguardando_aprovacao', 'em_execucao')
+                ORDER BY data_inicio DESC
+                LIMIT 1
+            """, (usuario,))
+            return cursor.fetchone()
+        except Exception as e:
+            # Tabela não existe ou erro de acesso - retornar silenciosamente
+            if 'does not exist' in str(e) or 'no such table' in str(e):
+                return None
+            raise
+    finally:
+        _return_conn(conn)
+
+
 def exibir_hora_extra_em_andamento():
     """Exibe contador de hora extra em andamento com opção de encerrar"""
     from datetime import datetime
@@ -1902,21 +1983,11 @@ def exibir_hora_extra_em_andamento():
     # Verificar se tem hora extra ativa
     if REFACTORING_ENABLED:
         try:
-            # Verificar se tabela existe (compatibilidade com bancos antigos)
-            check_query = f"""
-                SELECT id, aprovador, justificativa, data_inicio, status
-                FROM horas_extras_ativas
-                WHERE usuario = {SQL_PLACEHOLDER} AND status IN ('aguardando_aprovacao', 'em_execucao')
-                ORDER BY data_inicio DESC
-                LIMIT 1
-            """
-            try:
-                hora_extra = execute_query(check_query, (st.session_state.usuario,), fetch_one=True)
-            except Exception as e:
-                # Tabela não existe ou erro de acesso - retornar silenciosamente
-                if 'does not exist' in str(e) or 'no such table' in str(e):
-                    return
-                raise e
+            # Primeira tela após o login usa o valor já buscado pelo prefetch
+            # (bancos antigos sem a tabela: decidido pelo schema sondado)
+            hora_extra = _valor_prefetch(
+                'hora_extra_ativa', lambda: _buscar_hora_extra_ativa(st.session_state.usuario)
+            )
             
             if not hora_extra:
                 return
@@ -1975,20 +2046,23 @@ def exibir_hora_extra_em_andamento():
                 with col1:
                     if st.button("🛑 Encerrar Hora Extra", type="primary", width="stretch", key="btn_encerrar_he"):
                         # Encerrar hora extra
+                        conn_encerrar = get_connection()
+                        cursor_encerrar = conn_encerrar.cursor()
+                        
                         try:
                             agora = get_datetime_br()
                             agora_sem_tz = agora.replace(tzinfo=None)
                             tempo_total_minutos = int(tempo_decorrido.total_seconds() / 60)
                             
-                            update_query = f"""
+                            chaves = chaves_afetadas(cursor_encerrar, 'horas_extras_ativas', [he_id])
+                            cursor_encerrar.execute(f"""
                                 UPDATE horas_extras_ativas
                                 SET status = 'encerrada',
                                     data_fim = {SQL_PLACEHOLDER},
                                     hora_fim = {SQL_PLACEHOLDER},
                                     tempo_decorrido_minutos = {SQL_PLACEHOLDER}
                                 WHERE id = {SQL_PLACEHOLDER}
-                            """
-                            execute_update(update_query, (
+                            """, (
                                 agora_sem_tz.strftime('%Y-%m-%d %H:%M:%S'),
                                 agora_sem_tz.strftime('%H:%M'),
                                 tempo_total_minutos,
@@ -1996,12 +2070,11 @@ def exibir_hora_extra_em_andamento():
                             ))
                             
                             # Registrar na tabela de solicitações de horas extras
-                            insert_query = f"""
+                            cursor_encerrar.execute(f"""
                                 INSERT INTO solicitacoes_horas_extras
                                 (usuario, data, hora_inicio, hora_fim, justificativa, aprovador_solicitado, status, aprovado_por, data_aprovacao)
                                 VALUES ({SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, 'aprovada', {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER})
-                            """
-                            execute_update(insert_query, (
+                            """, (
                                 st.session_state.usuario,
                                 inicio.strftime('%Y-%m-%d'),
                                 inicio.strftime('%H:%M'),
@@ -2012,6 +2085,9 @@ def exibir_hora_extra_em_andamento():
                                 agora_sem_tz.strftime('%Y-%m-%d %H:%M:%S')
                             ))
                             
+                            sincronizar_contadores(cursor_encerrar, 'horas_extras_ativas', chaves=chaves)
+                            conn_encerrar.commit()
+                            
                             log_security_event("HOUR_EXTRA_ENDED", usuario=st.session_state.usuario, context={"he_id": he_id, "tempo_minutos": tempo_total_minutos})
                             st.success(f"✅ Hora extra encerrada! Total trabalhado: **{horas}h {minutos}min**")
                             st.balloons()
@@ -2022,8 +2098,11 @@ def exibir_hora_extra_em_andamento():
                             st.rerun()
                             
                         except Exception as e:
+                            conn_encerrar.rollback()
                             log_error("Erro ao encerrar hora extra", e, {"he_id": he_id, "usuario": st.session_state.usuario})
                             st.error(f"❌ Erro ao encerrar hora extra: {e}")
+                        finally:
+                            _return_conn(conn_encerrar)
                 
                 with col2:
                     st.info("💡 Clique em 'Encerrar' quando finalizar o trabalho para registrar o total de horas extras")
@@ -2032,27 +2111,11 @@ def exibir_hora_extra_em_andamento():
             logger.error(f"Erro em exibir_hora_extra_em_andamento: {str(e)}")
     else:
         # Fallback original
-        conn = None
         try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            
-            # Verificar se tabela existe (compatibilidade com bancos antigos)
-            try:
-                cursor.execute(f"""
-                    SELECT id, aprovador, justificativa, data_inicio, status
-                    FROM horas_extras_ativas
-                    WHERE usuario = {SQL_PLACEHOLDER} AND status IN ('aguardando_aprovacao', 'em_execucao')
-                    ORDER BY data_inicio DESC
-                    LIMIT 1
-                """, (st.session_state.usuario,))
-                
-                hora_extra = cursor.fetchone()
-            except Exception as e:
-                # Tabela não existe ou erro de acesso - retornar silenciosamente
-                if 'does not exist' in str(e) or 'no such table' in str(e):
-                    return
-                raise e
+            # Primeira tela após o login usa o valor já buscado pelo prefetch
+            hora_extra = _valor_prefetch(
+                'hora_extra_ativa', lambda: _buscar_hora_extra_ativa(st.session_state.usuario)
+            )
             
             if not hora_extra:
                 return
@@ -2119,6 +2182,7 @@ def exibir_hora_extra_em_andamento():
                             agora_sem_tz = agora.replace(tzinfo=None)
                             tempo_total_minutos = int(tempo_decorrido.total_seconds() / 60)
                             
+                            chaves = chaves_afetadas(cursor_encerrar, 'horas_extras_ativas', [he_id])
                             cursor_encerrar.execute(f"""
                                 UPDATE horas_extras_ativas
                                 SET status = 'encerrada',
@@ -2149,6 +2213,7 @@ def exibir_hora_extra_em_andamento():
                                 agora_sem_tz.strftime('%Y-%m-%d %H:%M:%S')
                             ))
                             
+                            sincronizar_contadores(cursor_encerrar, 'horas_extras_ativas', chaves=chaves)
                             conn_encerrar.commit()
                             
                             st.success(f"✅ Hora extra encerrada! Total trabalhado: **{horas}h {minutos}min**")
@@ -2169,9 +2234,6 @@ def exibir_hora_extra_em_andamento():
         
         except Exception as e:
             logger.error(f"Erro em exibir_hora_extra_em_andamento: {str(e)}")
-        finally:
-            if conn:
-                _return_conn(conn)
 
 
 def aprovar_hora_extra_rapida_interface():
@@ -2249,13 +2311,20 @@ def aprovar_hora_extra_rapida_interface():
                 
                 with col1:
                     if st.button("✅ Aprovar", key=f"aprovar_{he_id}", type="primary", width="stretch"):
-                        # Atualizar status para em_execucao
-                        update_query = f"""
-                            UPDATE horas_extras_ativas
-                            SET status = 'em_execucao'
-                            WHERE id = {SQL_PLACEHOLDER}
-                        """
-                        execute_update(update_query, (he_id,))
+                        # Atualizar status para em_execucao (contadores na mesma transação)
+                        conn = get_connection()
+                        try:
+                            cursor = conn.cursor()
+                            chaves = chaves_afetadas(cursor, 'horas_extras_ativas', [he_id])
+                            cursor.execute(f"""
+                                UPDATE horas_extras_ativas
+                                SET status = 'em_execucao'
+                                WHERE id = {SQL_PLACEHOLDER}
+                            """, (he_id,))
+                            sincronizar_contadores(cursor, 'horas_extras_ativas', chaves=chaves)
+                            conn.commit()
+                        finally:
+                            _return_conn(conn)
                         
                         # Criar notificação para o funcionário
                         from notifications import NotificationManager
@@ -2277,13 +2346,20 @@ def aprovar_hora_extra_rapida_interface():
                 
                 with col2:
                     if st.button("❌ Rejeitar", key=f"rejeitar_{he_id}", width="stretch"):
-                        # Atualizar status para rejeitada
-                        update_query = f"""
-                            UPDATE horas_extras_ativas
-                            SET status = 'rejeitada'
-                            WHERE id = {SQL_PLACEHOLDER}
-                        """
-                        execute_update(update_query, (he_id,))
+                        # Atualizar status para rejeitada (contadores na mesma transação)
+                        conn = get_connection()
+                        try:
+                            cursor = conn.cursor()
+                            chaves = chaves_afetadas(cursor, 'horas_extras_ativas', [he_id])
+                            cursor.execute(f"""
+                                UPDATE horas_extras_ativas
+                                SET status = 'rejeitada'
+                                WHERE id = {SQL_PLACEHOLDER}
+                            """, (he_id,))
+                            sincronizar_contadores(cursor, 'horas_extras_ativas', chaves=chaves)
+                            conn.commit()
+                        finally:
+                            _return_conn(conn)
                         
                         # Criar notificação para o funcionário
                         from notifications import NotificationManager
@@ -2380,11 +2456,13 @@ def aprovar_hora_extra_rapida_interface():
                 with col1:
                     if st.button("✅ Aprovar", key=f"aprovar_{he_id}", type="primary", width="stretch"):
                         # Atualizar status para em_execucao
+                        chaves = chaves_afetadas(cursor, 'horas_extras_ativas', [he_id])
                         cursor.execute(f"""
                             UPDATE horas_extras_ativas
                             SET status = 'em_execucao'
                             WHERE id = {SQL_PLACEHOLDER}
                         """, (he_id,))
+                        sincronizar_contadores(cursor, 'horas_extras_ativas', chaves=chaves)
                         conn.commit()
                         
                         # Criar notificação para o funcionário
@@ -2414,11 +2492,13 @@ def aprovar_hora_extra_rapida_interface():
                 with col2:
                     if st.button("❌ Rejeitar", key=f"rejeitar_{he_id}", width="stretch"):
                         # Atualizar status para rejeitada
+                        chaves = chaves_afetadas(cursor, 'horas_extras_ativas', [he_id])
                         cursor.execute(f"""
                             UPDATE horas_extras_ativas
                             SET status = 'rejeitada'
                             WHERE id = {SQL_PLACEHOLDER}
                         """, (he_id,))
+                        sincronizar_contadores(cursor, 'horas_extras_ativas', chaves=chaves)
                         conn.commit()
                         
                         # Criar notificação para o funcionário
@@ -2642,6 +2722,7 @@ def exibir_widget_notificacoes(horas_extras_system):
                                                 data_aprovacao = NOW(), observacoes = {SQL_PLACEHOLDER}
                                             WHERE id = {SQL_PLACEHOLDER}
                                         """, (st.session_state.usuario, observacoes_he, sol_id))
+                                        sincronizar_contadores(cursor, 'solicitacoes_horas_extras', ids=[sol_id])
                                         conn.commit()
                                     finally:
                                         _return_conn(conn)
@@ -2666,6 +2747,7 @@ def exibir_widget_notificacoes(horas_extras_system):
                                                     data_aprovacao = NOW(), observacoes = {SQL_PLACEHOLDER}
                                                 WHERE id = {SQL_PLACEHOLDER}
                                             """, (st.session_state.usuario, observacoes_he, sol_id))
+                                            sincronizar_contadores(cursor, 'solicitacoes_horas_extras', ids=[sol_id])
                                             conn.commit()
                                         finally:
                                             _return_conn(conn)
@@ -3016,6 +3098,7 @@ def mensagens_funcionario_interface():
                     
                     if st.button("✅ Marcar como lida", key=f"ler_msg_{msg_id}"):
                         marcar_mensagem_lida(msg_id)
+                        obter_mensagens_nao_lidas_count_cached.clear()
                         st.rerun()
         
         if lidas:
@@ -3275,7 +3358,7 @@ def registrar_ponto_interface(calculo_horas_system, horas_extras_system=None):
     dia_semana_map = {0: 'seg', 1: 'ter', 2: 'qua', 3: 'qui', 4: 'sex', 5: 'sab', 6: 'dom'}
     dia_semana = dia_semana_map.get(hoje.weekday(), 'seg')
     
-    jornada = obter_jornada_usuario(st.session_state.usuario)
+    jornada = _valor_prefetch('jornada', lambda: obter_jornada_usuario(st.session_state.usuario))
     config_dia = jornada.get(dia_semana, {})
     
     # Obter horário de fim da jornada
@@ -3585,6 +3668,7 @@ def registrar_ponto_interface(calculo_horas_system, horas_extras_system=None):
                                 conn_external=conn,
                             )
 
+                            sincronizar_contadores(cursor, 'solicitacoes_horas_extras', chaves=[aprovador_username])
                             conn.commit()
                         except Exception:
                             conn.rollback()
@@ -3806,11 +3890,15 @@ def registrar_ponto_interface(calculo_horas_system, horas_extras_system=None):
         key="ver_registros_data"
     )
 
-    registros_dia = obter_registros_usuario(
+    carregar_registros_dia = lambda: obter_registros_usuario(
         st.session_state.usuario,
         data_selecionada.strftime("%Y-%m-%d"),
         data_selecionada.strftime("%Y-%m-%d")
     )
+    if data_selecionada == hoje_br():
+        registros_dia = _valor_prefetch('registros_hoje', carregar_registros_dia)
+    else:
+        registros_dia = carregar_registros_dia()
 
     if registros_dia:
         st.subheader(f"📋 Registros de {data_selecionada.strftime('%d/%m/%Y')}")
@@ -5296,36 +5384,42 @@ def solicitar_correcao_registro_interface():
                                 if solicitacao_duplicada_id:
                                     st.warning("⚠️ Já existe uma solicitação pendente idêntica para este registro.")
                                     return
-                                try:
-                                    cursor.execute(f"""
-                                        INSERT INTO solicitacoes_correcao_registro
-                                        (usuario, registro_id, data_hora_original, data_hora_nova,
-                                         tipo_original, tipo_novo, modalidade_original, modalidade_nova,
-                                         projeto_original, projeto_novo, tipo_solicitacao,
-                                         data_referencia, hora_inicio_solicitada, hora_saida_solicitada,
-                                         justificativa, status)
-                                        VALUES ({SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER},
-                                                {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER},
-                                                {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, 'ajuste_registro',
-                                                {SQL_PLACEHOLDER}, NULL, NULL, {SQL_PLACEHOLDER}, 'pendente')
-                                    """, (
-                                        usuario_logado,
-                                        registro['id'],
-                                        registro['data_hora'],
-                                        nova_data_hora,
-                                        registro['tipo'],
-                                        novo_tipo,
-                                        registro['modalidade'],
-                                        nova_modalidade if nova_modalidade else None,
-                                        registro['projeto'],
-                                        novo_projeto if novo_projeto else None,
-                                        nova_data.strftime("%Y-%m-%d"),
-                                        justificativa.strip(),
-                                    ))
-                                except Exception as insert_exc:
-                                    if not _is_missing_column_error(insert_exc):
-                                        raise
-                                    conn.rollback()
+                                # Variante escolhida pelo schema sondado; erro de coluna só se não foi possível sondar.
+                                usar_legado = _correcao_schema_novo() is False
+                                if not usar_legado:
+                                    try:
+                                        cursor.execute(f"""
+                                            INSERT INTO solicitacoes_correcao_registro
+                                            (usuario, registro_id, data_hora_original, data_hora_nova,
+                                             tipo_original, tipo_novo, modalidade_original, modalidade_nova,
+                                             projeto_original, projeto_novo, tipo_solicitacao,
+                                             data_referencia, hora_inicio_solicitada, hora_saida_solicitada,
+                                             justificativa, status)
+                                            VALUES ({SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER},
+                                                    {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER},
+                                                    {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, 'ajuste_registro',
+                                                    {SQL_PLACEHOLDER}, NULL, NULL, {SQL_PLACEHOLDER}, 'pendente')
+                                        """, (
+                                            usuario_logado,
+                                            registro['id'],
+                                            registro['data_hora'],
+                                            nova_data_hora,
+                                            registro['tipo'],
+                                            novo_tipo,
+                                            registro['modalidade'],
+                                            nova_modalidade if nova_modalidade else None,
+                                            registro['projeto'],
+                                            novo_projeto if novo_projeto else None,
+                                            nova_data.strftime("%Y-%m-%d"),
+                                            justificativa.strip(),
+                                        ))
+                                    except Exception as insert_exc:
+                                        if not _is_missing_column_error(insert_exc):
+                                            raise
+                                        conn.rollback()
+                                        invalidar_schema()
+                                        usar_legado = True
+                                if usar_legado:
                                     cursor.execute(f"""
                                         INSERT INTO solicitacoes_correcao_registro
                                         (usuario, registro_id, data_hora_original, data_hora_nova,
@@ -5347,6 +5441,7 @@ def solicitar_correcao_registro_interface():
                                         novo_projeto if novo_projeto else None,
                                         justificativa.strip(),
                                     ))
+                                sincronizar_contadores(cursor, 'solicitacoes_correcao_registro', chaves=[usuario_logado])
                                 conn.commit()
                             finally:
                                 _return_conn(conn)
@@ -5451,6 +5546,9 @@ def solicitar_correcao_registro_interface():
                             conn = get_connection()
                             try:
                                 cursor = conn.cursor()
+                                if _correcao_schema_novo() is False and not _try_upgrade_correcao_schema(conn):
+                                    st.error("❌ O banco de produção ainda não foi migrado para complemento de jornada. Contate o suporte.")
+                                    return
                                 solicitacao_duplicada_id = existe_solicitacao_correcao_pendente_cursor(
                                     cursor,
                                     usuario=usuario_logado,
@@ -5492,6 +5590,7 @@ def solicitar_correcao_registro_interface():
                                     hora_saida.strftime("%H:%M"),
                                     justificativa.strip(),
                                 ))
+                                sincronizar_contadores(cursor, 'solicitacoes_correcao_registro', chaves=[usuario_logado])
                                 conn.commit()
                             except Exception as e:
                                 if _is_missing_column_error(e):
@@ -5526,6 +5625,7 @@ def solicitar_correcao_registro_interface():
                                                 hora_saida.strftime("%H:%M"),
                                                 justificativa.strip(),
                                             ))
+                                            sincronizar_contadores(cursor, 'solicitacoes_correcao_registro', chaves=[usuario_logado])
                                             conn.commit()
                                         except Exception as retry_exc:
                                             log_error("Erro ao reenviar complemento apos migracao", retry_exc, {"usuario": usuario_logado})
@@ -5584,6 +5684,7 @@ def solicitar_correcao_registro_interface():
                     LIMIT 50
                 """,
                 legacy_suffix=('ajuste_registro', None, None, None),
+                requer_colunas=CORRECAO_COLUNAS_NOVAS,
             )
         except Exception as e:
             log_error("Erro ao buscar solicitações de correção", e, {"usuario": st.session_state.usuario})
@@ -5677,6 +5778,7 @@ def corrigir_registros_interface():
                 LIMIT 200
             """,
             legacy_suffix=('ajuste_registro', None, None, None),
+            requer_colunas=CORRECAO_COLUNAS_NOVAS,
         ) or []
     except Exception as e:
         logger.debug("Falha ao carregar pendências de correção: %s", e)
@@ -6900,7 +7002,21 @@ def dashboard_gestor(banco_horas_system, calculo_horas_system):
     # Métricas gerais - OTIMIZADO COM CACHE
     hoje = date.today().strftime("%Y-%m-%d")
     
-    if USE_OPTIMIZED:
+    # 🚀 Snapshot pré-calculado pelo scheduler: uma única leitura de linha
+    snapshot = None
+    try:
+        from dashboard_snapshot import obter_dashboard_snapshot
+        snapshot = obter_dashboard_snapshot()
+    except Exception as e:
+        logger.warning("Snapshot do dashboard indisponível, usando consultas diretas: %s", e)
+    
+    if snapshot:
+        total_usuarios = snapshot["total_usuarios"]
+        registros_hoje = snapshot["registros_hoje"]
+        ausencias_pendentes = snapshot["ausencias_pendentes"]
+        horas_extras_pendentes = snapshot["horas_extras_pendentes"]
+        atestados_mes = snapshot["atestados_mes"]
+    elif USE_OPTIMIZED:
         # 🚀 Busca todas as métricas de uma vez com cache
         metricas = get_metricas_dashboard_otimizado()
         total_usuarios = metricas["total_usuarios"]
@@ -7083,7 +7199,9 @@ def dashboard_gestor(banco_horas_system, calculo_horas_system):
             # Gráfico de Rosca - Status de presença
             # Calcular presentes hoje
             presentes_hoje = 0
-            if REFACTORING_ENABLED:
+            if snapshot:
+                presentes_hoje = snapshot["presentes_hoje"]
+            elif REFACTORING_ENABLED:
                 try:
                     query_presentes = f"""
                         SELECT COUNT(DISTINCT usuario) FROM registros_ponto 
@@ -7125,19 +7243,23 @@ def dashboard_gestor(banco_horas_system, calculo_horas_system):
         # Gráfico de linha - Registros últimos 7 dias
         datas_semana = []
         valores_semana = []
-        for i in range(6, -1, -1):
-            data_check = (date.today() - timedelta(days=i)).strftime("%Y-%m-%d")
-            count_dia = 0
-            if REFACTORING_ENABLED:
-                try:
-                    query_dia = f"SELECT COUNT(*) FROM registros_ponto WHERE DATE(data_hora) = {SQL_PLACEHOLDER}"
-                    resultado = execute_query(query_dia, (data_check,), fetch_one=True)
-                    if resultado:
-                        count_dia = resultado[0]
-                except Exception as e:
-                    logger.debug("Erro silenciado: %s", e)
-            datas_semana.append((date.today() - timedelta(days=i)).strftime("%d/%m"))
-            valores_semana.append(count_dia)
+        if snapshot:
+            datas_semana = list(snapshot["registros_semana"]["datas"])
+            valores_semana = list(snapshot["registros_semana"]["valores"])
+        else:
+            for i in range(6, -1, -1):
+                data_check = (date.today() - timedelta(days=i)).strftime("%Y-%m-%d")
+                count_dia = 0
+                if REFACTORING_ENABLED:
+                    try:
+                        query_dia = f"SELECT COUNT(*) FROM registros_ponto WHERE DATE(data_hora) = {SQL_PLACEHOLDER}"
+                        resultado = execute_query(query_dia, (data_check,), fetch_one=True)
+                        if resultado:
+                            count_dia = resultado[0]
+                    except Exception as e:
+                        logger.debug("Erro silenciado: %s", e)
+                datas_semana.append((date.today() - timedelta(days=i)).strftime("%d/%m"))
+                valores_semana.append(count_dia)
         
         fig = create_line_chart(
             x_data=datas_semana,
@@ -7156,7 +7278,11 @@ def dashboard_gestor(banco_horas_system, calculo_horas_system):
             # Tipos de ausências no mês
             ausencias_por_tipo = {}
             primeiro_dia_mes = date.today().replace(day=1).strftime("%Y-%m-%d")
-            if REFACTORING_ENABLED:
+            if snapshot:
+                ausencias_por_tipo = {
+                    (tipo or "")[:20]: total for tipo, total in snapshot["ausencias_por_tipo"].items()
+                }
+            elif REFACTORING_ENABLED:
                 try:
                     query_tipos = f"""
                         SELECT tipo, COUNT(*) as total FROM ausencias 
@@ -7186,7 +7312,11 @@ def dashboard_gestor(banco_horas_system, calculo_horas_system):
         with col2:
             # Status das solicitações
             status_counts = {'Pendente': 0, 'Aprovado': 0, 'Rejeitado': 0}
-            if REFACTORING_ENABLED:
+            if snapshot:
+                for status_nome, total in snapshot["ausencias_status"].items():
+                    if status_nome.capitalize() in status_counts:
+                        status_counts[status_nome.capitalize()] = total
+            elif REFACTORING_ENABLED:
                 try:
                     query_status = f"""
                         SELECT status, COUNT(*) FROM ausencias 
@@ -7637,6 +7767,7 @@ def aprovar_correcoes_registros_interface():
                     ORDER BY c.data_solicitacao DESC
                 """,
                 legacy_suffix=('ajuste_registro', None, None, None),
+                requer_colunas=CORRECAO_COLUNAS_NOVAS,
             )
         finally:
             _return_conn(conn)
@@ -7955,6 +8086,7 @@ def aprovar_correcoes_registros_interface():
                                                 detalhes=observacoes,
                                             )
 
+                                        sincronizar_contadores(cursor, 'solicitacoes_correcao_registro', ids=[correcao_id])
                                         conn.commit()
                                     finally:
                                         _return_conn(conn)
@@ -8001,6 +8133,7 @@ def aprovar_correcoes_registros_interface():
                                                         data_aprovacao = CURRENT_TIMESTAMP, observacoes = {SQL_PLACEHOLDER}
                                                     WHERE id = {SQL_PLACEHOLDER}
                                                 """, (st.session_state.usuario, motivo, correcao_id))
+                                                sincronizar_contadores(cursor, 'solicitacoes_correcao_registro', ids=[correcao_id])
                                                 conn.commit()
                                             finally:
                                                 _return_conn(conn)
@@ -8057,6 +8190,7 @@ def aprovar_correcoes_registros_interface():
                     LIMIT 50
                 """,
                 legacy_suffix=('ajuste_registro', None, None, None),
+                requer_colunas=CORRECAO_COLUNAS_NOVAS,
             )
         finally:
             _return_conn(conn)
@@ -8130,6 +8264,7 @@ def aprovar_correcoes_registros_interface():
                     LIMIT 50
                 """,
                 legacy_suffix=('ajuste_registro', None),
+                requer_colunas=CORRECAO_COLUNAS_NOVAS,
             )
         finally:
             _return_conn(conn)
@@ -8289,6 +8424,7 @@ def notificacoes_gestor_interface(horas_extras_system, atestado_system):
                     LIMIT 200
                 """,
                 legacy_suffix=('ajuste_registro', None, None, None),
+                requer_colunas=CORRECAO_COLUNAS_NOVAS,
             ) or []
         except Exception as e:
             log_error("Erro ao buscar correções de registros pendentes nas notificações", e, {"status": "pendente"})
@@ -8916,6 +9052,7 @@ def aprovar_atestados_interface(atestado_system):
                                                 observacoes = {SQL_PLACEHOLDER}
                                             WHERE id = {SQL_PLACEHOLDER}
                                         """, (f"Revertido: {motivo_rev}", atestado_id))
+                                        sincronizar_contadores(cursor, 'atestado_horas', ids=[atestado_id])
                                         conn.commit()
                                     finally:
                                         _return_conn(conn)
@@ -10334,7 +10471,6 @@ def gerenciar_usuarios_interface():
                                     ))
                                     
                                     # Salvar jornada semanal
-                                    from jornada_semanal_system import salvar_jornada_semanal
                                     salvar_jornada_semanal(usuario_id, jornada_config)
                                     
                                     log_security_event("USER_UPDATED", usuario=st.session_state.usuario, context={"target_user_id": usuario_id, "target_type": novo_tipo})
@@ -10364,7 +10500,6 @@ def gerenciar_usuarios_interface():
                                     ))
 
                                     # Salvar jornada semanal NA MESMA transação
-                                    from jornada_semanal_system import salvar_jornada_semanal
                                     salvar_jornada_semanal(usuario_id, jornada_config, conn_external=conn)
 
                                     conn.commit()
@@ -11334,6 +11469,49 @@ def _render_backup_email_section():
                         st.error(f"❌ Erro ao enviar backup: {e}")
 
 
+def _render_backup_restore_section():
+    """Restauração de um backup do servidor, com progresso por tabela."""
+    st.markdown("---")
+    st.markdown("### ♻️ Restaurar Backup")
+
+    try:
+        from backup_postgresql import get_available_backups, restore_backup
+        backups = [b for b in get_available_backups() if 'JSON' in b['type']]
+    except Exception as e:
+        st.error(f"❌ Erro ao listar backups: {e}")
+        return
+
+    if not backups:
+        st.info("Nenhum backup disponível no servidor.")
+        return
+
+    with st.form("restaurar_backup"):
+        escolhido = st.selectbox(
+            "📦 Backup",
+            options=range(len(backups)),
+            format_func=lambda i: f"{backups[i]['filename']} ({backups[i]['size_formatted']}, "
+                                  f"{backups[i]['created']:%d/%m/%Y %H:%M})",
+        )
+        limpar = st.checkbox(
+            "🗑️ Apagar os dados atuais das tabelas antes de restaurar",
+            value=False,
+            help="Sem esta opção, registros já existentes são mantidos e só os ausentes são inseridos"
+        )
+        restaurar = st.form_submit_button("♻️ Restaurar", type="secondary")
+
+    if restaurar:
+        barra = st.progress(0.0, text="Preparando restauração...")
+
+        def _atualizar(concluidas, total, tabela):
+            barra.progress(concluidas / total, text=f"Tabela {tabela} concluída ({concluidas}/{total})")
+
+        sucesso, mensagem = restore_backup(backups[escolhido]['path'], limpar, progresso=_atualizar)
+        if sucesso:
+            st.success(f"✅ {mensagem}")
+        else:
+            st.error(f"❌ {mensagem}")
+
+
 def _render_push_notifications_config():
     """Seção de configuração de Push Notifications globais."""
     st.markdown("---")
@@ -11424,6 +11602,72 @@ def _render_push_notifications_config():
         """)
 
 
+def _render_job_runs_dashboard():
+    """Seção de desempenho dos jobs agendados (p50/p95 a partir de job_runs)."""
+    st.markdown("---")
+    st.markdown("### 📈 Desempenho dos Jobs Agendados")
+
+    try:
+        from job_telemetry import obter_estatisticas_jobs, obter_percentis_diarios
+        from constants import JOB_RUNS_DASHBOARD_DAYS
+
+        estatisticas = obter_estatisticas_jobs()
+    except Exception as e:
+        st.error(f"❌ Erro ao carregar histórico de jobs: {e}")
+        return
+
+    if not estatisticas:
+        st.info("Nenhuma execução registrada ainda. O histórico aparece após os primeiros jobs rodarem.")
+        return
+
+    st.caption(f"Últimos {JOB_RUNS_DASHBOARD_DAYS} dias. Perdidos = misfire; sobrepostos = disparo com execução anterior ainda rodando.")
+    df_jobs = pd.DataFrame(estatisticas)[[
+        'job_nome', 'execucoes', 'p50_ms', 'p95_ms', 'max_ms', 'erros',
+        'perdidos', 'sobrepostos', 'consultas_por_execucao', 'chamadas_externas', 'chamadas_falha',
+    ]]
+    st.dataframe(
+        df_jobs.rename(columns={
+            'job_nome': 'Job', 'execucoes': 'Execuções', 'p50_ms': 'p50 (ms)', 'p95_ms': 'p95 (ms)',
+            'max_ms': 'Máx (ms)', 'erros': 'Erros', 'perdidos': 'Perdidos', 'sobrepostos': 'Sobrepostos',
+            'consultas_por_execucao': 'SQL/execução', 'chamadas_externas': 'Chamadas externas',
+            'chamadas_falha': 'Falhas externas',
+        }).round(1),
+        hide_index=True,
+        width="stretch",
+    )
+
+    serie = pd.DataFrame(obter_percentis_diarios())
+    if not serie.empty:
+        metrica = st.radio("Percentil", ["p95_ms", "p50_ms"], horizontal=True, key="job_runs_percentil",
+                           format_func=lambda m: m.replace("_ms", "").upper())
+        st.line_chart(serie.pivot_table(index='dia', columns='job', values=metrica))
+
+
+def _render_rate_limits():
+    """Filas e esperas dos limites de taxa das APIs externas (este processo)."""
+    try:
+        from rate_limiter import metricas_limitadores
+        metricas = metricas_limitadores()
+    except Exception as e:
+        st.error(f"❌ Erro ao carregar limites de taxa: {e}")
+        return
+
+    if not metricas:
+        return
+
+    st.markdown("#### 🚦 Limites de Taxa das APIs Externas")
+    st.caption("Fila = chamadas aguardando a vez em todos os processos; demais colunas desde o início deste processo.")
+    st.dataframe(
+        pd.DataFrame(metricas).rename(columns={
+            'destino': 'Destino', 'taxa_por_s': 'Taxa (/s)', 'rajada': 'Rajada', 'aguardando': 'Aguardando',
+            'fila': 'Fila', 'adquiridos': 'Chamadas', 'recusados': 'Recusadas', 'esperas': 'Esperaram',
+            'espera_media_ms': 'Espera média (ms)', 'espera_max_ms': 'Espera máx (ms)',
+        }),
+        hide_index=True,
+        width="stretch",
+    )
+
+
 def _render_auto_notifications_config():
     """Seção de configuração de Notificações Automáticas (Scheduler)."""
     st.markdown("---")
@@ -11451,6 +11695,8 @@ def _render_auto_notifications_config():
                     st.info("Nenhum job agendado no momento.")
 
             st.markdown(f"🕐 **Horário do servidor:** {status['data_hora_atual']}")
+        elif status.get('seguidor'):
+            st.info("ℹ️ **Scheduler em espera** - outro processo executa os jobs agendados e este assume se ele cair.")
         else:
             st.warning("⚠️ **Scheduler inativo** - Notificações automáticas desabilitadas")
             st.info("Você pode iniciar agora sem reiniciar o app.")
@@ -11935,8 +12181,11 @@ def sistema_interface():
 
     # Seções extraídas para funções auxiliares (legibilidade)
     _render_backup_email_section()
+    _render_backup_restore_section()
     _render_push_notifications_config()
     _render_auto_notifications_config()
+    _render_job_runs_dashboard()
+    _render_rate_limits()
 
 
 # Rodapé unificado
@@ -12552,6 +12801,7 @@ def corrigir_registro_ponto(registro_id, novo_tipo, nova_data_hora, nova_modalid
                 detalhes=f"Registro ID {registro_id} movido para nova data",
             )
 
+        sincronizar_contadores(cursor, 'solicitacoes_correcao_registro', ids=[correcao_id])
         conn.commit()
         log_security_event("RECORD_CORRECTION", usuario=gestor, context={"registro_id": registro_id, "tipo": novo_tipo})
         return {"success": True, "message": "Registro corrigido com sucesso"}
@@ -12639,6 +12889,7 @@ def excluir_registro_ponto(registro_id, justificativa, gestor, correcao_id=None)
             detalhes=f"Registro excluído: tipo={tipo}; modalidade={modalidade}; projeto={projeto}; atividade={atividade}; localizacao={localizacao}",
         )
 
+        sincronizar_contadores(cursor, 'solicitacoes_correcao_registro', ids=[correcao_id])
         conn.commit()
         log_security_event("RECORD_DELETION", usuario=gestor, context={"registro_id": registro_id, "usuario_afetado": usuario_afetado})
         return {"success": True, "message": "Registro excluído com sucesso"}
@@ -12663,6 +12914,13 @@ def _initialize_app_once():
         run_pending_migrations()
     except Exception as e:
         logger.warning("Não foi possível executar migrações: %s", e)
+
+    # Calibrar custo bcrypt e subir o pool de verificação de senhas em background
+    try:
+        from password_utils import iniciar_pool_senhas
+        threading.Thread(target=iniciar_pool_senhas, name="password-pool-init", daemon=True).start()
+    except Exception as e:
+        logger.warning("Pool de verificação de senhas não iniciado: %s", e)
     
     # Iniciar scheduler embutido por padrão.
     # Pode ser desabilitado explicitamente com USE_EMBEDDED_SCHEDULER=false.
@@ -12670,8 +12928,8 @@ def _initialize_app_once():
         try:
             from background_scheduler import iniciar_scheduler_background, is_scheduler_running
             if not is_scheduler_running():
-                iniciar_scheduler_background()
-                logger.info("✅ Scheduler embutido de notificações iniciado")
+                if iniciar_scheduler_background():
+                    logger.info("✅ Scheduler embutido de notificações iniciado (líder ou em espera)")
         except Exception as e:
             logger.warning(f"Scheduler embutido não iniciado: {e}")
     else:
@@ -12690,6 +12948,9 @@ def _initialize_app_once():
         apply_uploads_migration()
     except Exception as e:
         logger.warning(f"Não foi possível aplicar migration de uploads: {e}")
+
+    # Migrações podem ter criado tabelas/colunas: a sondagem de schema recomeça daqui
+    invalidar_schema()
     
     return True
 
@@ -12910,10 +13171,17 @@ def main():
             # Exibir modal de ativação de push notifications (obrigatório após login)
             exibir_modal_push_obrigatorio()
 
+            # O prefetch do login vale só para a primeira renderização (mesmo com rerun/stop).
             if st.session_state.tipo_usuario == 'funcionario':
-                tela_funcionario()
+                try:
+                    tela_funcionario()
+                finally:
+                    _finalizar_prefetch_login('tela_funcionario')
             elif st.session_state.tipo_usuario == 'gestor':
-                tela_gestor()
+                try:
+                    tela_gestor()
+                finally:
+                    _finalizar_prefetch_login('tela_gestor')
             else:
                 st.error(
                     "Tipo de usuário desconhecido. Por favor, faça login novamente.")
@@ -8,6 +8,7 @@ from datetime import datetime
 logger = logging.getLogger(__name__)
 
 from database import get_connection, return_connection, SQL_PLACEHOLDER as DB_SQL_PLACEHOLDER
+from pending_counters import sincronizar_contadores
 
 SQL_PLACEHOLDER = DB_SQL_PLACEHOLDER
 
@@ -64,8 +65,9 @@ class AtestadoHorasSystem:
                     nao_possui_comprovante,
                 ),
             )
-            conn.commit()
             atestado_id = cursor.lastrowid if hasattr(cursor, "lastrowid") else None
+            sincronizar_contadores(cursor, "atestado_horas", chaves=[usuario])
+            conn.commit()
             return_connection(conn)
             return {"success": True, "message": "Atestado registrado com sucesso!", "id": atestado_id, "total_horas": total_horas}
         except Exception as e:
@@ -118,6 +120,7 @@ class AtestadoHorasSystem:
                 """,
                 ("aprovado", gestor, observacoes, atestado_id),
             )
+            sincronizar_contadores(cursor, "atestado_horas", ids=[atestado_id])
             conn.commit()
             return_connection(conn)
             return {"success": True, "message": "Atestado aprovado"}
@@ -146,6 +149,7 @@ class AtestadoHorasSystem:
                 """,
                 ("rejeitado", gestor, motivo, atestado_id)
             )
+            sincronizar_contadores(cursor, "atestado_horas", ids=[atestado_id])
             conn.commit()
             return_connection(conn)
             return {"success": True, "message": "Atestado rejeitado"}
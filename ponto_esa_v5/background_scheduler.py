@@ -13,13 +13,20 @@ Configurações são lidas do banco de dados (tabela configuracoes).
 @version: 1.1.0
 """
 
+import importlib.util
 import os
 import sys
 import logging
 import threading
 import atexit
 from typing import Optional, Dict, List
-from constants import agora_br
+from constants import (
+    agora_br,
+    DASHBOARD_SNAPSHOT_INTERVAL_SECONDS,
+    PENDING_COUNTERS_RECONCILE_SECONDS,
+    JOB_RUNS_RETENTION_DAYS,
+    OUTBOX_RETENTION_DAYS,
+)
 
 # Configurar logging
 logging.basicConfig(
@@ -32,6 +39,8 @@ logger = logging.getLogger(__name__)
 _scheduler = None
 _scheduler_lock = threading.Lock()
 _scheduler_started = False
+_eleicao = None
+_eleicao_lock = threading.Lock()
 
 
 def get_scheduler():
@@ -162,7 +171,8 @@ def agendar_backup_email_automatico(scheduler_instance) -> bool:
         # Função wrapper para o job
         def job_backup_email():
             logger.info(f"📧 Executando backup por email para {email_destino}...")
-            sucesso, msg = enviar_backup_por_email(email_destino, 'json')
+            # Completo a cada BACKUP_DELTAS_POR_COMPLETO envios, incremental nos demais
+            sucesso, msg = enviar_backup_por_email(email_destino, 'incremental')
             if sucesso:
                 logger.info(f"✅ Backup enviado: {msg}")
             else:
@@ -200,11 +210,116 @@ def agendar_backup_email_automatico(scheduler_instance) -> bool:
         return False
 
 
-def iniciar_scheduler_background() -> bool:
+def agendar_snapshot_dashboard(scheduler_instance) -> bool:
     """
-    Inicia o scheduler de notificações em background.
-    Usa BackgroundScheduler do APScheduler que roda em thread separada.
-    Carrega configurações do banco de dados.
+    Agenda o recálculo periódico do snapshot do dashboard do gestor.
+
+    A primeira execução é imediata para o dashboard já abrir com dados.
+
+    Args:
+        scheduler_instance: Instância do APScheduler
+
+    Returns:
+        True se agendou com sucesso
+    """
+    from apscheduler.triggers.interval import IntervalTrigger
+    from dashboard_snapshot import atualizar_dashboard_snapshot
+
+    scheduler_instance.add_job(
+        atualizar_dashboard_snapshot,
+        trigger=IntervalTrigger(seconds=DASHBOARD_SNAPSHOT_INTERVAL_SECONDS),
+        id='dashboard_snapshot',
+        name='Snapshot Dashboard Gestor',
+        next_run_time=agora_br(),
+        replace_existing=True
+    )
+
+    logger.info(f"  ✅ Snapshot do Dashboard: a cada {DASHBOARD_SNAPSHOT_INTERVAL_SECONDS}s")
+    return True
+
+
+def agendar_reconciliacao_contadores(scheduler_instance) -> bool:
+    """
+    Agenda a reconstrução periódica de ``pending_counters``.
+
+    Corrige contadores que tenham divergido (escritas fora dos fluxos que
+    chamam ``sincronizar_contadores``, falhas isoladas pelo SAVEPOINT).
+
+    Args:
+        scheduler_instance: Instância do APScheduler
+
+    Returns:
+        True se agendou com sucesso
+    """
+    from apscheduler.triggers.interval import IntervalTrigger
+    from pending_counters import reconstruir_contadores
+
+    scheduler_instance.add_job(
+        reconstruir_contadores,
+        trigger=IntervalTrigger(seconds=PENDING_COUNTERS_RECONCILE_SECONDS),
+        id='pending_counters_reconcile',
+        name='Reconciliação Contadores de Pendências',
+        replace_existing=True
+    )
+
+    logger.info(f"  ✅ Reconciliação de contadores: a cada {PENDING_COUNTERS_RECONCILE_SECONDS}s")
+    return True
+
+
+def agendar_retencao_job_runs(scheduler_instance) -> bool:
+    """
+    Agenda a limpeza diária do histórico de execuções (``job_runs``).
+
+    Args:
+        scheduler_instance: Instância do APScheduler
+
+    Returns:
+        True se agendou com sucesso
+    """
+    from apscheduler.triggers.cron import CronTrigger
+    from job_telemetry import purgar_job_runs
+
+    scheduler_instance.add_job(
+        purgar_job_runs,
+        CronTrigger(hour=3, minute=30, timezone='America/Sao_Paulo'),
+        id='job_runs_retencao',
+        name='Retenção do Histórico de Jobs',
+        replace_existing=True
+    )
+
+    logger.info(f"  ✅ Retenção do histórico de jobs: {JOB_RUNS_RETENTION_DAYS} dias (03:30)")
+    return True
+
+
+def agendar_retencao_outbox(scheduler_instance) -> bool:
+    """
+    Agenda a limpeza diária das notificações já entregues/descartadas.
+
+    Args:
+        scheduler_instance: Instância do APScheduler
+
+    Returns:
+        True se agendou com sucesso
+    """
+    from apscheduler.triggers.cron import CronTrigger
+    from notification_outbox import purgar_outbox
+
+    scheduler_instance.add_job(
+        purgar_outbox,
+        CronTrigger(hour=3, minute=45, timezone='America/Sao_Paulo'),
+        id='notification_outbox_retencao',
+        name='Retenção da Outbox de Notificações',
+        replace_existing=True
+    )
+
+    logger.info(f"  ✅ Retenção da outbox de notificações: {OUTBOX_RETENTION_DAYS} dias (03:45)")
+    return True
+
+
+def _iniciar_jobs() -> bool:
+    """
+    Sobe o BackgroundScheduler com os jobs configurados no banco.
+    Chamado apenas no processo líder (ver ``iniciar_scheduler_background``).
     
     Returns:
         True se iniciou com sucesso, False caso contrário
@@ -228,8 +343,8 @@ def iniciar_scheduler_background() -> bool:
         # Importar funções de job
         try:
             from push_reminder_cron import (
-                job_lembrete_entrada,
-                job_lembrete_saida,
+                carregar_agenda_lembretes,
+                job_lembretes_agendados,
                 job_alerta_hora_extra,
                 job_lembrete_aprovadores,
                 job_lembrete_fim_dia_aprovadores,
@@ -260,42 +375,32 @@ def iniciar_scheduler_background() -> bool:
             logger.info("Configurando jobs de notificação automática...")
             
             # ============================================
-            # JOB 1: Lembrete de Entrada (configurável)
-            # ============================================
-            if config['notif_entrada_ativo']:
-                for i, horario in enumerate(config['notif_entrada_horarios']):
-                    hora, minuto = parse_horario(horario)
-                    if hora is not None:
-                        _scheduler.add_job(
-                            job_lembrete_entrada,
-                            CronTrigger(hour=hora, minute=minuto, day_of_week='mon-fri', timezone='America/Sao_Paulo'),
-                            id=f'entrada_{hora}h{minuto:02d}',
-                            name=f'Lembrete Entrada {hora}:{minuto:02d}',
-                            replace_existing=True
-                        )
-                horarios_str = ', '.join(config['notif_entrada_horarios'])
-                logger.info(f"  ✅ Lembrete de Entrada: {horarios_str} (Seg-Sex)")
-            else:
-                logger.info("  ⏸️ Lembrete de Entrada: DESATIVADO")
-            
-            # ============================================
-            # JOB 2: Lembrete de Saída (configurável)
+            # JOBS 1 e 2: Lembretes de Entrada/Saída (agenda por usuário)
             # ============================================
-            if config['notif_saida_ativo']:
-                for i, horario in enumerate(config['notif_saida_horarios']):
-                    hora, minuto = parse_horario(horario)
-                    if hora is not None:
-                        _scheduler.add_job(
-                            job_lembrete_saida,
-                            CronTrigger(hour=hora, minute=minuto, day_of_week='mon-fri', timezone='America/Sao_Paulo'),
-                            id=f'saida_{hora}h{minuto:02d}',
-                            name=f'Lembrete Saída {hora}:{minuto:02d}',
-                            replace_existing=True
-                        )
-                horarios_str = ', '.join(config['notif_saida_horarios'])
-                logger.info(f"  ✅ Lembrete de Saída: {horarios_str} (Seg-Sex)")
+            # Cada usuário é lembrado no seu horário (config_lembretes_push);
+            # os horários configurados aqui valem para quem não tem horário
+            # pessoal. O job de minuto em minuto só consulta quem venceu.
+            if config['notif_entrada_ativo'] or config['notif_saida_ativo']:
+                total = carregar_agenda_lembretes({
+                    'entrada': config['notif_entrada_horarios'] if config['notif_entrada_ativo'] else None,
+                    'saida': config['notif_saida_horarios'] if config['notif_saida_ativo'] else None,
+                })
+                _scheduler.add_job(
+                    job_lembretes_agendados,
+                    CronTrigger(minute='*', timezone='America/Sao_Paulo'),
+                    id='lembretes_agendados',
+                    name='Lembretes Entrada/Saída (agenda por usuário)',
+                    replace_existing=True
+                )
+                for chave, rotulo in (('entrada', 'Entrada'), ('saida', 'Saída')):
+                    if config[f'notif_{chave}_ativo']:
+                        horarios_str = ', '.join(config[f'notif_{chave}_horarios'])
+                        logger.info(f"  ✅ Lembrete de {rotulo}: horário de cada usuário (padrão {horarios_str})")
+                    else:
+                        logger.info(f"  ⏸️ Lembrete de {rotulo}: DESATIVADO")
+                logger.info(f"     {total} lembretes na agenda")
             else:
-                logger.info("  ⏸️ Lembrete de Saída: DESATIVADO")
+                logger.info("  ⏸️ Lembretes de Entrada/Saída: DESATIVADOS")
             
             # ============================================
             # JOB 3: Alerta de Hora Extra (configurável)
@@ -351,14 +456,60 @@ def iniciar_scheduler_background() -> bool:
                 agendar_backup_email_automatico(_scheduler)
             except Exception as e:
                 logger.warning(f"  ⚠️ Backup por Email não configurado: {e}")
-            
+
+            # ============================================
+            # JOB 6: Snapshot do Dashboard do Gestor
+            # ============================================
+            try:
+                agendar_snapshot_dashboard(_scheduler)
+            except Exception as e:
+                logger.warning(f"  ⚠️ Snapshot do dashboard não agendado: {e}")
+
+            # ============================================
+            # JOB 7: Reconciliação dos contadores de pendências
+            # ============================================
+            try:
+                agendar_reconciliacao_contadores(_scheduler)
+            except Exception as e:
+                logger.warning(f"  ⚠️ Reconciliação de contadores não agendada: {e}")
+
+            # ============================================
+            # JOB 8: Retenção do histórico de execuções
+            # ============================================
+            try:
+                agendar_retencao_job_runs(_scheduler)
+            except Exception as e:
+                logger.warning(f"  ⚠️ Retenção de job_runs não agendada: {e}")
+
+            # ============================================
+            # JOB 9: Retenção da notification_outbox
+            # ============================================
+            try:
+                agendar_retencao_outbox(_scheduler)
+            except Exception as e:
+                logger.warning(f"  ⚠️ Retenção da outbox não agendada: {e}")
+
+            # Telemetria: cada execução (e misfire/sobreposição) vai para job_runs
+            try:
+                from job_telemetry import instrumentar_scheduler
+                instrumentar_scheduler(_scheduler)
+            except Exception as e:
+                logger.warning(f"  ⚠️ Telemetria de jobs não ativada: {e}")
+
+            # ============================================
+            # WORKER: Entrega da notification_outbox
+            # ============================================
+            try:
+                from notification_outbox import iniciar_worker_outbox
+                iniciar_worker_outbox()
+                logger.info("  ✅ Worker da outbox de notificações ativo")
+            except Exception as e:
+                logger.warning(f"  ⚠️ Worker da outbox de notificações não iniciado: {e}")
+
             # Iniciar scheduler
             _scheduler.start()
             _scheduler_started = True
             
-            # Registrar shutdown no exit
-            atexit.register(parar_scheduler)
-            
             logger.info("=" * 60)
             logger.info("🚀 Scheduler iniciado com sucesso!")
             logger.info("   Notificações automáticas ativadas")
@@ -373,8 +524,56 @@ def iniciar_scheduler_background() -> bool:
             return False
 
 
+def iniciar_scheduler_background() -> bool:
+    """
+    Inicia o scheduler de notificações em background.
+    Usa BackgroundScheduler do APScheduler que roda em thread separada.
+    Carrega configurações do banco de dados.
+    
+    Com várias réplicas/workers, só o processo líder (``leader_election``)
+    executa os jobs; os demais ficam como seguidores e assumem se o líder cair.
+    
+    Returns:
+        True se este processo roda os jobs ou aguarda como seguidor,
+        False se o scheduler não pôde ser iniciado
+    """
+    global _eleicao
+    
+    if importlib.util.find_spec("apscheduler") is None:
+        logger.warning("APScheduler não instalado. Notificações automáticas desabilitadas.")
+        logger.info("Para habilitar, execute: pip install apscheduler")
+        return False
+    
+    with _eleicao_lock:
+        if _eleicao is None:
+            from leader_election import EleicaoLider
+            _eleicao = EleicaoLider("background_scheduler", _iniciar_jobs, _parar_jobs)
+            # Registrar shutdown no exit (libera a liderança para outro processo)
+            atexit.register(parar_scheduler)
+        eleicao = _eleicao
+    
+    if eleicao.iniciar():
+        return True
+    # Seguidor é um estado válido; falso só se a trava veio e os jobs não subiram.
+    return not eleicao.falhou_ao_assumir
+
+
+def is_scheduler_leader() -> bool:
+    """True se este processo detém a liderança dos jobs agendados."""
+    return _eleicao is not None and _eleicao.e_lider
+
+
 def parar_scheduler():
-    """Para o scheduler de forma graciosa."""
+    """Para o scheduler de forma graciosa e cede a liderança."""
+    with _eleicao_lock:
+        eleicao = _eleicao
+    if eleicao is not None:
+        eleicao.parar()
+    _parar_jobs()
+
+
+def _parar_jobs():
+    """Para os jobs deste processo (perdeu a liderança ou encerrando)."""
     global _scheduler, _scheduler_started
     
     with _scheduler_lock:
@@ -383,6 +582,8 @@ def parar_scheduler():
                 logger.info("Parando scheduler de notificações...")
                 _scheduler.shutdown(wait=False)
                 _scheduler_started = False
+                from notification_outbox import parar_worker_outbox
+                parar_worker_outbox()
                 logger.info("Scheduler parado com sucesso")
             except Exception as e:
                 logger.error(f"Erro ao parar scheduler: {e}")
@@ -429,6 +630,7 @@ def obter_status_scheduler() -> dict:
     
     status = {
         'ativo': _scheduler_started,
+        'seguidor': _eleicao is not None and _eleicao.ativa and not _eleicao.e_lider,
         'data_hora_atual': agora,
         'total_jobs': 0,
         'jobs': []
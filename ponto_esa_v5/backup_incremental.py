@@ -0,0 +1,543 @@
+"""
+Backup incremental - Ponto ExSA v5.0
+
+Todo backup agendado era um dump completo, embora por dia só mudem os
+registros de ponto e as solicitações do dia. Aqui cada cadeia de backups
+(``'local'`` para o backup automático, ``'email'`` para o envio por email)
+começa com um backup completo e segue com deltas que levam só o que mudou:
+
+- inserções: linhas com ``id`` acima da marca d'água da tabela;
+- alterações e exclusões: registradas por triggers em ``backup_alteracoes``,
+  cuja própria sequência serve de marca d'água global.
+
+No PostgreSQL os ids saem da sequência na ordem do INSERT, não do commit:
+uma transação com id menor pode confirmar depois da leitura da marca. Por
+isso cada backup guarda as lacunas (ids ainda invisíveis) nos
+``BACKUP_DELTA_JANELA_IDS`` logo abaixo da marca, e o delta seguinte as
+confere de novo; reaplicar uma linha é idempotente (upsert pelo ``id``).
+
+As marcas de cada backup ficam no manifesto da cadeia
+(``manifesto_<cadeia>.json`` no diretório de backups). Tabelas sem ``id``
+(``configuracoes``, ``jornada_semanal``) são pequenas e vão inteiras em cada
+delta. ``restaurar_cadeia`` reaplica o completo e, em ordem, os deltas.
+
+Uma restauração reescreve as tabelas por baixo das marcas (e os triggers
+registram cada linha apagada ou sobrescrita): toda restauração roda dentro
+de ``restauracao()``, que força um completo no próximo elo de cada cadeia e
+descarta o log gerado por ela.
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from constants import agora_br, BACKUP_DELTAS_POR_COMPLETO, BACKUP_DELTA_JANELA_IDS
+
+try:
+    from database import get_connection, return_connection, SQL_PLACEHOLDER, USE_POSTGRESQL
+except ImportError:
+    from ponto_esa_v5.database import get_connection, return_connection, SQL_PLACEHOLDER, USE_POSTGRESQL
+
+try:
+    from backup_postgresql import (
+        backup_manager, NDJSON_VERSION, Progresso,
+        _abrir_saida_backup, _caminho_livre, _colunas_tabela, _dependencias, _linha_ndjson,
+        _niveis_dependencia, _tabela_existe,
+    )
+except ImportError:
+    from ponto_esa_v5.backup_postgresql import (
+        backup_manager, NDJSON_VERSION, Progresso,
+        _abrir_saida_backup, _caminho_livre, _colunas_tabela, _dependencias, _linha_ndjson,
+        _niveis_dependencia, _tabela_existe,
+    )
+
+logger = logging.getLogger(__name__)
+
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+# Ids por DELETE ... WHERE id IN (...) na aplicação de um delta
+_LOTE_EXCLUSAO = 500
+
+
+# ---------------------------------------------------------------------------
+# Schema: log de alterações alimentado por triggers
+# ---------------------------------------------------------------------------
+
+def _criar_schema(cursor, tabelas: List[str]) -> None:
+    """DDL idempotente de ``backup_alteracoes`` e dos triggers de UPDATE/DELETE."""
+    if USE_POSTGRESQL:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS backup_alteracoes (
+                id BIGSERIAL PRIMARY KEY,
+                tabela TEXT NOT NULL,
+                registro_id BIGINT NOT NULL,
+                operacao CHAR(1) NOT NULL,
+                alterado_em TIMESTAMP DEFAULT NOW()
+            )
+        """)
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION backup_registrar_alteracao() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO backup_alteracoes (tabela, registro_id, operacao)
+                VALUES (TG_TABLE_NAME, OLD.id, LEFT(TG_OP, 1));
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+    else:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS backup_alteracoes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tabela TEXT NOT NULL,
+                registro_id INTEGER NOT NULL,
+                operacao TEXT NOT NULL,
+                alterado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_backup_alteracoes_tabela ON backup_alteracoes (tabela, id)")
+
+    for tabela in tabelas:
+        if 'id' not in _colunas_tabela(cursor, tabela):
+            continue
+        if USE_POSTGRESQL:
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_backup_{tabela} ON {tabela}")
+            cursor.execute(f"""
+                CREATE TRIGGER trg_backup_{tabela} AFTER UPDATE OR DELETE ON {tabela}
+                FOR EACH ROW EXECUTE PROCEDURE backup_registrar_alteracao()
+            """)
+        else:
+            for operacao, evento in (('U', 'UPDATE'), ('D', 'DELETE')):
+                cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_backup_{tabela}_{operacao.lower()}
+                    AFTER {evento} ON {tabela}
+                    BEGIN
+                        INSERT INTO backup_alteracoes (tabela, registro_id, operacao)
+                        VALUES ('{tabela}', OLD.id, '{operacao}');
+                    END
+                """)
+
+
+def ensure_backup_incremental_schema_once() -> None:
+    """Cria o log de alterações e os triggers uma vez por processo."""
+    global _schema_ready
+    if _schema_ready:
+        return
+
+    with _schema_lock:
+        if _schema_ready:
+            return
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            tabelas = [t for t in backup_manager.tables_to_backup if _tabela_existe(cursor, t)]
+            _criar_schema(cursor, tabelas)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            return_connection(conn)
+        _schema_ready = True
+
+
+# ---------------------------------------------------------------------------
+# Manifesto e marcas d'água
+# ---------------------------------------------------------------------------
+
+def _caminho_manifesto(cadeia: str) -> str:
+    return os.path.join(backup_manager.backup_dir, f"manifesto_{cadeia}.json")
+
+
+def ler_manifesto(cadeia: str = 'local') -> Dict:
+    """Manifesto da cadeia: ``{"cadeias": [{"completo": {...}, "deltas": [...]}]}``."""
+    try:
+        with open(_caminho_manifesto(cadeia), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'cadeias': []}
+
+
+def _gravar_manifesto(cadeia: str, manifesto: Dict) -> None:
+    caminho = _caminho_manifesto(cadeia)
+    with open(caminho + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    os.replace(caminho + '.tmp', caminho)
+
+
+def _nomes_cadeias() -> List[str]:
+    """Cadeias com manifesto no diretório de backups."""
+    return [
+        nome[len('manifesto_'):-len('.json')]
+        for nome in os.listdir(backup_manager.backup_dir)
+        if nome.startswith('manifesto_') and nome.endswith('.json')
+    ]
+
+
+def _lacunas(cursor, tabela: str, marca: int) -> List[int]:
+    """Ids da janela logo abaixo de ``marca`` ainda não visíveis (só PostgreSQL).
+
+    Incluem transações em andamento, que podem confirmar depois da leitura da
+    marca; ids excluídos ou de transações desfeitas também entram e não
+    custam nada ao delta. No SQLite as escritas são serializadas: sem lacunas.
+    """
+    if not USE_POSTGRESQL:
+        return []
+    inicio = max(0, marca - BACKUP_DELTA_JANELA_IDS)
+    cursor.execute(
+        f"SELECT id FROM {tabela} WHERE id > {SQL_PLACEHOLDER} AND id < {SQL_PLACEHOLDER}",
+        (inicio, marca),
+    )
+    visiveis = {row[0] for row in cursor.fetchall()}
+    return [i for i in range(inicio + 1, marca) if i not in visiveis]
+
+
+def _marcas_atuais() -> Tuple[Dict[str, Optional[int]], int, Dict[str, List[int]]]:
+    """Maior ``id`` de cada tabela (None se ela não tem ``id``) e do log de alterações.
+
+    Lidas antes do snapshot do backup: o que entrar entre as duas leituras vai
+    no backup e também no próximo delta — reaplicar é idempotente.
+
+    Returns:
+        ``(marcas, log_id, lacunas)``; ``lacunas`` traz, por tabela (e por
+        ``backup_alteracoes``), os ids abaixo da marca a conferir no próximo delta.
+    """
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        marcas = {}
+        lacunas = {}
+        for tabela in backup_manager.tables_to_backup:
+            if not _tabela_existe(cursor, tabela):
+                continue
+            if 'id' in _colunas_tabela(cursor, tabela):
+                cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {tabela}")
+                marcas[tabela] = cursor.fetchone()[0]
+                lacunas[tabela] = _lacunas(cursor, tabela, marcas[tabela])
+            else:
+                marcas[tabela] = None
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM backup_alteracoes")
+        log_id = cursor.fetchone()[0]
+        lacunas['backup_alteracoes'] = _lacunas(cursor, 'backup_alteracoes', log_id)
+        conn.commit()
+        return marcas, log_id, lacunas
+    finally:
+        return_connection(conn)
+
+
+def _acima_da_marca(coluna: str, marca: int, lacunas: List[int]) -> Tuple[str, tuple]:
+    """Condição "acima da marca anterior ou numa das lacunas dela" e seus parâmetros."""
+    if not lacunas:
+        return f"{coluna} > {SQL_PLACEHOLDER}", (marca,)
+    placeholders = ', '.join([SQL_PLACEHOLDER] * len(lacunas))
+    return f"({coluna} > {SQL_PLACEHOLDER} OR {coluna} IN ({placeholders}))", (marca, *lacunas)
+
+
+def _podar(cadeia: str, manifesto: Dict) -> None:
+    """Descarta cadeias cujo completo já foi removido e o log que nenhuma cadeia usa mais."""
+    vivas = []
+    for item in manifesto['cadeias']:
+        if os.path.exists(item['completo']['arquivo']):
+            vivas.append(item)
+            continue
+        for delta in item['deltas']:
+            if os.path.exists(delta['arquivo']):
+                os.remove(delta['arquivo'])
+    manifesto['cadeias'] = vivas
+    _gravar_manifesto(cadeia, manifesto)
+
+    # O próximo delta de cada cadeia só lê o log acima da sua última marca
+    # (e as lacunas abaixo dela, que ainda podem ser confirmadas)
+    # (cadeias a reiniciar após uma restauração não leem mais o log)
+    marcas = []
+    for nome in _nomes_cadeias():
+        outro = ler_manifesto(nome)
+        if outro['cadeias'] and not outro.get('reiniciar'):
+            ultimo = (outro['cadeias'][-1]['deltas'] or [outro['cadeias'][-1]['completo']])[-1]
+            lacunas_log = ultimo.get('lacunas', {}).get('backup_alteracoes') or []
+            marcas.append(min([ultimo['log_id'], *(i - 1 for i in lacunas_log)]))
+    if marcas:
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"DELETE FROM backup_alteracoes WHERE id <= {SQL_PLACEHOLDER}", (min(marcas),))
+            conn.commit()
+        finally:
+            return_connection(conn)
+
+
+# ---------------------------------------------------------------------------
+# Backups
+# ---------------------------------------------------------------------------
+
+def criar_backup_completo(cadeia: str = 'local', progresso: Optional[Progresso] = None) -> Optional[str]:
+    """Backup completo que inicia uma nova cadeia incremental."""
+    ensure_backup_incremental_schema_once()
+    inicio = time.monotonic()
+    marcas, log_id, lacunas = _marcas_atuais()
+    caminho = backup_manager.export_to_json(compress=True, progresso=progresso)
+    if not caminho:
+        return None
+
+    manifesto = ler_manifesto(cadeia)
+    manifesto['cadeias'].append({
+        'completo': {
+            'arquivo': caminho,
+            'timestamp': agora_br().isoformat(),
+            'marcas': marcas,
+            'log_id': log_id,
+            'lacunas': lacunas,
+            'tamanho': os.path.getsize(caminho),
+            'duracao_s': round(time.monotonic() - inicio, 2),
+        },
+        'deltas': [],
+    })
+    manifesto.pop('reiniciar', None)
+    _podar(cadeia, manifesto)
+    return caminho
+
+
+def criar_backup_delta(cadeia: str = 'local') -> Optional[str]:
+    """Backup só com o que mudou desde o último backup da cadeia.
+
+    Cada tabela com ``id`` leva as linhas novas ou alteradas e, no cabeçalho,
+    os ids excluídos (``excluir``); tabelas sem ``id`` vão inteiras
+    (``substituir``). Sem cadeia iniciada, ou depois de uma restauração,
+    faz um completo.
+    """
+    ensure_backup_incremental_schema_once()
+    manifesto = ler_manifesto(cadeia)
+    if not manifesto['cadeias'] or manifesto.get('reiniciar'):
+        return criar_backup_completo(cadeia)
+    atual = manifesto['cadeias'][-1]
+    anterior = (atual['deltas'] or [atual['completo']])[-1]
+
+    inicio = time.monotonic()
+    marcas, log_id, lacunas = _marcas_atuais()
+    lacunas_anteriores = anterior.get('lacunas', {})
+    log_anterior, parametros_log = _acima_da_marca(
+        'a.id', anterior['log_id'], lacunas_anteriores.get('backup_alteracoes', [])
+    )
+    caminho = _caminho_livre(backup_manager.backup_dir, "ponto_esa_delta_", ".ndjson.gz")
+    temporario = caminho + '.parcial'
+    linhas = exclusoes = 0
+
+    conn = get_connection()
+    try:
+        backup_manager._iniciar_leitura_consistente(conn)
+        cursor = conn.cursor()
+        with _abrir_saida_backup(temporario, 'gzip') as saida:
+            saida.write(_linha_ndjson({'metadata': {
+                'timestamp': agora_br().isoformat(),
+                'version': NDJSON_VERSION,
+                'format': 'ndjson',
+                'tipo': 'delta',
+                'base': os.path.basename(atual['completo']['arquivo']),
+                'anterior': os.path.basename(anterior['arquivo']),
+            }}))
+            for tabela, marca in marcas.items():
+                marca_anterior = anterior['marcas'].get(tabela)
+                if marca is None or marca_anterior is None:
+                    resultado = backup_manager._exportar_tabela_ndjson(
+                        conn, tabela, saida, extras={'substituir': True}
+                    )
+                else:
+                    cursor.execute(f"""
+                        SELECT DISTINCT a.registro_id FROM backup_alteracoes a
+                        WHERE a.tabela = {SQL_PLACEHOLDER} AND a.operacao = 'D' AND {log_anterior}
+                    """, (tabela, *parametros_log))
+                    excluir = [row[0] for row in cursor.fetchall()]
+                    novas, parametros_novas = _acima_da_marca(
+                        'id', marca_anterior, lacunas_anteriores.get(tabela, [])
+                    )
+                    resultado = backup_manager._exportar_tabela_ndjson(
+                        conn, tabela, saida,
+                        filtro=f"""{novas} OR id IN (
+                            SELECT a.registro_id FROM backup_alteracoes a
+                            WHERE a.tabela = {SQL_PLACEHOLDER} AND a.operacao = 'U' AND {log_anterior}
+                        )""",
+                        parametros=(*parametros_novas, tabela, *parametros_log),
+                        extras={'excluir': excluir},
+                    )
+                    exclusoes += len(excluir)
+                if resultado:
+                    linhas += resultado[1]
+            saida.write(_linha_ndjson({'fim': True}))
+        os.replace(temporario, caminho)
+    except Exception as e:
+        logger.error(f"Erro ao criar backup incremental: {e}")
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        return None
+    finally:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        return_connection(conn)
+
+    atual['deltas'].append({
+        'arquivo': caminho,
+        'timestamp': agora_br().isoformat(),
+        'marcas': marcas,
+        'log_id': log_id,
+        'lacunas': lacunas,
+        'linhas': linhas,
+        'exclusoes': exclusoes,
+        'tamanho': os.path.getsize(caminho),
+        'duracao_s': round(time.monotonic() - inicio, 2),
+    })
+    _podar(cadeia, manifesto)
+    logger.info(f"Backup incremental criado: {caminho} ({linhas} linhas, {exclusoes} exclusões)")
+    return caminho
+
+
+def executar_backup_agendado(cadeia: str = 'local',
+                             deltas_por_completo: int = BACKUP_DELTAS_POR_COMPLETO) -> Optional[str]:
+    """Próximo elo da cadeia: completo a cada ``deltas_por_completo`` deltas, delta nos demais."""
+    manifesto = ler_manifesto(cadeia)
+    cadeias = manifesto['cadeias']
+    if (not cadeias
+            or manifesto.get('reiniciar')
+            or len(cadeias[-1]['deltas']) >= deltas_por_completo
+            or not os.path.exists(cadeias[-1]['completo']['arquivo'])):
+        return criar_backup_completo(cadeia)
+    return criar_backup_delta(cadeia)
+
+
+# ---------------------------------------------------------------------------
+# Restauração
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def restauracao():
+    """Envolve uma restauração do banco (completo, cadeia ou backup avulso).
+
+    Antes: marca todas as cadeias para recomeçar com um completo — os deltas
+    seguintes partiriam de marcas de um banco que não existe mais. Depois
+    (mesmo com falha no meio): esvazia ``backup_alteracoes``, onde os
+    triggers registraram as exclusões e sobrescritas da própria restauração;
+    um delta que as lesse apagaria os dados recém-restaurados.
+    """
+    for nome in _nomes_cadeias():
+        manifesto = ler_manifesto(nome)
+        if manifesto['cadeias'] and not manifesto.get('reiniciar'):
+            manifesto['reiniciar'] = True
+            _gravar_manifesto(nome, manifesto)
+    try:
+        yield
+    finally:
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            # Banco novo, ainda sem os triggers: nada foi registrado
+            if _tabela_existe(cursor, 'backup_alteracoes'):
+                cursor.execute("DELETE FROM backup_alteracoes")
+            conn.commit()
+        finally:
+            return_connection(conn)
+
+
+def aplicar_delta(arquivo: str) -> int:
+    """Aplica um backup incremental numa única transação.
+
+    Exclui (filhas antes das mães) só os ids removidos e grava as linhas que o
+    delta traz (mães antes das filhas) por upsert no ``id``: linhas alteradas
+    são atualizadas no lugar, sem apagar e reinserir (o que violaria as
+    chaves estrangeiras das filhas que não vieram no delta).
+
+    Returns:
+        Número de linhas gravadas.
+    """
+    temporario = tempfile.mkdtemp(prefix='delta_', dir=backup_manager.backup_dir)
+    try:
+        cabecalhos: Dict[str, Dict] = {}
+        tabelas = backup_manager._separar_tabelas(arquivo, temporario, cabecalhos)
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            niveis = _niveis_dependencia(_dependencias(cursor, list(tabelas)))
+
+            for nivel in reversed(niveis):
+                for tabela in nivel:
+                    if cabecalhos[tabela].get('substituir'):
+                        cursor.execute(f"DELETE FROM {tabela}")
+                        continue
+                    ids = list(cabecalhos[tabela].get('excluir', []))
+                    for i in range(0, len(ids), _LOTE_EXCLUSAO):
+                        lote = ids[i:i + _LOTE_EXCLUSAO]
+                        placeholders = ', '.join([SQL_PLACEHOLDER] * len(lote))
+                        cursor.execute(f"DELETE FROM {tabela} WHERE id IN ({placeholders})", lote)
+
+            total = 0
+            for nivel in niveis:
+                for tabela in nivel:
+                    total += backup_manager._inserir_arquivo(
+                        cursor, tabela, *tabelas[tabela], False, atualizar=True
+                    )
+            conn.commit()
+            return total
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            return_connection(conn)
+    finally:
+        shutil.rmtree(temporario, ignore_errors=True)
+
+
+def restaurar_cadeia(cadeia: str = 'local', ate: Optional[str] = None, limpar: bool = True,
+                     progresso: Optional[Callable[[int, int, str], None]] = None) -> Tuple[bool, str]:
+    """Restaura o último completo da cadeia e reaplica seus deltas em ordem.
+
+    Args:
+        ate: Nome do último delta a aplicar (padrão: todos)
+        limpar: Esvaziar as tabelas antes do completo
+        progresso: Chamado a cada arquivo aplicado com (aplicados, total, arquivo)
+    """
+    cadeias = ler_manifesto(cadeia)['cadeias']
+    if not cadeias:
+        return False, f"Nenhum backup na cadeia '{cadeia}'"
+    completo, deltas = cadeias[-1]['completo'], cadeias[-1]['deltas']
+    if ate:
+        nomes = [os.path.basename(d['arquivo']) for d in deltas]
+        if ate not in nomes:
+            return False, f"Delta {ate} não pertence à cadeia '{cadeia}'"
+        deltas = deltas[:nomes.index(ate) + 1]
+
+    total = 1 + len(deltas)
+    with restauracao():
+        sucesso, mensagem = backup_manager.restore_from_json(completo['arquivo'], clear_existing=limpar)
+        if not sucesso:
+            return False, f"Falha no backup completo: {mensagem}"
+        if progresso:
+            progresso(1, total, os.path.basename(completo['arquivo']))
+
+        for aplicados, delta in enumerate(deltas, start=2):
+            try:
+                aplicar_delta(delta['arquivo'])
+            except Exception as e:
+                logger.error(f"Erro ao aplicar delta {delta['arquivo']}: {e}")
+                return False, f"Falha no delta {os.path.basename(delta['arquivo'])}: {e}"
+            if progresso:
+                progresso(aplicados, total, os.path.basename(delta['arquivo']))
+
+    return True, f"Cadeia restaurada: 1 completo + {len(deltas)} incrementais"
+
+
+__all__ = [
+    'ensure_backup_incremental_schema_once',
+    'ler_manifesto',
+    'criar_backup_completo',
+    'criar_backup_delta',
+    'executar_backup_agendado',
+    'restauracao',
+    'aplicar_delta',
+    'restaurar_cadeia',
+]
@@ -9,16 +9,33 @@ com exportação para JSON/CSV e restauração.
 """
 
 import os
+import io
 import json
 import gzip
 import csv
+import base64
 import logging
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any, Tuple
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, date, time as dt_time, timedelta
+from decimal import Decimal
+from typing import Optional, List, Dict, Any, Tuple, Iterator, Callable
 from io import StringIO, BytesIO
 import threading
 import time
 
+try:
+    import zstandard
+except ImportError:  # opcional: sem ele o backup sai em gzip
+    zstandard = None
+
+try:
+    from psycopg2.extras import execute_values
+except ImportError:
+    execute_values = None
+
 # Configurar logging
 logger = logging.getLogger(__name__)
 
@@ -31,7 +48,223 @@ except ImportError:
     from ponto_esa_v5.database import get_connection, return_connection, SQL_PLACEHOLDER
     VALID_TABLE_NAMES = None
 
-from constants import agora_br, agora_br_naive
+from constants import (
+    agora_br, agora_br_naive, BACKUP_FETCH_SIZE, BACKUP_COMPRESSION_LEVEL,
+    BACKUP_PARALLEL_WORKERS, BACKUP_RESTORE_BATCH,
+)
+
+# Versão do formato NDJSON: uma linha de metadados, e por tabela um cabeçalho
+# ({"tabela", "colunas"}), as linhas como listas na ordem das colunas e um
+# rodapé ({"fim_tabela", "linhas"}).
+NDJSON_VERSION = '3.0.0'
+
+
+def _valor_para_json(valor: Any) -> Any:
+    """Converte um valor do banco para JSON sem perda (binários em base64)."""
+    if valor is None or isinstance(valor, (str, int, float, bool, list, dict)):
+        return valor
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return {'$b64': base64.b64encode(bytes(valor)).decode('ascii')}
+    if isinstance(valor, (datetime, date, dt_time)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return str(valor)
+
+
+def _valor_do_json(valor: Any) -> Any:
+    """Inverso de ``_valor_para_json`` para os tipos que o JSON não representa."""
+    if isinstance(valor, dict) and len(valor) == 1 and '$b64' in valor:
+        return base64.b64decode(valor['$b64'])
+    return valor
+
+
+def _linha_ndjson(objeto: Any) -> bytes:
+    return json.dumps(objeto, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8') + b'\n'
+
+
+@contextmanager
+def _abrir_saida_backup(caminho: str, compressao: Optional[str]):
+    """Arquivo binário de escrita, comprimido em streaming ('zstd', 'gzip' ou None)."""
+    if compressao == 'zstd':
+        with open(caminho, 'wb') as bruto:
+            compressor = zstandard.ZstdCompressor(level=BACKUP_COMPRESSION_LEVEL)
+            with compressor.stream_writer(bruto, closefd=False) as saida:
+                yield saida
+    elif compressao == 'gzip':
+        with gzip.open(caminho, 'wb', compresslevel=BACKUP_COMPRESSION_LEVEL) as saida:
+            yield saida
+    else:
+        with open(caminho, 'wb') as saida:
+            yield saida
+
+
+@contextmanager
+def _abrir_entrada_backup(caminho: str):
+    """Arquivo de texto de leitura, descomprimindo conforme a extensão."""
+    if caminho.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError("Backup .zst requer o pacote zstandard (pip install zstandard)")
+        with open(caminho, 'rb') as bruto:
+            # O arquivo é a concatenação de um frame por tabela
+            leitor = zstandard.ZstdDecompressor().stream_reader(bruto, read_across_frames=True)
+            with io.TextIOWrapper(leitor, encoding='utf-8') as entrada:
+                yield entrada
+    elif caminho.endswith('.gz'):
+        with gzip.open(caminho, 'rt', encoding='utf-8') as entrada:
+            yield entrada
+    else:
+        with open(caminho, 'r', encoding='utf-8') as entrada:
+            yield entrada
+
+
+def _caminho_livre(diretorio: str, prefixo: str, extensao: str) -> str:
+    """``<prefixo><timestamp><extensao>`` ainda não usado (dois backups no mesmo segundo)."""
+    base = os.path.join(diretorio, prefixo + agora_br().strftime("%Y%m%d_%H%M%S"))
+    caminho, n = base + extensao, 1
+    while os.path.exists(caminho) or os.path.exists(caminho + '.parcial'):
+        caminho, n = f"{base}_{n}{extensao}", n + 1
+    return caminho
+
+
+def _tabela_existe(cursor, tabela: str) -> bool:
+    if USE_POSTGRESQL:
+        cursor.execute("SELECT to_regclass(%s)", (tabela,))
+    else:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (tabela,))
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def _colunas_tabela(cursor, tabela: str) -> List[str]:
+    """Colunas reais da tabela, na ordem de definição."""
+    if USE_POSTGRESQL:
+        cursor.execute("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = %s
+            ORDER BY ordinal_position
+        """, (tabela,))
+        return [row[0] for row in cursor.fetchall()]
+    cursor.execute(f"PRAGMA table_info({tabela})")
+    return [row[1] for row in cursor.fetchall()]
+
+
+# progresso(tabelas_concluidas, total_de_tabelas, tabela_recem_concluida)
+Progresso = Callable[[int, int, str], None]
+
+
+def _dependencias(cursor, tabelas: List[str]) -> Dict[str, set]:
+    """Tabelas (dentre ``tabelas``) referenciadas por chave estrangeira de cada tabela."""
+    deps = {t: set() for t in tabelas}
+    if USE_POSTGRESQL:
+        cursor.execute("""
+            SELECT filha.relname, pai.relname
+            FROM pg_constraint c
+            JOIN pg_class filha ON filha.oid = c.conrelid
+            JOIN pg_class pai ON pai.oid = c.confrelid
+            WHERE c.contype = 'f' AND filha.relnamespace = current_schema()::regnamespace
+        """)
+        pares = cursor.fetchall()
+    else:
+        pares = []
+        for tabela in tabelas:
+            cursor.execute(f"PRAGMA foreign_key_list({tabela})")
+            pares.extend((tabela, row[2]) for row in cursor.fetchall())
+    for filha, pai in pares:
+        if filha in deps and pai in deps and filha != pai:
+            deps[filha].add(pai)
+    return deps
+
+
+def _niveis_dependencia(deps: Dict[str, set]) -> List[List[str]]:
+    """Agrupa as tabelas em níveis: cada nível só referencia níveis anteriores.
+
+    As tabelas de um mesmo nível podem ser carregadas ao mesmo tempo. Um ciclo
+    de chaves estrangeiras (não deveria existir) vai inteiro para o último nível.
+    """
+    pendentes = {t: set(d) for t, d in deps.items()}
+    niveis = []
+    while pendentes:
+        nivel = sorted(t for t, d in pendentes.items() if not d)
+        if not nivel:
+            niveis.append(sorted(pendentes))
+            break
+        niveis.append(nivel)
+        for tabela in nivel:
+            del pendentes[tabela]
+        for d in pendentes.values():
+            d.difference_update(nivel)
+    return niveis
+
+
+def _grupos_dependencia(deps: Dict[str, set]) -> List[List[str]]:
+    """Separa as tabelas em grupos ligados por chave estrangeira (direta ou não).
+
+    Cada grupo vem na ordem de carga (mães antes das filhas); grupos
+    diferentes não se referenciam e podem ser restaurados ao mesmo tempo.
+    """
+    grupo_de = {t: {t} for t in deps}
+    for tabela, maes in deps.items():
+        for mae in maes:
+            if grupo_de[tabela] is not grupo_de[mae]:
+                unido = grupo_de[tabela] | grupo_de[mae]
+                for t in unido:
+                    grupo_de[t] = unido
+    grupos = {id(g): g for g in grupo_de.values()}.values()
+    return sorted(
+        ([t for nivel in _niveis_dependencia({t: deps[t] for t in g}) for t in nivel] for g in grupos),
+        key=lambda grupo: grupo[0],
+    )
+
+
+def _valor_copy(valor: Any) -> str:
+    """Valor no formato texto do ``COPY FROM STDIN`` do PostgreSQL."""
+    if valor is None:
+        return '\\N'
+    if isinstance(valor, bool):
+        return 't' if valor else 'f'
+    if isinstance(valor, bytes):
+        return '\\\\x' + valor.hex()
+    if isinstance(valor, (list, dict)):
+        valor = json.dumps(valor, ensure_ascii=False)
+    return (str(valor).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+@contextmanager
+def _cursor_streaming(conn, tabela: str):
+    """Cursor que busca em lotes: no PostgreSQL, cursor nomeado (do lado do servidor)."""
+    if USE_POSTGRESQL:
+        cursor = conn.cursor(name=f"backup_{tabela}")
+        cursor.itersize = BACKUP_FETCH_SIZE
+    else:
+        cursor = conn.cursor()  # sqlite3 já entrega as linhas sob demanda
+    try:
+        yield cursor
+    finally:
+        cursor.close()
+
+
+def _iterar_tabela(conn, tabela: str, filtro: str = '',
+                   parametros: tuple = ()) -> Iterator[Tuple[List[str], List[tuple]]]:
+    """Percorre ``SELECT *`` de ``tabela`` em lotes de ``BACKUP_FETCH_SIZE`` linhas.
+
+    Args:
+        filtro: Cláusula WHERE opcional (sem a palavra WHERE), com ``parametros``
+
+    Yields:
+        ``(colunas, lote)``; nunca há mais de um lote em memória.
+    """
+    with _cursor_streaming(conn, tabela) as cursor:
+        if filtro:
+            cursor.execute(f"SELECT * FROM {tabela} WHERE {filtro}", parametros)
+        else:
+            cursor.execute(f"SELECT * FROM {tabela}")
+        while True:
+            lote = cursor.fetchmany(BACKUP_FETCH_SIZE)
+            if not lote:
+                break
+            yield [d[0] for d in cursor.description], lote
 
 
 class PostgreSQLBackupManager:
@@ -106,88 +339,182 @@ class PostgreSQLBackupManager:
             if conn:
                 return_connection(conn)
     
-    def export_to_json(self, compress: bool = True) -> Optional[str]:
+    def _iniciar_leitura_consistente(self, conn) -> Optional[str]:
+        """Abre uma transação só de leitura com snapshot único para todas as tabelas.
+        
+        Returns:
+            No PostgreSQL, o id do snapshot exportado (``pg_export_snapshot``),
+            para que outras conexões leiam exatamente os mesmos dados.
         """
-        Exporta todas as tabelas para um arquivo JSON.
+        conn.rollback()
+        if not USE_POSTGRESQL:
+            return None
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+            cursor.execute("SELECT pg_export_snapshot()")
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+    
+    def _exportar_tabela_ndjson(self, conn, table: str, saida, filtro: str = '', parametros: tuple = (),
+                                extras: Optional[Dict] = None) -> Optional[Tuple[List[str], int]]:
+        """Escreve cabeçalho, linhas e rodapé de ``table`` em ``saida``; None se ela não existe.
+        
+        ``filtro``/``parametros`` restringem as linhas (backup incremental) e
+        ``extras`` são campos adicionais do cabeçalho.
+        """
+        cursor = conn.cursor()
+        try:
+            if not _tabela_existe(cursor, table):
+                return None
+            colunas = _colunas_tabela(cursor, table)
+        finally:
+            cursor.close()
+        
+        saida.write(_linha_ndjson({'tabela': table, 'colunas': colunas, **(extras or {})}))
+        total = 0
+        for colunas_lote, lote in _iterar_tabela(conn, table, filtro, parametros):
+            if colunas_lote != colunas:
+                # SELECT * segue a ordem real; o cabeçalho já foi escrito com ela.
+                raise RuntimeError(f"Colunas de {table} mudaram durante o backup")
+            for row in lote:
+                saida.write(_linha_ndjson([_valor_para_json(v) for v in row]))
+            total += len(lote)
+        saida.write(_linha_ndjson({'fim_tabela': table, 'linhas': total}))
+        return colunas, total
+    
+    def _exportar_parte(self, table: str, caminho: str, compression: Optional[str],
+                        snapshot: str) -> Optional[Tuple[List[str], int]]:
+        """Exporta ``table`` para ``caminho`` numa conexão própria, no snapshot do coordenador."""
+        conn = get_connection()
+        try:
+            conn.rollback()
+            cursor = conn.cursor()
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+            cursor.execute("SET TRANSACTION SNAPSHOT %s", (snapshot,))
+            cursor.close()
+            with _abrir_saida_backup(caminho, compression) as saida:
+                return self._exportar_tabela_ndjson(conn, table, saida)
+        finally:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            return_connection(conn)
+    
+    def export_to_json(self, compress: bool = True, compression: Optional[str] = None,
+                       workers: Optional[int] = None, progresso: Optional[Progresso] = None) -> Optional[str]:
+        """
+        Exporta todas as tabelas para um arquivo NDJSON, em streaming.
+        
+        As linhas são lidas em lotes por um cursor do lado do servidor e escritas
+        direto no arquivo comprimido: o uso de memória não cresce com o banco.
+        No PostgreSQL, até ``workers`` tabelas são exportadas ao mesmo tempo, cada
+        uma numa conexão do pool que importa o snapshot do coordenador
+        (``pg_export_snapshot``) — o backup continua consistente. Cada tabela vira
+        um membro gzip (ou frame zstd) e o arquivo final é a concatenação deles.
         
         Args:
-            compress: Se True, comprime o arquivo com gzip
+            compress: Se True, comprime o arquivo (gzip, ou zstd se disponível
+                e ``compression='zstd'``)
+            compression: 'gzip' ou 'zstd' (padrão: gzip)
+            workers: Tabelas em paralelo (padrão: BACKUP_PARALLEL_WORKERS; 1 no SQLite)
+            progresso: Chamado a cada tabela concluída com (concluídas, total, tabela)
             
         Returns:
             Caminho do arquivo de backup ou None em caso de erro
         """
+        if not compress:
+            compression = None
+        elif compression == 'zstd' and zstandard is None:
+            logger.warning("zstandard não instalado; backup em gzip")
+            compression = 'gzip'
+        elif compression not in ('gzip', 'zstd'):
+            compression = 'gzip'
+        extensao = {'gzip': '.ndjson.gz', 'zstd': '.ndjson.zst', None: '.ndjson'}[compression]
+        if workers is None:
+            workers = BACKUP_PARALLEL_WORKERS
+        
+        filepath = _caminho_livre(self.backup_dir, "ponto_esa_backup_", extensao)
+        temporario = filepath + '.parcial'
+        dir_partes = tempfile.mkdtemp(prefix='partes_', dir=self.backup_dir)
+        partes = {t: os.path.join(dir_partes, f"{i:02d}_{t}") for i, t in enumerate(self.tables_to_backup)}
+        
+        conn = None
         try:
-            timestamp = agora_br().strftime("%Y%m%d_%H%M%S")
+            conn = get_connection()
+            snapshot = self._iniciar_leitura_consistente(conn)
+            resultados = {}
             
-            backup_data = {
-                'metadata': {
-                    'timestamp': agora_br().isoformat(),
-                    'version': '2.0.0',
-                    'type': 'postgresql_export',
-                    'tables': []
-                },
-                'data': {}
-            }
+            def concluida(table):
+                if resultados[table] is None:
+                    logger.warning(f"Tabela {table} não existe; ignorada no backup")
+                else:
+                    logger.info(f"Tabela {table}: {resultados[table][1]} registros exportados")
+                if progresso:
+                    progresso(len(resultados), len(partes), table)
             
-            for table in self.tables_to_backup:
-                try:
-                    columns, rows = self.get_table_data(table)
-                    
-                    if columns:
-                        # Converter rows para lista de dicts
-                        table_data = []
-                        for row in rows:
-                            row_dict = {}
-                            for i, col in enumerate(columns):
-                                value = row[i]
-                                # Converter tipos não serializáveis
-                                if isinstance(value, (datetime, )):
-                                    value = value.isoformat()
-                                elif isinstance(value, bytes):
-                                    value = value.decode('utf-8', errors='ignore')
-                                elif hasattr(value, '__str__') and not isinstance(value, (str, int, float, bool, type(None), list, dict)):
-                                    value = str(value)
-                                row_dict[col] = value
-                            table_data.append(row_dict)
-                        
-                        backup_data['data'][table] = table_data
-                        backup_data['metadata']['tables'].append({
-                            'name': table,
-                            'columns': columns,
-                            'rows': len(rows)
-                        })
-                        
-                        logger.info(f"Tabela {table}: {len(rows)} registros exportados")
-                        
-                except Exception as e:
-                    logger.warning(f"Erro ao exportar tabela {table}: {e}")
-                    continue
+            if snapshot and workers > 1:
+                # A transação do coordenador fica aberta até o fim: mantém o snapshot válido.
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='backup') as executor:
+                    futuros = {
+                        executor.submit(self._exportar_parte, t, caminho, compression, snapshot): t
+                        for t, caminho in partes.items()
+                    }
+                    for futuro in as_completed(futuros):
+                        resultados[futuros[futuro]] = futuro.result()
+                        concluida(futuros[futuro])
+            else:
+                for table, caminho in partes.items():
+                    with _abrir_saida_backup(caminho, compression) as saida:
+                        resultados[table] = self._exportar_tabela_ndjson(conn, table, saida)
+                    concluida(table)
             
-            # Salvar arquivo
-            json_content = json.dumps(backup_data, ensure_ascii=False, indent=2, default=str)
+            tabelas = [
+                {'name': t, 'columns': resultados[t][0], 'rows': resultados[t][1]}
+                for t in self.tables_to_backup if resultados[t] is not None
+            ]
+            cabecalho = os.path.join(dir_partes, 'cabecalho')
+            with _abrir_saida_backup(cabecalho, compression) as saida:
+                saida.write(_linha_ndjson({'metadata': {
+                    'timestamp': agora_br().isoformat(),
+                    'version': NDJSON_VERSION,
+                    'type': 'postgresql_export' if USE_POSTGRESQL else 'sqlite_export',
+                    'format': 'ndjson',
+                }}))
+            rodape = os.path.join(dir_partes, 'rodape')
+            with _abrir_saida_backup(rodape, compression) as saida:
+                saida.write(_linha_ndjson({'fim': True, 'tables': tabelas}))
             
-            if compress:
-                filename = f"ponto_esa_backup_{timestamp}.json.gz"
-                filepath = os.path.join(self.backup_dir, filename)
-                
-                with gzip.open(filepath, 'wt', encoding='utf-8') as f:
-                    f.write(json_content)
-            else:
-                filename = f"ponto_esa_backup_{timestamp}.json"
-                filepath = os.path.join(self.backup_dir, filename)
-                
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(json_content)
+            # Membros gzip / frames zstd concatenados formam um arquivo válido
+            with open(temporario, 'wb') as destino:
+                for caminho in [cabecalho, *partes.values(), rodape]:
+                    with open(caminho, 'rb') as origem:
+                        shutil.copyfileobj(origem, destino)
+            
+            # Só aparece na lista de backups quando completo
+            os.replace(temporario, filepath)
             
             # Registrar no log
             self._log_backup(filepath, os.path.getsize(filepath), 'json')
             
-            logger.info(f"Backup JSON criado: {filepath}")
+            logger.info(f"Backup NDJSON criado: {filepath}")
             return filepath
             
         except Exception as e:
             logger.error(f"Erro ao criar backup JSON: {e}")
+            if os.path.exists(temporario):
+                os.remove(temporario)
             return None
+        finally:
+            shutil.rmtree(dir_partes, ignore_errors=True)
+            if conn:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                return_connection(conn)
     
     def export_to_csv(self) -> Optional[str]:
         """
@@ -201,34 +528,50 @@ class PostgreSQLBackupManager:
             csv_dir = os.path.join(self.backup_dir, f"csv_backup_{timestamp}")
             os.makedirs(csv_dir, exist_ok=True)
             
-            for table in self.tables_to_backup:
-                try:
-                    columns, rows = self.get_table_data(table)
-                    
-                    if columns and rows:
-                        filepath = os.path.join(csv_dir, f"{table}.csv")
+            conn = get_connection()
+            try:
+                self._iniciar_leitura_consistente(conn)
+                for table in self.tables_to_backup:
+                    try:
+                        cursor = conn.cursor()
+                        existe = _tabela_existe(cursor, table)
+                        cursor.close()
+                        if not existe:
+                            continue
                         
+                        filepath = os.path.join(csv_dir, f"{table}.csv")
+                        total = 0
                         with open(filepath, 'w', newline='', encoding='utf-8') as f:
                             writer = csv.writer(f)
-                            writer.writerow(columns)
-                            
-                            for row in rows:
-                                # Converter valores para string
-                                csv_row = []
-                                for value in row:
-                                    if value is None:
-                                        csv_row.append('')
-                                    elif isinstance(value, datetime):
-                                        csv_row.append(value.isoformat())
-                                    else:
-                                        csv_row.append(str(value))
-                                writer.writerow(csv_row)
+                            for columns, rows in _iterar_tabela(conn, table):
+                                if total == 0:
+                                    writer.writerow(columns)
+                                for row in rows:
+                                    # Converter valores para string
+                                    csv_row = []
+                                    for value in row:
+                                        if value is None:
+                                            csv_row.append('')
+                                        elif isinstance(value, datetime):
+                                            csv_row.append(value.isoformat())
+                                        elif isinstance(value, (bytes, bytearray, memoryview)):
+                                            csv_row.append(base64.b64encode(bytes(value)).decode('ascii'))
+                                        else:
+                                            csv_row.append(str(value))
+                                    writer.writerow(csv_row)
+                                total += len(rows)
                         
-                        logger.info(f"CSV exportado: {table}.csv ({len(rows)} registros)")
+                        if total == 0:
+                            os.remove(filepath)
+                            continue
+                        logger.info(f"CSV exportado: {table}.csv ({total} registros)")
                         
-                except Exception as e:
-                    logger.warning(f"Erro ao exportar CSV {table}: {e}")
-                    continue
+                    except Exception as e:
+                        logger.warning(f"Erro ao exportar CSV {table}: {e}")
+                        continue
+            finally:
+                conn.rollback()
+                return_connection(conn)
             
             # Criar arquivo de metadados
             metadata = {
@@ -245,17 +588,242 @@ class PostgreSQLBackupManager:
             logger.error(f"Erro ao criar backup CSV: {e}")
             return None
     
-    def restore_from_json(self, filepath: str, clear_existing: bool = False) -> Tuple[bool, str]:
+    def restore_from_json(self, filepath: str, clear_existing: bool = False,
+                          workers: Optional[int] = None,
+                          progresso: Optional[Progresso] = None) -> Tuple[bool, str]:
         """
-        Restaura dados de um backup JSON.
+        Restaura dados de um backup JSON (NDJSON em paralelo ou o formato antigo).
         
         Args:
             filepath: Caminho do arquivo de backup
             clear_existing: Se True, limpa os dados existentes antes de restaurar
+            workers: Tabelas carregadas em paralelo (padrão: BACKUP_PARALLEL_WORKERS; 1 no SQLite)
+            progresso: Chamado a cada tabela concluída com (concluídas, total, tabela)
             
         Returns:
             Tuple (sucesso, mensagem)
         """
+        if '.ndjson' in os.path.basename(filepath):
+            return self._restaurar_ndjson(filepath, clear_existing, workers, progresso)
+        return self._restaurar_json_legado(filepath, clear_existing)
+    
+    def _separar_tabelas(self, filepath: str, destino: str,
+                         cabecalhos: Optional[Dict[str, Dict]] = None) -> Dict[str, Tuple[List[str], str]]:
+        """Copia as linhas de cada tabela do backup para um arquivo próprio em ``destino``.
+        
+        Args:
+            cabecalhos: Se informado, recebe a linha de cabeçalho completa de
+                cada tabela (backups incrementais levam nela as exclusões)
+        
+        Returns:
+            {tabela: (colunas do backup, arquivo com uma linha JSON por registro)}
+        """
+        tabelas = {}
+        saida = None
+        with _abrir_entrada_backup(filepath) as entrada:
+            primeira = entrada.readline()
+            if not primeira or 'metadata' not in json.loads(primeira):
+                raise ValueError("Formato de backup inválido")
+            try:
+                for linha in entrada:
+                    if linha.startswith('['):
+                        if saida is not None:
+                            saida.write(linha)
+                        continue
+                    registro = json.loads(linha)
+                    if 'tabela' in registro:
+                        caminho = os.path.join(destino, f"{len(tabelas):02d}.ndjson")
+                        tabelas[registro['tabela']] = (registro['colunas'], caminho)
+                        if cabecalhos is not None:
+                            cabecalhos[registro['tabela']] = registro
+                        saida = open(caminho, 'w', encoding='utf-8')
+                    elif 'fim_tabela' in registro and saida is not None:
+                        saida.close()
+                        saida = None
+            finally:
+                if saida is not None:
+                    saida.close()
+        return tabelas
+    
+    def _carregar_tabelas(self, grupo: List[str], tabelas: Dict[str, Tuple[List[str], str]],
+                          limpar: bool) -> Dict[str, int]:
+        """Carrega ``grupo`` (mães antes das filhas) numa conexão e transação próprias.
+        
+        Com ``limpar``, o DELETE (filhas antes das mães) entra na mesma
+        transação da carga: se ela falhar, o rollback devolve os dados antigos
+        em vez de deixar as tabelas vazias.
+        
+        Returns:
+            {tabela: registros carregados}
+        """
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            if limpar:
+                for table_name in reversed(grupo):
+                    cursor.execute(f"DELETE FROM {table_name}")
+            totais = {t: self._inserir_arquivo(cursor, t, *tabelas[t], limpar) for t in grupo}
+            conn.commit()
+            return totais
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            return_connection(conn)
+    
+    def _inserir_arquivo(self, cursor, table_name: str, colunas_backup: List[str], arquivo: str,
+                         usar_copy: bool, atualizar: bool = False) -> int:
+        """Insere em lotes as linhas de ``arquivo`` (uma lista JSON por linha) em ``table_name``.
+        
+        No PostgreSQL usa ``COPY FROM STDIN`` quando a tabela foi esvaziada
+        (``usar_copy``) e ``execute_values`` com ``ON CONFLICT`` caso
+        contrário; no SQLite, ``executemany``. Linhas que já existem são
+        mantidas, ou sobrescritas pelo ``id`` com ``atualizar`` (deltas).
+        """
+        # Filtrar apenas colunas que existem na tabela
+        valid_columns = set(_colunas_tabela(cursor, table_name))
+        indices = [i for i, c in enumerate(colunas_backup) if c in valid_columns]
+        if not indices:
+            raise ValueError("nenhuma coluna válida")
+        colunas = [colunas_backup[i] for i in indices]
+        columns_str = ', '.join(colunas)
+        
+        conflito = "ON CONFLICT DO NOTHING"
+        if atualizar and 'id' in colunas and len(colunas) > 1:
+            conflito = "ON CONFLICT (id) DO UPDATE SET " + ', '.join(
+                f"{c} = excluded.{c}" for c in colunas if c != 'id'
+            )
+        
+        if USE_POSTGRESQL and usar_copy:
+            sql = f"COPY {table_name} ({columns_str}) FROM STDIN"
+        elif USE_POSTGRESQL and execute_values is not None:
+            sql = f"INSERT INTO {table_name} ({columns_str}) VALUES %s {conflito}"
+        else:
+            placeholders = ', '.join([SQL_PLACEHOLDER] * len(indices))
+            sql = f"INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders}) {conflito}"
+        
+        def gravar(lote):
+            if USE_POSTGRESQL and usar_copy:
+                dados = ''.join('\t'.join(_valor_copy(v) for v in row) + '\n' for row in lote)
+                cursor.copy_expert(sql, StringIO(dados))
+            elif USE_POSTGRESQL and execute_values is not None:
+                execute_values(cursor, sql, lote, page_size=len(lote))
+            else:
+                cursor.executemany(sql, lote)
+        
+        total = 0
+        lote = []
+        with open(arquivo, 'r', encoding='utf-8') as entrada:
+            for linha in entrada:
+                registro = json.loads(linha)
+                lote.append([_valor_do_json(registro[i]) for i in indices])
+                if len(lote) >= BACKUP_RESTORE_BATCH:
+                    gravar(lote)
+                    total += len(lote)
+                    lote = []
+        if lote:
+            gravar(lote)
+            total += len(lote)
+        
+        if USE_POSTGRESQL and 'id' in valid_columns:
+            # Ids vieram do backup: a sequência precisa continuar depois deles
+            cursor.execute(f"""
+                SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 0) + 1, false)
+                FROM {table_name}
+                WHERE pg_get_serial_sequence(%s, 'id') IS NOT NULL
+            """, (table_name, table_name))
+        
+        return total
+    
+    def _restaurar_ndjson(self, filepath: str, clear_existing: bool, workers: Optional[int],
+                          progresso: Optional[Progresso]) -> Tuple[bool, str]:
+        """Restaura um backup NDJSON carregando tabelas independentes em paralelo.
+        
+        As linhas de cada tabela são primeiro separadas em arquivos temporários.
+        Sem ``clear_existing``, as tabelas são carregadas por níveis de
+        dependência (chaves estrangeiras): um nível só começa quando o anterior
+        foi confirmado, e as tabelas de um mesmo nível vão em paralelo, cada uma
+        na sua conexão e na sua transação. Com ``clear_existing``, cada grupo de
+        tabelas ligadas por chave estrangeira é esvaziado e recarregado numa
+        única transação (apagar uma mãe exige apagar antes as filhas), e grupos
+        independentes vão em paralelo.
+        """
+        restored_tables = []
+        errors = []
+        if workers is None:
+            workers = BACKUP_PARALLEL_WORKERS if USE_POSTGRESQL else 1  # SQLite: um escritor por vez
+        
+        temporario = tempfile.mkdtemp(prefix='restauracao_', dir=self.backup_dir)
+        try:
+            tabelas = self._separar_tabelas(filepath, temporario)
+            
+            for table_name in list(tabelas):
+                # Validar nome da tabela contra whitelist
+                if VALID_TABLE_NAMES and table_name not in VALID_TABLE_NAMES:
+                    errors.append(f"{table_name}: nome de tabela não permitido")
+                    logger.warning("Tentativa de restaurar tabela não permitida: %s", table_name)
+                    del tabelas[table_name]
+            
+            conn = get_connection()
+            try:
+                cursor = conn.cursor()
+                for table_name in list(tabelas):
+                    if not _tabela_existe(cursor, table_name):
+                        errors.append(f"{table_name}: tabela não existe")
+                        del tabelas[table_name]
+                deps = _dependencias(cursor, list(tabelas))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                return_connection(conn)
+            
+            if clear_existing:
+                etapas = [_grupos_dependencia(deps)]
+            else:
+                etapas = [[[t] for t in nivel] for nivel in _niveis_dependencia(deps)]
+            
+            concluidas = 0
+            for grupos in etapas:
+                with ThreadPoolExecutor(max_workers=max(1, min(workers, len(grupos))),
+                                        thread_name_prefix='restauracao') as executor:
+                    futuros = {
+                        executor.submit(self._carregar_tabelas, grupo, tabelas, clear_existing): grupo
+                        for grupo in grupos
+                    }
+                    for futuro in as_completed(futuros):
+                        grupo = futuros[futuro]
+                        try:
+                            for table_name, total in futuro.result().items():
+                                restored_tables.append(table_name)
+                                logger.info("Tabela %s restaurada: %d registros", table_name, total)
+                        except Exception as e:
+                            errors.append(f"{', '.join(grupo)}: {str(e)}")
+                            logger.error("Erro ao restaurar tabelas %s: %s", grupo, e)
+                        for table_name in grupo:
+                            concluidas += 1
+                            if progresso:
+                                progresso(concluidas, len(tabelas), table_name)
+            
+            if errors:
+                return False, f"Restauração parcial. Tabelas OK: {restored_tables}. Erros: {errors}"
+            
+            return True, f"Restauração completa. Tabelas: {restored_tables}"
+            
+        except Exception as e:
+            logger.error(f"Erro ao restaurar backup: {e}")
+            return False, f"Erro: {str(e)}"
+        finally:
+            shutil.rmtree(temporario, ignore_errors=True)
+    
+    def _restaurar_json_legado(self, filepath: str, clear_existing: bool) -> Tuple[bool, str]:
+        """Restaura o formato antigo (um único documento JSON com ``data``).
+        
+        Tudo numa transação: com ``clear_existing`` as tabelas são esvaziadas
+        (filhas antes das mães) e recarregadas (mães antes das filhas), e
+        qualquer erro desfaz a restauração inteira, inclusive a limpeza.
+        """
         try:
             # Ler arquivo
             if filepath.endswith('.gz'):
@@ -268,72 +836,50 @@ class PostgreSQLBackupManager:
             if 'data' not in backup_data:
                 return False, "Formato de backup inválido"
             
+            dados = {}
+            for table_name, table_data in backup_data['data'].items():
+                if not table_data:
+                    continue
+                # Validar nome da tabela contra whitelist
+                if VALID_TABLE_NAMES and table_name not in VALID_TABLE_NAMES:
+                    logger.warning("Tentativa de restaurar tabela não permitida: %s", table_name)
+                    return False, f"Erro: {table_name}: nome de tabela não permitido"
+                dados[table_name] = table_data
+            
             conn = get_connection()
             try:
                 cursor = conn.cursor()
+                ordem = [t for nivel in _niveis_dependencia(_dependencias(cursor, list(dados))) for t in nivel]
                 
-                restored_tables = []
-                errors = []
+                if clear_existing:
+                    for table_name in reversed(ordem):
+                        cursor.execute(f"DELETE FROM {table_name}")
                 
-                for table_name, table_data in backup_data['data'].items():
-                    if not table_data:
-                        continue
+                for table_name in ordem:
+                    table_data = dados[table_name]
+                    # Filtrar apenas colunas que existem na tabela
+                    valid_columns = set(_colunas_tabela(cursor, table_name))
+                    columns = [c for c in table_data[0].keys() if c in valid_columns]
+                    if not columns:
+                        raise ValueError(f"{table_name}: nenhuma coluna válida")
                     
-                    # Validar nome da tabela contra whitelist
-                    if VALID_TABLE_NAMES and table_name not in VALID_TABLE_NAMES:
-                        errors.append(f"{table_name}: nome de tabela não permitido")
-                        logger.warning("Tentativa de restaurar tabela não permitida: %s", table_name)
-                        continue
-                        
-                    try:
-                        # Limpar tabela se solicitado
-                        if clear_existing:
-                            cursor.execute(f"DELETE FROM {table_name}")
-                        
-                        # Obter colunas válidas da tabela real
-                        cursor.execute("""
-                            SELECT column_name FROM information_schema.columns
-                            WHERE table_name = %s ORDER BY ordinal_position
-                        """, (table_name,))
-                        valid_columns = {row[0] for row in cursor.fetchall()}
-                        
-                        # Filtrar apenas colunas que existem na tabela
-                        columns = [c for c in table_data[0].keys() if c in valid_columns]
-                        if not columns:
-                            errors.append(f"{table_name}: nenhuma coluna válida")
-                            continue
-                        
-                        # Inserir dados com parametrização segura
-                        placeholders = ', '.join(['%s'] * len(columns))
-                        columns_str = ', '.join(columns)
-                        
-                        for row in table_data:
-                            values = [row.get(col) for col in columns]
-                            
-                            try:
-                                cursor.execute(f"""
-                                    INSERT INTO {table_name} ({columns_str})
-                                    VALUES ({placeholders})
-                                    ON CONFLICT DO NOTHING
-                                """, values)
-                            except Exception as insert_error:
-                                logger.warning("Erro ao inserir em %s: %s", table_name, insert_error)
-                        
-                        restored_tables.append(table_name)
-                        logger.info("Tabela %s restaurada: %d registros", table_name, len(table_data))
-                        
-                    except Exception as e:
-                        errors.append(f"{table_name}: {str(e)}")
-                        logger.error("Erro ao restaurar tabela %s: %s", table_name, e)
+                    # Inserir dados com parametrização segura
+                    placeholders = ', '.join([SQL_PLACEHOLDER] * len(columns))
+                    columns_str = ', '.join(columns)
+                    cursor.executemany(
+                        f"INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders}) ON CONFLICT DO NOTHING",
+                        [[row.get(col) for col in columns] for row in table_data]
+                    )
+                    logger.info("Tabela %s restaurada: %d registros", table_name, len(table_data))
                 
                 conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
             finally:
                 return_connection(conn)
             
-            if errors:
-                return True, f"Restauração parcial. Tabelas OK: {restored_tables}. Erros: {errors}"
-            
-            return True, f"Restauração completa. Tabelas: {restored_tables}"
+            return True, f"Restauração completa. Tabelas: {ordem}"
             
         except Exception as e:
             logger.error(f"Erro ao restaurar backup: {e}")
@@ -421,8 +967,9 @@ class PostgreSQLBackupManager:
         """Worker thread para backup automático."""
         while self.running:
             try:
-                # Criar backup
-                backup_path = self.export_to_json(compress=True)
+                # Completo semanal, incremental nos demais dias
+                from backup_incremental import executar_backup_agendado
+                backup_path = executar_backup_agendado('local')
                 if backup_path:
                     logger.info(f"Backup automático criado: {backup_path}")
                 
@@ -454,7 +1001,13 @@ class PostgreSQLBackupManager:
                         file_stats = os.stat(file_path)
                         
                         # Determinar tipo
-                        if filename.endswith('.json.gz'):
+                        if filename.endswith('.parcial'):
+                            continue  # backup ainda em andamento
+                        elif filename.endswith(('.ndjson.gz', '.ndjson.zst')):
+                            backup_type = 'NDJSON (comprimido)'
+                        elif filename.endswith('.ndjson'):
+                            backup_type = 'NDJSON'
+                        elif filename.endswith('.json.gz'):
                             backup_type = 'JSON (comprimido)'
                         elif filename.endswith('.json'):
                             backup_type = 'JSON'
@@ -562,9 +1115,13 @@ def get_available_backups() -> List[Dict]:
     return backup_manager.get_backup_list()
 
 
-def restore_backup(filepath: str, clear_existing: bool = False) -> Tuple[bool, str]:
-    """Restaura um backup."""
-    return backup_manager.restore_from_json(filepath, clear_existing)
+def restore_backup(filepath: str, clear_existing: bool = False,
+                   progresso: Optional[Progresso] = None) -> Tuple[bool, str]:
+    """Restaura um backup (``progresso`` recebe concluídas, total e tabela)."""
+    # Cadeias incrementais recomeçam com um completo depois da restauração
+    from backup_incremental import restauracao
+    with restauracao():
+        return backup_manager.restore_from_json(filepath, clear_existing, progresso=progresso)
 
 
 def enviar_backup_por_email(
@@ -577,7 +1134,8 @@ def enviar_backup_por_email(
     
     Args:
         email_destino: Email para enviar o backup
-        backup_type: 'json' ou 'csv'
+        backup_type: 'json', 'csv' ou 'incremental' (próximo elo da cadeia
+            'email': completo ou só o que mudou desde o último envio)
         assunto_personalizado: Assunto personalizado (opcional)
         
     Returns:
@@ -613,22 +1171,30 @@ def enviar_backup_por_email(
                         arcname = os.path.relpath(file_path, csv_dir)
                         zipf.write(file_path, arcname)
             
-            with open(zip_path, 'rb') as f:
-                backup_bytes = f.read()
-            
+            anexo_path = zip_path
             anexo_nome = zip_filename
-            os.remove(zip_path)  # Limpar arquivo temporário
+            anexo_temporario = True
+            
+        elif backup_type == 'incremental':
+            from backup_incremental import executar_backup_agendado
+            backup_path = executar_backup_agendado('email')
+            if not backup_path:
+                return False, "Erro ao criar backup incremental"
             
+            anexo_path = backup_path
+            anexo_nome = os.path.basename(backup_path)
+            anexo_temporario = False
+        
         else:
             # JSON comprimido
             backup_path = backup_manager.export_to_json(compress=True)
             if not backup_path:
                 return False, "Erro ao criar backup JSON"
             
-            with open(backup_path, 'rb') as f:
-                backup_bytes = f.read()
-            
+            # O anexo é lido do disco em blocos na montagem do email
+            anexo_path = backup_path
             anexo_nome = os.path.basename(backup_path)
+            anexo_temporario = False
         
         # Obter estatísticas do backup
         conn = None
@@ -658,7 +1224,7 @@ def enviar_backup_por_email(
         
         # Montar email
         data_atual = agora_br().strftime("%d/%m/%Y às %H:%M")
-        tamanho_backup = len(backup_bytes) / 1024  # KB
+        tamanho_backup = os.path.getsize(anexo_path) / 1024  # KB
         
         if tamanho_backup > 1024:
             tamanho_str = f"{tamanho_backup/1024:.2f} MB"
@@ -667,12 +1233,25 @@ def enviar_backup_por_email(
         
         assunto = assunto_personalizado or f"🔒 Backup Ponto ExSA - {agora_br().strftime('%d/%m/%Y')}"
         
+        # Incremental: o arquivo só restaura junto com o completo e os deltas anteriores
+        aviso_incremental = aviso_incremental_texto = ''
+        if anexo_nome.startswith('ponto_esa_delta_'):
+            aviso_incremental_texto = (
+                "Backup INCREMENTAL: contém só as alterações desde o envio anterior. "
+                "Guarde junto com o último backup completo e os incrementais seguintes.\n"
+            )
+            aviso_incremental = f"""
+        <p style="color: #e65100; font-size: 14px;">
+            🔗 {aviso_incremental_texto.strip()}
+        </p>"""
+        
         conteudo = f"""
         <h2 style="color: #1a1a2e; margin-bottom: 20px;">📦 Backup Automático</h2>
         
         <p style="color: #333; font-size: 16px;">
             O backup do sistema <strong>Ponto ExSA</strong> foi gerado com sucesso.
         </p>
+        {aviso_incremental}
         
         <div style="background-color: #e8f5e9; padding: 20px; border-radius: 10px; margin: 20px 0;">
             <h3 style="color: #2e7d32; margin-top: 0;">✅ Informações do Backup</h3>
@@ -721,7 +1300,7 @@ def enviar_backup_por_email(
         
         corpo_texto = f"""
 BACKUP PONTO ExSA - {data_atual}
-
+{aviso_incremental_texto}
 Informações:
 - Arquivo: {anexo_nome}
 - Tamanho: {tamanho_str}
@@ -735,16 +1314,20 @@ devem ser mantidos por 5 anos. Guarde este backup em local seguro.
         # Enviar email com anexo
         anexo = {
             'nome': anexo_nome,
-            'dados': backup_bytes
+            'caminho': anexo_path
         }
         
-        sucesso, msg = enviar_email(
-            destinatario=email_destino,
-            assunto=assunto,
-            corpo_html=corpo_html,
-            corpo_texto=corpo_texto,
-            anexos=[anexo]
-        )
+        try:
+            sucesso, msg = enviar_email(
+                destinatario=email_destino,
+                assunto=assunto,
+                corpo_html=corpo_html,
+                corpo_texto=corpo_texto,
+                anexos=[anexo]
+            )
+        finally:
+            if anexo_temporario:
+                os.remove(anexo_path)  # Limpar arquivo temporário
         
         if sucesso:
             logger.info(f"Backup enviado por email para {email_destino}")
@@ -786,7 +1369,7 @@ def agendar_backup_email_semanal(email_destino: str, dia_semana: int = 0) -> boo
         
         # Agendar novo job - Segunda às 06:00
         scheduler.add_job(
-            func=lambda: enviar_backup_por_email(email_destino, 'json'),
+            func=lambda: enviar_backup_por_email(email_destino, 'incremental'),
             trigger=CronTrigger(day_of_week=dia_semana, hour=6, minute=0),
             id=job_id,
             name='Backup Semanal por Email',
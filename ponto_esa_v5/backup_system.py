@@ -12,10 +12,91 @@ from datetime import datetime, timedelta
 import threading
 import time
 import logging
-from constants import agora_br, agora_br_naive
+from contextlib import contextmanager
+from constants import (
+    agora_br, agora_br_naive, SQLITE_BACKUP_PAGINAS_POR_PASSO, SQLITE_BACKUP_PAUSA_S,
+    SQLITE_BACKUP_MAX_REINICIOS, AUDIT_LOG_MAX_BYTES, AUDIT_LOG_ARQUIVOS_ANTIGOS,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 logger = logging.getLogger(__name__)
 
+MODOS_BACKUP = ('online', 'vacuum')
+
+# Caminho do log de auditoria: AUDIT_LOG_FILE no ambiente ou logs/ ao lado do
+# módulo (como app_logger), independente do diretório de trabalho
+AUDIT_LOG_FILE = os.getenv("AUDIT_LOG_FILE") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "logs", "audit.log"
+)
+
+
+class _CopiaReiniciada(Exception):
+    """Outra conexão escreveu no banco e a cópia em passos voltou ao início."""
+
+
+def _copiar_online(origem, destino, paginas=None, pausa=None, max_reinicios=None):
+    """
+    Copia ``origem`` para ``destino`` com a API de backup online do SQLite.
+
+    Em modo WAL a cópia é feita num passo só: ela segura apenas uma transação
+    de leitura e os escritores continuam livres. No journal padrão a cópia anda
+    de ``paginas`` em ``paginas`` com ``pausa`` entre os passos, liberando o
+    banco para os escritores. Como cada escrita de outra conexão recomeça a
+    cópia, a cada recomeço o passo dobra de tamanho (menos passos, menos janelas
+    para recomeçar); depois de ``max_reinicios`` recomeços o restante vai num
+    passo só, que trava os escritores só pelo tempo de ler as páginas.
+
+    Retorna o número de recomeços.
+    """
+    paginas = paginas or SQLITE_BACKUP_PAGINAS_POR_PASSO
+    pausa = SQLITE_BACKUP_PAUSA_S if pausa is None else pausa
+    max_reinicios = SQLITE_BACKUP_MAX_REINICIOS if max_reinicios is None else max_reinicios
+    fonte = sqlite3.connect(origem, timeout=30)
+    alvo = sqlite3.connect(destino)
+    try:
+        if fonte.execute("PRAGMA journal_mode").fetchone()[0].lower() == 'wal':
+            fonte.backup(alvo)
+            return 0
+
+        reinicios = 0
+        while True:
+            anterior = [None]
+
+            def progresso(status, restante, total):
+                # Passo concluído sem avanço: a cópia voltou ao início
+                if status == sqlite3.SQLITE_OK and anterior[0] is not None and restante >= anterior[0]:
+                    raise _CopiaReiniciada()
+                anterior[0] = restante
+                # O ``sleep`` do backup() só vale quando o passo volta BUSY; a
+                # pausa entre passos, com o banco destravado, é feita aqui
+                if restante:
+                    time.sleep(pausa)
+
+            try:
+                if reinicios >= max_reinicios:
+                    fonte.backup(alvo)
+                else:
+                    fonte.backup(alvo, pages=paginas, progress=progresso, sleep=pausa)
+                return reinicios
+            except _CopiaReiniciada:
+                reinicios += 1
+                paginas *= 2
+                logger.debug("Backup de %s recomeçou (%d); passo de %d páginas", origem, reinicios, paginas)
+    finally:
+        alvo.close()
+        fonte.close()
+
+
+def _comprimir(origem, destino):
+    """Comprime ``origem`` em gzip gravando em ``destino`` por blocos."""
+    with open(origem, 'rb') as f_in, gzip.open(destino, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+
 class BackupManager:
     def __init__(self, db_path="database/ponto_esa.db", backup_dir="backups"):
         self.db_path = db_path
@@ -26,39 +107,68 @@ class BackupManager:
         # Criar diretório de backup se não existir
         os.makedirs(backup_dir, exist_ok=True)
     
-    def create_backup(self, compress=True):
+    def create_backup(self, compress=True, modo='online'):
         """
         Cria um backup do banco de dados
+
+        ``modo='online'`` usa a API de backup do SQLite em passos, sem travar os
+        escritores; ``modo='vacuum'`` usa ``VACUUM INTO`` e gera uma cópia
+        compactada (sem páginas livres), ao custo de uma leitura única mais longa.
         """
+        if modo not in MODOS_BACKUP:
+            raise ValueError(f"Modo de backup inválido: {modo}")
+        temp_path = None
         try:
             timestamp = agora_br().strftime("%Y%m%d_%H%M%S")
             backup_filename = f"ponto_esa_backup_{timestamp}.db"
             backup_path = os.path.join(self.backup_dir, backup_filename)
-            
-            # Copiar banco de dados
-            shutil.copy2(self.db_path, backup_path)
-            
-            # Comprimir se solicitado
+            sufixo = 1
+            while os.path.exists(backup_path) or os.path.exists(backup_path + ".gz"):
+                backup_path = os.path.join(self.backup_dir, f"ponto_esa_backup_{timestamp}_{sufixo}.db")
+                sufixo += 1
+            if not os.path.exists(self.db_path):
+                raise FileNotFoundError(self.db_path)
+
+            # A API de backup só grava num banco: o snapshot vai para um arquivo
+            # temporário e só depois é comprimido, fora de qualquer trava
+            temp_path = backup_path + ".parcial"
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            inicio = time.perf_counter()
+            reinicios = 0
+            if modo == 'vacuum':
+                conn = sqlite3.connect(self.db_path, timeout=30)
+                try:
+                    conn.execute("VACUUM INTO ?", (temp_path,))
+                finally:
+                    conn.close()
+            else:
+                reinicios = _copiar_online(self.db_path, temp_path)
+
             if compress:
                 compressed_path = backup_path + ".gz"
-                with open(backup_path, 'rb') as f_in:
-                    with gzip.open(compressed_path, 'wb') as f_out:
-                        shutil.copyfileobj(f_in, f_out)
-                
-                # Remover arquivo não comprimido
-                os.remove(backup_path)
+                _comprimir(temp_path, compressed_path + ".parcial")
+                os.replace(compressed_path + ".parcial", compressed_path)
+                os.remove(temp_path)
                 backup_path = compressed_path
-            
+            else:
+                os.replace(temp_path, backup_path)
+            temp_path = None
+
             # Registrar backup no log
-            self._log_backup(backup_path, os.path.getsize(backup_path))
-            
+            self._log_backup(backup_path, os.path.getsize(backup_path), modo=modo,
+                             duracao_s=round(time.perf_counter() - inicio, 3), reinicios=reinicios)
+
             return backup_path
-        
+
         except Exception as e:
             print(f"Erro ao criar backup: {e}")
             return None
-    
-    def _log_backup(self, backup_path, file_size):
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _log_backup(self, backup_path, file_size, **detalhes):
         """
         Registra o backup no log de auditoria
         """
@@ -67,7 +177,8 @@ class BackupManager:
             "action": "backup_created",
             "file_path": backup_path,
             "file_size": file_size,
-            "status": "success"
+            "status": "success",
+            **detalhes
         }
         
         log_file = os.path.join(self.backup_dir, "backup_log.json")
@@ -157,28 +268,41 @@ class BackupManager:
     def restore_backup(self, backup_path):
         """
         Restaura um backup
+
+        A cópia entra pelo próprio SQLite (API de backup numa conexão com o banco
+        ativo), que respeita as travas das outras conexões, em vez de sobrescrever
+        o arquivo em uso.
         """
+        temp_path = None
         try:
             # Verificar se é arquivo comprimido
             if backup_path.endswith('.gz'):
                 # Descomprimir temporariamente
-                temp_path = backup_path[:-3]  # Remove .gz
+                temp_path = backup_path[:-3] + ".restaurar"
                 with gzip.open(backup_path, 'rb') as f_in:
                     with open(temp_path, 'wb') as f_out:
-                        shutil.copyfileobj(f_in, f_out)
-                
-                # Restaurar
-                shutil.copy2(temp_path, self.db_path)
-                os.remove(temp_path)
+                        shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+                origem = temp_path
             else:
-                shutil.copy2(backup_path, self.db_path)
-            
+                origem = backup_path
+
+            fonte = sqlite3.connect(origem)
+            destino = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                fonte.backup(destino)
+            finally:
+                destino.close()
+                fonte.close()
+
             return True
-        
+
         except Exception as e:
             print(f"Erro ao restaurar backup: {e}")
             return False
-    
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
     def get_backup_list(self):
         """
         Retorna lista de backups disponíveis
@@ -208,12 +332,175 @@ class BackupManager:
         return backups
 
 class AuditLogger:
-    def __init__(self, log_file="logs/audit.log"):
-        self.log_file = log_file
-        
-        # Criar diretório de logs se não existir
-        os.makedirs(os.path.dirname(log_file), exist_ok=True)
-    
+    """
+    Log de auditoria append-only em JSONL (uma ação por linha).
+
+    Cada ação é gravada com um único ``write`` num descritor aberto com
+    ``O_APPEND``, então gravações concorrentes não se misturam nem reescrevem
+    o arquivo. Ao passar de ``AUDIT_LOG_MAX_BYTES`` o arquivo roda para
+    ``audit.log.<n>`` (mantendo ``AUDIT_LOG_ARQUIVOS_ANTIGOS``). Gravação e
+    rotação acontecem sob ``flock`` em ``audit.log.lock`` (``msvcrt.locking``
+    no Windows), então vários processos (workers, agendador) não rodam o
+    mesmo arquivo duas vezes nem gravam no arquivo já renomeado. Um índice em
+    SQLite ao lado (``audit.log.idx``) guarda arquivo, posição e usuário de
+    cada linha, e as consultas vão direto às linhas pedidas. O índice é
+    derivado: se faltar ou ficar para trás, é refeito a partir dos arquivos.
+
+    Nada é aberto na construção: diretório, trava e índice são criados no
+    primeiro uso, em ``log_file`` ou, sem ele, em ``AUDIT_LOG_FILE``.
+    """
+
+    def __init__(self, log_file=None):
+        self._log_file = log_file
+        self._lock = threading.Lock()
+        self._indice = None
+
+    @property
+    def log_file(self):
+        return self._log_file or AUDIT_LOG_FILE
+
+    @property
+    def index_file(self):
+        return self.log_file + ".idx"
+
+    @property
+    def lock_file(self):
+        return self.log_file + ".lock"
+
+    @contextmanager
+    def _aberto(self):
+        """``_trava`` com o log inicializado (conversão do legado e índice) no primeiro uso."""
+        with self._trava():
+            if self._indice is None:
+                self._converter_legado()
+                self._indice = self._abrir_indice()
+                self._atualizar_indice()
+            yield
+
+    def _abrir_indice(self):
+        conn = sqlite3.connect(self.index_file, check_same_thread=False, timeout=30)
+        # Índice é reconstruível: não precisa de fsync a cada ação
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS arquivos (
+                seq INTEGER PRIMARY KEY, nome TEXT NOT NULL, indexado_ate INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS entradas (
+                seq INTEGER NOT NULL, posicao INTEGER NOT NULL, user_id TEXT,
+                PRIMARY KEY (seq, posicao)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_entradas_usuario ON entradas (user_id, seq, posicao);
+        """)
+        if conn.execute("SELECT COUNT(*) FROM arquivos").fetchone()[0] == 0:
+            # Índice novo: registra os arquivos já rodados para serem reindexados
+            base = os.path.basename(self.log_file)
+            rodados = sorted(
+                int(nome[len(base) + 1:]) for nome in os.listdir(os.path.dirname(self.log_file) or ".")
+                if nome.startswith(base + ".") and nome[len(base) + 1:].isdigit()
+            )
+            conn.executemany("INSERT INTO arquivos (seq, nome) VALUES (?, ?)",
+                             [(seq, f"{base}.{seq}") for seq in rodados])
+            conn.execute("INSERT INTO arquivos (seq, nome) VALUES (?, ?)", ((rodados[-1] if rodados else 0) + 1, base))
+        conn.commit()
+        return conn
+
+    def _converter_legado(self):
+        """Converte o formato antigo (um array JSON com indent=2) para JSONL."""
+        if not os.path.exists(self.log_file):
+            return
+        with open(self.log_file, 'r', encoding='utf-8') as f:
+            inicio = f.read(64).lstrip()
+        if not inicio.startswith('['):
+            return
+        try:
+            with open(self.log_file, 'r', encoding='utf-8') as f:
+                logs = json.load(f)
+        except Exception as e:
+            logger.debug("Erro ao ler log de auditoria antigo: %s", e)
+            logs = []
+        temp_path = self.log_file + ".conv"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for entrada in logs:
+                f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+        os.replace(temp_path, self.log_file)
+        if os.path.exists(self.index_file):
+            os.remove(self.index_file)
+
+    def _arquivo_atual(self):
+        return self._indice.execute("SELECT MAX(seq) FROM arquivos").fetchone()[0]
+
+    def _caminho(self, nome):
+        return os.path.join(os.path.dirname(self.log_file), nome)
+
+    def _atualizar_indice(self):
+        """Indexa o que foi gravado além de ``indexado_ate`` (índice refeito ou queda entre gravar e indexar)."""
+        for seq, nome, indexado_ate in self._indice.execute("SELECT seq, nome, indexado_ate FROM arquivos").fetchall():
+            caminho = self._caminho(nome)
+            if not os.path.exists(caminho) or os.path.getsize(caminho) <= indexado_ate:
+                continue
+            entradas = []
+            posicao = indexado_ate
+            with open(caminho, 'rb') as f:
+                f.seek(indexado_ate)
+                for linha in f:
+                    if not linha.endswith(b"\n"):
+                        break  # linha ainda sendo gravada por outro processo
+                    try:
+                        user_id = json.loads(linha).get("user_id")
+                    except ValueError:
+                        user_id = None
+                    entradas.append((seq, posicao, json.dumps(user_id)))
+                    posicao += len(linha)
+            with self._indice:
+                self._indice.executemany("INSERT OR IGNORE INTO entradas VALUES (?, ?, ?)", entradas)
+                self._indice.execute("UPDATE arquivos SET indexado_ate = MAX(indexado_ate, ?) WHERE seq = ?",
+                                     (posicao, seq))
+
+    @contextmanager
+    def _trava(self):
+        """Exclusão entre threads (lock da instância) e processos (``flock`` no arquivo de trava)."""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.log_file) or ".", exist_ok=True)
+            fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                yield
+            finally:
+                if fcntl is None:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+                os.close(fd)  # fechar também solta o flock
+
+    def _rodar(self, seq, inode):
+        """Renomeia o arquivo atual para ``audit.log.<seq>`` e descarta os mais antigos."""
+        # Só roda se o arquivo no caminho ainda é o que acabamos de gravar, continua
+        # grande e o índice não avançou (outro processo sem a trava pode ter rodado)
+        try:
+            estado = os.stat(self.log_file)
+        except FileNotFoundError:
+            return
+        if estado.st_ino != inode or estado.st_size < AUDIT_LOG_MAX_BYTES or self._arquivo_atual() != seq:
+            return
+        nome = f"{os.path.basename(self.log_file)}.{seq}"
+        os.replace(self.log_file, self._caminho(nome))
+        with self._indice:
+            self._indice.execute("UPDATE arquivos SET nome = ? WHERE seq = ?", (nome, seq))
+            self._indice.execute("INSERT INTO arquivos (seq, nome) VALUES (?, ?)",
+                                 (seq + 1, os.path.basename(self.log_file)))
+            antigos = self._indice.execute(
+                "SELECT seq, nome FROM arquivos WHERE seq <= ?", (seq - AUDIT_LOG_ARQUIVOS_ANTIGOS,)
+            ).fetchall()
+            for seq_antigo, nome_antigo in antigos:
+                self._indice.execute("DELETE FROM entradas WHERE seq = ?", (seq_antigo,))
+                self._indice.execute("DELETE FROM arquivos WHERE seq = ?", (seq_antigo,))
+                caminho = self._caminho(nome_antigo)
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+
     def log_action(self, user_id, action, details=None, ip_address=None):
         """
         Registra uma ação no log de auditoria
@@ -227,30 +514,29 @@ class AuditLogger:
                 "ip_address": ip_address,
                 "session_id": self._get_session_id()
             }
-            
-            # Ler logs existentes
-            logs = []
-            if os.path.exists(self.log_file):
+            dados = (json.dumps(log_entry, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+            with self._aberto():
+                # Lido sob a trava: outro processo pode ter rodado o arquivo
+                seq = self._arquivo_atual()
+                fd = os.open(self.log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
                 try:
-                    with open(self.log_file, 'r') as f:
-                        logs = json.load(f)
-                except Exception as e:
-                    logger.debug("Erro ao ler log de auditoria: %s", e)
-                    logs = []
-            
-            # Adicionar novo log
-            logs.append(log_entry)
-            
-            # Manter apenas os últimos 10000 logs
-            if len(logs) > 10000:
-                logs = logs[-10000:]
-            
-            # Salvar logs
-            with open(self.log_file, 'w') as f:
-                json.dump(logs, f, indent=2)
+                    os.write(fd, dados)
+                    # Com O_APPEND a posição após o write é o fim da nossa linha
+                    fim = os.lseek(fd, 0, os.SEEK_CUR)
+                    inode = os.fstat(fd).st_ino
+                finally:
+                    os.close(fd)
+                with self._indice:
+                    self._indice.execute("INSERT OR IGNORE INTO entradas VALUES (?, ?, ?)",
+                                         (seq, fim - len(dados), json.dumps(user_id)))
+                    self._indice.execute("UPDATE arquivos SET indexado_ate = MAX(indexado_ate, ?) WHERE seq = ?",
+                                         (fim, seq))
+                if fim >= AUDIT_LOG_MAX_BYTES:
+                    self._rodar(seq, inode)
         
         except Exception as e:
-            print(f"Erro ao registrar log de auditoria: {e}")
+            logger.error("Erro ao registrar log de auditoria: %s", e)
     
     def _get_session_id(self):
         """
@@ -259,26 +545,40 @@ class AuditLogger:
         import hashlib
         import time
         return hashlib.md5(str(time.time()).encode()).hexdigest()[:8]
+
+    def _ler_entradas(self, posicoes):
+        """Lê as linhas apontadas pelo índice, em ordem cronológica."""
+        nomes = dict(self._indice.execute("SELECT seq, nome FROM arquivos").fetchall())
+        logs = []
+        abertos = {}
+        try:
+            for seq, posicao in sorted(posicoes):
+                if seq not in abertos:
+                    abertos[seq] = open(self._caminho(nomes[seq]), 'rb')
+                arquivo = abertos[seq]
+                arquivo.seek(posicao)
+                logs.append(json.loads(arquivo.readline()))
+        finally:
+            for arquivo in abertos.values():
+                arquivo.close()
+        return logs
     
     def get_user_logs(self, user_id, limit=100):
         """
         Retorna logs de um usuário específico
         """
         try:
-            if not os.path.exists(self.log_file):
-                return []
-            
-            with open(self.log_file, 'r') as f:
-                all_logs = json.load(f)
-            
-            # Filtrar por usuário
-            user_logs = [log for log in all_logs if log.get("user_id") == user_id]
-            
-            # Retornar os mais recentes
-            return user_logs[-limit:]
+            with self._aberto():
+                self._atualizar_indice()
+                posicoes = self._indice.execute(
+                    "SELECT seq, posicao FROM entradas WHERE user_id = ? "
+                    "ORDER BY seq DESC, posicao DESC LIMIT ?",
+                    (json.dumps(user_id), limit),
+                ).fetchall()
+                return self._ler_entradas(posicoes)
         
         except Exception as e:
-            print(f"Erro ao obter logs do usuário: {e}")
+            logger.error("Erro ao obter logs do usuário: %s", e)
             return []
     
     def get_all_logs(self, limit=1000):
@@ -286,16 +586,15 @@ class AuditLogger:
         Retorna todos os logs
         """
         try:
-            if not os.path.exists(self.log_file):
-                return []
-            
-            with open(self.log_file, 'r') as f:
-                all_logs = json.load(f)
-            
-            return all_logs[-limit:]
+            with self._aberto():
+                self._atualizar_indice()
+                posicoes = self._indice.execute(
+                    "SELECT seq, posicao FROM entradas ORDER BY seq DESC, posicao DESC LIMIT ?", (limit,)
+                ).fetchall()
+                return self._ler_entradas(posicoes)
         
         except Exception as e:
-            print(f"Erro ao obter logs: {e}")
+            logger.error("Erro ao obter logs: %s", e)
             return []
 
 # Instâncias globais
@@ -5,6 +5,7 @@ Centraliza todos os valores numéricos, limites e thresholds usados
 pelo sistema para eliminar magic numbers e facilitar manutenção.
 """
 
+import os
 from datetime import datetime, date, timedelta
 
 # =============================================
@@ -72,13 +73,46 @@ CACHE_TTL_MEDIUM = 300  # 5 min  — projetos, usuários
 CACHE_TTL_LONG = 3600  # 1 hora — configurações estáveis
 PERF_MONITOR_MAX_ITEMS = 1000  # limite de itens no monitor
 CACHE_MAX_ENTRIES = 100  # máximo de entradas no cache de sessão
+DASHBOARD_SNAPSHOT_INTERVAL_SECONDS = 60  # recálculo periódico pelo scheduler
+DASHBOARD_SNAPSHOT_MAX_AGE_SECONDS = 300  # snapshot mais velho que isso é recalculado na leitura
+DASHBOARD_SNAPSHOT_DEBOUNCE_SECONDS = 2  # agrupa eventos próximos num único refresh
+PENDING_COUNTERS_RECONCILE_SECONDS = 600  # reconstrução periódica de pending_counters
+LOGIN_PREFETCH_MAX_WORKERS = 6  # threads que aquecem as telas iniciais após o login
+LOGIN_PREFETCH_WAIT_SECONDS = 3  # espera máxima por um prefetch em andamento antes de consultar direto
+SCHEMA_PROBE_NEGATIVO_TTL_SECONDS = 300  # tabela/coluna ausente é reconsultada no catálogo no máximo 1x nesse intervalo
 
 # =============================================
 # NOTIFICAÇÕES
 # =============================================
 MAX_NOTIFICATION_DESC_LEN = 100  # truncar descrição de notificação
 PUSH_TIMEOUT_SECONDS = 10  # timeout para envio de push
+PUSH_FANOUT_MAX_WORKERS = 16  # envios ntfy simultâneos em avisos em massa (conexões keep-alive)
+WEBPUSH_FANOUT_MAX_WORKERS = 32  # envios WebPush simultâneos (criptografia + POST por dispositivo)
+OUTBOX_POLL_SECONDS = 5  # intervalo do worker da notification_outbox sem novos enfileiramentos
+OUTBOX_BATCH_SIZE = 100  # notificações reservadas por ciclo do worker
+OUTBOX_MAX_TENTATIVAS = 6  # após isso a notificação fica como 'falhou'
+OUTBOX_BACKOFF_BASE_SECONDS = 30  # espera da 1ª retentativa (dobra a cada falha)
+OUTBOX_BACKOFF_MAX_SECONDS = 3600
+OUTBOX_LEASE_SECONDS = 300  # reserva 'enviando' expirada volta para a fila (worker caiu)
+OUTBOX_CONCORRENCIA_POR_CANAL = {"ntfy": 8, "webpush": 4, "email": 2}
+OUTBOX_RETENTION_DAYS = 7  # linhas 'enviado'/'descartado' mais antigas que isso são apagadas
 GEOCODING_TIMEOUT_SECONDS = 5  # timeout para geocodificação
+# Limites de taxa por destino externo (balde de tokens compartilhado entre processos do host):
+# taxa = chamadas/s sustentadas, rajada = chamadas seguidas permitidas, espera_max = s na fila antes de desistir
+RATE_LIMIT_POLITICAS = {
+    "nominatim": {"taxa": 1.0, "rajada": 1, "espera_max": 10},  # política de uso do OSM: máx. 1 req/s
+    "ntfy": {"taxa": 5.0, "rajada": 60, "espera_max": 60},
+    "webpush": {"taxa": 50.0, "rajada": 100, "espera_max": 60},
+    "smtp": {"taxa": 1.0, "rajada": 10, "espera_max": 120},
+}
+# Arquivos de estado dos baldes ("" = só dentro do processo). Caminho absoluto ao lado do
+# módulo: processos iniciados de diretórios diferentes compartilham o mesmo balde
+RATE_LIMIT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "database")
+SMTP_TIMEOUT_SECONDS = 30  # timeout de conexão/comando SMTP
+SMTP_POOL_SIZE = 2  # sessões SMTP abertas por processo (= concorrência do canal email da outbox)
+SMTP_IDLE_SECONDS = 60  # sessão ociosa além disso é fechada antes de reutilizar
+SMTP_MAX_MENSAGENS_POR_SESSAO = 100  # reconecta após N mensagens (limite comum dos provedores)
+EMAIL_ANEXO_MAX_BYTES = 18 * 1024 * 1024  # anexo maior é recusado (~25 MB após base64, limite comum dos provedores)
 
 # =============================================
 # SCHEDULER
@@ -86,6 +120,17 @@ GEOCODING_TIMEOUT_SECONDS = 5  # timeout para geocodificação
 SCHEDULER_MISFIRE_GRACE_SECONDS = 30
 POLL_INTERVAL_SECONDS = 60  # intervalo de checagem do scheduler
 ERROR_RETRY_DELAY_SECONDS = 30  # retry após erro
+LEADER_RENEW_SECONDS = 10  # heartbeat do líder (também o atraso máximo para ceder a liderança)
+LEADER_RETRY_SECONDS = 15  # intervalo com que seguidores tentam assumir a liderança
+LEADER_LOCK_DIR = "database"  # diretório dos arquivos de trava (backend SQLite)
+REMINDER_WHEEL_MISFIRE_SECONDS = 600  # lembrete por usuário atrasado além disso é pulado
+# Horários de lembrete de quem não tem horário pessoal em config_lembretes_push
+REMINDER_HORARIOS_PADRAO = {
+    'entrada': ['08:15', '08:30', '09:00'],
+    'saida': ['17:15', '17:30', '18:00'],
+}
+JOB_RUNS_RETENTION_DAYS = 30  # histórico de execuções de jobs (job_runs)
+JOB_RUNS_DASHBOARD_DAYS = 14  # janela do painel de p50/p95 por job
 
 # =============================================
 # ARQUIVOS / UPLOADS
@@ -93,17 +138,57 @@ ERROR_RETRY_DELAY_SECONDS = 30  # retry após erro
 MAX_UPLOAD_SIZE_MB = 10
 MAX_UPLOAD_SIZE_BYTES = MAX_UPLOAD_SIZE_MB * 1024 * 1024
 
+# =============================================
+# BACKUP
+# =============================================
+BACKUP_FETCH_SIZE = 500  # linhas por fetchmany no cursor de servidor (memória constante)
+BACKUP_COMPRESSION_LEVEL = 6  # gzip (1-9) / zstd (1-22)
+BACKUP_PARALLEL_WORKERS = 4  # tabelas exportadas/restauradas ao mesmo tempo (conexões do pool)
+BACKUP_RESTORE_BATCH = 5000  # linhas por COPY / execute_values na restauração
+BACKUP_DELTAS_POR_COMPLETO = 6  # backups incrementais antes de um novo completo (diário → completo semanal)
+BACKUP_DELTA_JANELA_IDS = 1000  # ids abaixo da marca d'água conferidos a cada backup (commits fora de ordem)
+SQLITE_BACKUP_PAGINAS_POR_PASSO = 256  # páginas copiadas por passo da API de backup online
+SQLITE_BACKUP_PAUSA_S = 0.005  # pausa entre passos: os escritores pegam o lock nesse intervalo
+SQLITE_BACKUP_MAX_REINICIOS = 8  # a cada recomeço o passo dobra; depois disso, copia num passo só
+
 # =============================================
 # LOGS
 # =============================================
 LOG_MAX_BYTES = 5 * 1024 * 1024  # 5 MB por ficheiro de log
 LOG_BACKUP_COUNT = 3
+AUDIT_LOG_MAX_BYTES = 5 * 1024 * 1024  # log de auditoria (JSONL) roda ao passar deste tamanho
+AUDIT_LOG_ARQUIVOS_ANTIGOS = 4  # arquivos rodados mantidos (e indexados) além do atual
+
+# =============================================
+# MODO OFFLINE
+# =============================================
+OFFLINE_SYNC_LOTE = 1000  # linhas por INSERT multi-linha ao sincronizar (1.000 batidas = 1 ida ao banco)
+OFFLINE_SYNC_BACKOFF_BASE_SECONDS = 30  # 1ª nova tentativa de um item da fila após falha; dobra a cada falha
+OFFLINE_SYNC_BACKOFF_MAX_SECONDS = 3600  # teto do intervalo entre tentativas (os itens nunca são descartados)
+OFFLINE_SYNC_INTERVALO_S = 60  # sincronização periódica enquanto online (a volta da conexão sincroniza na hora)
+OFFLINE_MONITOR_INTERVALO_S = 30  # sondagem de conectividade enquanto online
+OFFLINE_MONITOR_BACKOFF_BASE_S = 5  # sondagem enquanto offline: 5 s, 10 s, 20 s... até o teto
+OFFLINE_MONITOR_BACKOFF_MAX_S = 300
+OFFLINE_SONDA_TIMEOUT_S = 3  # timeout de cada sondagem (só na thread do monitor, nunca na UI)
+OFFLINE_CACHE_MAX_BYTES = 8 * 1024 * 1024  # teto do cache offline (valores JSON); acima disso sai o menos usado
+OFFLINE_CACHE_MAX_ITENS = 2000
+OFFLINE_CACHE_COTA_PADRAO_BYTES = 2 * 1024 * 1024  # cota de cada namespace (prefixo da chave antes de ':')
+OFFLINE_CACHE_COTAS_BYTES = {}  # cotas específicas por namespace, ex.: {'projetos': 512 * 1024}
+OFFLINE_CACHE_FOLGA = 0.9  # ao estourar um limite, poda até 90% dele (a poda não roda a cada gravação)
+OFFLINE_CACHE_TOQUE_S = 60  # leituras só regravam last_access_at se o último acesso for mais antigo que isso
 
 # =============================================
 # SEGURANÇA
 # =============================================
 MAX_LOGIN_ATTEMPTS = 5  # bloqueio após N tentativas
 PASSWORD_MIN_LENGTH = 8
+PASSWORD_VERIFY_MAX_WORKERS = 4  # processos do pool de verificação bcrypt (0 = na própria thread)
+PASSWORD_VERIFY_TIMEOUT_SECONDS = 10  # espera por um worker antes de calcular localmente (se a tarefa ainda estiver na fila)
+BCRYPT_TARGET_MS = 250  # custo bcrypt calibrado para ~este tempo por hash
+BCRYPT_MIN_ROUNDS = 12  # piso = default de bcrypt.gensalt(); a calibração só sobe o custo
+BCRYPT_MAX_ROUNDS = 14
+PASSWORD_UPGRADE_BATCH_SIZE = 50  # upgrades de hash gravados por transação
+PASSWORD_UPGRADE_FLUSH_SECONDS = 2  # espera para agrupar upgrades num lote
 
 # =============================================
 # TABELAS VÁLIDAS (whitelist para operações DDL dinâmicas)
@@ -8,10 +8,13 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
-from datetime import datetime, date, timedelta
+from datetime import datetime
 from typing import Dict, List, Optional, Any
 import logging
-from ponto_esa_v5.database import SQL_PLACEHOLDER
+try:
+    from dashboard_snapshot import obter_dashboard_snapshot
+except ImportError:
+    from ponto_esa_v5.dashboard_snapshot import obter_dashboard_snapshot
 from constants import agora_br
 
 logger = logging.getLogger(__name__)
@@ -528,8 +531,13 @@ def render_dashboard_executivo(dados: Dict[str, Any]):
         ), unsafe_allow_html=True)
 
 
-def get_dashboard_data_from_db(execute_query_func) -> Dict[str, Any]:
-    """Obtém dados do banco para o dashboard"""
+def get_dashboard_data_from_db(execute_query_func=None) -> Dict[str, Any]:
+    """Obtém dados do dashboard a partir do snapshot pré-calculado.
+
+    ``execute_query_func`` é mantido apenas por compatibilidade: as métricas
+    vêm de ``dashboard_snapshot`` (uma leitura de linha), recalculado pelo
+    scheduler com consultas agregadas.
+    """
     
     dados = {
         'total_usuarios': 0,
@@ -547,91 +555,22 @@ def get_dashboard_data_from_db(execute_query_func) -> Dict[str, Any]:
         'atestados_total': 0
     }
     
-    hoje = date.today().strftime("%Y-%m-%d")
-    
     try:
-        # Total de usuários
-        result = execute_query_func(
-            "SELECT COUNT(*) FROM usuarios WHERE ativo = 1 AND tipo = 'funcionario'",
-            fetch_one=True
-        )
-        if result:
-            dados['total_usuarios'] = result[0]
-        
-        # Registros hoje
-        result = execute_query_func(
-            f"SELECT COUNT(*) FROM registros_ponto WHERE DATE(data_hora) = {SQL_PLACEHOLDER}",
-            (hoje,), fetch_one=True
-        )
-        if result:
-            dados['registros_hoje'] = result[0]
-        
-        # Pendências (ausências + horas extras pendentes)
-        result = execute_query_func(
-            "SELECT COUNT(*) FROM ausencias WHERE status = 'pendente'",
-            fetch_one=True
-        )
-        ausencias_pend = result[0] if result else 0
-        
-        result = execute_query_func(
-            "SELECT COUNT(*) FROM solicitacoes_horas_extras WHERE status = 'pendente'",
-            fetch_one=True
-        )
-        he_pend = result[0] if result else 0
-        dados['pendencias_total'] = ausencias_pend + he_pend
-        
-        # Status de presença hoje
-        result = execute_query_func(
-            f"""SELECT COUNT(DISTINCT usuario_id) FROM registros_ponto 
-               WHERE DATE(data_hora) = {SQL_PLACEHOLDER}""",
-            (hoje,), fetch_one=True
-        )
-        presentes = result[0] if result else 0
-        ausentes = max(0, dados['total_usuarios'] - presentes)
+        snapshot = obter_dashboard_snapshot()
+        dados['total_usuarios'] = snapshot['total_usuarios']
+        dados['registros_hoje'] = snapshot['registros_hoje']
+        dados['pendencias_total'] = snapshot['pendencias_total']
         dados['status_presenca'] = {
-            'Presentes': presentes,
-            'Ausentes': ausentes
+            'Presentes': snapshot['presentes_hoje'],
+            'Ausentes': max(0, snapshot['total_usuarios'] - snapshot['presentes_hoje'])
         }
-        
-        # Registros últimos 7 dias
-        datas = []
-        valores = []
-        for i in range(6, -1, -1):
-            data = (date.today() - timedelta(days=i)).strftime("%Y-%m-%d")
-            result = execute_query_func(
-                f"SELECT COUNT(*) FROM registros_ponto WHERE DATE(data_hora) = {SQL_PLACEHOLDER}",
-                (data,), fetch_one=True
-            )
-            datas.append((date.today() - timedelta(days=i)).strftime("%d/%m"))
-            valores.append(result[0] if result else 0)
-        
-        dados['registros_semana'] = {'datas': datas, 'valores': valores}
-        
-        # Ausências por tipo no mês
-        primeiro_dia_mes = date.today().replace(day=1).strftime("%Y-%m-%d")
-        result = execute_query_func(
-            f"""SELECT tipo, COUNT(*) as total FROM ausencias 
-               WHERE data_inicio >= {SQL_PLACEHOLDER} 
-               GROUP BY tipo""",
-            (primeiro_dia_mes,), fetch_all=True
-        )
-        if result:
-            for row in result:
-                dados['ausencias_tipo'][row[0]] = row[1]
-        
-        # Atestados do mês
-        result = execute_query_func(
-            f"""SELECT 
-                COUNT(*) as total,
-                SUM(CASE WHEN status = 'aprovado' THEN 1 ELSE 0 END) as aprovados
-               FROM ausencias 
-               WHERE data_inicio >= {SQL_PLACEHOLDER} AND tipo LIKE '%%Atestado%%'""",
-            (primeiro_dia_mes,), fetch_one=True
-        )
-        if result:
-            dados['atestados_total'] = result[0] or 0
-            dados['atestados_aprovados'] = result[1] or 0
-        
+        dados['registros_semana'] = {
+            'datas': snapshot['registros_semana']['datas'],
+            'valores': snapshot['registros_semana']['valores']
+        }
+        dados['ausencias_tipo'] = dict(snapshot['ausencias_por_tipo'])
+        dados['atestados_total'] = snapshot['atestados_mes']
+        dados['atestados_aprovados'] = snapshot['atestados_aprovados']
     except Exception as e:
         logger.error(f"Erro ao obter dados do dashboard: {e}")
     
@@ -0,0 +1,310 @@
+"""
+Snapshot pré-calculado do dashboard do gestor - Ponto ExSA v5.0
+
+O dashboard executivo precisava de ~12 consultas por renderização (incluindo
+7 ``COUNT(*)`` separados para o gráfico semanal). Aqui as métricas são
+calculadas com 3 consultas agregadas e gravadas numa única linha da tabela
+``dashboard_snapshot``:
+
+- o ``background_scheduler`` recalcula o snapshot a cada minuto;
+- eventos (registro de ponto, aprovações, novas solicitações) chamam
+  ``solicitar_atualizacao_snapshot()`` para antecipar o recálculo;
+- as telas leem com ``obter_dashboard_snapshot()`` (leitura de uma linha),
+  independente do tamanho da empresa.
+"""
+
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+
+try:
+    from database import get_connection, return_connection, SQL_PLACEHOLDER
+except ImportError:
+    from ponto_esa_v5.database import get_connection, return_connection, SQL_PLACEHOLDER
+
+from constants import (
+    agora_br_naive,
+    hoje_br,
+    DASHBOARD_SNAPSHOT_MAX_AGE_SECONDS,
+    DASHBOARD_SNAPSHOT_DEBOUNCE_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_ID = 1
+DIAS_GRAFICO_SEMANAL = 7
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+# Debounce do recálculo antecipado: rajadas de eventos viram um único refresh.
+_refresh_timer: Optional[threading.Timer] = None
+_refresh_lock = threading.Lock()
+
+
+@contextmanager
+def _db():
+    """Context manager que obtém conexão do pool e a devolve ao final."""
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        return_connection(conn)
+
+
+def ensure_snapshot_schema_once() -> None:
+    """Cria a tabela ``dashboard_snapshot`` apenas uma vez por processo."""
+    global _schema_ready
+    if _schema_ready:
+        return
+
+    with _schema_lock:
+        if _schema_ready:
+            return
+        with _db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS dashboard_snapshot (
+                    id INTEGER PRIMARY KEY,
+                    dados TEXT NOT NULL,
+                    atualizado_em TIMESTAMP NOT NULL
+                )
+            """)
+            conn.commit()
+            cursor.close()
+        _schema_ready = True
+
+
+# ---------------------------------------------------------------------------
+# Consultas agregadas (reutilizadas por db_optimized/performance_cache)
+# ---------------------------------------------------------------------------
+
+def contar_registros_por_dia(cursor, data_inicio: date, data_fim: date) -> Dict[str, tuple]:
+    """Conta registros e usuários distintos por dia num único ``GROUP BY``.
+
+    Args:
+        cursor: cursor aberto do banco.
+        data_inicio: primeiro dia (inclusive).
+        data_fim: último dia (inclusive).
+
+    Returns:
+        Dict ``{'YYYY-MM-DD': (registros, usuarios_distintos)}`` apenas com
+        os dias que possuem registros.
+    """
+    cursor.execute(
+        f"""
+        SELECT DATE(data_hora) AS dia, COUNT(*), COUNT(DISTINCT usuario)
+        FROM registros_ponto
+        WHERE data_hora >= {SQL_PLACEHOLDER} AND data_hora < {SQL_PLACEHOLDER}
+        GROUP BY DATE(data_hora)
+        """,
+        (
+            data_inicio.strftime("%Y-%m-%d 00:00:00"),
+            (data_fim + timedelta(days=1)).strftime("%Y-%m-%d 00:00:00"),
+        ),
+    )
+    return {str(row[0])[:10]: (int(row[1] or 0), int(row[2] or 0)) for row in cursor.fetchall()}
+
+
+def serie_registros_semana(por_dia: Dict[str, tuple], data_fim: date) -> Dict[str, list]:
+    """Monta a série dos últimos 7 dias (com zeros) no formato dos gráficos."""
+    datas, valores, datas_iso = [], [], []
+    for i in range(DIAS_GRAFICO_SEMANAL - 1, -1, -1):
+        dia = data_fim - timedelta(days=i)
+        chave = dia.strftime("%Y-%m-%d")
+        datas.append(dia.strftime("%d/%m"))
+        datas_iso.append(chave)
+        valores.append(por_dia.get(chave, (0, 0))[0])
+    return {"datas": datas, "valores": valores, "datas_iso": datas_iso}
+
+
+def calcular_metricas_dashboard(cursor, data_ref: Optional[date] = None) -> Dict[str, Any]:
+    """Calcula todas as métricas do dashboard com 3 consultas agregadas.
+
+    Args:
+        cursor: cursor aberto do banco.
+        data_ref: dia de referência (padrão: hoje em Brasília).
+
+    Returns:
+        Dict serializável em JSON com as métricas do dashboard.
+    """
+    data_ref = data_ref or hoje_br()
+    primeiro_dia_mes = data_ref.replace(day=1)
+
+    # 1) Totais escalares numa única ida ao banco
+    cursor.execute("""
+        SELECT
+            (SELECT COUNT(*) FROM usuarios WHERE ativo = 1 AND tipo = 'funcionario'),
+            (SELECT COUNT(*) FROM ausencias WHERE status = 'pendente'),
+            (SELECT COUNT(*) FROM solicitacoes_horas_extras WHERE status = 'pendente')
+    """)
+    row = cursor.fetchone() or (0, 0, 0)
+    total_usuarios = int(row[0] or 0)
+    ausencias_pendentes = int(row[1] or 0)
+    horas_extras_pendentes = int(row[2] or 0)
+
+    # 2) Registros dos últimos 7 dias agrupados por dia (inclui hoje)
+    por_dia = contar_registros_por_dia(
+        cursor, data_ref - timedelta(days=DIAS_GRAFICO_SEMANAL - 1), data_ref
+    )
+    registros_hoje, presentes_hoje = por_dia.get(data_ref.strftime("%Y-%m-%d"), (0, 0))
+
+    # 3) Ausências do mês agrupadas por tipo e status
+    cursor.execute(
+        f"""
+        SELECT tipo, status, COUNT(*)
+        FROM ausencias
+        WHERE data_inicio >= {SQL_PLACEHOLDER}
+        GROUP BY tipo, status
+        """,
+        (primeiro_dia_mes.strftime("%Y-%m-%d"),),
+    )
+    ausencias_por_tipo: Dict[str, int] = {}
+    ausencias_status: Dict[str, int] = {}
+    atestados_mes = 0
+    atestados_aprovados = 0
+    for tipo, status, total in cursor.fetchall():
+        total = int(total or 0)
+        tipo = tipo or "Outros"
+        ausencias_por_tipo[tipo] = ausencias_por_tipo.get(tipo, 0) + total
+        if status:
+            ausencias_status[status] = ausencias_status.get(status, 0) + total
+        if "Atestado" in tipo:
+            atestados_mes += total
+            if status == "aprovado":
+                atestados_aprovados += total
+
+    return {
+        "data_referencia": data_ref.strftime("%Y-%m-%d"),
+        "gerado_em": agora_br_naive().isoformat(),
+        "total_usuarios": total_usuarios,
+        "registros_hoje": registros_hoje,
+        "presentes_hoje": presentes_hoje,
+        "ausencias_pendentes": ausencias_pendentes,
+        "horas_extras_pendentes": horas_extras_pendentes,
+        "pendencias_total": ausencias_pendentes + horas_extras_pendentes,
+        "atestados_mes": atestados_mes,
+        "atestados_aprovados": atestados_aprovados,
+        "taxa_presenca": (presentes_hoje / total_usuarios * 100) if total_usuarios > 0 else 0,
+        "registros_semana": serie_registros_semana(por_dia, data_ref),
+        "ausencias_por_tipo": ausencias_por_tipo,
+        "ausencias_status": ausencias_status,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Escrita / leitura do snapshot
+# ---------------------------------------------------------------------------
+
+def atualizar_dashboard_snapshot() -> Dict[str, Any]:
+    """Recalcula as métricas e grava a linha única de ``dashboard_snapshot``.
+
+    Executado pelo scheduler a cada minuto e pelos refreshs antecipados.
+
+    Returns:
+        As métricas recém-calculadas.
+    """
+    ensure_snapshot_schema_once()
+    with _db() as conn:
+        cursor = conn.cursor()
+        try:
+            dados = calcular_metricas_dashboard(cursor)
+            cursor.execute(
+                f"""
+                INSERT INTO dashboard_snapshot (id, dados, atualizado_em)
+                VALUES ({SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER})
+                ON CONFLICT (id) DO UPDATE
+                SET dados = excluded.dados, atualizado_em = excluded.atualizado_em
+                """,
+                (SNAPSHOT_ID, json.dumps(dados, ensure_ascii=False), agora_br_naive()),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    logger.debug("Snapshot do dashboard atualizado (%s)", dados["gerado_em"])
+    return dados
+
+
+def _snapshot_valido(dados: Dict[str, Any], max_idade_segundos: int) -> bool:
+    """Snapshot é válido se for do dia atual e mais novo que ``max_idade_segundos``."""
+    if dados.get("data_referencia") != hoje_br().strftime("%Y-%m-%d"):
+        return False
+    try:
+        gerado_em = datetime.fromisoformat(dados["gerado_em"])
+    except (KeyError, TypeError, ValueError):
+        return False
+    return (agora_br_naive() - gerado_em).total_seconds() <= max_idade_segundos
+
+
+def obter_dashboard_snapshot(max_idade_segundos: int = DASHBOARD_SNAPSHOT_MAX_AGE_SECONDS) -> Dict[str, Any]:
+    """Retorna as métricas do dashboard lendo uma única linha.
+
+    Se o snapshot não existir, for de outro dia ou estiver mais velho que
+    ``max_idade_segundos`` (ex.: scheduler parado), recalcula na hora.
+
+    Returns:
+        Dict com as métricas (ver ``calcular_metricas_dashboard``).
+    """
+    ensure_snapshot_schema_once()
+    with _db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT dados FROM dashboard_snapshot WHERE id = {SQL_PLACEHOLDER}",
+            (SNAPSHOT_ID,),
+        )
+        row = cursor.fetchone()
+        cursor.close()
+
+    if row and row[0]:
+        try:
+            dados = json.loads(row[0])
+            if _snapshot_valido(dados, max_idade_segundos):
+                return dados
+        except (TypeError, ValueError) as e:
+            logger.warning("Snapshot do dashboard corrompido, recalculando: %s", e)
+
+    return atualizar_dashboard_snapshot()
+
+
+def _executar_refresh_antecipado() -> None:
+    """Callback do timer de debounce."""
+    global _refresh_timer
+    with _refresh_lock:
+        _refresh_timer = None
+    try:
+        atualizar_dashboard_snapshot()
+    except Exception as e:
+        logger.warning("Falha no refresh antecipado do dashboard: %s", e)
+
+
+def solicitar_atualizacao_snapshot() -> None:
+    """Agenda um recálculo antecipado do snapshot (não bloqueia o chamador).
+
+    Chamadas em sequência dentro da janela de debounce são combinadas num
+    único recálculo.
+    """
+    global _refresh_timer
+    with _refresh_lock:
+        if _refresh_timer is not None:
+            return
+        _refresh_timer = threading.Timer(DASHBOARD_SNAPSHOT_DEBOUNCE_SECONDS, _executar_refresh_antecipado)
+        _refresh_timer.daemon = True
+        _refresh_timer.start()
+
+
+__all__ = [
+    "ensure_snapshot_schema_once",
+    "contar_registros_por_dia",
+    "serie_registros_semana",
+    "calcular_metricas_dashboard",
+    "atualizar_dashboard_snapshot",
+    "obter_dashboard_snapshot",
+    "solicitar_atualizacao_snapshot",
+]
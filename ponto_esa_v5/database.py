@@ -94,11 +94,34 @@ def _get_pool():
     return _connection_pool
 
 
+_observadores_conexao = []
+
+
+def registrar_observador_conexao(observador) -> None:
+    """Registra ``observador(conn)``, chamado a cada ``get_connection()``.
+
+    Usado pela telemetria dos jobs (``job_telemetry``) para contar comandos
+    SQL sem que ``database`` dependa dela.
+    """
+    if observador not in _observadores_conexao:
+        _observadores_conexao.append(observador)
+
+
 def get_connection(db_path: str | None = None):
     """Retorna uma conexão com o banco de dados configurado.
     
     OTIMIZADO: Usa connection pool para PostgreSQL (evita overhead de TCP handshake).
     """
+    conn = _abrir_conexao(db_path)
+    for observador in _observadores_conexao:
+        try:
+            observador(conn)
+        except Exception as e:
+            logger.debug("Observador de conexão falhou: %s", e)
+    return conn
+
+
+def _abrir_conexao(db_path: str | None = None):
     # Override explícito para cenários de teste/local com SQLite.
     if db_path:
         os.makedirs(os.path.dirname(db_path) or 'database', exist_ok=True)
@@ -278,6 +301,13 @@ def init_db():
         _db_initialized = True
         logger.info("✅ Banco de dados inicializado")
 
+    # As migrações de init podem ter criado tabelas/colunas já sondadas como ausentes
+    try:
+        from schema_probe import invalidar_schema
+    except ImportError:
+        from ponto_esa_v5.schema_probe import invalidar_schema
+    invalidar_schema()
+
 
 def _init_db_internal():
     """Implementação real do init_db (uso interno)"""
@@ -170,9 +170,34 @@ MIGRATIONS: list[tuple[int, str, list[str], list[str]]] = [
             "DROP INDEX IF EXISTS idx_push_subscriptions_usuario",
         ],
     ),
+    (
+        12,
+        "Criar índices por chave para a recontagem incremental de pending_counters",
+        [
+            "CREATE INDEX IF NOT EXISTS idx_he_ativas_aprovador ON horas_extras_ativas(aprovador, status)",
+            "CREATE INDEX IF NOT EXISTS idx_atestado_horas_usuario_status ON atestado_horas(usuario, status)",
+            "CREATE INDEX IF NOT EXISTS idx_correcao_usuario_status ON solicitacoes_correcao_registro(usuario, status)",
+            "CREATE INDEX IF NOT EXISTS idx_mensagens_destinatario_lida ON mensagens_diretas(destinatario, lida)",
+        ],
+        [
+            "DROP INDEX IF EXISTS idx_he_ativas_aprovador",
+            "DROP INDEX IF EXISTS idx_atestado_horas_usuario_status",
+            "DROP INDEX IF EXISTS idx_correcao_usuario_status",
+            "DROP INDEX IF EXISTS idx_mensagens_destinatario_lida",
+        ],
+    ),
 ]
 
 
+def _invalidar_schema_sondado() -> None:
+    """Descarta o catálogo em cache do schema_probe após mudar o schema."""
+    try:
+        from schema_probe import invalidar_schema
+    except ImportError:
+        from ponto_esa_v5.schema_probe import invalidar_schema
+    invalidar_schema()
+
+
 def _ensure_migrations_table(conn) -> None:
     """Cria a tabela de migrações se não existir."""
     cursor = conn.cursor()
@@ -241,6 +266,7 @@ def run_pending_migrations(conn=None) -> list[int]:
             return_connection(conn)
 
     if applied:
+        _invalidar_schema_sondado()
         logger.info("Migrações aplicadas: %s", applied)
     else:
         logger.debug("Nenhuma migração pendente.")
@@ -288,6 +314,7 @@ def rollback_migration(version: int, conn=None) -> bool:
             (version,),
         )
         conn.commit()
+        _invalidar_schema_sondado()
         logger.info("Migration v%d revertida: %s", version, desc)
         return True
     except Exception as e:
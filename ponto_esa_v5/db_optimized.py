@@ -7,7 +7,7 @@ NOTA: NÃO cria pool próprio — reutiliza o pool de database.py via get_connec
 
 import os
 import streamlit as st
-from datetime import datetime, date, timedelta
+from datetime import datetime, timedelta
 from typing import Any, Optional, List, Dict, Tuple
 from contextlib import contextmanager
 import logging
@@ -20,6 +20,22 @@ try:
 except ImportError:
     from ponto_esa_v5.database import get_connection, return_connection, SQL_PLACEHOLDER
 
+try:
+    from dashboard_snapshot import (
+        contar_registros_por_dia, serie_registros_semana,
+        obter_dashboard_snapshot, solicitar_atualizacao_snapshot,
+    )
+except ImportError:
+    from ponto_esa_v5.dashboard_snapshot import (
+        contar_registros_por_dia, serie_registros_semana,
+        obter_dashboard_snapshot, solicitar_atualizacao_snapshot,
+    )
+
+try:
+    from pending_counters import obter_contadores
+except ImportError:
+    from ponto_esa_v5.pending_counters import obter_contadores
+
 
 @contextmanager
 def get_pooled_connection():
@@ -179,26 +195,23 @@ def get_configuracoes_sistema() -> Dict[str, str]:
 
 @st.cache_data(ttl=60)  # Cache de 1 minuto
 def get_registros_semana(data_fim: str) -> Dict[str, List]:
-    """Retorna registros dos últimos 7 dias para gráfico (com cache)"""
-    datas = []
-    valores = []
-    
+    """Retorna registros dos últimos 7 dias para gráfico (com cache).
+    OTIMIZADO: um único GROUP BY por dia ao invés de 7 COUNT(*) separados.
+    """
     try:
         data_fim_obj = datetime.strptime(data_fim, "%Y-%m-%d").date()
-        
-        for i in range(6, -1, -1):
-            data_check = (data_fim_obj - timedelta(days=i)).strftime("%Y-%m-%d")
-            result = execute_query_optimized(
-                f"SELECT COUNT(*) FROM registros_ponto WHERE DATE(data_hora) = {SQL_PLACEHOLDER}",
-                (data_check,),
-                fetch_one=True
-            )
-            datas.append((data_fim_obj - timedelta(days=i)).strftime("%d/%m"))
-            valores.append(result[0] if result else 0)
+        with get_pooled_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                por_dia = contar_registros_por_dia(cursor, data_fim_obj - timedelta(days=6), data_fim_obj)
+            finally:
+                cursor.close()
+        serie = serie_registros_semana(por_dia, data_fim_obj)
+        return {"datas": serie["datas"], "valores": serie["valores"]}
     except Exception as e:
         logger.error(f"Erro em get_registros_semana: {e}")
     
-    return {"datas": datas, "valores": valores}
+    return {"datas": [], "valores": []}
 
 
 @st.cache_data(ttl=120)  # Cache de 2 minutos
@@ -230,44 +243,31 @@ def invalidar_caches():
     get_configuracoes_sistema.clear()
     get_registros_semana.clear()
     get_ausencias_por_tipo.clear()
+    solicitar_atualizacao_snapshot()
     logger.info("Todos os caches foram invalidados")
 
 
 # ============== MÉTRICAS DO DASHBOARD (OTIMIZADO) ==============
 
 def get_metricas_dashboard_otimizado() -> Dict[str, Any]:
-    """Retorna todas as métricas do dashboard de uma vez (otimizado)"""
-    hoje = date.today().strftime("%Y-%m-%d")
-    primeiro_dia_mes = date.today().replace(day=1).strftime("%Y-%m-%d")
-    
-    # Usar funções com cache
-    total_usuarios = get_total_usuarios_ativos()
-    registros_hoje = get_registros_hoje(hoje)
-    presentes_hoje = get_presentes_hoje(hoje)
-    pendencias = get_pendencias()
-    
-    # Atestados do mês
-    atestados_mes = 0
+    """Retorna todas as métricas do dashboard de uma vez (otimizado).
+    Lê a linha única de ``dashboard_snapshot`` mantida pelo scheduler.
+    """
     try:
-        result = execute_query_optimized(
-            f"SELECT COUNT(*) FROM ausencias WHERE data_inicio >= {SQL_PLACEHOLDER} AND tipo LIKE '%%Atestado%%'",
-            (primeiro_dia_mes,),
-            fetch_one=True
-        )
-        if result:
-            atestados_mes = result[0]
+        snapshot = obter_dashboard_snapshot()
     except Exception as e:
-        logger.debug(f"Falha ao obter atestados do mês: {e}")
+        logger.error(f"Erro ao obter snapshot do dashboard: {e}")
+        snapshot = {}
     
     return {
-        "total_usuarios": total_usuarios,
-        "registros_hoje": registros_hoje,
-        "presentes_hoje": presentes_hoje,
-        "ausencias_pendentes": pendencias["ausencias"],
-        "horas_extras_pendentes": pendencias["horas_extras"],
-        "pendencias_total": pendencias["ausencias"] + pendencias["horas_extras"],
-        "atestados_mes": atestados_mes,
-        "taxa_presenca": (presentes_hoje / total_usuarios * 100) if total_usuarios > 0 else 0
+        "total_usuarios": snapshot.get("total_usuarios", 0),
+        "registros_hoje": snapshot.get("registros_hoje", 0),
+        "presentes_hoje": snapshot.get("presentes_hoje", 0),
+        "ausencias_pendentes": snapshot.get("ausencias_pendentes", 0),
+        "horas_extras_pendentes": snapshot.get("horas_extras_pendentes", 0),
+        "pendencias_total": snapshot.get("pendencias_total", 0),
+        "atestados_mes": snapshot.get("atestados_mes", 0),
+        "taxa_presenca": snapshot.get("taxa_presenca", 0)
     }
 
 
@@ -339,7 +339,7 @@ def testar_performance():
 @st.cache_data(ttl=60)  # Cache de 60 segundos (aumentado para reduzir queries)
 def get_notificacoes_funcionario(usuario: str) -> Dict[str, int]:
     """Retorna contagens de notificações para badges do menu (com cache).
-    OTIMIZADO: Uma única query com UNION ALL ao invés de 3 queries separadas.
+    OTIMIZADO: lê ``pending_counters`` (busca por chave) ao invés de COUNT(*).
     """
     notif = {
         "he_aprovar": 0,
@@ -349,29 +349,10 @@ def get_notificacoes_funcionario(usuario: str) -> Dict[str, int]:
     }
     
     try:
-        # Uma única query para todas as contagens
-        query = f"""
-            SELECT 'he' as tipo, COUNT(*) as cnt FROM solicitacoes_horas_extras 
-            WHERE aprovador_solicitado = {SQL_PLACEHOLDER} AND status = 'pendente'
-            UNION ALL
-            SELECT 'corr' as tipo, COUNT(*) as cnt FROM solicitacoes_correcao_registro 
-            WHERE usuario = {SQL_PLACEHOLDER} AND status = 'pendente'
-            UNION ALL
-            SELECT 'atest' as tipo, COUNT(*) as cnt FROM atestado_horas 
-            WHERE usuario = {SQL_PLACEHOLDER} AND status = 'pendente'
-        """
-        results = execute_query_optimized(query, (usuario, usuario, usuario))
-        
-        if results:
-            for row in results:
-                tipo, cnt = row[0], row[1]
-                if tipo == 'he':
-                    notif["he_aprovar"] = cnt
-                elif tipo == 'corr':
-                    notif["correcoes_pendentes"] = cnt
-                elif tipo == 'atest':
-                    notif["atestados_pendentes"] = cnt
-        
+        contadores = obter_contadores(usuario)
+        notif["he_aprovar"] = contadores["he_aprovar"]
+        notif["correcoes_pendentes"] = contadores["correcoes_usuario"]
+        notif["atestados_pendentes"] = contadores["atestados_usuario"]
         notif["total"] = notif["he_aprovar"] + notif["correcoes_pendentes"] + notif["atestados_pendentes"]
         
     except Exception as e:
@@ -16,17 +16,25 @@ Configuração:
 """
 
 import os
+import atexit
+import base64
 import smtplib
-import ssl
 import logging
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
-from email import encoders
+from functools import lru_cache
+from string import Template
 from typing import Optional, List, Dict, Tuple
 from datetime import datetime, date
 from dotenv import load_dotenv
-from constants import agora_br
+from constants import agora_br, EMAIL_ANEXO_MAX_BYTES
+
+try:
+    from smtp_pool import PoolSMTP
+except ImportError:
+    from ponto_esa_v5.smtp_pool import PoolSMTP
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -44,10 +52,17 @@ SMTP_USER = os.getenv('SMTP_USER', '')
 SMTP_PASSWORD = os.getenv('SMTP_PASSWORD', '')
 EMAIL_FROM_NAME = os.getenv('EMAIL_FROM_NAME', 'Ponto ExSA')
 EMAIL_FROM = os.getenv('EMAIL_FROM', SMTP_USER)
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', 'true').lower() != 'false'
+EMAIL_LOCALE = os.getenv('EMAIL_LOCALE', 'pt-BR')
 
 # URL base do sistema para links nos emails
 SYSTEM_URL = os.getenv('SYSTEM_URL', 'https://ponto-exsa.onrender.com')
 
+# Pool de sessões SMTP (criado no primeiro envio)
+_pool: Optional[PoolSMTP] = None
+_pool_config = None
+_pool_lock = threading.Lock()
+
 
 def is_email_configured() -> bool:
     """Verifica se o email está configurado corretamente."""
@@ -86,6 +101,106 @@ def get_email_usuario(usuario: str) -> Optional[str]:
         return None
 
 
+def _obter_pool():
+    """Pool SMTP do processo (recriado se a configuração mudar)."""
+    global _pool, _pool_config
+    config = (SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, SMTP_STARTTLS)
+    with _pool_lock:
+        if _pool is None or _pool_config != config:
+            if _pool is not None:
+                _pool.fechar()
+            _pool = PoolSMTP(SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, starttls=SMTP_STARTTLS)
+            _pool_config = config
+        return _pool
+
+
+def fechar_pool_smtp() -> None:
+    """Encerra as sessões SMTP abertas (chamado no encerramento do processo)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.fechar()
+            _pool = None
+
+
+atexit.register(fechar_pool_smtp)
+
+
+def _anexo_base64(anexo: Dict) -> str:
+    """Conteúdo do anexo em base64.
+
+    Com 'caminho', o arquivo é codificado em blocos, sem manter os bytes
+    originais e a cópia codificada juntos. O texto base64 inteiro ainda fica
+    em memória (o ``smtplib`` envia a mensagem completa), por isso arquivos
+    acima de ``EMAIL_ANEXO_MAX_BYTES`` são recusados antes da leitura.
+    """
+    if anexo.get('caminho'):
+        tamanho = os.path.getsize(anexo['caminho'])
+        if tamanho > EMAIL_ANEXO_MAX_BYTES:
+            raise ValueError(
+                f"Anexo {anexo.get('nome', anexo['caminho'])} com {tamanho} bytes "
+                f"excede o limite de {EMAIL_ANEXO_MAX_BYTES} bytes"
+            )
+        partes = []
+        with open(anexo['caminho'], 'rb') as f:
+            # Múltiplo de 57 bytes: cada bloco vira linhas completas de 76 caracteres.
+            for bloco in iter(lambda: f.read(57 * 1024), b''):
+                partes.append(base64.encodebytes(bloco).decode('ascii'))
+        return ''.join(partes)
+    return base64.encodebytes(anexo['dados']).decode('ascii')
+
+
+def _montar_mensagem(
+    destinatario: str,
+    assunto: str,
+    corpo_html: str,
+    corpo_texto: Optional[str] = None,
+    anexos: Optional[List[Dict]] = None
+) -> MIMEMultipart:
+    """Monta a mensagem MIME (texto + HTML + anexos)."""
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = assunto
+    msg['From'] = f"{EMAIL_FROM_NAME} <{EMAIL_FROM}>"
+    msg['To'] = destinatario
+    
+    # Adicionar corpo texto (fallback)
+    if corpo_texto:
+        parte_texto = MIMEText(corpo_texto, 'plain', 'utf-8')
+        msg.attach(parte_texto)
+    
+    # Adicionar corpo HTML
+    parte_html = MIMEText(corpo_html, 'html', 'utf-8')
+    msg.attach(parte_html)
+    
+    # Adicionar anexos se houver
+    if anexos:
+        for anexo in anexos:
+            parte = MIMEBase('application', 'octet-stream')
+            parte.set_payload(_anexo_base64(anexo))
+            parte['Content-Transfer-Encoding'] = 'base64'
+            parte.add_header(
+                'Content-Disposition',
+                f"attachment; filename={anexo['nome']}"
+            )
+            msg.attach(parte)
+    return msg
+
+
+def _descrever_erro(e: Exception) -> str:
+    """Mensagem de retorno para uma falha de envio (e registro no log)."""
+    if isinstance(e, smtplib.SMTPAuthenticationError):
+        logger.error("Erro de autenticação SMTP")
+        return "Erro de autenticação no servidor de email"
+    if isinstance(e, smtplib.SMTPException):
+        logger.error(f"Erro SMTP: {e}")
+        return f"Erro ao enviar email: {str(e)}"
+    if isinstance(e, OSError):
+        logger.error(f"Erro de rede ao enviar email: {e}")
+        return f"Erro: {str(e)}"
+    logger.error(f"Erro ao enviar email: {e}")
+    return f"Erro: {str(e)}"
+
+
 def enviar_email(
     destinatario: str,
     assunto: str,
@@ -94,7 +209,7 @@ def enviar_email(
     anexos: Optional[List[Dict]] = None
 ) -> Tuple[bool, str]:
     """
-    Envia um email.
+    Envia um email (por uma sessão SMTP reaproveitada do pool).
     
     Args:
         destinatario: Email do destinatário
@@ -102,6 +217,7 @@ def enviar_email(
         corpo_html: Corpo do email em HTML
         corpo_texto: Corpo do email em texto puro (opcional)
         anexos: Lista de anexos [{'nome': 'arquivo.pdf', 'dados': bytes}]
+            ou [{'nome': 'backup.zip', 'caminho': '/tmp/backup.zip'}]
         
     Returns:
         Tuple (sucesso, mensagem)
@@ -113,83 +229,109 @@ def enviar_email(
         return False, "Destinatário não informado"
     
     try:
-        # Criar mensagem
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = assunto
-        msg['From'] = f"{EMAIL_FROM_NAME} <{EMAIL_FROM}>"
-        msg['To'] = destinatario
-        
-        # Adicionar corpo texto (fallback)
-        if corpo_texto:
-            parte_texto = MIMEText(corpo_texto, 'plain', 'utf-8')
-            msg.attach(parte_texto)
-        
-        # Adicionar corpo HTML
-        parte_html = MIMEText(corpo_html, 'html', 'utf-8')
-        msg.attach(parte_html)
-        
-        # Adicionar anexos se houver
-        if anexos:
-            for anexo in anexos:
-                parte = MIMEBase('application', 'octet-stream')
-                parte.set_payload(anexo['dados'])
-                encoders.encode_base64(parte)
-                parte.add_header(
-                    'Content-Disposition',
-                    f"attachment; filename={anexo['nome']}"
-                )
-                msg.attach(parte)
-        
-        # Conectar e enviar - Tentar TLS (587) e SSL (465) como fallback
-        context = ssl.create_default_context()
-        
-        def _send_ssl():
-            with smtplib.SMTP_SSL(SMTP_HOST, 465, context=context, timeout=30) as server:
-                server.login(SMTP_USER, SMTP_PASSWORD)
-                server.sendmail(EMAIL_FROM, destinatario, msg.as_string())
-
-        def _send_tls():
-            with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30) as server:
-                server.starttls(context=context)
-                server.login(SMTP_USER, SMTP_PASSWORD)
-                server.sendmail(EMAIL_FROM, destinatario, msg.as_string())
-
-        if SMTP_PORT == 465:
-            _send_ssl()
-        else:
-            try:
-                _send_tls()
-            except OSError as tls_err:
-                # TLS falhou (ex: Network unreachable na porta 587) — tentar SSL na 465
-                logger.warning("TLS porta %d falhou (%s), tentando SSL porta 465...", SMTP_PORT, tls_err)
-                _send_ssl()
+        msg = _montar_mensagem(destinatario, assunto, corpo_html, corpo_texto, anexos)
+        _obter_pool().enviar(EMAIL_FROM, [destinatario], msg.as_string())
         
         logger.info(f"Email enviado para {destinatario}: {assunto}")
         return True, "Email enviado com sucesso"
         
-    except smtplib.SMTPAuthenticationError:
-        logger.error("Erro de autenticação SMTP")
-        return False, "Erro de autenticação no servidor de email"
-    except smtplib.SMTPException as e:
-        logger.error(f"Erro SMTP: {e}")
-        return False, f"Erro ao enviar email: {str(e)}"
-    except OSError as e:
-        logger.error(f"Erro de rede ao enviar email: {e}")
-        return False, f"Erro: {str(e)}"
     except Exception as e:
-        logger.error(f"Erro ao enviar email: {e}")
-        return False, f"Erro: {str(e)}"
+        return False, _descrever_erro(e)
+
+
+def enviar_emails_em_lote(envios: List[Dict]) -> List[Tuple[bool, str]]:
+    """
+    Envia vários emails numa única sessão SMTP (um handshake TLS + AUTH).
+    
+    Args:
+        envios: Lista de dicts com as chaves de ``enviar_email``
+            (``destinatario``, ``assunto``, ``corpo_html``, ``corpo_texto``, ``anexos``)
+        
+    Returns:
+        Lista (sucesso, mensagem) na mesma ordem de ``envios``
+    """
+    if not is_email_configured():
+        return [(False, "Sistema de email não configurado")] * len(envios)
+    
+    resultados: List[Optional[Tuple[bool, str]]] = [None] * len(envios)
+    prontos, indices = [], []
+    for i, envio in enumerate(envios):
+        destinatario = envio.get('destinatario')
+        if not destinatario:
+            resultados[i] = (False, "Destinatário não informado")
+            continue
+        try:
+            msg = _montar_mensagem(
+                destinatario, envio.get('assunto', ''), envio.get('corpo_html', ''),
+                envio.get('corpo_texto'), envio.get('anexos')
+            )
+        except Exception as e:
+            resultados[i] = (False, _descrever_erro(e))
+            continue
+        prontos.append((EMAIL_FROM, [destinatario], msg.as_string()))
+        indices.append(i)
+    
+    if prontos:
+        try:
+            erros = _obter_pool().enviar_lote(prontos)
+        except Exception as e:
+            # Falha ao abrir a sessão: nenhum envio do lote saiu.
+            erros = [e] * len(prontos)
+        for i, erro in zip(indices, erros):
+            resultados[i] = (True, "Email enviado com sucesso") if erro is None else (False, _descrever_erro(erro))
+        logger.info(f"Lote de emails: {sum(1 for i in indices if resultados[i][0])}/{len(envios)} enviados")
+    
+    return resultados
+
+
+def enfileirar_email(
+    destinatario: str,
+    assunto: str,
+    corpo_html: str,
+    corpo_texto: Optional[str] = None,
+    chave_dedup: Optional[str] = None,
+    cursor=None,
+) -> bool:
+    """
+    Enfileira um email na notification_outbox (entrega assíncrona pelo worker).
+
+    Use no lugar de ``enviar_email`` em fluxos de tela, para o request não
+    esperar o servidor SMTP. Anexos não são suportados na outbox.
+
+    Args:
+        destinatario: Email ou username (o email é resolvido na entrega)
+        cursor: Cursor da transação de negócio em andamento (opcional)
+
+    Returns:
+        True se o email foi enfileirado
+    """
+    try:
+        from notification_outbox import enfileirar_notificacao
+    except ImportError:
+        from ponto_esa_v5.notification_outbox import enfileirar_notificacao
+
+    return enfileirar_notificacao(
+        "email",
+        destinatario,
+        {"assunto": assunto, "corpo_html": corpo_html, "corpo_texto": corpo_texto},
+        chave_dedup=chave_dedup,
+        cursor=cursor,
+    )
 
 
 # ============================================
 # TEMPLATES DE EMAIL
 # ============================================
 
-def get_template_base(conteudo: str, titulo: str = "Ponto ExSA") -> str:
-    """Retorna o template HTML base para emails."""
-    return f"""
+_MARCADOR_CONTEUDO = "\x00conteudo\x00"
+
+
+@lru_cache(maxsize=32)
+def _moldura_base(titulo: str, locale: str) -> Tuple[str, str]:
+    """Cabeçalho/rodapé do template base, renderizados uma vez por (título, locale)."""
+    html = f"""
     <!DOCTYPE html>
-    <html lang="pt-BR">
+    <html lang="{locale}">
     <head>
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
@@ -208,7 +350,7 @@ def get_template_base(conteudo: str, titulo: str = "Ponto ExSA") -> str:
             <!-- Conteúdo -->
             <tr>
                 <td style="padding: 30px;">
-                    {conteudo}
+                    {_MARCADOR_CONTEUDO}
                 </td>
             </tr>
             
@@ -230,14 +372,22 @@ def get_template_base(conteudo: str, titulo: str = "Ponto ExSA") -> str:
     </body>
     </html>
     """
+    prefixo, sufixo = html.split(_MARCADOR_CONTEUDO)
+    return prefixo, sufixo
 
 
-def template_lembrete_entrada(nome_usuario: str) -> Tuple[str, str]:
-    """Template para lembrete de entrada."""
-    assunto = "⏰ Lembrete: Registre sua entrada de hoje"
-    
-    conteudo = f"""
-    <h2 style="color: #1a1a2e; margin: 0 0 20px 0;">Bom dia, {nome_usuario}!</h2>
+def get_template_base(conteudo: str, titulo: str = "Ponto ExSA", locale: str = EMAIL_LOCALE) -> str:
+    """Retorna o template HTML base para emails."""
+    prefixo, sufixo = _moldura_base(titulo, locale)
+    return prefixo + conteudo + sufixo
+
+
+# Conteúdo dos lembretes (enviados a muitos usuários de uma vez): só nome e
+# data variam, então o HTML completo é renderizado uma vez por (template, locale)
+# e cada envio só substitui os campos.
+_CONTEUDOS_LEMBRETE = {
+    "lembrete_entrada": ("Lembrete de Entrada - Ponto ExSA", """
+    <h2 style="color: #1a1a2e; margin: 0 0 20px 0;">Bom dia, $nome!</h2>
     
     <div style="background-color: #fff3cd; border-left: 4px solid #ffc107; padding: 15px; margin-bottom: 20px;">
         <p style="color: #856404; margin: 0; font-weight: bold;">
@@ -250,26 +400,17 @@ def template_lembrete_entrada(nome_usuario: str) -> Tuple[str, str]:
     </p>
     
     <div style="text-align: center; margin: 30px 0;">
-        <a href="{SYSTEM_URL}" style="background: linear-gradient(135deg, #00ff9d 0%, #00d68f 100%); color: #1a1a2e; padding: 15px 40px; text-decoration: none; border-radius: 8px; font-weight: bold; display: inline-block;">
+        <a href="$url" style="background: linear-gradient(135deg, #00ff9d 0%, #00d68f 100%); color: #1a1a2e; padding: 15px 40px; text-decoration: none; border-radius: 8px; font-weight: bold; display: inline-block;">
             📱 Registrar Ponto Agora
         </a>
     </div>
     
     <p style="color: #6c757d; font-size: 13px; margin-top: 30px;">
-        Data: {agora_br().strftime('%d/%m/%Y')}
+        Data: $data
     </p>
-    """
-    
-    html = get_template_base(conteudo, "Lembrete de Entrada - Ponto ExSA")
-    return assunto, html
-
-
-def template_lembrete_saida(nome_usuario: str) -> Tuple[str, str]:
-    """Template para lembrete de saída."""
-    assunto = "🏠 Lembrete: Não esqueça de registrar sua saída"
-    
-    conteudo = f"""
-    <h2 style="color: #1a1a2e; margin: 0 0 20px 0;">Boa tarde, {nome_usuario}!</h2>
+    """),
+    "lembrete_saida": ("Lembrete de Saída - Ponto ExSA", """
+    <h2 style="color: #1a1a2e; margin: 0 0 20px 0;">Boa tarde, $nome!</h2>
     
     <div style="background-color: #d1ecf1; border-left: 4px solid #17a2b8; padding: 15px; margin-bottom: 20px;">
         <p style="color: #0c5460; margin: 0; font-weight: bold;">
@@ -282,17 +423,40 @@ def template_lembrete_saida(nome_usuario: str) -> Tuple[str, str]:
     </p>
     
     <div style="text-align: center; margin: 30px 0;">
-        <a href="{SYSTEM_URL}" style="background: linear-gradient(135deg, #17a2b8 0%, #138496 100%); color: #ffffff; padding: 15px 40px; text-decoration: none; border-radius: 8px; font-weight: bold; display: inline-block;">
+        <a href="$url" style="background: linear-gradient(135deg, #17a2b8 0%, #138496 100%); color: #ffffff; padding: 15px 40px; text-decoration: none; border-radius: 8px; font-weight: bold; display: inline-block;">
             📱 Registrar Saída Agora
         </a>
     </div>
     
     <p style="color: #6c757d; font-size: 13px; margin-top: 30px;">
-        Data: {agora_br().strftime('%d/%m/%Y')}
+        Data: $data
     </p>
-    """
-    
-    html = get_template_base(conteudo, "Lembrete de Saída - Ponto ExSA")
+    """),
+}
+
+
+@lru_cache(maxsize=32)
+def _template_renderizado(template: str, locale: str) -> Template:
+    """HTML completo de um lembrete com ``$nome``/``$data`` por preencher."""
+    titulo, conteudo = _CONTEUDOS_LEMBRETE[template]
+    return Template(get_template_base(conteudo.replace("$url", SYSTEM_URL), titulo, locale))
+
+
+def template_lembrete_entrada(nome_usuario: str, locale: str = EMAIL_LOCALE) -> Tuple[str, str]:
+    """Template para lembrete de entrada."""
+    assunto = "⏰ Lembrete: Registre sua entrada de hoje"
+    html = _template_renderizado("lembrete_entrada", locale).substitute(
+        nome=nome_usuario, data=agora_br().strftime('%d/%m/%Y')
+    )
+    return assunto, html
+
+
+def template_lembrete_saida(nome_usuario: str, locale: str = EMAIL_LOCALE) -> Tuple[str, str]:
+    """Template para lembrete de saída."""
+    assunto = "🏠 Lembrete: Não esqueça de registrar sua saída"
+    html = _template_renderizado("lembrete_saida", locale).substitute(
+        nome=nome_usuario, data=agora_br().strftime('%d/%m/%Y')
+    )
     return assunto, html
 
 
@@ -459,52 +623,70 @@ def template_solicitacao_rejeitada(nome_usuario: str, tipo: str, motivo: str) ->
 # FUNÇÕES DE ENVIO DE NOTIFICAÇÃO
 # ============================================
 
-def notificar_lembrete_entrada_email(usuario: str) -> Tuple[bool, str]:
-    """Envia lembrete de entrada por email."""
-    email = get_email_usuario(usuario)
-    if not email:
-        return False, "Usuário não possui email cadastrado"
-    
-    # Buscar nome do usuário
-    nome = usuario
+def _contatos_usuarios(usuarios: List[str]) -> Dict[str, Tuple[str, str]]:
+    """Email e primeiro nome de vários usuários numa única consulta.
+
+    Returns:
+        Dict usuario -> (email, nome); usuários sem email ficam de fora
+    """
+    from database import get_connection, return_connection, SQL_PLACEHOLDER
+    conn = get_connection()
     try:
-        from database import get_connection, return_connection, SQL_PLACEHOLDER
-        conn = get_connection()
         cursor = conn.cursor()
-        cursor.execute(f"SELECT nome_completo FROM usuarios WHERE usuario = {SQL_PLACEHOLDER}", (usuario,))
-        resultado = cursor.fetchone()
-        if resultado and resultado[0]:
-            nome = resultado[0].split()[0]  # Primeiro nome
+        placeholders = ", ".join([SQL_PLACEHOLDER] * len(usuarios))
+        cursor.execute(
+            f"SELECT usuario, email, nome_completo FROM usuarios WHERE usuario IN ({placeholders})",
+            tuple(usuarios)
+        )
+        linhas = cursor.fetchall()
+    finally:
         return_connection(conn)
-    except Exception as e:
-        logger.debug(f"Falha ao buscar nome para lembrete de entrada: {e}")
-    
-    assunto, html = template_lembrete_entrada(nome)
-    return enviar_email(email, assunto, html)
+    return {
+        usuario: (email, nome_completo.split()[0] if nome_completo and nome_completo.split() else usuario)
+        for usuario, email, nome_completo in linhas
+        if email
+    }
+
+
+def notificar_lembrete_entrada_email(usuario: str) -> Tuple[bool, str]:
+    """Envia lembrete de entrada por email."""
+    return notificar_lembretes_email_em_lote([usuario], 'entrada')[usuario]
 
 
 def notificar_lembrete_saida_email(usuario: str) -> Tuple[bool, str]:
     """Envia lembrete de saída por email."""
-    email = get_email_usuario(usuario)
-    if not email:
-        return False, "Usuário não possui email cadastrado"
+    return notificar_lembretes_email_em_lote([usuario], 'saida')[usuario]
+
+
+def notificar_lembretes_email_em_lote(usuarios: List[str], tipo: str) -> Dict[str, Tuple[bool, str]]:
+    """
+    Envia o lembrete ``tipo`` ('entrada' ou 'saida') a vários usuários numa sessão SMTP.
+    
+    Emails e nomes vêm de uma única consulta; usuários sem email ficam de fora do lote.
+    
+    Returns:
+        Dict usuario -> (sucesso, mensagem)
+    """
+    template = template_lembrete_entrada if tipo == 'entrada' else template_lembrete_saida
+    resultados = {usuario: (False, "Usuário não possui email cadastrado") for usuario in usuarios}
+    if not usuarios:
+        return resultados
     
-    # Buscar nome do usuário
-    nome = usuario
     try:
-        from database import get_connection, return_connection, SQL_PLACEHOLDER
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT nome_completo FROM usuarios WHERE usuario = {SQL_PLACEHOLDER}", (usuario,))
-        resultado = cursor.fetchone()
-        if resultado and resultado[0]:
-            nome = resultado[0].split()[0]
-        return_connection(conn)
+        contatos = _contatos_usuarios(usuarios)
     except Exception as e:
-        logger.debug(f"Falha ao buscar nome para lembrete de saída: {e}")
+        logger.error(f"Erro ao obter emails para lembretes: {e}")
+        return resultados
     
-    assunto, html = template_lembrete_saida(nome)
-    return enviar_email(email, assunto, html)
+    envios, destino = [], []
+    for usuario, (email, nome) in contatos.items():
+        assunto, html = template(nome)
+        envios.append({'destinatario': email, 'assunto': assunto, 'corpo_html': html})
+        destino.append(usuario)
+    
+    for usuario, resultado in zip(destino, enviar_emails_em_lote(envios)):
+        resultados[usuario] = resultado
+    return resultados
 
 
 def notificar_hora_extra_email(usuario: str, minutos: int) -> Tuple[bool, str]:
@@ -533,29 +715,45 @@ def notificar_hora_extra_email(usuario: str, minutos: int) -> Tuple[bool, str]:
 
 def notificar_gestor_pendencias_email(gestor: str, resumo: Dict) -> Tuple[bool, str]:
     """Envia resumo de pendências para gestor por email."""
-    email = get_email_usuario(gestor)
-    if not email:
-        return False, "Gestor não possui email cadastrado"
+    return notificar_gestores_pendencias_email_em_lote({gestor: resumo})[gestor]
+
+
+def notificar_gestores_pendencias_email_em_lote(resumos: Dict[str, Dict]) -> Dict[str, Tuple[bool, str]]:
+    """
+    Envia o resumo de pendências a vários gestores numa sessão SMTP.
     
-    if sum(resumo.values()) == 0:
-        return False, "Não há pendências para notificar"
+    Args:
+        resumos: Dict gestor -> resumo (``{'horas_extras': n, ...}``)
+        
+    Returns:
+        Dict gestor -> (sucesso, mensagem)
+    """
+    resultados = {}
+    com_pendencias = []
+    for gestor, resumo in resumos.items():
+        if sum(resumo.values()) == 0:
+            resultados[gestor] = (False, "Não há pendências para notificar")
+        else:
+            resultados[gestor] = (False, "Gestor não possui email cadastrado")
+            com_pendencias.append(gestor)
+    if not com_pendencias:
+        return resultados
     
-    # Buscar nome do gestor
-    nome = gestor
     try:
-        from database import get_connection, return_connection, SQL_PLACEHOLDER
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT nome_completo FROM usuarios WHERE usuario = {SQL_PLACEHOLDER}", (gestor,))
-        resultado = cursor.fetchone()
-        if resultado and resultado[0]:
-            nome = resultado[0].split()[0]
-        return_connection(conn)
+        contatos = _contatos_usuarios(com_pendencias)
     except Exception as e:
-        logger.debug(f"Falha ao buscar nome do gestor para pendências: {e}")
+        logger.error(f"Erro ao obter emails dos gestores: {e}")
+        return resultados
     
-    assunto, html = template_solicitacoes_pendentes_gestor(nome, resumo)
-    return enviar_email(email, assunto, html)
+    envios, destino = [], []
+    for gestor, (email, nome) in contatos.items():
+        assunto, html = template_solicitacoes_pendentes_gestor(nome, resumos[gestor])
+        envios.append({'destinatario': email, 'assunto': assunto, 'corpo_html': html})
+        destino.append(gestor)
+    
+    for gestor, resultado in zip(destino, enviar_emails_em_lote(envios)):
+        resultados[gestor] = resultado
+    return resultados
 
 
 def notificar_aprovacao_email(usuario: str, tipo: str, detalhes: str) -> Tuple[bool, str]:
@@ -623,12 +821,18 @@ class EmailNotificationSystem:
     def lembrete_saida(self, usuario: str) -> Tuple[bool, str]:
         return notificar_lembrete_saida_email(usuario)
     
+    def lembretes(self, usuarios: List[str], tipo: str) -> Dict[str, Tuple[bool, str]]:
+        return notificar_lembretes_email_em_lote(usuarios, tipo)
+    
     def alerta_hora_extra(self, usuario: str, minutos: int) -> Tuple[bool, str]:
         return notificar_hora_extra_email(usuario, minutos)
     
     def pendencias_gestor(self, gestor: str, resumo: Dict) -> Tuple[bool, str]:
         return notificar_gestor_pendencias_email(gestor, resumo)
     
+    def pendencias_gestores(self, resumos: Dict[str, Dict]) -> Dict[str, Tuple[bool, str]]:
+        return notificar_gestores_pendencias_email_em_lote(resumos)
+    
     def aprovacao(self, usuario: str, tipo: str, detalhes: str) -> Tuple[bool, str]:
         return notificar_aprovacao_email(usuario, tipo, detalhes)
     
@@ -645,10 +849,15 @@ __all__ = [
     'EmailNotificationSystem',
     'is_email_configured',
     'enviar_email',
+    'enviar_emails_em_lote',
+    'fechar_pool_smtp',
+    'enfileirar_email',
     'notificar_lembrete_entrada_email',
     'notificar_lembrete_saida_email',
+    'notificar_lembretes_email_em_lote',
     'notificar_hora_extra_email',
     'notificar_gestor_pendencias_email',
+    'notificar_gestores_pendencias_email_em_lote',
     'notificar_aprovacao_email',
     'notificar_rejeicao_email'
 ]
@@ -10,13 +10,23 @@ from typing import Optional, Dict
 import logging
 import time
 
+from constants import GEOCODING_TIMEOUT_SECONDS
+
+try:
+    from rate_limiter import aguardar_vez
+except ImportError:
+    from ponto_esa_v5.rate_limiter import aguardar_vez
+
 logger = logging.getLogger(__name__)
 
+
+class GeocodificacaoAdiada(Exception):
+    """Limite de taxa do Nominatim não liberou a tempo (resultado não deve ir para o cache)."""
+
 # Cache para endereços (evitar múltiplas requisições para mesmas coordenadas)
 # Usa st.cache_data para persistir durante a sessão
 
 
-@st.cache_data(ttl=3600)  # Cache de 1 hora
 def coordenadas_para_endereco(latitude: float, longitude: float) -> Optional[str]:
     """
     Converte coordenadas GPS em endereço usando Nominatim (OpenStreetMap)
@@ -31,6 +41,25 @@ def coordenadas_para_endereco(latitude: float, longitude: float) -> Optional[str
     if not latitude or not longitude:
         return None
     
+    try:
+        return _consultar_endereco(latitude, longitude)
+    except GeocodificacaoAdiada:
+        # Sem vez livre no limite de taxa: tentar de novo numa próxima exibição.
+        logger.info(f"Geocodificação de {latitude}, {longitude} adiada pelo limite de taxa")
+        return None
+
+
+@st.cache_data(ttl=3600)  # Cache de 1 hora
+def _consultar_endereco(latitude: float, longitude: float) -> Optional[str]:
+    """Consulta o Nominatim (no máximo ~1 req/s, compartilhado entre processos).
+
+    Só é chamada na renderização das telas: sem vez livre agora, desiste na
+    hora (``espera_max=0``) em vez de segurar o render na fila do limitador.
+    """
+    if not aguardar_vez("nominatim", espera_max=0):
+        # Exceção não é cacheada pelo st.cache_data (um None ficaria 1 hora no cache).
+        raise GeocodificacaoAdiada()
+    
     try:
         # API Nominatim (gratuita, requer User-Agent)
         url = "https://nominatim.openstreetmap.org/reverse"
@@ -46,7 +75,7 @@ def coordenadas_para_endereco(latitude: float, longitude: float) -> Optional[str
             "User-Agent": "PontoExSA/5.0 (Sistema de Controle de Ponto)"
         }
         
-        response = requests.get(url, params=params, headers=headers, timeout=5)
+        response = requests.get(url, params=params, headers=headers, timeout=GEOCODING_TIMEOUT_SECONDS)
         
         if response.status_code == 200:
             data = response.json()
@@ -4,6 +4,10 @@ Gerencia solicitações e aprovações de horas extras
 """
 
 from database import get_connection, return_connection, SQL_PLACEHOLDER as DB_SQL_PLACEHOLDER
+try:
+    from pending_counters import sincronizar_contadores
+except ImportError:
+    from ponto_esa_v5.pending_counters import sincronizar_contadores
 
 from datetime import datetime, timedelta, time
 import json
@@ -12,6 +16,10 @@ try:
     from notifications import notification_manager
 except Exception:
     from notifications import notification_manager
+try:
+    from notification_outbox import despertar_worker
+except ImportError:
+    from ponto_esa_v5.notification_outbox import despertar_worker
 
 # SQL Placeholder para compatibilidade SQLite/PostgreSQL
 SQL_PLACEHOLDER = DB_SQL_PLACEHOLDER
@@ -189,25 +197,29 @@ class HorasExtrasSystem:
                 """, (usuario, data, hora_inicio, hora_fim, justificativa, aprovador_solicitado))
 
                 solicitacao_id = cursor.lastrowid
-
-            # Enviar notificação para o aprovador sem bloquear o fluxo principal.
-            try:
-                notification_manager.add_notification(
-                    aprovador_solicitado,
-                    {
-                        "type": "horas_extras_solicitacao",
-                        "title": "Nova solicitação de horas extras",
-                        "message": f"{usuario} solicitou aprovação de {total_horas:.1f}h extras em {data}",
-                        "solicitacao_id": solicitacao_id,
-                        "usuario": usuario,
-                        "data": data,
-                        "total_horas": total_horas,
-                        "timestamp": agora_br().isoformat(),
-                        "requires_response": True
-                    }
-                )
-            except Exception:
-                pass
+                sincronizar_contadores(cursor, "solicitacoes_horas_extras", chaves=[aprovador_solicitado])
+
+                # Notificação ao aprovador na mesma transação (outbox); falha não bloqueia o fluxo.
+                try:
+                    notification_manager.add_notification(
+                        aprovador_solicitado,
+                        {
+                            "type": "horas_extras_solicitacao",
+                            "title": "Nova solicitação de horas extras",
+                            "message": f"{usuario} solicitou aprovação de {total_horas:.1f}h extras em {data}",
+                            "solicitacao_id": solicitacao_id,
+                            "usuario": usuario,
+                            "data": data,
+                            "total_horas": total_horas,
+                            "timestamp": agora_br().isoformat(),
+                            "requires_response": True
+                        },
+                        cursor=cursor,
+                    )
+                except Exception:
+                    pass
+
+            despertar_worker()
 
             # Iniciar lembrete contínuo para o aprovador selecionado
             job_id = f"horas_extras_{solicitacao_id}"
@@ -339,6 +351,7 @@ class HorasExtrasSystem:
                     solicitacao_id,
                     "solicitacoes_horas_extras"
                 )
+                sincronizar_contadores(cursor, "solicitacoes_horas_extras", ids=[solicitacao_id])
 
             notification_manager.stop_repeating_notification(f"horas_extras_{solicitacao_id}")
             return {"success": True, "message": "Solicitação aprovada com sucesso"}
@@ -378,6 +391,7 @@ class HorasExtrasSystem:
                     SET status = 'rejeitado', aprovado_por = {SQL_PLACEHOLDER}, data_aprovacao = {SQL_PLACEHOLDER}, observacoes = {SQL_PLACEHOLDER}
                     WHERE id = {SQL_PLACEHOLDER}
                 """, (aprovador, agora_br().isoformat(), observacoes, solicitacao_id))
+                sincronizar_contadores(cursor, "solicitacoes_horas_extras", ids=[solicitacao_id])
 
             notification_manager.stop_repeating_notification(f"horas_extras_{solicitacao_id}")
             return {"success": True, "message": "Solicitação rejeitada"}
@@ -431,6 +445,10 @@ class HorasExtrasSystem:
 
     def contar_notificacoes_pendentes(self, aprovador):
         """Conta quantas solicitações estão pendentes para um aprovador"""
+        if not self.db_path:
+            from pending_counters import obter_contadores
+            return obter_contadores(aprovador)["he_aprovar"]
+
         conn = get_connection(self.db_path)
         cursor = conn.cursor()
 
@@ -0,0 +1,438 @@
+"""
+Telemetria das execuções de jobs - Ponto ExSA v5.0
+
+``obter_status_scheduler`` só mostrava o próximo horário de cada job; os dicts
+que os jobs retornam eram logados e descartados. Aqui cada execução vira uma
+linha em ``job_runs``:
+
+- ``medir_job()`` envolve a função do job e mede duração, comandos SQL
+  emitidos (observador de ``get_connection``), chamadas externas
+  (``registrar_chamada_externa``, usado pelo cliente ntfy) e o resultado;
+- ``instrumentar_scheduler()`` aplica o wrapper a todos os jobs de um
+  APScheduler (inclusive os adicionados depois) e registra disparos perdidos
+  (misfire) e sobrepostos (``max_instances``);
+- ``purgar_job_runs()`` aplica a retenção de ``JOB_RUNS_RETENTION_DAYS``;
+- ``obter_estatisticas_jobs()``/``obter_percentis_diarios()`` alimentam o
+  painel de p50/p95 em ``sistema_interface``.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from database import (
+        get_connection, return_connection, SQL_PLACEHOLDER, USE_POSTGRESQL,
+        adapt_sql_for_postgresql, registrar_observador_conexao,
+    )
+except ImportError:
+    from ponto_esa_v5.database import (
+        get_connection, return_connection, SQL_PLACEHOLDER, USE_POSTGRESQL,
+        adapt_sql_for_postgresql, registrar_observador_conexao,
+    )
+
+from constants import agora_br_naive, JOB_RUNS_RETENTION_DAYS, JOB_RUNS_DASHBOARD_DAYS
+
+logger = logging.getLogger(__name__)
+
+STATUS_OK = "ok"
+STATUS_ERRO = "erro"
+STATUS_IGNORADO = "ignorado"
+STATUS_PERDIDO = "perdido"
+STATUS_SOBREPOSTO = "sobreposto"
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+_PROCESSO = f"{socket.gethostname()}:{os.getpid()}"
+
+
+@dataclass
+class ExecucaoJob:
+    """Contadores de uma execução em andamento."""
+
+    job_id: str
+    job_nome: str
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    inicio: datetime = field(default_factory=agora_br_naive)
+    consultas_db: int = 0
+    chamadas_externas: int = 0
+    chamadas_ok: int = 0
+    chamadas_falha: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def contar_consulta(self, *_args) -> None:
+        with self._lock:
+            self.consultas_db += 1
+
+    def contar_chamada(self, ok: bool) -> None:
+        with self._lock:
+            self.chamadas_externas += 1
+            if ok:
+                self.chamadas_ok += 1
+            else:
+                self.chamadas_falha += 1
+
+
+_execucao_atual: contextvars.ContextVar[Optional[ExecucaoJob]] = contextvars.ContextVar(
+    "job_telemetry_execucao", default=None
+)
+
+
+def execucao_atual() -> Optional[ExecucaoJob]:
+    return _execucao_atual.get()
+
+
+def registrar_chamada_externa(ok: bool) -> None:
+    """Conta uma chamada a serviço externo na execução de job corrente (se houver).
+
+    Threads de fan-out devem rodar com ``contextvars.copy_context()`` para
+    que a chamada seja atribuída ao job que a disparou.
+    """
+    execucao = _execucao_atual.get()
+    if execucao is not None:
+        execucao.contar_chamada(ok)
+
+
+# ---------------------------------------------------------------------------
+# Contagem de comandos SQL
+# ---------------------------------------------------------------------------
+
+if USE_POSTGRESQL:
+    import psycopg2.extensions
+
+    class _CursorContado(psycopg2.extensions.cursor):
+        """Cursor que conta ``execute`` na execução de job corrente."""
+
+        def execute(self, query, vars=None):
+            execucao = _execucao_atual.get()
+            if execucao is not None:
+                execucao.contar_consulta()
+            return super().execute(query, vars)
+
+        def executemany(self, query, vars_list):
+            execucao = _execucao_atual.get()
+            if execucao is not None:
+                execucao.contar_consulta()
+            return super().executemany(query, vars_list)
+
+
+def _observar_conexao(conn) -> None:
+    if USE_POSTGRESQL:
+        # Conexões do pool são reaproveitadas: o cursor decide na hora se conta.
+        if getattr(conn, "cursor_factory", None) is None:
+            conn.cursor_factory = _CursorContado
+        return
+    execucao = _execucao_atual.get()
+    if execucao is not None and hasattr(conn, "set_trace_callback"):
+        conn.set_trace_callback(execucao.contar_consulta)
+
+
+registrar_observador_conexao(_observar_conexao)
+
+
+# ---------------------------------------------------------------------------
+# Schema
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def _db():
+    """Context manager que obtém conexão do pool e a devolve ao final."""
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        return_connection(conn)
+
+
+def _criar_tabela(cursor) -> None:
+    """DDL idempotente de ``job_runs``."""
+    cursor.execute(adapt_sql_for_postgresql("""
+        CREATE TABLE IF NOT EXISTS job_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL,
+            job_id TEXT NOT NULL,
+            job_nome TEXT,
+            status TEXT NOT NULL,
+            inicio TIMESTAMP NOT NULL,
+            duracao_ms REAL,
+            consultas_db INTEGER DEFAULT 0,
+            chamadas_externas INTEGER DEFAULT 0,
+            chamadas_ok INTEGER DEFAULT 0,
+            chamadas_falha INTEGER DEFAULT 0,
+            processo TEXT,
+            erro TEXT,
+            resultado TEXT
+        )
+    """))
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_job_runs_job_inicio ON job_runs (job_id, inicio)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_job_runs_inicio ON job_runs (inicio)")
+
+
+def ensure_job_runs_schema_once() -> None:
+    """Cria ``job_runs`` uma vez por processo."""
+    global _schema_ready
+    if _schema_ready:
+        return
+
+    with _schema_lock:
+        if _schema_ready:
+            return
+        with _db() as conn:
+            cursor = conn.cursor()
+            _criar_tabela(cursor)
+            conn.commit()
+            cursor.close()
+        _schema_ready = True
+
+
+# ---------------------------------------------------------------------------
+# Registro
+# ---------------------------------------------------------------------------
+
+def _serializar_resultado(resultado: Any) -> Optional[str]:
+    if resultado is None:
+        return None
+    try:
+        return json.dumps(resultado, default=str, ensure_ascii=False)[:4000]
+    except Exception:
+        return str(resultado)[:4000]
+
+
+def _status_do_resultado(resultado: Any) -> str:
+    if isinstance(resultado, dict) and resultado.get("status") == "skipped":
+        return STATUS_IGNORADO
+    if resultado is False:
+        return STATUS_ERRO
+    return STATUS_OK
+
+
+def registrar_execucao(
+    job_id: str,
+    job_nome: Optional[str],
+    status: str,
+    inicio: datetime,
+    duracao_ms: Optional[float] = None,
+    execucao: Optional[ExecucaoJob] = None,
+    erro: Optional[str] = None,
+    resultado: Any = None,
+) -> bool:
+    """Grava uma linha em ``job_runs`` (nunca propaga erro para o job)."""
+    try:
+        ensure_job_runs_schema_once()
+        with _db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                INSERT INTO job_runs (
+                    run_id, job_id, job_nome, status, inicio, duracao_ms,
+                    consultas_db, chamadas_externas, chamadas_ok, chamadas_falha,
+                    processo, erro, resultado
+                ) VALUES ({", ".join([SQL_PLACEHOLDER] * 13)})
+                """,
+                (
+                    execucao.run_id if execucao else uuid.uuid4().hex,
+                    job_id,
+                    job_nome,
+                    status,
+                    inicio,
+                    duracao_ms,
+                    execucao.consultas_db if execucao else 0,
+                    execucao.chamadas_externas if execucao else 0,
+                    execucao.chamadas_ok if execucao else 0,
+                    execucao.chamadas_falha if execucao else 0,
+                    _PROCESSO,
+                    erro[:1000] if erro else None,
+                    _serializar_resultado(resultado),
+                ),
+            )
+            conn.commit()
+            cursor.close()
+        return True
+    except Exception as e:
+        logger.warning("Execução do job %s não registrada em job_runs: %s", job_id, e)
+        return False
+
+
+def medir_job(job_id: str, job_nome: Optional[str], func: Callable) -> Callable:
+    """Envolve ``func`` para registrar cada execução em ``job_runs``."""
+    if getattr(func, "__job_telemetria__", False):
+        return func
+
+    @functools.wraps(func)
+    def executar(*args, **kwargs):
+        execucao = ExecucaoJob(job_id=job_id, job_nome=job_nome or job_id)
+        token = _execucao_atual.set(execucao)
+        inicio = time.perf_counter()
+        try:
+            resultado = func(*args, **kwargs)
+        except Exception as e:
+            _execucao_atual.reset(token)
+            registrar_execucao(
+                job_id, execucao.job_nome, STATUS_ERRO, execucao.inicio,
+                (time.perf_counter() - inicio) * 1000, execucao, erro=f"{type(e).__name__}: {e}",
+            )
+            raise
+        _execucao_atual.reset(token)
+        registrar_execucao(
+            job_id, execucao.job_nome, _status_do_resultado(resultado), execucao.inicio,
+            (time.perf_counter() - inicio) * 1000, execucao, resultado=resultado,
+        )
+        return resultado
+
+    executar.__job_telemetria__ = True
+    return executar
+
+
+def instrumentar_scheduler(scheduler) -> None:
+    """Mede todos os jobs de ``scheduler`` e registra misfires/sobreposições.
+
+    Chamar depois de adicionar os jobs iniciais; jobs adicionados com o
+    scheduler já rodando são instrumentados pelo listener de ``EVENT_JOB_ADDED``.
+    """
+    from apscheduler.events import EVENT_JOB_ADDED, EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
+
+    def _instrumentar(job) -> None:
+        if not getattr(job.func, "__job_telemetria__", False):
+            job.modify(func=medir_job(job.id, job.name, job.func))
+
+    for job in scheduler.get_jobs():
+        _instrumentar(job)
+
+    def _ao_evento(evento) -> None:
+        if evento.code == EVENT_JOB_ADDED:
+            job = scheduler.get_job(evento.job_id)
+            if job is not None:
+                _instrumentar(job)
+            return
+        job = scheduler.get_job(evento.job_id)
+        status = STATUS_PERDIDO if evento.code == EVENT_JOB_MISSED else STATUS_SOBREPOSTO
+        agendado = evento.scheduled_run_time
+        registrar_execucao(
+            evento.job_id,
+            job.name if job is not None else evento.job_id,
+            status,
+            agendado.replace(tzinfo=None) if agendado is not None else agora_br_naive(),
+        )
+
+    scheduler.add_listener(_ao_evento, EVENT_JOB_ADDED | EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
+
+
+def purgar_job_runs(dias: int = JOB_RUNS_RETENTION_DAYS) -> int:
+    """Apaga execuções mais antigas que ``dias``. Retorna o número de linhas."""
+    ensure_job_runs_schema_once()
+    limite = agora_br_naive() - timedelta(days=dias)
+    with _db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"DELETE FROM job_runs WHERE inicio < {SQL_PLACEHOLDER}", (limite,))
+        removidas = cursor.rowcount or 0
+        conn.commit()
+        cursor.close()
+    logger.info("job_runs: %d execuções anteriores a %s removidas", removidas, limite.date())
+    return removidas
+
+
+# ---------------------------------------------------------------------------
+# Consultas do painel
+# ---------------------------------------------------------------------------
+
+def _percentil(valores: List[float], p: float) -> Optional[float]:
+    """Percentil por interpolação linear (igual a ``percentile_cont``)."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p
+    base = int(posicao)
+    if base + 1 >= len(ordenados):
+        return ordenados[-1]
+    return ordenados[base] + (ordenados[base + 1] - ordenados[base]) * (posicao - base)
+
+
+def _carregar_execucoes(dias: int) -> List[tuple]:
+    ensure_job_runs_schema_once()
+    desde = agora_br_naive() - timedelta(days=dias)
+    with _db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            SELECT job_id, job_nome, status, inicio, duracao_ms, consultas_db, chamadas_externas, chamadas_falha
+            FROM job_runs
+            WHERE inicio >= {SQL_PLACEHOLDER}
+            """,
+            (desde,),
+        )
+        linhas = cursor.fetchall()
+        cursor.close()
+    return linhas
+
+
+def obter_estatisticas_jobs(dias: int = JOB_RUNS_DASHBOARD_DAYS) -> List[Dict[str, Any]]:
+    """Resumo por job na janela: execuções, p50/p95/máx da duração, erros, perdidos e sobreposições."""
+    por_job: Dict[str, Dict[str, Any]] = {}
+    for job_id, nome, status, inicio, duracao, consultas, chamadas, falhas in _carregar_execucoes(dias):
+        item = por_job.setdefault(job_id, {
+            "job_id": job_id, "job_nome": nome or job_id, "execucoes": 0, "erros": 0,
+            "perdidos": 0, "sobrepostos": 0, "duracoes": [], "consultas": 0,
+            "chamadas_externas": 0, "chamadas_falha": 0,
+        })
+        if status == STATUS_PERDIDO:
+            item["perdidos"] += 1
+            continue
+        if status == STATUS_SOBREPOSTO:
+            item["sobrepostos"] += 1
+            continue
+        item["execucoes"] += 1
+        item["erros"] += 1 if status == STATUS_ERRO else 0
+        item["consultas"] += consultas or 0
+        item["chamadas_externas"] += chamadas or 0
+        item["chamadas_falha"] += falhas or 0
+        if duracao is not None:
+            item["duracoes"].append(float(duracao))
+
+    resumo = []
+    for item in por_job.values():
+        duracoes = item.pop("duracoes")
+        execucoes = item["execucoes"] or 1
+        item["p50_ms"] = _percentil(duracoes, 0.50)
+        item["p95_ms"] = _percentil(duracoes, 0.95)
+        item["max_ms"] = max(duracoes) if duracoes else None
+        item["consultas_por_execucao"] = item.pop("consultas") / execucoes
+        resumo.append(item)
+    return sorted(resumo, key=lambda r: r["p95_ms"] or 0, reverse=True)
+
+
+def obter_percentis_diarios(dias: int = JOB_RUNS_DASHBOARD_DAYS) -> List[Dict[str, Any]]:
+    """p50/p95 da duração por job e por dia (para o gráfico ao longo do tempo)."""
+    grupos: Dict[tuple, List[float]] = {}
+    for job_id, nome, status, inicio, duracao, *_ in _carregar_execucoes(dias):
+        if duracao is None or status in (STATUS_PERDIDO, STATUS_SOBREPOSTO):
+            continue
+        dia = inicio.date() if isinstance(inicio, datetime) else str(inicio)[:10]
+        grupos.setdefault((str(dia), nome or job_id), []).append(float(duracao))
+    return [
+        {"dia": dia, "job": job, "p50_ms": _percentil(valores, 0.50), "p95_ms": _percentil(valores, 0.95)}
+        for (dia, job), valores in sorted(grupos.items())
+    ]
+
+
+__all__ = [
+    "ExecucaoJob",
+    "execucao_atual",
+    "registrar_chamada_externa",
+    "ensure_job_runs_schema_once",
+    "registrar_execucao",
+    "medir_job",
+    "instrumentar_scheduler",
+    "purgar_job_runs",
+    "obter_estatisticas_jobs",
+    "obter_percentis_diarios",
+]
@@ -0,0 +1,307 @@
+"""
+Eleição de líder dos schedulers - Ponto ExSA v5.0
+
+O scheduler é embutido em cada processo do Streamlit (e também sobe no
+``notification_worker``); com várias réplicas/workers cada job rodava uma vez
+por processo, duplicando lembretes e avisos. Aqui só o processo que detém uma
+trava exclusiva executa os jobs:
+
+- PostgreSQL: ``pg_try_advisory_lock`` numa conexão dedicada; a trava é da
+  sessão, então morre junto com o processo/conexão;
+- SQLite: ``flock`` (``msvcrt.locking`` no Windows) num arquivo em
+  ``LEADER_LOCK_DIR``; o sistema operacional libera a trava se o processo
+  morrer.
+
+O líder renova a liderança a cada ``LEADER_RENEW_SECONDS`` (heartbeat na
+conexão/arquivo) e, se a renovação falhar, para os jobs. Os seguidores ficam
+ociosos e tentam assumir a cada ``LEADER_RETRY_SECONDS``.
+"""
+
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Callable, Optional
+
+from constants import LEADER_LOCK_DIR, LEADER_RENEW_SECONDS, LEADER_RETRY_SECONDS, DB_CONNECT_TIMEOUT
+
+try:
+    from database import USE_POSTGRESQL
+except ImportError:
+    from ponto_esa_v5.database import USE_POSTGRESQL
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+def _chave_advisory(nome: str) -> int:
+    """Chave bigint estável (entre processos/versões do Python) para ``nome``."""
+    return int.from_bytes(hashlib.sha1(nome.encode("utf-8")).digest()[:8], "big", signed=True)
+
+
+class TravaPostgres:
+    """Advisory lock de sessão numa conexão dedicada (fora do pool)."""
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.chave = _chave_advisory(nome)
+        self._conn = None
+
+    def _conectar(self):
+        if self._conn is not None and not getattr(self._conn, "closed", 1):
+            return self._conn
+        # Sempre uma conexão própria: uma conexão do pool ficaria presa enquanto
+        # o processo for líder e voltaria ao pool em autocommit.
+        import psycopg2
+        database_url = os.getenv("DATABASE_URL")
+        if database_url:
+            conn = psycopg2.connect(database_url, connect_timeout=DB_CONNECT_TIMEOUT)
+        else:
+            conn = psycopg2.connect(
+                host=os.getenv("DB_HOST", "localhost"),
+                database=os.getenv("DB_NAME", "ponto_esa"),
+                user=os.getenv("DB_USER", "postgres"),
+                password=os.getenv("DB_PASSWORD", "postgres"),
+                port=os.getenv("DB_PORT", "5432"),
+                connect_timeout=DB_CONNECT_TIMEOUT,
+            )
+        conn.autocommit = True
+        self._conn = conn
+        return conn
+
+    def _fechar(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def tentar_adquirir(self) -> bool:
+        try:
+            cursor = self._conectar().cursor()
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (self.chave,))
+            adquiriu = bool(cursor.fetchone()[0])
+            cursor.close()
+            return adquiriu
+        except Exception:
+            self._fechar()
+            raise
+
+    def renovar(self) -> bool:
+        # A trava vive enquanto a sessão viver; o heartbeat detecta a queda.
+        try:
+            cursor = self._conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception as e:
+            logger.warning("Heartbeat da liderança '%s' falhou: %s", self.nome, e)
+            self._fechar()
+            return False
+
+    def liberar(self) -> None:
+        # Fechar a sessão libera a trava mesmo se o unlock falhar.
+        try:
+            if self._conn is not None and not getattr(self._conn, "closed", 1):
+                cursor = self._conn.cursor()
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (self.chave,))
+                cursor.close()
+        except Exception:
+            pass
+        self._fechar()
+
+
+class TravaArquivo:
+    """Trava exclusiva num arquivo local (instalações SQLite, um único host)."""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._fd: Optional[int] = None
+
+    def _escrever_heartbeat(self) -> None:
+        os.ftruncate(self._fd, 0)
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        os.write(self._fd, f"{os.getpid()} {socket.gethostname()} {time.time():.0f}\n".encode())
+
+    def tentar_adquirir(self) -> bool:
+        os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+        fd = os.open(self.caminho, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        self._escrever_heartbeat()
+        return True
+
+    def renovar(self) -> bool:
+        if self._fd is None:
+            return False
+        try:
+            # Se o arquivo foi apagado/recriado, outro processo pode travar o novo.
+            if os.fstat(self._fd).st_ino != os.stat(self.caminho).st_ino:
+                logger.warning("Arquivo de trava %s foi substituído", self.caminho)
+                return False
+            self._escrever_heartbeat()
+            return True
+        except OSError as e:
+            logger.warning("Heartbeat da trava %s falhou: %s", self.caminho, e)
+            return False
+
+    def liberar(self) -> None:
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        except OSError:
+            pass
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+def criar_trava(nome: str):
+    """Trava adequada ao banco configurado para a liderança ``nome``."""
+    if USE_POSTGRESQL:
+        return TravaPostgres(nome)
+    return TravaArquivo(os.path.join(LEADER_LOCK_DIR, f"{nome}.leader.lock"))
+
+
+class EleicaoLider:
+    """Mantém (ou disputa) a liderança ``nome`` numa thread daemon.
+
+    ``ao_assumir()`` sobe os jobs quando este processo vira líder e deve
+    retornar True; se retornar False/levantar, a trava é devolvida e a
+    tentativa se repete no próximo ciclo. ``ao_perder()`` para os jobs quando
+    a renovação falha ou em ``parar()``.
+    """
+
+    def __init__(
+        self,
+        nome: str,
+        ao_assumir: Callable[[], bool],
+        ao_perder: Callable[[], None],
+        trava=None,
+        renovar_a_cada: float = LEADER_RENEW_SECONDS,
+        tentar_a_cada: float = LEADER_RETRY_SECONDS,
+    ):
+        self.nome = nome
+        self._ao_assumir = ao_assumir
+        self._ao_perder = ao_perder
+        self._trava = trava if trava is not None else criar_trava(nome)
+        self._renovar_a_cada = renovar_a_cada
+        self._tentar_a_cada = tentar_a_cada
+        self._lider = False
+        self.falhou_ao_assumir = False
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def e_lider(self) -> bool:
+        return self._lider
+
+    @property
+    def ativa(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _tentar_assumir(self) -> bool:
+        try:
+            if not self._trava.tentar_adquirir():
+                return False
+        except Exception as e:
+            logger.warning("Falha ao disputar a liderança '%s': %s", self.nome, e)
+            return False
+
+        try:
+            assumiu = bool(self._ao_assumir())
+        except Exception as e:
+            logger.error("Erro ao assumir a liderança '%s': %s", self.nome, e)
+            assumiu = False
+        self.falhou_ao_assumir = not assumiu
+        if not assumiu:
+            self._trava.liberar()
+            return False
+
+        self._lider = True
+        logger.info("👑 Processo %d é o líder de '%s'", os.getpid(), self.nome)
+        return True
+
+    def _ceder(self, motivo: str) -> None:
+        self._lider = False
+        logger.warning("Processo %d deixou a liderança de '%s' (%s)", os.getpid(), self.nome, motivo)
+        try:
+            self._ao_perder()
+        except Exception as e:
+            logger.error("Erro ao parar jobs da liderança '%s': %s", self.nome, e)
+        finally:
+            self._trava.liberar()
+
+    def _loop(self) -> None:
+        while True:
+            intervalo = self._renovar_a_cada if self._lider else self._tentar_a_cada
+            if self._parar.wait(intervalo):
+                return
+            with self._lock:
+                if self._parar.is_set():
+                    return
+                if self._lider:
+                    if not self._trava.renovar():
+                        self._ceder("renovação falhou")
+                else:
+                    self._tentar_assumir()
+
+    def iniciar(self) -> bool:
+        """Disputa a liderança já (síncrono) e mantém a disputa em background.
+
+        Returns:
+            True se este processo é o líder após a primeira tentativa.
+        """
+        with self._lock:
+            if self.ativa:
+                return self._lider
+            self._parar.clear()
+            self._tentar_assumir()
+            if not self._lider:
+                logger.info("Processo %d aguarda como seguidor de '%s'", os.getpid(), self.nome)
+            self._thread = threading.Thread(
+                target=self._loop, name=f"lider-{self.nome}", daemon=True
+            )
+            self._thread.start()
+            return self._lider
+
+    def parar(self, timeout: float = 5.0) -> None:
+        """Encerra a disputa e, se líder, para os jobs e libera a trava."""
+        self._parar.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=timeout)
+        with self._lock:
+            self._thread = None
+            if self._lider:
+                self._ceder("encerramento")
+
+
+__all__ = [
+    "EleicaoLider",
+    "TravaPostgres",
+    "TravaArquivo",
+    "criar_trava",
+]
@@ -0,0 +1,137 @@
+"""
+Prefetch pós-login - Ponto ExSA v5.0
+
+A primeira renderização de ``tela_funcionario``/``tela_gestor`` pagava todas
+as consultas frias em sequência (jornada, badges, projetos, hora extra
+ativa...). Logo após o login bem-sucedido, ``iniciar_prefetch()`` dispara
+essas cargas em paralelo num pool de threads:
+
+- funções com ``st.cache_data``/``st.cache_resource`` ficam aquecidas (o
+  Streamlit serializa chamadas concorrentes da mesma chave, então a tela
+  espera o prefetch em vez de repetir a consulta);
+- valores sem cache são consumidos uma única vez pela primeira tela via
+  ``consumir()``, com fallback para a consulta direta.
+
+Os tempos de cada carga e o tempo até a primeira tela pronta vão para o log.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from constants import LOGIN_PREFETCH_MAX_WORKERS, LOGIN_PREFETCH_WAIT_SECONDS
+
+try:
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+except Exception:  # fora do Streamlit (scripts/testes)
+    add_script_run_ctx = None
+    get_script_run_ctx = None
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=LOGIN_PREFETCH_MAX_WORKERS, thread_name_prefix="login-prefetch")
+
+
+class PrefetchLogin:
+    """Estado de um prefetch disparado no login (guardado no ``session_state``)."""
+
+    def __init__(self, usuario: str):
+        self.usuario = usuario
+        self.inicio = time.perf_counter()
+        self.futuros: Dict[str, Future] = {}
+        self.tempos_ms: Dict[str, float] = {}
+        self.erros: Dict[str, str] = {}
+        self._pendentes = 0
+        self._lock = threading.Lock()
+
+    def _concluir(self, nome: str, inicio: float, erro: Optional[BaseException]) -> None:
+        with self._lock:
+            self.tempos_ms[nome] = (time.perf_counter() - inicio) * 1000
+            if erro is not None:
+                self.erros[nome] = str(erro)
+            self._pendentes -= 1
+            ultimo = self._pendentes == 0
+        if ultimo:
+            logger.info(
+                "Prefetch pós-login de %s: %d cargas em %.0f ms (%s)%s",
+                self.usuario,
+                len(self.tempos_ms),
+                (time.perf_counter() - self.inicio) * 1000,
+                ", ".join(f"{k}={v:.0f}ms" for k, v in sorted(self.tempos_ms.items())),
+                f" | erros: {self.erros}" if self.erros else "",
+            )
+
+
+def _executar(prefetch: PrefetchLogin, nome: str, carregar: Callable[[], Any], ctx) -> Any:
+    """Roda uma carga no pool com o contexto da sessão do Streamlit."""
+    if ctx is not None and add_script_run_ctx is not None:
+        # Necessário para st.session_state/st.cache_* dentro da thread do pool.
+        add_script_run_ctx(threading.current_thread(), ctx)
+    inicio = time.perf_counter()
+    try:
+        resultado = carregar()
+    except Exception as e:
+        prefetch._concluir(nome, inicio, e)
+        raise
+    prefetch._concluir(nome, inicio, None)
+    return resultado
+
+
+def iniciar_prefetch(usuario: str, tarefas: Dict[str, Callable[[], Any]]) -> PrefetchLogin:
+    """Dispara as cargas em paralelo e retorna imediatamente.
+
+    Args:
+        usuario: usuário que acabou de logar (para log).
+        tarefas: ``{nome: função sem argumentos}``.
+
+    Returns:
+        ``PrefetchLogin`` para ``consumir()``/``registrar_primeira_tela()``.
+    """
+    prefetch = PrefetchLogin(usuario)
+    ctx = get_script_run_ctx() if get_script_run_ctx is not None else None
+    prefetch._pendentes = len(tarefas)
+    for nome, carregar in tarefas.items():
+        prefetch.futuros[nome] = _executor.submit(_executar, prefetch, nome, carregar, ctx)
+    return prefetch
+
+
+def consumir(
+    prefetch: Optional[PrefetchLogin],
+    nome: str,
+    carregar: Callable[[], Any],
+    espera: float = LOGIN_PREFETCH_WAIT_SECONDS,
+) -> Any:
+    """Retorna (uma única vez) o valor pré-carregado ``nome`` ou executa ``carregar``.
+
+    Se a carga ainda estiver em andamento, espera até ``espera`` segundos;
+    em caso de erro ou timeout consulta diretamente.
+    """
+    futuro = prefetch.futuros.pop(nome, None) if prefetch is not None else None
+    if futuro is None:
+        return carregar()
+    try:
+        return futuro.result(timeout=espera)
+    except Exception as e:
+        logger.debug("Prefetch '%s' indisponível, consultando direto: %s", nome, e)
+        return carregar()
+
+
+def registrar_primeira_tela(prefetch: PrefetchLogin, tela: str) -> float:
+    """Registra no log o tempo entre o login e a primeira tela renderizada.
+
+    Returns:
+        Tempo em milissegundos.
+    """
+    total_ms = (time.perf_counter() - prefetch.inicio) * 1000
+    logger.info("Primeira tela (%s) de %s pronta %.0f ms após o login", tela, prefetch.usuario, total_ms)
+    return total_ms
+
+
+__all__ = [
+    "PrefetchLogin",
+    "iniciar_prefetch",
+    "consumir",
+    "registrar_primeira_tela",
+]
@@ -0,0 +1,494 @@
+"""
+Outbox de notificações - Ponto ExSA v5.0
+
+``NotificationManager.add_notification``, ``notificar_gestor_solicitacao`` e
+afins enviavam ntfy/WebPush/SMTP dentro do request do Streamlit: o clique do
+aprovador esperava a latência do serviço externo e falhas se perdiam.
+
+Agora quem notifica apenas grava uma linha em ``notification_outbox``
+(de preferência com o cursor da própria mudança de negócio, antes do
+``commit``) e um worker em background entrega:
+
+- reserva lotes com ``lote``/``bloqueado_em`` (seguro com mais de um
+  processo; reservas expiradas voltam para a fila);
+- limita a concorrência por canal (``OUTBOX_CONCORRENCIA_POR_CANAL``);
+- falhas são reagendadas com backoff exponencial até
+  ``OUTBOX_MAX_TENTATIVAS``;
+- ``chave_dedup`` (UNIQUE) torna o enfileiramento idempotente;
+- linhas entregues ou descartadas são apagadas após
+  ``OUTBOX_RETENTION_DAYS`` (``purgar_outbox``, job diário do scheduler).
+
+O worker roda junto do scheduler (``background_scheduler``) ou isolado com
+``python notification_worker.py --mode outbox``.
+"""
+
+import json
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+try:
+    from database import get_connection, return_connection, SQL_PLACEHOLDER, adapt_sql_for_postgresql
+except ImportError:
+    from ponto_esa_v5.database import get_connection, return_connection, SQL_PLACEHOLDER, adapt_sql_for_postgresql
+
+from constants import (
+    agora_br_naive,
+    OUTBOX_BACKOFF_BASE_SECONDS,
+    OUTBOX_BACKOFF_MAX_SECONDS,
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_CONCORRENCIA_POR_CANAL,
+    OUTBOX_LEASE_SECONDS,
+    OUTBOX_MAX_TENTATIVAS,
+    OUTBOX_POLL_SECONDS,
+    OUTBOX_RETENTION_DAYS,
+)
+
+logger = logging.getLogger(__name__)
+
+CANAIS = ("ntfy", "webpush", "email")
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+_worker_thread: Optional[threading.Thread] = None
+_worker_lock = threading.Lock()
+_despertar = threading.Event()
+_parar = threading.Event()
+
+
+class EntregaDescartada(Exception):
+    """Entrega impossível de forma permanente (sem inscrição, sem e-mail...)."""
+
+
+@contextmanager
+def _db():
+    """Context manager que obtém conexão do pool e a devolve ao final."""
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        return_connection(conn)
+
+
+def _criar_tabela(cursor) -> None:
+    """DDL idempotente de ``notification_outbox``."""
+    cursor.execute(adapt_sql_for_postgresql("""
+        CREATE TABLE IF NOT EXISTS notification_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            canal TEXT NOT NULL,
+            destinatario TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            chave_dedup TEXT,
+            status TEXT NOT NULL DEFAULT 'pendente',
+            tentativas INTEGER NOT NULL DEFAULT 0,
+            proxima_tentativa TIMESTAMP,
+            lote TEXT,
+            bloqueado_em TIMESTAMP,
+            ultimo_erro TEXT,
+            criado_em TIMESTAMP,
+            enviado_em TIMESTAMP
+        )
+    """))
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_outbox_dedup ON notification_outbox (chave_dedup)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_outbox_fila ON notification_outbox (status, proxima_tentativa)"
+    )
+
+
+def ensure_outbox_schema_once() -> None:
+    """Cria ``notification_outbox`` uma vez por processo."""
+    global _schema_ready
+    if _schema_ready:
+        return
+
+    with _schema_lock:
+        if _schema_ready:
+            return
+        with _db() as conn:
+            cursor = conn.cursor()
+            _criar_tabela(cursor)
+            conn.commit()
+            cursor.close()
+        _schema_ready = True
+
+
+# ---------------------------------------------------------------------------
+# Enfileiramento
+# ---------------------------------------------------------------------------
+
+def _inserir(cursor, canal: str, destinatario: str, payload: Dict[str, Any], chave_dedup: Optional[str]) -> None:
+    agora = agora_br_naive()
+    cursor.execute(
+        f"""
+        INSERT INTO notification_outbox
+            (canal, destinatario, payload, chave_dedup, status, tentativas, proxima_tentativa, criado_em)
+        VALUES ({SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER},
+                'pendente', 0, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER})
+        ON CONFLICT (chave_dedup) DO NOTHING
+        """,
+        (canal, destinatario, json.dumps(payload, ensure_ascii=False, default=str), chave_dedup, agora, agora),
+    )
+
+
+def enfileirar_notificacao(
+    canal: str,
+    destinatario: str,
+    payload: Dict[str, Any],
+    chave_dedup: Optional[str] = None,
+    cursor=None,
+) -> bool:
+    """Grava uma notificação na outbox para entrega assíncrona.
+
+    Args:
+        canal: ``'ntfy'``, ``'webpush'`` ou ``'email'``.
+        destinatario: usuário (ou e-mail, no canal ``'email'``).
+        payload: dados do canal (ver ``_ENTREGADORES``).
+        chave_dedup: enfileiramentos repetidos com a mesma chave são ignorados.
+        cursor: cursor da transação de negócio em andamento. A linha só fica
+            visível ao worker no ``commit`` do chamador, que deve então chamar
+            ``despertar_worker()``. Sem cursor, usa conexão própria e já commita.
+
+    Returns:
+        True se a notificação foi gravada (ou já existia pela ``chave_dedup``).
+    """
+    if canal not in CANAIS:
+        raise ValueError(f"Canal de notificação inválido: {canal}")
+    if not destinatario:
+        return False
+
+    if cursor is None:
+        try:
+            ensure_outbox_schema_once()
+            with _db() as conn:
+                cur = conn.cursor()
+                _inserir(cur, canal, destinatario, payload, chave_dedup)
+                conn.commit()
+                cur.close()
+        except Exception as e:
+            logger.warning("Falha ao enfileirar notificação %s para %s: %s", canal, destinatario, e)
+            return False
+        despertar_worker()
+        return True
+
+    # Na transação do chamador: SAVEPOINT isola a falha da mudança de negócio.
+    try:
+        cursor.execute("SAVEPOINT notification_outbox")
+    except Exception as e:
+        logger.debug("SAVEPOINT indisponível para notification_outbox: %s", e)
+        return False
+    try:
+        # Não abrir outra conexão aqui (lock de escrita do SQLite do próprio chamador).
+        if not _schema_ready:
+            _criar_tabela(cursor)
+        _inserir(cursor, canal, destinatario, payload, chave_dedup)
+        cursor.execute("RELEASE SAVEPOINT notification_outbox")
+        return True
+    except Exception as e:
+        logger.warning("Falha ao enfileirar notificação %s para %s: %s", canal, destinatario, e)
+        try:
+            cursor.execute("ROLLBACK TO SAVEPOINT notification_outbox")
+            cursor.execute("RELEASE SAVEPOINT notification_outbox")
+        except Exception as rollback_error:
+            logger.debug("Erro ao desfazer SAVEPOINT notification_outbox: %s", rollback_error)
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Entrega por canal
+# ---------------------------------------------------------------------------
+
+def _entregar_ntfy(destinatario: str, payload: Dict[str, Any]) -> bool:
+    try:
+        from push_scheduler import enviar_notificacao, verificar_subscription
+    except ImportError:
+        from ponto_esa_v5.push_scheduler import enviar_notificacao, verificar_subscription
+
+    if payload.get("somente_inscritos"):
+        _topic, ativo = verificar_subscription(destinatario)
+        if not ativo:
+            raise EntregaDescartada("usuário sem push ativo")
+    return enviar_notificacao(
+        destinatario,
+        payload.get("titulo") or "Notificação",
+        payload.get("mensagem") or "",
+        payload.get("emoji", "📋"),
+    )
+
+
+def _entregar_webpush(destinatario: str, payload: Dict[str, Any]) -> bool:
+    try:
+        from push_notifications import enviar_notificacao_para_usuario
+    except ImportError:
+        from ponto_esa_v5.push_notifications import enviar_notificacao_para_usuario
+
+    enviados, total = enviar_notificacao_para_usuario(
+        destinatario,
+        payload.get("titulo") or "Notificação",
+        payload.get("mensagem") or "",
+        tipo=payload.get("tipo", "info"),
+        url=payload.get("url", "/"),
+        dados_extras=payload.get("dados_extras"),
+    )
+    if total == 0:
+        raise EntregaDescartada("usuário sem subscription WebPush")
+    return enviados > 0
+
+
+def _entregar_email(destinatario: str, payload: Dict[str, Any]) -> bool:
+    try:
+        from email_notifications import enviar_email, get_email_usuario, is_email_configured
+    except ImportError:
+        from ponto_esa_v5.email_notifications import enviar_email, get_email_usuario, is_email_configured
+
+    if not is_email_configured():
+        raise EntregaDescartada("SMTP não configurado")
+    email = destinatario if "@" in destinatario else get_email_usuario(destinatario)
+    if not email:
+        raise EntregaDescartada("destinatário sem e-mail cadastrado")
+    sucesso, _mensagem = enviar_email(
+        email,
+        payload.get("assunto") or "Ponto ExSA",
+        payload.get("corpo_html") or "",
+        payload.get("corpo_texto"),
+    )
+    return sucesso
+
+
+_ENTREGADORES = {
+    "ntfy": _entregar_ntfy,
+    "webpush": _entregar_webpush,
+    "email": _entregar_email,
+}
+
+
+def _backoff(tentativas: int) -> timedelta:
+    """Espera antes da próxima tentativa: base * 2^(tentativas-1), com teto."""
+    segundos = OUTBOX_BACKOFF_BASE_SECONDS * (2 ** max(0, tentativas - 1))
+    return timedelta(seconds=min(segundos, OUTBOX_BACKOFF_MAX_SECONDS))
+
+
+def _entregar(canal: str, destinatario: str, payload_json: str):
+    """Executa a entrega; retorna (status, erro)."""
+    try:
+        payload = json.loads(payload_json or "{}")
+        if _ENTREGADORES[canal](destinatario, payload):
+            return "enviado", None
+        return "erro", "entrega não confirmada"
+    except EntregaDescartada as e:
+        return "descartado", str(e)
+    except Exception as e:
+        return "erro", str(e)
+
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+
+def _reservar_lote(cursor, limite: int):
+    """Reserva até ``limite`` notificações vencidas; retorna ``(lote, linhas)``."""
+    agora = agora_br_naive()
+    expirado = agora - timedelta(seconds=OUTBOX_LEASE_SECONDS)
+    cursor.execute(
+        f"""
+        SELECT id FROM notification_outbox
+        WHERE (status = 'pendente' AND proxima_tentativa <= {SQL_PLACEHOLDER})
+           OR (status = 'enviando' AND bloqueado_em < {SQL_PLACEHOLDER})
+        ORDER BY id
+        LIMIT {SQL_PLACEHOLDER}
+        """,
+        (agora, expirado, limite),
+    )
+    ids = [row[0] for row in cursor.fetchall()]
+    if not ids:
+        return None, []
+
+    lote = uuid.uuid4().hex
+    placeholders = ", ".join([SQL_PLACEHOLDER] * len(ids))
+    # A condição se repete no UPDATE: outro worker pode ter reservado entre o SELECT e aqui.
+    cursor.execute(
+        f"""
+        UPDATE notification_outbox
+        SET status = 'enviando', lote = {SQL_PLACEHOLDER}, bloqueado_em = {SQL_PLACEHOLDER}
+        WHERE id IN ({placeholders})
+          AND ((status = 'pendente' AND proxima_tentativa <= {SQL_PLACEHOLDER})
+               OR (status = 'enviando' AND bloqueado_em < {SQL_PLACEHOLDER}))
+        """,
+        (lote, agora, *ids, agora, expirado),
+    )
+    cursor.execute(
+        f"""
+        SELECT id, canal, destinatario, payload, tentativas
+        FROM notification_outbox WHERE lote = {SQL_PLACEHOLDER} AND status = 'enviando'
+        ORDER BY id
+        """,
+        (lote,),
+    )
+    return lote, cursor.fetchall()
+
+
+def processar_outbox(limite: int = OUTBOX_BATCH_SIZE) -> Dict[str, int]:
+    """Entrega um lote da outbox (um ciclo do worker).
+
+    Returns:
+        Contagem por resultado: ``enviado``, ``descartado``, ``reagendado``, ``falhou``.
+    """
+    resumo = {"enviado": 0, "descartado": 0, "reagendado": 0, "falhou": 0}
+    ensure_outbox_schema_once()
+
+    with _db() as conn:
+        cursor = conn.cursor()
+        lote, linhas = _reservar_lote(cursor, limite)
+        conn.commit()
+        cursor.close()
+    if not linhas:
+        return resumo
+
+    executores = {
+        canal: ThreadPoolExecutor(max_workers=max(1, OUTBOX_CONCORRENCIA_POR_CANAL.get(canal, 1)),
+                                  thread_name_prefix=f"outbox-{canal}")
+        for canal in {linha[1] for linha in linhas}
+    }
+    try:
+        futuros = []
+        for id_, canal, destinatario, payload, tentativas in linhas:
+            if canal not in _ENTREGADORES:
+                futuros.append((id_, tentativas, None))
+                continue
+            futuros.append((id_, tentativas, executores[canal].submit(_entregar, canal, destinatario, payload)))
+        resultados = [
+            (id_, tentativas, futuro.result() if futuro else ("descartado", "canal desconhecido"))
+            for id_, tentativas, futuro in futuros
+        ]
+    finally:
+        for executor in executores.values():
+            executor.shutdown(wait=True)
+
+    agora = agora_br_naive()
+    concluidas, reagendadas = [], []
+    for id_, tentativas, (status, erro) in resultados:
+        if status in ("enviado", "descartado"):
+            resumo[status] += 1
+            concluidas.append((status, erro, agora if status == "enviado" else None, id_, lote))
+            continue
+        tentativas = int(tentativas or 0) + 1
+        if tentativas >= OUTBOX_MAX_TENTATIVAS:
+            resumo["falhou"] += 1
+            concluidas.append(("falhou", erro, None, id_, lote))
+            logger.warning("Notificação %s desistida após %d tentativas: %s", id_, tentativas, erro)
+        else:
+            resumo["reagendado"] += 1
+            reagendadas.append((tentativas, agora + _backoff(tentativas), erro, id_, lote))
+
+    # ``lote`` no WHERE: se a reserva expirou e outro worker reservou a linha
+    # de novo, o resultado dele prevalece sobre o deste ciclo.
+    with _db() as conn:
+        cursor = conn.cursor()
+        if concluidas:
+            cursor.executemany(
+                f"""
+                UPDATE notification_outbox
+                SET status = {SQL_PLACEHOLDER}, ultimo_erro = {SQL_PLACEHOLDER},
+                    enviado_em = {SQL_PLACEHOLDER}, lote = NULL, bloqueado_em = NULL
+                WHERE id = {SQL_PLACEHOLDER} AND lote = {SQL_PLACEHOLDER}
+                """,
+                concluidas,
+            )
+        if reagendadas:
+            cursor.executemany(
+                f"""
+                UPDATE notification_outbox
+                SET status = 'pendente', tentativas = {SQL_PLACEHOLDER}, proxima_tentativa = {SQL_PLACEHOLDER},
+                    ultimo_erro = {SQL_PLACEHOLDER}, lote = NULL, bloqueado_em = NULL
+                WHERE id = {SQL_PLACEHOLDER} AND lote = {SQL_PLACEHOLDER}
+                """,
+                reagendadas,
+            )
+        conn.commit()
+        cursor.close()
+
+    logger.info("Outbox: %s", ", ".join(f"{k}={v}" for k, v in resumo.items() if v))
+    return resumo
+
+
+def purgar_outbox(dias: int = OUTBOX_RETENTION_DAYS) -> int:
+    """Apaga notificações entregues ou descartadas há mais de ``dias``. Retorna o número de linhas."""
+    ensure_outbox_schema_once()
+    limite = agora_br_naive() - timedelta(days=dias)
+    with _db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            DELETE FROM notification_outbox
+            WHERE status IN ('enviado', 'descartado') AND criado_em < {SQL_PLACEHOLDER}
+            """,
+            (limite,),
+        )
+        removidas = cursor.rowcount or 0
+        conn.commit()
+        cursor.close()
+    logger.info("notification_outbox: %d notificações anteriores a %s removidas", removidas, limite.date())
+    return removidas
+
+
+def despertar_worker() -> None:
+    """Acorda o worker deste processo (chamar após o commit que enfileirou)."""
+    _despertar.set()
+
+
+def _loop_worker() -> None:
+    while not _parar.is_set():
+        # Limpa antes de drenar: um despertar durante o ciclo não se perde.
+        _despertar.clear()
+        processadas = 0
+        try:
+            processadas = sum(processar_outbox().values())
+        except Exception as e:
+            logger.warning("Erro no worker da outbox: %s", e)
+        if processadas >= OUTBOX_BATCH_SIZE:
+            continue  # ainda há fila
+        _despertar.wait(OUTBOX_POLL_SECONDS)
+
+
+def iniciar_worker_outbox() -> bool:
+    """Inicia o worker em thread daemon (idempotente)."""
+    global _worker_thread
+    with _worker_lock:
+        if _worker_thread is not None and _worker_thread.is_alive():
+            return False
+        _parar.clear()
+        _worker_thread = threading.Thread(target=_loop_worker, name="notification-outbox", daemon=True)
+        _worker_thread.start()
+    logger.info("Worker da notification_outbox iniciado")
+    return True
+
+
+def parar_worker_outbox(timeout: float = 10.0) -> None:
+    """Sinaliza o worker para parar e aguarda o ciclo em andamento."""
+    global _worker_thread
+    with _worker_lock:
+        thread, _worker_thread = _worker_thread, None
+    if thread is None:
+        return
+    _parar.set()
+    _despertar.set()
+    thread.join(timeout)
+
+
+__all__ = [
+    "CANAIS",
+    "EntregaDescartada",
+    "ensure_outbox_schema_once",
+    "enfileirar_notificacao",
+    "processar_outbox",
+    "purgar_outbox",
+    "despertar_worker",
+    "iniciar_worker_outbox",
+    "parar_worker_outbox",
+]
@@ -6,6 +6,7 @@ O scheduler real roda integrado ao app principal via background_scheduler.py
 
 Para testes locais:
     python notification_worker.py --mode once    # Executar jobs uma vez
+    python notification_worker.py --mode outbox  # Apenas entregar a notification_outbox
     python notification_worker.py --mode health  # Verificar sistema
 
 @author: Pâmella SAR - Expressão Socioambiental
@@ -86,6 +87,31 @@ def run_scheduler():
         logger.info("Scheduler encerrado.")
 
 
+def run_outbox():
+    """
+    Entrega continuamente a notification_outbox (sem os jobs agendados).
+    Útil para um processo dedicado à entrega de notificações.
+    """
+    try:
+        from notification_outbox import iniciar_worker_outbox, parar_worker_outbox
+    except Exception as e:
+        logger.error(f"Erro ao importar notification_outbox: {e}")
+        return
+
+    logger.info("=" * 60)
+    logger.info("📬 NOTIFICATION WORKER - Outbox")
+    logger.info("=" * 60)
+    iniciar_worker_outbox()
+    try:
+        while not shutdown_requested:
+            time_module.sleep(2)
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("Worker da outbox interrompido.")
+    finally:
+        parar_worker_outbox()
+        logger.info("Worker da outbox encerrado.")
+
+
 def run_once():
     """
     Executa os jobs uma única vez (modo cron externo).
@@ -112,6 +138,13 @@ def run_once():
         else:
             enviados = job_result.get('lembretes_enviados', job_result.get('notificacoes_enviadas', 0))
             logger.info(f"  ✅ {job_name}: {enviados} notificações enviadas")
+
+    # Entregar o que estiver na outbox (inclusive o enfileirado pelos jobs acima)
+    try:
+        from notification_outbox import processar_outbox
+        logger.info(f"  📬 outbox: {processar_outbox()}")
+    except Exception as e:
+        logger.error(f"Erro ao processar notification_outbox: {e}")
     
     logger.info("=" * 60)
 
@@ -149,9 +182,9 @@ if __name__ == '__main__':
     )
     parser.add_argument(
         '--mode',
-        choices=['scheduler', 'once', 'health'],
+        choices=['scheduler', 'once', 'outbox', 'health'],
         default='scheduler',
-        help='Modo de execução: scheduler (contínuo), once (única vez), health (verificação)'
+        help='Modo de execução: scheduler (contínuo), once (única vez), outbox (só entregas), health (verificação)'
     )
     
     args = parser.parse_args()
@@ -161,6 +194,8 @@ if __name__ == '__main__':
         sys.exit(0 if success else 1)
     elif args.mode == 'once':
         run_once()
+    elif args.mode == 'outbox':
+        run_outbox()
     else:
         # Modo scheduler (padrão)
         health_check()
@@ -9,7 +9,12 @@ import json
 import logging
 import threading
 
-from database import get_connection, return_connection, SQL_PLACEHOLDER
+from database import get_connection, return_connection, SQL_PLACEHOLDER, USE_POSTGRESQL
+
+try:
+    from notification_outbox import enfileirar_notificacao, despertar_worker
+except ImportError:
+    from ponto_esa_v5.notification_outbox import enfileirar_notificacao, despertar_worker
 
 logger = logging.getLogger(__name__)
 
@@ -22,64 +27,90 @@ class NotificationManager:
         with self._lock:
             return list(self.active_notifications.get(user_id, []))
     
-    def add_notification(self, user_id, payload):
+    def add_notification(self, user_id, payload, cursor=None):
+        """Registra a notificação e enfileira o push ntfy na outbox.
+
+        Com ``cursor`` (transação de negócio em andamento) as duas linhas entram
+        nessa transação, isoladas por SAVEPOINT: só existem se a mudança de
+        negócio for commitada. O chamador faz o ``commit`` e depois chama
+        ``despertar_worker()``. Sem cursor, usa conexão própria e já commita.
+        """
         with self._lock:
             if user_id not in self.active_notifications:
                 self.active_notifications[user_id] = []
             self.active_notifications[user_id].append(payload)
-        
+
+        if cursor is not None:
+            try:
+                cursor.execute("SAVEPOINT notificacao")
+            except Exception as e:
+                logger.debug("SAVEPOINT indisponível para notificação: %s", e)
+                return
+            try:
+                self._gravar_notificacao(cursor, user_id, payload)
+                cursor.execute("RELEASE SAVEPOINT notificacao")
+            except Exception as e:
+                logger.warning("Falha ao registrar notificação para %s: %s", user_id, e)
+                try:
+                    cursor.execute("ROLLBACK TO SAVEPOINT notificacao")
+                    cursor.execute("RELEASE SAVEPOINT notificacao")
+                except Exception as rollback_error:
+                    logger.debug("Erro ao desfazer SAVEPOINT notificacao: %s", rollback_error)
+            return
+
         # Persistência mínima em SQLite/PostgreSQL
         conn = get_connection()
         cur = conn.cursor()
+        self._gravar_notificacao(cur, user_id, payload)
+        conn.commit()
+        return_connection(conn)
+        despertar_worker()
+
+    def _gravar_notificacao(self, cur, user_id, payload):
+        """INSERT em Notificacoes + push ntfy na outbox, no cursor informado."""
         title = payload.get("title") if isinstance(payload, dict) else None
         message = payload.get("message") if isinstance(payload, dict) else None
         type_ = payload.get("type") if isinstance(payload, dict) else None
         extra = json.dumps(payload) if isinstance(payload, dict) else None
-        cur.execute(
-            f"""
+        sql = f"""
             INSERT INTO Notificacoes (user_id, title, message, type, read, extra_data)
             VALUES ({SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, 0, {SQL_PLACEHOLDER})
-            """,
-            (user_id, title, message, type_, extra),
+        """
+        params = (user_id, title, message, type_, extra)
+        if USE_POSTGRESQL:
+            # psycopg2 não preenche lastrowid
+            cur.execute(sql + " RETURNING id", params)
+            notificacao_id = cur.fetchone()[0]
+        else:
+            cur.execute(sql, params)
+            notificacao_id = cur.lastrowid
+        # Push no celular (ntfy) vai para a outbox na mesma transação; o worker entrega.
+        self._enfileirar_push_ntfy(cur, user_id, title, message, type_, notificacao_id)
+
+    def _enfileirar_push_ntfy(self, cur, user_id, title, message, type_, notificacao_id=None):
+        """Enfileira o push ntfy (só para quem tem push ativado, verificado na entrega)."""
+        # Escolher emoji baseado no tipo
+        emoji_map = {
+            'aprovacao': '✅',
+            'rejeicao': '❌',
+            'solicitacao': '📋',
+            'horas_extras': '⏰',
+            'atestado': '📄',
+            'correcao': '🔧',
+            'info': 'ℹ️',
+        }
+        enfileirar_notificacao(
+            "ntfy",
+            user_id,
+            {
+                "titulo": title or "Notificação",
+                "mensagem": message or "",
+                "emoji": emoji_map.get(type_, '🔔'),
+                "somente_inscritos": True,
+            },
+            chave_dedup=f"notificacao:{notificacao_id}" if notificacao_id else None,
+            cursor=cur,
         )
-        conn.commit()
-        return_connection(conn)
-        
-        # Enviar também via ntfy (push no celular)
-        self._enviar_push_ntfy(user_id, title, message, type_)
-    
-    def _enviar_push_ntfy(self, user_id, title, message, type_):
-        """Envia notificação via ntfy.sh para o celular do usuário"""
-        try:
-            from push_scheduler import verificar_subscription, get_topic_for_user, enviar_notificacao
-            
-            # Verificar se usuário tem push ativado
-            topic, ativo = verificar_subscription(user_id)
-            if not ativo:
-                return
-            
-            # Escolher emoji baseado no tipo
-            emoji_map = {
-                'aprovacao': '✅',
-                'rejeicao': '❌',
-                'solicitacao': '📋',
-                'horas_extras': '⏰',
-                'atestado': '📄',
-                'correcao': '🔧',
-                'info': 'ℹ️',
-            }
-            emoji = emoji_map.get(type_, '🔔')
-            
-            # Enviar via ntfy
-            enviar_notificacao(
-                usuario=user_id,
-                titulo=title or "Notificação",
-                mensagem=message or "",
-                emoji=emoji
-            )
-        except Exception as e:
-            # Log ao invés de silenciar completamente
-            logger.warning("[Push] Erro ao enviar ntfy para %s: %s", user_id, e)
 
     def start_repeating_notification(self, job_id, user_id, payload, interval_seconds=3, stop_condition=None, **kwargs):
         # Simulação simples: criar duas notificações imediatamente para satisfazer testes
@@ -87,10 +118,11 @@ class NotificationManager:
         self.add_notification(user_id, payload)
         return True
 
-    def criar_notificacao(self, usuario_destino, tipo, titulo, mensagem, dados_extras=None):
+    def criar_notificacao(self, usuario_destino, tipo, titulo, mensagem, dados_extras=None, cursor=None):
         """
         Cria uma notificação para um usuário (usado pelo app).
         Também envia via push (ntfy) se o usuário tiver ativado.
+        Com ``cursor``, tudo é gravado na transação do chamador (ver ``add_notification``).
         """
         payload = {
             'title': titulo,
@@ -98,7 +130,7 @@ class NotificationManager:
             'type': tipo,
             'data': dados_extras or {}
         }
-        self.add_notification(usuario_destino, payload)
+        self.add_notification(usuario_destino, payload, cursor=cursor)
         
         # Se for uma solicitação (funcionário -> gestor), notificar gestor via push
         if tipo in ['aprovacao_hora_extra', 'aprovacao_atestado', 'aprovacao_correcao']:
@@ -118,10 +150,11 @@ class NotificationManager:
                     gestor=usuario_destino,
                     tipo=tipo_map.get(tipo, tipo),
                     solicitante=solicitante,
-                    descricao=mensagem[:100]  # Limitar tamanho
+                    descricao=mensagem[:100],  # Limitar tamanho
+                    cursor=cursor,
                 )
             except Exception as e:
-                print(f"[Push] Erro ao notificar gestor: {e}")
+                logger.warning("[Push] Erro ao notificar gestor: %s", e)
 
     def stop_repeating_notification(self, *args, **kwargs):
         return True
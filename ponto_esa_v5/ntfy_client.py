@@ -0,0 +1,185 @@
+"""
+Cliente HTTP do ntfy - Ponto ExSA v5.0
+
+Cada envio abria uma conexão nova com ``requests.post`` (handshake TLS a cada
+notificação) e avisos em massa eram enviados um destinatário por vez. Aqui:
+
+- uma ``requests.Session`` por processo mantém as conexões vivas (keep-alive)
+  e é compartilhada entre threads;
+- ``publicar_em_lote()``/``publicar_varios()`` despacham vários envios em
+  paralelo, com paralelismo limitado por ``PUSH_FANOUT_MAX_WORKERS``, e
+  devolvem o resultado de cada destinatário.
+
+Envios que o limite de taxa não liberou a tempo voltam com ``adiado=True``:
+não chegaram a sair, e quem conhece o conteúdo (``push_scheduler``) os
+reenfileira na ``notification_outbox`` em vez de tratá-los como falha.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from constants import PUSH_FANOUT_MAX_WORKERS, PUSH_TIMEOUT_SECONDS
+
+try:
+    from job_telemetry import registrar_chamada_externa
+except ImportError:
+    from ponto_esa_v5.job_telemetry import registrar_chamada_externa
+
+try:
+    from rate_limiter import aguardar_vez
+except ImportError:
+    from ponto_esa_v5.rate_limiter import aguardar_vez
+
+logger = logging.getLogger(__name__)
+
+_sessao: Optional[requests.Session] = None
+_sessao_lock = threading.Lock()
+
+
+@dataclass
+class ResultadoEnvio:
+    """Resultado de um envio ao ntfy."""
+
+    ok: bool
+    status: Optional[int] = None
+    erro: Optional[str] = None
+    tempo_ms: float = 0.0
+    adiado: bool = False  # não enviado por limite de taxa (pode ser reenviado)
+
+
+def obter_sessao() -> requests.Session:
+    """Retorna a sessão HTTP compartilhada (criada uma vez por processo)."""
+    global _sessao
+    if _sessao is not None:
+        return _sessao
+
+    with _sessao_lock:
+        if _sessao is None:
+            sessao = requests.Session()
+            # Uma conexão viva por worker do lote; sem isso o urllib3 descarta o excedente.
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=PUSH_FANOUT_MAX_WORKERS)
+            sessao.mount("https://", adapter)
+            sessao.mount("http://", adapter)
+            _sessao = sessao
+    return _sessao
+
+
+def fechar_sessao() -> None:
+    """Fecha a sessão compartilhada (a próxima chamada cria outra)."""
+    global _sessao
+    with _sessao_lock:
+        if _sessao is not None:
+            _sessao.close()
+            _sessao = None
+
+
+def publicar(url: str, corpo: bytes, headers: Mapping[str, str],
+             timeout: float = PUSH_TIMEOUT_SECONDS, espera_max: Optional[float] = None) -> ResultadoEnvio:
+    """Publica uma mensagem no tópico ``url`` reaproveitando a conexão.
+
+    ``espera_max`` limita a espera pelo limite de taxa (None = a da política;
+    0 = não espera, para envios disparados pela UI).
+    """
+    inicio = time.perf_counter()
+    if not aguardar_vez("ntfy", espera_max=espera_max):
+        return ResultadoEnvio(ok=False, erro="limite de taxa do ntfy excedido", adiado=True,
+                              tempo_ms=(time.perf_counter() - inicio) * 1000)
+    try:
+        response = obter_sessao().post(url, data=corpo, headers=dict(headers), timeout=timeout)
+        resultado = ResultadoEnvio(
+            ok=response.status_code == 200,
+            status=response.status_code,
+            erro=None if response.status_code == 200 else f"HTTP {response.status_code}",
+            tempo_ms=(time.perf_counter() - inicio) * 1000,
+        )
+    except Exception as e:
+        resultado = ResultadoEnvio(ok=False, erro=str(e), tempo_ms=(time.perf_counter() - inicio) * 1000)
+    registrar_chamada_externa(resultado.ok)
+    return resultado
+
+
+def publicar_varios(
+    envios: Mapping[str, Tuple[str, bytes, Mapping[str, str]]],
+    max_workers: int = PUSH_FANOUT_MAX_WORKERS,
+    timeout: float = PUSH_TIMEOUT_SECONDS,
+    espera_max: Optional[float] = None,
+) -> Dict[str, ResultadoEnvio]:
+    """Publica mensagens (possivelmente diferentes) em paralelo.
+
+    Args:
+        envios: ``{destinatario: (url_do_topico, corpo, headers)}``.
+        max_workers: envios simultâneos no máximo.
+        espera_max: espera máxima pelo limite de taxa por envio (ver ``publicar``).
+
+    Returns:
+        ``{destinatario: ResultadoEnvio}`` na mesma ordem de ``envios``.
+    """
+    if not envios:
+        return {}
+
+    workers = max(1, min(max_workers, len(envios)))
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ntfy-fanout") as executor:
+        # Cada tarefa leva uma cópia do contexto: a telemetria do job que
+        # disparou o lote conta as chamadas feitas nas threads do pool.
+        futuros = {
+            destino: executor.submit(contextvars.copy_context().run, publicar, url, corpo, headers, timeout, espera_max)
+            for destino, (url, corpo, headers) in envios.items()
+        }
+        resultados = {destino: futuro.result() for destino, futuro in futuros.items()}
+
+    logger.info(
+        "[Push] Lote ntfy: %d/%d enviados, %d adiados pelo limite de taxa em %.0f ms (%d workers)",
+        sum(1 for r in resultados.values() if r.ok),
+        len(resultados),
+        sum(1 for r in resultados.values() if r.adiado),
+        (time.perf_counter() - inicio) * 1000,
+        workers,
+    )
+    return resultados
+
+
+def publicar_em_lote(
+    urls: Mapping[str, str],
+    corpo: bytes,
+    headers: Mapping[str, str],
+    max_workers: int = PUSH_FANOUT_MAX_WORKERS,
+    timeout: float = PUSH_TIMEOUT_SECONDS,
+    espera_max: Optional[float] = None,
+) -> Dict[str, ResultadoEnvio]:
+    """Publica a mesma mensagem em vários tópicos em paralelo.
+
+    Args:
+        urls: ``{destinatario: url_do_topico}``.
+        corpo: corpo já codificado.
+        headers: headers ntfy (Title, Priority...).
+        max_workers: envios simultâneos no máximo.
+        espera_max: espera máxima pelo limite de taxa por envio (ver ``publicar``).
+
+    Returns:
+        ``{destinatario: ResultadoEnvio}`` na mesma ordem de ``urls``.
+    """
+    return publicar_varios(
+        {destino: (url, corpo, headers) for destino, url in urls.items()},
+        max_workers=max_workers,
+        timeout=timeout,
+        espera_max=espera_max,
+    )
+
+
+__all__ = [
+    "ResultadoEnvio",
+    "obter_sessao",
+    "fechar_sessao",
+    "publicar",
+    "publicar_varios",
+    "publicar_em_lote",
+]
@@ -8,26 +8,277 @@ import json
 import datetime
 import os
 import logging
+import socket
+import threading
+import uuid
+import urllib.parse
+import urllib.request
 from pathlib import Path
-from database import return_connection
-from constants import agora_br, agora_br_naive
+
+try:
+    from psycopg2.extras import execute_values
+except ImportError:
+    execute_values = None
+
+try:
+    from database import get_connection, return_connection, USE_POSTGRESQL
+except ImportError:
+    from ponto_esa_v5.database import get_connection, return_connection, USE_POSTGRESQL
+from constants import (
+    agora_br_naive, OFFLINE_SYNC_LOTE, OFFLINE_SYNC_BACKOFF_BASE_SECONDS,
+    OFFLINE_SYNC_BACKOFF_MAX_SECONDS, OFFLINE_SYNC_INTERVALO_S, OFFLINE_MONITOR_INTERVALO_S,
+    OFFLINE_MONITOR_BACKOFF_BASE_S, OFFLINE_MONITOR_BACKOFF_MAX_S, OFFLINE_SONDA_TIMEOUT_S,
+    OFFLINE_CACHE_MAX_BYTES, OFFLINE_CACHE_MAX_ITENS, OFFLINE_CACHE_COTA_PADRAO_BYTES,
+    OFFLINE_CACHE_COTAS_BYTES, OFFLINE_CACHE_TOQUE_S, OFFLINE_CACHE_FOLGA,
+)
 
 logger = logging.getLogger(__name__)
 
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+def ensure_sync_schema_once():
+    """
+    Garante ``uuid_cliente`` (UNIQUE) em ``registros_ponto`` e ``ausencias``
+    no banco principal, uma vez por processo. O UUID gerado no dispositivo
+    torna o reenvio de um lote idempotente (``ON CONFLICT DO NOTHING``).
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+
+    with _schema_lock:
+        if _schema_ready:
+            return
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            for tabela in ('registros_ponto', 'ausencias'):
+                if USE_POSTGRESQL:
+                    cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN IF NOT EXISTS uuid_cliente TEXT")
+                else:
+                    cursor.execute(f"PRAGMA table_info({tabela})")
+                    if 'uuid_cliente' not in {row[1] for row in cursor.fetchall()}:
+                        cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN uuid_cliente TEXT")
+                cursor.execute(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{tabela}_uuid_cliente ON {tabela} (uuid_cliente)"
+                )
+            conn.commit()
+            cursor.close()
+        finally:
+            return_connection(conn)
+        try:
+            from schema_probe import invalidar_schema
+        except ImportError:
+            from ponto_esa_v5.schema_probe import invalidar_schema
+        invalidar_schema()
+        _schema_ready = True
+
+
+def _hora_completa(horario):
+    """``'08:00'`` → ``'08:00:00'`` (o horário informado é salvo sem segundos)."""
+    horario = str(horario)
+    return horario if horario.count(':') >= 2 else horario + ':00'
+
+
+def _linha_registro(row):
+    """Linha de ``registros_offline`` → valores de ``registros_ponto``."""
+    _, uuid_cliente, user_id, data, tipo, horario_informado, horario_real, modalidade, projeto, atividade, localizacao = row
+    data_hora = f"{data} {_hora_completa(horario_informado)}" if horario_informado else horario_real
+    return (user_id, data_hora, tipo, modalidade, projeto, atividade, localizacao, uuid_cliente)
+
+
+def _linha_ausencia(row):
+    """Linha de ``ausencias_offline`` → valores de ``ausencias``."""
+    _, uuid_cliente, user_id, data_inicio, data_fim, tipo, motivo, comprovante = row
+    return (user_id, data_inicio, data_fim or data_inicio, tipo, motivo, comprovante, uuid_cliente)
+
+
+# (tipo na fila, tabela offline, colunas lidas, tabela online, colunas gravadas, conversão)
+_SINCRONIZACAO = (
+    ('registro', 'registros_offline',
+     'id, uuid, user_id, data, tipo, horario_informado, horario_real, modalidade, projeto, atividade, localizacao',
+     'registros_ponto',
+     ('usuario', 'data_hora', 'tipo', 'modalidade', 'projeto', 'atividade', 'localizacao', 'uuid_cliente'),
+     _linha_registro),
+    ('ausencia', 'ausencias_offline',
+     'id, uuid, user_id, data_inicio, data_fim, tipo, motivo, comprovante',
+     'ausencias',
+     ('usuario', 'data_inicio', 'data_fim', 'tipo', 'motivo', 'arquivo_comprovante', 'uuid_cliente'),
+     _linha_ausencia),
+)
+
+
+def _instante(momento=None):
+    """Timestamp da fila em texto ordenável (comparado direto no índice)."""
+    return (momento or agora_br_naive()).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _proxima_tentativa(tentativas):
+    """Backoff exponencial: base, 2×base, 4×base... até o teto."""
+    espera = min(OFFLINE_SYNC_BACKOFF_BASE_SECONDS * 2 ** (tentativas - 1), OFFLINE_SYNC_BACKOFF_MAX_SECONDS)
+    return _instante(agora_br_naive() + datetime.timedelta(seconds=espera))
+
+
+def _namespace_cache(chave):
+    """Namespace do cache: prefixo da chave antes de ``:`` (``'projetos:ativos'`` → ``'projetos'``)."""
+    return chave.split(':', 1)[0] if ':' in chave else 'geral'
+
+
+def _inserir_lote(cursor, tabela, colunas, linhas):
+    """INSERT multi-linha (``OFFLINE_SYNC_LOTE`` linhas por comando) ignorando UUIDs já enviados."""
+    sql = (f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES %s "
+           "ON CONFLICT (uuid_cliente) DO NOTHING")
+    if USE_POSTGRESQL and execute_values is not None:
+        execute_values(cursor, sql, linhas, page_size=OFFLINE_SYNC_LOTE)
+        return
+    marcador = "(" + ", ".join(["?" if not USE_POSTGRESQL else "%s"] * len(colunas)) + ")"
+    for inicio in range(0, len(linhas), OFFLINE_SYNC_LOTE):
+        parte = linhas[inicio:inicio + OFFLINE_SYNC_LOTE]
+        cursor.execute(sql.replace("%s", ", ".join([marcador] * len(parte)), 1),
+                       [valor for linha in parte for valor in linha])
+
+
+def sondar_banco():
+    """
+    Uma sondagem de conectividade com o que a sincronização realmente usa.
+
+    ``OFFLINE_HEALTH_URL`` (se definida) é consultada por HTTP; senão, com
+    PostgreSQL, abre um TCP com o host/porta do banco (``DATABASE_URL`` ou
+    ``DB_HOST``/``DB_PORT``). Com SQLite local o banco principal está sempre
+    acessível.
+    """
+    url_saude = os.getenv('OFFLINE_HEALTH_URL')
+    if url_saude:
+        with urllib.request.urlopen(url_saude, timeout=OFFLINE_SONDA_TIMEOUT_S) as resposta:
+            return resposta.status < 500
+    if not USE_POSTGRESQL:
+        return True
+    database_url = os.getenv('DATABASE_URL')
+    if database_url:
+        partes = urllib.parse.urlsplit(database_url)
+        host, porta = partes.hostname, partes.port or 5432
+    else:
+        host, porta = os.getenv('DB_HOST', 'localhost'), int(os.getenv('DB_PORT', '5432'))
+    socket.create_connection((host, porta), timeout=OFFLINE_SONDA_TIMEOUT_S).close()
+    return True
+
+
+class MonitorConectividade:
+    """
+    Estado de conectividade mantido por uma thread em background.
+
+    A UI só lê ``online`` (nunca espera uma sondagem). Online, a sonda roda a
+    cada ``intervalo``; offline, com backoff exponencial entre
+    ``backoff_base`` e ``backoff_max``. Na volta da conexão (ou na primeira
+    sondagem bem-sucedida) os callbacks de ``ao_reconectar`` são chamados.
+    """
+
+    def __init__(self, sondar=None, intervalo=None, backoff_base=None, backoff_max=None):
+        self._sondar = sondar or sondar_banco
+        self.intervalo = OFFLINE_MONITOR_INTERVALO_S if intervalo is None else intervalo
+        self.backoff_base = OFFLINE_MONITOR_BACKOFF_BASE_S if backoff_base is None else backoff_base
+        self.backoff_max = OFFLINE_MONITOR_BACKOFF_MAX_S if backoff_max is None else backoff_max
+        self.online = None  # desconhecido até a primeira sondagem
+        self.falhas_seguidas = 0
+        self.ultima_sondagem = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def ao_reconectar(self, callback):
+        """Registra ``callback()``, chamado na transição para online."""
+        self._callbacks.append(callback)
+
+    def sondar(self):
+        """Executa uma sondagem, atualiza o estado e dispara a reconexão."""
+        try:
+            online = bool(self._sondar())
+        except Exception as e:
+            logger.debug("Sondagem de conectividade falhou: %s", e)
+            online = False
+        with self._lock:
+            voltou = online and self.online is not True
+            self.online = online
+            self.falhas_seguidas = 0 if online else self.falhas_seguidas + 1
+            self.ultima_sondagem = agora_br_naive()
+        if voltou:
+            for callback in list(self._callbacks):
+                try:
+                    callback()
+                except Exception as e:
+                    logger.warning("Callback de reconexão falhou: %s", e)
+        return online
+
+    def proxima_espera(self):
+        """Segundos até a próxima sondagem."""
+        if self.online:
+            return self.intervalo
+        return min(self.backoff_base * 2 ** max(self.falhas_seguidas - 1, 0), self.backoff_max)
+
+    def verificar_agora(self):
+        """Antecipa a próxima sondagem (ex.: após uma falha de sincronização)."""
+        self._acordar.set()
+
+    def iniciar(self):
+        """Inicia a thread do monitor (idempotente)."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._loop, name="monitor-conectividade", daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        self._acordar.set()
+
+    def _loop(self):
+        while True:
+            # Limpa antes de sondar: um pedido que chega durante a sondagem
+            # (ou entre o wait e a próxima volta) antecipa a seguinte
+            self._acordar.clear()
+            if self._parar.is_set():
+                break
+            self.sondar()
+            self._acordar.wait(self.proxima_espera())
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def obter_monitor():
+    """Monitor de conectividade do processo, iniciado no primeiro uso."""
+    global _monitor
+    if _monitor is None:
+        with _monitor_lock:
+            if _monitor is None:
+                _monitor = MonitorConectividade()
+                _monitor.iniciar()
+    return _monitor
+
+
 class OfflineSystem:
     """Sistema de gerenciamento offline"""
     
     def __init__(self):
         self.offline_db_path = "database/offline_ponto_esa.db"
-        self.sync_queue_path = "database/sync_queue.json"
+        self.sync_queue_path = "database/sync_queue.json"  # formato antigo, importado para sync_queue
+        self.cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
         self.init_offline_db()
     
     def init_offline_db(self):
         """Inicializa banco de dados offline"""
         os.makedirs("database", exist_ok=True)
         
-        conn = sqlite3.connect(self.offline_db_path)
+        conn = self._conectar()
         cursor = conn.cursor()
+        # WAL: quem grava batidas não espera a leitura da sincronização
+        cursor.execute("PRAGMA journal_mode=WAL")
         
         # Tabela de registros offline
         cursor.execute('''
@@ -44,7 +295,8 @@ class OfflineSystem:
                 localizacao TEXT,
                 ip_address TEXT,
                 synced INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                uuid TEXT
             )
         ''')
         
@@ -59,7 +311,8 @@ class OfflineSystem:
                 motivo TEXT,
                 comprovante TEXT,
                 synced INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                uuid TEXT
             )
         ''')
         
@@ -74,205 +327,255 @@ class OfflineSystem:
             )
         ''')
         
+        # Fila de sincronização: enfileirar é um INSERT, os itens vencidos saem
+        # pelo índice de next_attempt_at e falhas reagendam com backoff
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sync_queue (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tipo TEXT NOT NULL,
+                item_id INTEGER NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at TIMESTAMP NOT NULL,
+                last_error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (tipo, item_id)
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sync_queue_vencimento ON sync_queue (next_attempt_at)")
+        
+        # Cache limitado: namespace/tamanho para as cotas, last_access_at para o LRU
+        cursor.execute("PRAGMA table_info(cache_dados)")
+        colunas_cache = {row[1] for row in cursor.fetchall()}
+        for coluna, tipo_coluna in (('namespace', "TEXT NOT NULL DEFAULT 'geral'"),
+                                    ('tamanho', 'INTEGER NOT NULL DEFAULT 0'),
+                                    ('last_access_at', 'TIMESTAMP')):
+            if coluna not in colunas_cache:
+                cursor.execute(f"ALTER TABLE cache_dados ADD COLUMN {coluna} {tipo_coluna}")
+        if 'tamanho' not in colunas_cache:
+            cursor.execute("UPDATE cache_dados SET tamanho = length(CAST(valor AS BLOB)) WHERE valor IS NOT NULL")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cache_dados_expires ON cache_dados (expires_at)")
+        # tamanho no índice: as somas de cota/total leem só o índice, não os valores
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cache_dados_lru ON cache_dados (namespace, last_access_at, tamanho)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cache_dados_acesso ON cache_dados (last_access_at)")
+        # Itens gravados antes do LRU: sem acesso registrado, NULL ordenaria como o
+        # mais antigo de todos; o último acesso conhecido é a gravação
+        cursor.execute("UPDATE cache_dados SET last_access_at = COALESCE(updated_at, ?) WHERE last_access_at IS NULL",
+                       (_instante(),))
+        
+        # Bancos offline anteriores ao uuid: cria a coluna e preenche as pendentes
+        for tabela in ('registros_offline', 'ausencias_offline'):
+            cursor.execute(f"PRAGMA table_info({tabela})")
+            if 'uuid' not in {row[1] for row in cursor.fetchall()}:
+                cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN uuid TEXT")
+            cursor.execute(f"UPDATE {tabela} SET uuid = lower(hex(randomblob(16))) WHERE uuid IS NULL")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{tabela}_synced ON {tabela} (synced, id)")
+        
+        self._importar_fila_json(cursor)
+        # Pendentes sem item na fila (fila antiga perdida) voltam a ser enfileirados
+        for tipo, origem, _, _, _, _ in _SINCRONIZACAO:
+            cursor.execute(f'''
+                INSERT OR IGNORE INTO sync_queue (tipo, item_id, next_attempt_at)
+                SELECT ?, id, ? FROM {origem} WHERE synced = 0
+            ''', (tipo, _instante()))
+        
         conn.commit()
         return_connection(conn)
     
-    def is_online(self):
-        """Verifica se há conexão com internet"""
+    def _conectar(self):
+        """Conexão com o banco offline (espera o lock de outra thread em vez de falhar)."""
+        return sqlite3.connect(self.offline_db_path, timeout=30)
+    
+    def _importar_fila_json(self, cursor):
+        """Move a fila do antigo ``sync_queue.json`` para a tabela e apaga o arquivo."""
+        if not os.path.exists(self.sync_queue_path):
+            return
         try:
-            import urllib.request
-            urllib.request.urlopen('http://www.google.com', timeout=3)
-            return True
+            with open(self.sync_queue_path, 'r') as f:
+                itens = json.load(f)
         except Exception as e:
-            logger.debug("Verificação de conexão falhou: %s", e)
-            return False
+            logger.warning("Erro ao carregar fila de sincronização antiga: %s", e)
+            itens = []
+        cursor.executemany(
+            "INSERT OR IGNORE INTO sync_queue (tipo, item_id, attempts, next_attempt_at) VALUES (?, ?, ?, ?)",
+            [(item['tipo'], item['item_id'], item.get('attempts', 0), _instante()) for item in itens],
+        )
+        os.remove(self.sync_queue_path)
+    
+    def is_online(self):
+        """
+        Estado de conexão mantido pelo monitor em background (sem sondar aqui).
+
+        Antes da primeira sondagem o estado é desconhecido e conta como online:
+        a tentativa de sincronização falha rápido e reagenda com backoff.
+        """
+        return obter_monitor().online is not False
     
     def save_offline_registro(self, user_id, data, tipo, horario_informado, modalidade, projeto, atividade, localizacao=""):
         """Salva registro offline"""
-        conn = sqlite3.connect(self.offline_db_path)
+        conn = self._conectar()
         cursor = conn.cursor()
         
         cursor.execute('''
             INSERT INTO registros_offline 
-            (user_id, data, tipo, horario_informado, modalidade, projeto, atividade, localizacao)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (user_id, data, tipo, horario_informado, modalidade, projeto, atividade, localizacao))
+            (user_id, data, tipo, horario_informado, modalidade, projeto, atividade, localizacao, uuid)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (user_id, data, tipo, horario_informado, modalidade, projeto, atividade, localizacao, str(uuid.uuid4())))
+        
+        # Adicionar à fila de sincronização (mesma transação do registro)
+        self.add_to_sync_queue('registro', cursor.lastrowid, cursor)
         
         conn.commit()
         return_connection(conn)
-        
-        # Adicionar à fila de sincronização
-        self.add_to_sync_queue('registro', cursor.lastrowid)
         return True
     
     def save_offline_ausencia(self, user_id, data_inicio, data_fim, tipo, motivo):
         """Salva ausência offline"""
-        conn = sqlite3.connect(self.offline_db_path)
+        conn = self._conectar()
         cursor = conn.cursor()
         
         cursor.execute('''
             INSERT INTO ausencias_offline 
-            (user_id, data_inicio, data_fim, tipo, motivo)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user_id, data_inicio, data_fim, tipo, motivo))
+            (user_id, data_inicio, data_fim, tipo, motivo, uuid)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (user_id, data_inicio, data_fim, tipo, motivo, str(uuid.uuid4())))
+        
+        # Adicionar à fila de sincronização (mesma transação da ausência)
+        self.add_to_sync_queue('ausencia', cursor.lastrowid, cursor)
         
         conn.commit()
         return_connection(conn)
-        
-        # Adicionar à fila de sincronização
-        self.add_to_sync_queue('ausencia', cursor.lastrowid)
         return True
     
-    def add_to_sync_queue(self, tipo, item_id):
-        """Adiciona item à fila de sincronização"""
-        queue_item = {
-            'tipo': tipo,
-            'item_id': item_id,
-            'timestamp': agora_br().isoformat(),
-            'attempts': 0
-        }
-        
-        # Carregar fila existente
-        sync_queue = self.load_sync_queue()
-        sync_queue.append(queue_item)
-        
-        # Salvar fila atualizada
-        with open(self.sync_queue_path, 'w') as f:
-            json.dump(sync_queue, f, indent=2)
+    def add_to_sync_queue(self, tipo, item_id, cursor=None):
+        """Adiciona item à fila de sincronização (um INSERT; repetido é ignorado)"""
+        sql = "INSERT OR IGNORE INTO sync_queue (tipo, item_id, next_attempt_at) VALUES (?, ?, ?)"
+        if cursor is not None:
+            cursor.execute(sql, (tipo, item_id, _instante()))
+            return
+        
+        conn = self._conectar()
+        with conn:
+            conn.execute(sql, (tipo, item_id, _instante()))
+        conn.close()
     
     def load_sync_queue(self):
         """Carrega fila de sincronização"""
-        if os.path.exists(self.sync_queue_path):
-            try:
-                with open(self.sync_queue_path, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.warning("Erro ao carregar fila de sincronização: %s", e)
-                return []
-        return []
+        conn = self._conectar()
+        try:
+            cursor = conn.execute(
+                "SELECT tipo, item_id, attempts, next_attempt_at, created_at FROM sync_queue ORDER BY id"
+            )
+            return [
+                {'tipo': tipo, 'item_id': item_id, 'attempts': attempts,
+                 'next_attempt_at': proxima, 'timestamp': criado}
+                for tipo, item_id, attempts, proxima, criado in cursor.fetchall()
+            ]
+        finally:
+            conn.close()
     
     def sync_to_online(self):
         """Sincroniza dados offline com banco online"""
         if not self.is_online():
             return False, "Sem conexão com internet"
         
-        sync_queue = self.load_sync_queue()
-        synced_items = []
-        errors = []
+        try:
+            enviados = self.sincronizar_pendentes()
+        except Exception as e:
+            logger.warning("Erro na sincronização offline: %s", e)
+            # A falha pode ser a conexão caindo: o monitor confirma já
+            obter_monitor().verificar_agora()
+            return False, f"Sincronizados: 0, Erros: 1 ({e})"
         
-        for item in sync_queue:
-            try:
-                if item['tipo'] == 'registro':
-                    success = self.sync_registro(item['item_id'])
-                elif item['tipo'] == 'ausencia':
-                    success = self.sync_ausencia(item['item_id'])
-                else:
-                    success = False
-                
-                if success:
-                    synced_items.append(item)
-                else:
-                    item['attempts'] += 1
-                    if item['attempts'] >= 3:
-                        errors.append(f"Falha ao sincronizar {item['tipo']} ID {item['item_id']}")
-                        synced_items.append(item)  # Remove da fila após 3 tentativas
+        total = sum(enviados.values())
+        return total > 0, f"Sincronizados: {total}, Erros: 0"
+    
+    def sincronizar_pendentes(self):
+        """
+        Envia os itens vencidos da fila numa única transação do banco principal
+        (``database.get_connection``, SQLite ou PostgreSQL).
+
+        Uma consulta por tipo (fila vencida pelo índice de ``next_attempt_at``
+        junto da tabela offline), INSERTs multi-linha em
+        ``registros_ponto``/``ausencias`` e, no banco offline, marcação em massa
+        e remoção da fila na mesma transação. Se o envio falhar, os itens são
+        reagendados com backoff exponencial. Se a marcação se perder (queda
+        entre o commit online e o offline), o próximo envio repete os mesmos
+        UUIDs e o banco principal os ignora.
+
+        Retorna ``{tipo: linhas enviadas}``.
+        """
+        agora = _instante()
+        conn_offline = self._conectar()
+        try:
+            pendentes = {}
+            for tipo, origem, colunas, _, _, _ in _SINCRONIZACAO:
+                colunas_origem = ", ".join(f"o.{coluna}" for coluna in colunas.split(", "))
+                pendentes[tipo] = conn_offline.execute(f"""
+                    SELECT q.attempts, {colunas_origem}
+                    FROM sync_queue q JOIN {origem} o ON o.id = q.item_id
+                    WHERE q.next_attempt_at <= ? AND q.tipo = ? AND o.synced = 0
+                    ORDER BY o.id
+                """, (agora, tipo)).fetchall()
+            if not any(pendentes.values()):
+                return {tipo: 0 for tipo in pendentes}
             
+            try:
+                ensure_sync_schema_once()
+                conn = get_connection()
+                try:
+                    cursor = conn.cursor()
+                    for tipo, _, _, destino, colunas_destino, converter in _SINCRONIZACAO:
+                        if pendentes[tipo]:
+                            _inserir_lote(cursor, destino, colunas_destino,
+                                          [converter(row[1:]) for row in pendentes[tipo]])
+                    conn.commit()
+                    cursor.close()
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    return_connection(conn)
             except Exception as e:
-                errors.append(f"Erro ao sincronizar {item['tipo']} ID {item['item_id']}: {str(e)}")
-                item['attempts'] += 1
-        
-        # Remover itens sincronizados da fila
-        remaining_queue = [item for item in sync_queue if item not in synced_items]
-        
-        with open(self.sync_queue_path, 'w') as f:
-            json.dump(remaining_queue, f, indent=2)
+                with conn_offline:
+                    conn_offline.executemany(
+                        "UPDATE sync_queue SET attempts = ?, next_attempt_at = ?, last_error = ? "
+                        "WHERE tipo = ? AND item_id = ?",
+                        [(row[0] + 1, _proxima_tentativa(row[0] + 1), str(e)[:500], tipo, row[1])
+                         for tipo, rows in pendentes.items() for row in rows],
+                    )
+                raise
+            
+            with conn_offline:
+                for tipo, origem, _, _, _, _ in _SINCRONIZACAO:
+                    ids = json.dumps([row[1] for row in pendentes[tipo]])
+                    conn_offline.execute(
+                        f"UPDATE {origem} SET synced = 1 WHERE id IN (SELECT value FROM json_each(?))", (ids,)
+                    )
+                    conn_offline.execute(
+                        "DELETE FROM sync_queue WHERE tipo = ? AND item_id IN (SELECT value FROM json_each(?))",
+                        (tipo, ids),
+                    )
+        finally:
+            conn_offline.close()
         
-        return len(synced_items) > 0, f"Sincronizados: {len(synced_items)}, Erros: {len(errors)}"
+        return {tipo: len(rows) for tipo, rows in pendentes.items()}
     
     def sync_registro(self, offline_id):
-        """Sincroniza registro específico"""
+        """Sincroniza registro específico (envia junto todos os pendentes)"""
         try:
-            # Buscar registro offline
-            conn_offline = sqlite3.connect(self.offline_db_path)
-            cursor_offline = conn_offline.cursor()
-            
-            cursor_offline.execute('''
-                SELECT * FROM registros_offline WHERE id = ? AND synced = 0
-            ''', (offline_id,))
-            
-            registro = cursor_offline.fetchone()
-            conn_offline.close()
-            
-            if not registro:
-                return True  # Já foi sincronizado
-            
-            # Inserir no banco online
-            conn_online = sqlite3.connect('database/ponto_esa.db')
-            cursor_online = conn_online.cursor()
-            
-            cursor_online.execute('''
-                INSERT INTO registros 
-                (user_id, data, tipo, horario_informado, modalidade, projeto, atividade, localizacao, horario_real)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (registro[1], registro[2], registro[3], registro[4], registro[6], registro[7], registro[8], registro[9], registro[5]))
-            
-            conn_online.commit()
-            conn_online.close()
-            
-            # Marcar como sincronizado
-            conn_offline = sqlite3.connect(self.offline_db_path)
-            cursor_offline = conn_offline.cursor()
-            cursor_offline.execute('UPDATE registros_offline SET synced = 1 WHERE id = ?', (offline_id,))
-            conn_offline.commit()
-            conn_offline.close()
-            
+            self.sincronizar_pendentes()
             return True
-            
         except Exception as e:
-            print(f"Erro ao sincronizar registro {offline_id}: {str(e)}")
+            logger.error("Erro ao sincronizar registro %s: %s", offline_id, e)
             return False
     
     def sync_ausencia(self, offline_id):
-        """Sincroniza ausência específica"""
+        """Sincroniza ausência específica (envia junto todas as pendentes)"""
         try:
-            # Buscar ausência offline
-            conn_offline = sqlite3.connect(self.offline_db_path)
-            cursor_offline = conn_offline.cursor()
-            
-            cursor_offline.execute('''
-                SELECT * FROM ausencias_offline WHERE id = ? AND synced = 0
-            ''', (offline_id,))
-            
-            ausencia = cursor_offline.fetchone()
-            conn_offline.close()
-            
-            if not ausencia:
-                return True  # Já foi sincronizado
-            
-            # Inserir no banco online
-            conn_online = sqlite3.connect('database/ponto_esa.db')
-            cursor_online = conn_online.cursor()
-            
-            cursor_online.execute('''
-                INSERT INTO ausencias 
-                (user_id, data_inicio, data_fim, tipo, motivo)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (ausencia[1], ausencia[2], ausencia[3], ausencia[4], ausencia[5]))
-            
-            conn_online.commit()
-            conn_online.close()
-            
-            # Marcar como sincronizado
-            conn_offline = sqlite3.connect(self.offline_db_path)
-            cursor_offline = conn_offline.cursor()
-            cursor_offline.execute('UPDATE ausencias_offline SET synced = 1 WHERE id = ?', (offline_id,))
-            conn_offline.commit()
-            conn_offline.close()
-            
+            self.sincronizar_pendentes()
             return True
-            
         except Exception as e:
-            print(f"Erro ao sincronizar ausência {offline_id}: {str(e)}")
+            logger.error("Erro ao sincronizar ausência %s: %s", offline_id, e)
             return False
     
     def get_offline_registros(self, user_id, data=None):
@@ -301,56 +604,133 @@ class OfflineSystem:
         
         return registros
     
-    def cache_data(self, chave, valor, expires_minutes=60):
-        """Armazena dados no cache"""
-        conn = sqlite3.connect(self.offline_db_path)
+    def cache_data(self, chave, valor, expires_minutes=60, namespace=None):
+        """
+        Armazena dados no cache
+
+        Na mesma transação remove os expirados e, se o namespace passar da
+        cota ou o cache passar de ``OFFLINE_CACHE_MAX_BYTES`` /
+        ``OFFLINE_CACHE_MAX_ITENS``, os itens acessados há mais tempo.
+        """
+        namespace = namespace or _namespace_cache(chave)
+        conteudo = json.dumps(valor)
+        agora = agora_br_naive()
+        
+        conn = self._conectar()
         cursor = conn.cursor()
         
-        expires_at = agora_br_naive() + datetime.timedelta(minutes=expires_minutes)
-        
         cursor.execute('''
-            INSERT OR REPLACE INTO cache_dados (chave, valor, expires_at)
-            VALUES (?, ?, ?)
-        ''', (chave, json.dumps(valor), expires_at))
+            INSERT OR REPLACE INTO cache_dados (chave, valor, expires_at, namespace, tamanho, last_access_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (chave, conteudo, _instante(agora + datetime.timedelta(minutes=expires_minutes)),
+              namespace, len(conteudo.encode('utf-8')), _instante(agora), _instante(agora)))
+        
+        cursor.execute("DELETE FROM cache_dados WHERE expires_at <= ?", (_instante(agora),))
+        
+        # Só ordena por LRU quando algum limite estourou, e então desce até
+        # OFFLINE_CACHE_FOLGA do limite para a próxima gravação não repetir a poda
+        cota = OFFLINE_CACHE_COTAS_BYTES.get(namespace, OFFLINE_CACHE_COTA_PADRAO_BYTES)
+        cursor.execute("SELECT TOTAL(tamanho) FROM cache_dados WHERE namespace = ?", (namespace,))
+        if cursor.fetchone()[0] > cota:
+            # Mantém os mais recentes enquanto a soma couber na cota
+            cursor.execute('''
+                DELETE FROM cache_dados WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id, SUM(tamanho) OVER (ORDER BY last_access_at DESC, id DESC) AS acumulado
+                        FROM cache_dados WHERE namespace = ?
+                    ) WHERE acumulado > ?
+                )
+            ''', (namespace, int(cota * OFFLINE_CACHE_FOLGA)))
+            self.cache_stats['evictions'] += cursor.rowcount
+        cursor.execute("SELECT COUNT(*), TOTAL(tamanho) FROM cache_dados")
+        itens, total = cursor.fetchone()
+        if itens > OFFLINE_CACHE_MAX_ITENS or total > OFFLINE_CACHE_MAX_BYTES:
+            cursor.execute('''
+                DELETE FROM cache_dados WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id,
+                               SUM(tamanho) OVER (ORDER BY last_access_at DESC, id DESC) AS acumulado,
+                               ROW_NUMBER() OVER (ORDER BY last_access_at DESC, id DESC) AS posicao
+                        FROM cache_dados
+                    ) WHERE acumulado > ? OR posicao > ?
+                )
+            ''', (int(OFFLINE_CACHE_MAX_BYTES * OFFLINE_CACHE_FOLGA), int(OFFLINE_CACHE_MAX_ITENS * OFFLINE_CACHE_FOLGA)))
+            self.cache_stats['evictions'] += cursor.rowcount
         
         conn.commit()
         return_connection(conn)
     
     def get_cached_data(self, chave):
         """Recupera dados do cache"""
-        conn = sqlite3.connect(self.offline_db_path)
+        agora = agora_br_naive()
+        conn = self._conectar()
         cursor = conn.cursor()
         
         cursor.execute('''
-            SELECT valor FROM cache_dados 
-            WHERE chave = ? AND expires_at > datetime('now')
-        ''', (chave,))
+            SELECT id, valor, last_access_at FROM cache_dados 
+            WHERE chave = ? AND expires_at > ?
+        ''', (chave, _instante(agora)))
         
         result = cursor.fetchone()
+        if result and (result[2] or '') < _instante(agora - datetime.timedelta(seconds=OFFLINE_CACHE_TOQUE_S)):
+            # Toque do LRU com granularidade de OFFLINE_CACHE_TOQUE_S: leituras
+            # seguidas da mesma chave não viram uma escrita cada
+            cursor.execute("UPDATE cache_dados SET last_access_at = ? WHERE id = ?", (_instante(agora), result[0]))
+            conn.commit()
         return_connection(conn)
         
         if result:
-            return json.loads(result[0])
+            self.cache_stats['hits'] += 1
+            return json.loads(result[1])
+        self.cache_stats['misses'] += 1
         return None
     
     def cleanup_old_cache(self):
         """Remove dados expirados do cache"""
-        conn = sqlite3.connect(self.offline_db_path)
+        conn = self._conectar()
         cursor = conn.cursor()
         
-        cursor.execute("DELETE FROM cache_dados WHERE expires_at <= datetime('now')")
+        cursor.execute("DELETE FROM cache_dados WHERE expires_at <= ?", (_instante(),))
         
         conn.commit()
         return_connection(conn)
     
+    def get_cache_stats(self):
+        """Tamanho do cache (total e por namespace) e taxa de acerto desta instância"""
+        conn = self._conectar()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT namespace, COUNT(*), COALESCE(SUM(tamanho), 0) FROM cache_dados GROUP BY namespace
+        ''')
+        por_namespace = {
+            namespace: {'itens': itens, 'bytes': tamanho,
+                        'cota_bytes': OFFLINE_CACHE_COTAS_BYTES.get(namespace, OFFLINE_CACHE_COTA_PADRAO_BYTES)}
+            for namespace, itens, tamanho in cursor.fetchall()
+        }
+        return_connection(conn)
+        
+        consultas = self.cache_stats['hits'] + self.cache_stats['misses']
+        return {
+            'itens': sum(n['itens'] for n in por_namespace.values()),
+            'bytes': sum(n['bytes'] for n in por_namespace.values()),
+            'max_itens': OFFLINE_CACHE_MAX_ITENS,
+            'max_bytes': OFFLINE_CACHE_MAX_BYTES,
+            'hits': self.cache_stats['hits'],
+            'misses': self.cache_stats['misses'],
+            'evictions': self.cache_stats['evictions'],
+            'taxa_acerto': self.cache_stats['hits'] / consultas if consultas else None,
+            'por_namespace': por_namespace,
+        }
+    
     def get_sync_status(self):
         """Retorna status da sincronização"""
-        sync_queue = self.load_sync_queue()
-        
         # Contar registros não sincronizados
-        conn = sqlite3.connect(self.offline_db_path)
+        conn = self._conectar()
         cursor = conn.cursor()
         
+        cursor.execute("SELECT COUNT(*) FROM sync_queue")
+        queue_size = cursor.fetchone()[0]
+        
         cursor.execute("SELECT COUNT(*) FROM registros_offline WHERE synced = 0")
         registros_pendentes = cursor.fetchone()[0]
         
@@ -361,7 +741,7 @@ class OfflineSystem:
         
         return {
             'online': self.is_online(),
-            'queue_size': len(sync_queue),
+            'queue_size': queue_size,
             'registros_pendentes': registros_pendentes,
             'ausencias_pendentes': ausencias_pendentes,
             'total_pendentes': registros_pendentes + ausencias_pendentes
@@ -372,25 +752,44 @@ def init_offline_system():
     """Inicializa sistema offline"""
     return OfflineSystem()
 
+_sync_thread = None
+_sync_lock = threading.Lock()
+
+
 def auto_sync():
-    """Executa sincronização automática em background"""
-    import threading
-    import time
-    
-    def sync_worker():
+    """
+    Executa sincronização automática em background.
+
+    Sincroniza a cada ``OFFLINE_SYNC_INTERVALO_S`` enquanto online e na hora
+    em que a conexão volta (aviso do monitor); offline, não sonda nem tenta.
+    Idempotente: cada rerun do Streamlit chama de novo e reaproveita a thread
+    (e o callback no monitor) já registrados.
+    """
+    global _sync_thread
+    with _sync_lock:
+        if _sync_thread is not None and _sync_thread.is_alive():
+            return _sync_thread
+        
         offline_system = OfflineSystem()
-        while True:
-            try:
-                if offline_system.is_online():
+        monitor = obter_monitor()
+        sincronizar = threading.Event()
+        monitor.ao_reconectar(sincronizar.set)
+        
+        def sync_worker():
+            while True:
+                sincronizar.wait(OFFLINE_SYNC_INTERVALO_S)
+                sincronizar.clear()
+                if monitor.online is False:
+                    continue
+                try:
                     offline_system.sync_to_online()
                     offline_system.cleanup_old_cache()
-                time.sleep(60)  # Tentar sincronizar a cada minuto
-            except Exception as e:
-                print(f"Erro na sincronização automática: {str(e)}")
-                time.sleep(300)  # Aguardar 5 minutos em caso de erro
-    
-    sync_thread = threading.Thread(target=sync_worker, daemon=True)
-    sync_thread.start()
+                except Exception as e:
+                    logger.error("Erro na sincronização automática: %s", e)
+        
+        _sync_thread = threading.Thread(target=sync_worker, name="auto-sync", daemon=True)
+        _sync_thread.start()
+        return _sync_thread
 
 # Integração com JavaScript para PWA offline
 OFFLINE_JS = """
@@ -6,23 +6,199 @@ Estratégia de migração:
 2. Login de usuário existente → verifica hash:
    a) Se começa com "$2b$" → bcrypt, verifica normalmente.
    b) Senão → assume SHA256 legado, verifica via sha256, e se válido,
-      re-hash para bcrypt in-place (upgrade transparente).
+      re-hash para bcrypt (upgrade transparente).
 3. Nenhum usuário fica sem acesso durante a migração.
+
+Desempenho:
+- ``bcrypt.checkpw``/``hashpw`` rodam num pool de processos limitado
+  (``PASSWORD_VERIFY_MAX_WORKERS``), fora da thread do script Streamlit;
+  se o pool não estiver disponível, o cálculo é feito localmente.
+- O custo (rounds) é calibrado uma vez por processo para ~``BCRYPT_TARGET_MS``;
+  hashes bcrypt com custo menor que o calibrado são refeitos no login.
+- Os UPDATEs de upgrade de hash são enfileirados e gravados em lote por uma
+  thread de fundo. Um upgrade perdido (ex.: restart) é refeito no próximo login.
 """
 
+import atexit
 import hashlib
 import logging
+import math
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Optional
 
 import bcrypt
 
 from database import get_connection, return_connection, SQL_PLACEHOLDER
+from constants import (
+    PASSWORD_VERIFY_MAX_WORKERS,
+    PASSWORD_VERIFY_TIMEOUT_SECONDS,
+    BCRYPT_TARGET_MS,
+    BCRYPT_MIN_ROUNDS,
+    BCRYPT_MAX_ROUNDS,
+    PASSWORD_UPGRADE_BATCH_SIZE,
+    PASSWORD_UPGRADE_FLUSH_SECONDS,
+)
 
 logger = logging.getLogger(__name__)
 
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_pool_indisponivel = False
+
+_bcrypt_rounds: Optional[int] = None
+
+# (novo_hash, usuario, hash_antigo) aguardando gravação em lote
+_fila_upgrades: "queue.Queue[tuple]" = queue.Queue()
+_writer_thread: Optional[threading.Thread] = None
+_writer_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Pool de processos
+# ---------------------------------------------------------------------------
+
+def _max_workers() -> int:
+    """Limite de concorrência do pool (env ``PASSWORD_VERIFY_MAX_WORKERS``)."""
+    try:
+        configurado = int(os.getenv("PASSWORD_VERIFY_MAX_WORKERS", PASSWORD_VERIFY_MAX_WORKERS))
+    except ValueError:
+        configurado = PASSWORD_VERIFY_MAX_WORKERS
+    return max(0, min(configurado, os.cpu_count() or 1))
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    """Retorna o pool de verificação (criado sob demanda) ou None se desabilitado."""
+    global _pool, _pool_indisponivel
+    if _pool is not None or _pool_indisponivel:
+        return _pool
+
+    with _pool_lock:
+        if _pool is not None or _pool_indisponivel:
+            return _pool
+        workers = _max_workers()
+        if workers <= 0:
+            _pool_indisponivel = True
+            return None
+        try:
+            # 'spawn': os workers só importam bcrypt (as tarefas são funções
+            # do próprio bcrypt), sem herdar conexões/threads do app.
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        except Exception as e:
+            logger.warning("Pool de verificação de senhas indisponível, usando thread local: %s", e)
+            _pool_indisponivel = True
+        return _pool
+
+
+def _descartar_pool() -> None:
+    """Descarta um pool quebrado; o próximo uso cria outro."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _executar_bcrypt(func, *args):
+    """Executa ``func(*args)`` no pool, com fallback local em caso de falha.
+
+    Se o pool demorar mais que ``PASSWORD_VERIFY_TIMEOUT_SECONDS``, a tarefa
+    ainda na fila é cancelada e calculada localmente; se já estiver rodando
+    num worker, espera o resultado — nunca o mesmo hash é calculado duas vezes.
+    """
+    pool = _get_pool()
+    if pool is not None:
+        try:
+            futuro = pool.submit(func, *args)
+            try:
+                return futuro.result(timeout=PASSWORD_VERIFY_TIMEOUT_SECONDS)
+            except FutureTimeoutError:
+                if not futuro.cancel():
+                    return futuro.result()
+                logger.warning("Pool de senhas saturado (> %ss); verificando localmente", PASSWORD_VERIFY_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.warning("Falha no pool de senhas, recriando: %s", e)
+            _descartar_pool()
+    return func(*args)
+
+
+def encerrar_pool_senhas() -> None:
+    """Encerra o pool de processos (chamado no atexit)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(encerrar_pool_senhas)
+
+
+# ---------------------------------------------------------------------------
+# Custo adaptativo
+# ---------------------------------------------------------------------------
+
+def calibrar_custo_bcrypt(alvo_ms: float = BCRYPT_TARGET_MS) -> int:
+    """Calcula os rounds bcrypt para que um hash leve aproximadamente ``alvo_ms``.
+
+    Mede um hash no custo mínimo; cada round adicional dobra o tempo. O
+    mínimo é o default de ``bcrypt.gensalt()`` (12): num host rápido a
+    calibração só aumenta o custo, nunca o reduz.
+
+    Returns:
+        Rounds entre ``BCRYPT_MIN_ROUNDS`` e ``BCRYPT_MAX_ROUNDS``.
+    """
+    global _bcrypt_rounds
+    inicio = time.perf_counter()
+    bcrypt.hashpw(b"calibracao", bcrypt.gensalt(BCRYPT_MIN_ROUNDS))
+    base_ms = max((time.perf_counter() - inicio) * 1000, 0.001)
+
+    extras = int(math.floor(math.log2(alvo_ms / base_ms))) if alvo_ms > base_ms else 0
+    rounds = max(BCRYPT_MIN_ROUNDS, min(BCRYPT_MAX_ROUNDS, BCRYPT_MIN_ROUNDS + extras))
+    _bcrypt_rounds = rounds
+    logger.info("Custo bcrypt calibrado: %s rounds (%.0f ms no custo %s)", rounds, base_ms, BCRYPT_MIN_ROUNDS)
+    return rounds
+
+
+def _rounds() -> int:
+    """Rounds em uso (calibra na primeira chamada)."""
+    rounds = _bcrypt_rounds
+    return rounds if rounds is not None else calibrar_custo_bcrypt()
+
+
+def _rounds_do_hash(hashed: str) -> int:
+    """Extrai o custo de um hash bcrypt (``$2b$12$...`` → 12)."""
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+def iniciar_pool_senhas() -> None:
+    """Calibra o custo e sobe os workers antes do primeiro login."""
+    _rounds()
+    pool = _get_pool()
+    if pool is not None:
+        # Força a criação dos processos agora (spawn é lento na primeira vez).
+        for _ in range(_max_workers()):
+            pool.submit(bcrypt.gensalt, BCRYPT_MIN_ROUNDS)
+
+
+# ---------------------------------------------------------------------------
+# Hash / verificação
+# ---------------------------------------------------------------------------
 
 def hash_password(plain: str) -> str:
     """Gera hash bcrypt com salt automático para uma senha em texto plano."""
-    return bcrypt.hashpw(plain.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    salt = bcrypt.gensalt(_rounds())
+    return _executar_bcrypt(bcrypt.hashpw, plain.encode("utf-8"), salt).decode("utf-8")
 
 
 def _is_bcrypt(hashed: str) -> bool:
@@ -39,51 +215,138 @@ def _verify_sha256_legacy(plain: str, hashed: str) -> bool:
     return hashlib.sha256(plain.encode()).hexdigest() == hashed
 
 
+def _checkpw(plain: str, hashed: str) -> bool:
+    """``bcrypt.checkpw`` executado no pool de processos."""
+    return bool(_executar_bcrypt(bcrypt.checkpw, plain.encode("utf-8"), hashed.encode("utf-8")))
+
+
 def verify_password(plain: str, hashed: str) -> bool:
     """Verifica senha contra hash (bcrypt ou SHA256 legado)."""
     if not hashed:
         return False
     if _is_bcrypt(hashed):
-        return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
+        return _checkpw(plain, hashed)
     return _verify_sha256_legacy(plain, hashed)
 
 
 def verify_and_upgrade(plain: str, hashed: str, usuario: str) -> bool:
     """Verifica senha e, se for SHA256 legado válido, faz upgrade para bcrypt.
-    
+
+    Hashes bcrypt com custo abaixo do calibrado também são refeitos. O
+    upgrade é assíncrono e não atrasa o login.
+
     Args:
         plain: Senha em texto plano digitada pelo usuário.
         hashed: Hash armazenado no banco.
         usuario: Login do usuário (para UPDATE).
-    
+
     Returns:
         True se a senha é válida, False caso contrário.
     """
     if not hashed:
         return False
     if _is_bcrypt(hashed):
-        return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
-    
+        if not _checkpw(plain, hashed):
+            return False
+        if _rounds_do_hash(hashed) < _rounds():
+            _agendar_upgrade(plain, hashed, usuario)
+        return True
+
     # Verificar SHA256 legado
     if not _verify_sha256_legacy(plain, hashed):
         return False
-    
+
     # Senha SHA256 válida → upgrade para bcrypt
+    _agendar_upgrade(plain, hashed, usuario)
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Upgrade de hash em lote
+# ---------------------------------------------------------------------------
+
+def _agendar_upgrade(plain: str, hash_antigo: str, usuario: str) -> None:
+    """Gera o novo hash no pool e enfileira o UPDATE (falhas não impedem o login)."""
     try:
-        new_hash = hash_password(plain)
-        conn = get_connection()
-        try:
-            cur = conn.cursor()
-            cur.execute(
-                f"UPDATE usuarios SET senha = {SQL_PLACEHOLDER} WHERE usuario = {SQL_PLACEHOLDER}",
-                (new_hash, usuario),
-            )
-            conn.commit()
-            logger.info("Hash de senha migrado para bcrypt: %s", usuario)
-        finally:
-            return_connection(conn)
+        salt = bcrypt.gensalt(_rounds())
+        pool = _get_pool()
+        if pool is None:
+            novo = bcrypt.hashpw(plain.encode("utf-8"), salt).decode("utf-8")
+            _enfileirar_upgrade(novo, usuario, hash_antigo)
+            return
+
+        futuro = pool.submit(bcrypt.hashpw, plain.encode("utf-8"), salt)
+
+        def _quando_pronto(f):
+            try:
+                _enfileirar_upgrade(f.result().decode("utf-8"), usuario, hash_antigo)
+            except Exception as exc:
+                logger.warning("Falha ao gerar hash bcrypt para %s: %s", usuario, exc)
+
+        futuro.add_done_callback(_quando_pronto)
     except Exception as exc:
-        # Falha no upgrade não impede o login
         logger.warning("Falha ao migrar hash para bcrypt para %s: %s", usuario, exc)
-    
-    return True
+
+
+def _enfileirar_upgrade(novo_hash: str, usuario: str, hash_antigo: str) -> None:
+    """Coloca o upgrade na fila e garante a thread gravadora ativa."""
+    global _writer_thread
+    _fila_upgrades.put((novo_hash, usuario, hash_antigo))
+    if _writer_thread is not None and _writer_thread.is_alive():
+        return
+    with _writer_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(
+                target=_loop_upgrades, name="password-upgrades", daemon=True
+            )
+            _writer_thread.start()
+
+
+def _loop_upgrades() -> None:
+    """Agrupa upgrades por até ``PASSWORD_UPGRADE_FLUSH_SECONDS`` e grava em lote."""
+    while True:
+        lote = [_fila_upgrades.get()]
+        limite = time.monotonic() + PASSWORD_UPGRADE_FLUSH_SECONDS
+        while len(lote) < PASSWORD_UPGRADE_BATCH_SIZE:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(_fila_upgrades.get(timeout=restante))
+            except queue.Empty:
+                break
+        gravar_upgrades(lote)
+
+
+def gravar_upgrades(lote: list) -> int:
+    """Grava ``(novo_hash, usuario, hash_antigo)`` numa única transação.
+
+    O ``WHERE senha = hash_antigo`` evita sobrescrever uma senha trocada
+    entre o login e a gravação.
+
+    Returns:
+        Quantidade de upgrades enviados ao banco (0 em caso de falha).
+    """
+    if not lote:
+        return 0
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.executemany(
+            f"UPDATE usuarios SET senha = {SQL_PLACEHOLDER} "
+            f"WHERE usuario = {SQL_PLACEHOLDER} AND senha = {SQL_PLACEHOLDER}",
+            lote,
+        )
+        conn.commit()
+        logger.info("Hashes de senha migrados para bcrypt: %s", ", ".join(u for _, u, _ in lote))
+        return len(lote)
+    except Exception as exc:
+        # Falha no upgrade não impede o login; o próximo login tenta de novo.
+        logger.warning("Falha ao gravar lote de upgrades de senha: %s", exc)
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        return 0
+    finally:
+        return_connection(conn)
@@ -0,0 +1,318 @@
+"""
+Contadores agregados de pendências - Ponto ExSA v5.0
+
+Badges do menu, banner de pendências do gestor e central de notificações
+faziam subconsultas ``COUNT(*)`` nas tabelas de solicitações a cada rerun.
+Este módulo mantém a tabela ``pending_counters`` com uma linha por
+``(chave, tipo)``, onde ``chave`` é o aprovador/usuário (ou ``'*'`` para
+pendências globais do gestor):
+
+- quem altera uma tabela de solicitações chama
+  ``sincronizar_contadores(cursor, '<tabela>', ids=..., chaves=...)`` antes do
+  ``commit``, na mesma transação da mudança de negócio; só as chaves afetadas
+  são recontadas e os contadores globais recebem a diferença. Em UPDATE/DELETE
+  as chaves são resolvidas antes da escrita com ``chaves_afetadas``;
+- ``reconstruir_contadores()`` refaz tudo (início do processo e job periódico
+  de reconciliação do scheduler);
+- a leitura é ``obter_contadores(usuario)`` — busca por chave primária.
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from database import get_connection, return_connection, SQL_PLACEHOLDER
+except ImportError:
+    from ponto_esa_v5.database import get_connection, return_connection, SQL_PLACEHOLDER
+
+from constants import agora_br_naive
+
+logger = logging.getLogger(__name__)
+
+CHAVE_GLOBAL = "*"
+
+# tipo -> (tabela de origem, coluna da chave, condição de pendência)
+TIPOS_CONTADOR: Dict[str, tuple] = {
+    "he_aprovar": ("solicitacoes_horas_extras", "aprovador_solicitado", "status = 'pendente'"),
+    "he_ativas_aguardando": ("horas_extras_ativas", "aprovador", "status = 'aguardando_aprovacao'"),
+    "atestados_usuario": ("atestado_horas", "usuario", "status = 'pendente'"),
+    "correcoes_usuario": ("solicitacoes_correcao_registro", "usuario", "status = 'pendente'"),
+    "mensagens_nao_lidas": ("mensagens_diretas", "destinatario", "lida = FALSE"),
+}
+
+# tipo global (chave '*', pendências de todos os gestores) -> tipo por chave
+# do qual ele é a soma; é ajustado pela diferença das chaves recalculadas.
+TIPOS_GLOBAIS: Dict[str, str] = {
+    "atestados_pendentes": "atestados_usuario",
+    "correcoes_pendentes": "correcoes_usuario",
+}
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+@contextmanager
+def _db():
+    """Context manager que obtém conexão do pool e a devolve ao final."""
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        return_connection(conn)
+
+
+def _criar_tabela(cursor) -> None:
+    """DDL idempotente de ``pending_counters``."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pending_counters (
+            chave TEXT NOT NULL,
+            tipo TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            atualizado_em TIMESTAMP,
+            PRIMARY KEY (chave, tipo)
+        )
+    """)
+
+
+def ensure_counters_schema_once() -> None:
+    """Cria ``pending_counters`` e faz a carga inicial uma vez por processo."""
+    global _schema_ready
+    if _schema_ready:
+        return
+
+    with _schema_lock:
+        if _schema_ready:
+            return
+        with _db() as conn:
+            cursor = conn.cursor()
+            _criar_tabela(cursor)
+            conn.commit()
+            cursor.close()
+        _schema_ready = True
+
+    reconstruir_contadores()
+
+
+def _placeholders(n: int) -> str:
+    return ", ".join([SQL_PLACEHOLDER] * n)
+
+
+def _gravar_totais(cursor, linhas) -> None:
+    """UPSERT de ``(chave, tipo, total, atualizado_em)`` em ``pending_counters``."""
+    if linhas:
+        cursor.executemany(
+            f"""
+            INSERT INTO pending_counters (chave, tipo, total, atualizado_em)
+            VALUES ({_placeholders(4)})
+            ON CONFLICT (chave, tipo) DO UPDATE
+            SET total = excluded.total, atualizado_em = excluded.atualizado_em
+            """,
+            linhas,
+        )
+
+
+def _ajustar_global(cursor, tipo_global: str, delta: int, agora) -> None:
+    """Soma ``delta`` ao contador global (chave '*') sem recontar a tabela."""
+    cursor.execute(
+        f"""
+        INSERT INTO pending_counters (chave, tipo, total, atualizado_em)
+        VALUES ({_placeholders(4)})
+        ON CONFLICT (chave, tipo) DO UPDATE
+        SET total = pending_counters.total + excluded.total, atualizado_em = excluded.atualizado_em
+        """,
+        (CHAVE_GLOBAL, tipo_global, delta, agora),
+    )
+
+
+def _recalcular_tipo(cursor, tipo: str) -> None:
+    """Recalcula todas as chaves de um tipo (e seu global) no cursor informado."""
+    tabela, coluna, condicao = TIPOS_CONTADOR[tipo]
+    agora = agora_br_naive()
+    # Zera as chaves existentes (pendências resolvidas) e regrava as atuais.
+    cursor.execute(
+        f"UPDATE pending_counters SET total = 0, atualizado_em = {SQL_PLACEHOLDER} WHERE tipo = {SQL_PLACEHOLDER}",
+        (agora, tipo),
+    )
+    cursor.execute(
+        f"SELECT {coluna}, COUNT(*) FROM {tabela} WHERE {condicao} AND {coluna} IS NOT NULL GROUP BY {coluna}"
+    )
+    linhas = [(str(chave), tipo, int(total or 0), agora) for chave, total in cursor.fetchall()]
+    _gravar_totais(cursor, linhas)
+    for tipo_global, origem in TIPOS_GLOBAIS.items():
+        if origem == tipo:
+            _gravar_totais(cursor, [(CHAVE_GLOBAL, tipo_global, sum(linha[2] for linha in linhas), agora)])
+
+
+def _recalcular_chaves(cursor, tipo: str, chaves: List[str]) -> None:
+    """Recalcula só as ``chaves`` de um tipo e aplica a diferença ao global."""
+    tabela, coluna, condicao = TIPOS_CONTADOR[tipo]
+    agora = agora_br_naive()
+    cursor.execute(
+        f"SELECT chave, total FROM pending_counters WHERE tipo = {SQL_PLACEHOLDER} AND chave IN ({_placeholders(len(chaves))})",
+        (tipo, *chaves),
+    )
+    anteriores = {chave: int(total or 0) for chave, total in cursor.fetchall()}
+    cursor.execute(
+        f"""
+        SELECT {coluna}, COUNT(*) FROM {tabela}
+        WHERE {condicao} AND {coluna} IN ({_placeholders(len(chaves))})
+        GROUP BY {coluna}
+        """,
+        chaves,
+    )
+    totais = {str(chave): int(total or 0) for chave, total in cursor.fetchall()}
+    _gravar_totais(cursor, [(chave, tipo, totais.get(chave, 0), agora) for chave in chaves])
+
+    delta = sum(totais.get(chave, 0) - anteriores.get(chave, 0) for chave in chaves)
+    for tipo_global, origem in TIPOS_GLOBAIS.items():
+        if origem == tipo and delta:
+            _ajustar_global(cursor, tipo_global, delta, agora)
+
+
+def _chaves_dos_ids(cursor, tipo: str, ids: List) -> List[str]:
+    """Resolve as chaves afetadas a partir dos ids das linhas alteradas (busca por PK)."""
+    tabela, coluna, _condicao = TIPOS_CONTADOR[tipo]
+    cursor.execute(
+        f"SELECT DISTINCT {coluna} FROM {tabela} WHERE id IN ({_placeholders(len(ids))}) AND {coluna} IS NOT NULL",
+        ids,
+    )
+    return [str(linha[0]) for linha in cursor.fetchall()]
+
+
+def chaves_afetadas(cursor, tabela: str, ids: Iterable) -> List[str]:
+    """Chaves de contador das linhas ``ids``, lidas antes de um UPDATE/DELETE.
+
+    Depois da escrita a linha pode não existir mais (DELETE) ou ter outra
+    chave (troca de aprovador); o resultado vai em ``chaves=`` de
+    ``sincronizar_contadores``.
+    """
+    ids = [i for i in ids if i is not None]
+    if not ids:
+        return []
+    chaves = set()
+    for tipo, (origem, _coluna, _cond) in sorted(TIPOS_CONTADOR.items()):
+        if origem == tabela:
+            chaves.update(_chaves_dos_ids(cursor, tipo, ids))
+    return sorted(chaves)
+
+
+def sincronizar_contadores(
+    cursor,
+    tabela: str,
+    ids: Optional[Iterable] = None,
+    chaves: Optional[Iterable[str]] = None,
+) -> bool:
+    """Atualiza os contadores afetados por uma escrita, na transação do chamador.
+
+    Deve ser chamado depois do INSERT/UPDATE de negócio e antes do ``commit``.
+    Só as chaves tocadas são recontadas (pelo índice da coluna da chave) e
+    os globais recebem a diferença — o custo não cresce com a tabela. Uma
+    falha aqui é isolada por SAVEPOINT: a mudança de negócio segue e o job
+    de reconciliação corrige o contador depois.
+
+    Args:
+        cursor: cursor da transação em andamento.
+        tabela: tabela de solicitações alterada.
+        ids: ids das linhas alteradas (a chave é lida de cada linha, já
+            depois da escrita).
+        chaves: chaves afetadas já conhecidas (ex.: aprovador de um INSERT, ou
+            ``chaves_afetadas`` obtidas antes de um UPDATE/DELETE).
+
+    Returns:
+        True se os contadores foram atualizados.
+    """
+    tipos = sorted(tipo for tipo, (origem, _coluna, _cond) in TIPOS_CONTADOR.items() if origem == tabela)
+    ids = [i for i in (ids or ()) if i is not None]
+    chaves = {str(c) for c in (chaves or ()) if c is not None}
+    if not tipos or not (ids or chaves):
+        return False
+
+    try:
+        cursor.execute("SAVEPOINT pending_counters")
+    except Exception as e:
+        logger.debug("SAVEPOINT indisponível para pending_counters: %s", e)
+        return False
+
+    try:
+        # Não abrir outra conexão aqui: no SQLite ela esperaria o lock de
+        # escrita da própria transação do chamador.
+        if not _schema_ready:
+            _criar_tabela(cursor)
+        # Ordem fixa de tipos e chaves evita deadlock entre transações concorrentes.
+        for tipo in tipos:
+            afetadas = chaves | set(_chaves_dos_ids(cursor, tipo, ids) if ids else ())
+            if afetadas:
+                _recalcular_chaves(cursor, tipo, sorted(afetadas))
+        cursor.execute("RELEASE SAVEPOINT pending_counters")
+        return True
+    except Exception as e:
+        logger.warning("Falha ao sincronizar pending_counters (%s): %s", tabela, e)
+        try:
+            cursor.execute("ROLLBACK TO SAVEPOINT pending_counters")
+            cursor.execute("RELEASE SAVEPOINT pending_counters")
+        except Exception as rollback_error:
+            logger.debug("Erro ao desfazer SAVEPOINT pending_counters: %s", rollback_error)
+        return False
+
+
+def reconstruir_contadores() -> int:
+    """Recalcula todos os tipos, cada um em sua própria transação.
+
+    Usado na carga inicial e pelo job de reconciliação do scheduler. Tipos
+    cuja tabela de origem ainda não existe são ignorados.
+
+    Returns:
+        Quantidade de tipos recalculados com sucesso.
+    """
+    ensure_counters_schema_once()
+    ok = 0
+    with _db() as conn:
+        cursor = conn.cursor()
+        for tipo in sorted(TIPOS_CONTADOR):
+            try:
+                _recalcular_tipo(cursor, tipo)
+                conn.commit()
+                ok += 1
+            except Exception as e:
+                conn.rollback()
+                logger.debug("Contador %s não reconstruído: %s", tipo, e)
+        cursor.close()
+    return ok
+
+
+def obter_contadores(usuario: Optional[str]) -> Dict[str, int]:
+    """Retorna os contadores do usuário e os globais numa única consulta.
+
+    Returns:
+        Dict ``{tipo: total}`` com todos os tipos (zero quando ausente).
+    """
+    contadores = {tipo: 0 for tipo in (*TIPOS_CONTADOR, *TIPOS_GLOBAIS)}
+    ensure_counters_schema_once()
+    with _db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT chave, tipo, total FROM pending_counters WHERE chave IN ({SQL_PLACEHOLDER}, {SQL_PLACEHOLDER})",
+            (usuario or CHAVE_GLOBAL, CHAVE_GLOBAL),
+        )
+        for chave, tipo, total in cursor.fetchall():
+            if tipo not in contadores:
+                continue
+            # Tipos globais só valem pela chave '*'; os demais pela chave do usuário.
+            if (chave == CHAVE_GLOBAL) == (tipo in TIPOS_GLOBAIS):
+                contadores[tipo] = int(total or 0)
+        cursor.close()
+    return contadores
+
+
+__all__ = [
+    "CHAVE_GLOBAL",
+    "TIPOS_CONTADOR",
+    "TIPOS_GLOBAIS",
+    "ensure_counters_schema_once",
+    "chaves_afetadas",
+    "sincronizar_contadores",
+    "reconstruir_contadores",
+    "obter_contadores",
+]
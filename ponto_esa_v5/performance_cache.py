@@ -4,14 +4,18 @@ Usa st.cache_data e st.cache_resource para melhorar a velocidade
 """
 
 import streamlit as st
-from datetime import datetime, date, timedelta
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Callable
 import logging
 import hashlib
 import json
 
-from database import SQL_PLACEHOLDER
+from database import SQL_PLACEHOLDER, get_connection, return_connection
 from constants import agora_br, agora_br_naive
+from dashboard_snapshot import (
+    calcular_metricas_dashboard, obter_dashboard_snapshot,
+    serie_registros_semana, solicitar_atualizacao_snapshot,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -84,9 +88,9 @@ def cached_get_configuracoes(_execute_query: Callable) -> Dict[str, str]:
         return {}
 
 
-@st.cache_data(ttl=CACHE_TTL_MEDIUM)
+@st.cache_data(ttl=CACHE_TTL_SHORT)
 def cached_get_metricas_dashboard(data_ref: str, _execute_query: Callable) -> Dict[str, Any]:
-    """Cache para métricas do dashboard do gestor"""
+    """Cache para métricas do dashboard do gestor (lidas de ``dashboard_snapshot``)"""
     metricas = {
         "total_usuarios": 0,
         "registros_hoje": 0,
@@ -97,54 +101,21 @@ def cached_get_metricas_dashboard(data_ref: str, _execute_query: Callable) -> Di
     }
     
     try:
-        # Total de usuários ativos
-        result = _execute_query(
-            "SELECT COUNT(*) FROM usuarios WHERE ativo = 1 AND tipo = 'funcionario'",
-            fetch_one=True
-        )
-        if result:
-            metricas["total_usuarios"] = result[0]
-        
-        # Registros hoje
-        result = _execute_query(
-            f"SELECT COUNT(*) FROM registros_ponto WHERE DATE(data_hora) = {SQL_PLACEHOLDER}",
-            (data_ref,), fetch_one=True
-        )
-        if result:
-            metricas["registros_hoje"] = result[0]
-        
-        # Usuários presentes hoje (distintos)
-        result = _execute_query(
-            f"SELECT COUNT(DISTINCT usuario_id) FROM registros_ponto WHERE DATE(data_hora) = {SQL_PLACEHOLDER}",
-            (data_ref,), fetch_one=True
-        )
-        if result:
-            metricas["presentes_hoje"] = result[0]
-        
-        # Ausências pendentes
-        result = _execute_query(
-            "SELECT COUNT(*) FROM ausencias WHERE status = 'pendente'",
-            fetch_one=True
-        )
-        if result:
-            metricas["ausencias_pendentes"] = result[0]
-        
-        # Horas extras pendentes
-        result = _execute_query(
-            "SELECT COUNT(*) FROM solicitacoes_horas_extras WHERE status = 'pendente'",
-            fetch_one=True
-        )
-        if result:
-            metricas["horas_extras_pendentes"] = result[0]
-        
-        # Atestados do mês
-        primeiro_dia_mes = date.today().replace(day=1).strftime("%Y-%m-%d")
-        result = _execute_query(
-            f"SELECT COUNT(*) FROM ausencias WHERE data_inicio >= {SQL_PLACEHOLDER} AND tipo LIKE '%%Atestado%%'",
-            (primeiro_dia_mes,), fetch_one=True
-        )
-        if result:
-            metricas["atestados_mes"] = result[0]
+        snapshot = obter_dashboard_snapshot()
+        if snapshot.get("data_referencia") == data_ref:
+            for chave in metricas:
+                metricas[chave] = snapshot.get(chave, 0)
+        else:
+            # Data diferente de hoje: calcular sob demanda com as mesmas consultas agregadas
+            conn = get_connection()
+            try:
+                cursor = conn.cursor()
+                dados = calcular_metricas_dashboard(cursor, datetime.strptime(data_ref, "%Y-%m-%d").date())
+                cursor.close()
+            finally:
+                return_connection(conn)
+            for chave in metricas:
+                metricas[chave] = dados.get(chave, 0)
             
     except Exception as e:
         logger.error(f"Erro em cached_get_metricas_dashboard: {e}")
@@ -154,26 +125,27 @@ def cached_get_metricas_dashboard(data_ref: str, _execute_query: Callable) -> Di
 
 @st.cache_data(ttl=CACHE_TTL_SHORT)
 def cached_get_registros_semana(data_fim: str, _execute_query: Callable) -> Dict[str, List]:
-    """Cache para registros da última semana (para gráfico)"""
-    datas = []
-    valores = []
-    
+    """Cache para registros da última semana (para gráfico) — um único GROUP BY por dia"""
     try:
         data_fim_obj = datetime.strptime(data_fim, "%Y-%m-%d").date()
-        
-        for i in range(6, -1, -1):
-            data_check = (data_fim_obj - timedelta(days=i)).strftime("%Y-%m-%d")
-            result = _execute_query(
-                f"SELECT COUNT(*) FROM registros_ponto WHERE DATE(data_hora) = {SQL_PLACEHOLDER}",
-                (data_check,), fetch_one=True
-            )
-            datas.append((data_fim_obj - timedelta(days=i)).strftime("%d/%m"))
-            valores.append(result[0] if result else 0)
+        data_inicio_obj = data_fim_obj - timedelta(days=6)
+        result = _execute_query(
+            f"""SELECT DATE(data_hora) AS dia, COUNT(*), COUNT(DISTINCT usuario)
+               FROM registros_ponto
+               WHERE data_hora >= {SQL_PLACEHOLDER} AND data_hora < {SQL_PLACEHOLDER}
+               GROUP BY DATE(data_hora)""",
+            (data_inicio_obj.strftime("%Y-%m-%d 00:00:00"),
+             (data_fim_obj + timedelta(days=1)).strftime("%Y-%m-%d 00:00:00")),
+            fetch_all=True
+        )
+        por_dia = {str(r[0])[:10]: (int(r[1] or 0), int(r[2] or 0)) for r in (result or [])}
+        serie = serie_registros_semana(por_dia, data_fim_obj)
+        return {"datas": serie["datas"], "valores": serie["valores"]}
             
     except Exception as e:
         logger.error(f"Erro em cached_get_registros_semana: {e}")
     
-    return {"datas": datas, "valores": valores}
+    return {"datas": [], "valores": []}
 
 
 @st.cache_data(ttl=CACHE_TTL_MEDIUM)
@@ -239,6 +211,7 @@ def invalidar_cache_usuario(usuario: str):
     cached_get_registros_usuario.clear()
     cached_get_saldo_banco_horas.clear()
     cached_get_metricas_dashboard.clear()
+    solicitar_atualizacao_snapshot()
     logger.info(f"Cache invalidado para usuário: {usuario}")
 
 
@@ -21,9 +21,17 @@ Dependências:
 
 import os
 import json
+import inspect
 import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta, time
 from typing import Optional, Dict, List, Any, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
 # Carregar variáveis de ambiente
@@ -36,8 +44,11 @@ logger = logging.getLogger(__name__)
 try:
     from pywebpush import webpush, WebPushException
     WEBPUSH_AVAILABLE = True
+    # Versões recentes aceitam uma requests.Session (conexões reaproveitadas)
+    _ACEITA_SESSAO = 'requests_session' in inspect.signature(webpush).parameters
 except ImportError:
     WEBPUSH_AVAILABLE = False
+    _ACEITA_SESSAO = False
     logger.warning("pywebpush não instalado. Notificações push desabilitadas.")
     logger.warning("Para habilitar, execute: pip install pywebpush")
 
@@ -48,7 +59,17 @@ except ImportError:
     # Fallback se importar de outro local
     from ponto_esa_v5.database import get_connection, return_connection, SQL_PLACEHOLDER
 
-from constants import agora_br
+try:
+    from job_telemetry import registrar_chamada_externa
+except ImportError:
+    from ponto_esa_v5.job_telemetry import registrar_chamada_externa
+
+try:
+    from rate_limiter import aguardar_vez
+except ImportError:
+    from ponto_esa_v5.rate_limiter import aguardar_vez
+
+from constants import agora_br, PUSH_TIMEOUT_SECONDS, WEBPUSH_FANOUT_MAX_WORKERS
 
 
 # ============================================
@@ -71,6 +92,11 @@ def get_vapid_public_key() -> str:
     return VAPID_PUBLIC_KEY
 
 
+# Sessão HTTP dos envios (criada no primeiro envio)
+_sessao_http: Optional[requests.Session] = None
+_sessao_lock = threading.Lock()
+
+
 # ============================================
 # GERENCIAMENTO DE SUBSCRIPTIONS
 # ============================================
@@ -228,57 +254,206 @@ def obter_subscriptions_usuario(usuario: str) -> List[Dict]:
             return_connection(conn)
 
 
-def marcar_subscription_invalida(endpoint: str) -> None:
+@dataclass
+class ResultadoWebPush:
+    """Resultado do envio para uma subscription."""
+
+    usuario: Optional[str]
+    endpoint: str
+    ok: bool
+    conta_falha: bool = False  # erro do serviço de push (conta para desativar)
+    expirada: bool = False  # 404/410: o navegador descartou a subscription
+    erro: Optional[str] = None
+
+
+def _gravar_resultados(resultados: List[ResultadoWebPush], logs: List[Tuple]) -> None:
     """
-    Marca uma subscription como inválida após falhas consecutivas.
-    Após 3 falhas, a subscription é desativada.
+    Aplica numa única transação o estado das subscriptions e as linhas de log.
+    
+    - sucesso: zera ``falhas_consecutivas`` e atualiza ``ultima_notificacao``;
+    - erro do serviço de push: incrementa falhas (desativa na 3ª consecutiva);
+    - 404/410: desativa na hora (a subscription não existe mais no navegador).
+    
+    Args:
+        resultados: Resultados por subscription
+        logs: Linhas ``(usuario, titulo, mensagem, tipo, dados_json, status, erro)``
     """
+    sucesso = [(r.endpoint,) for r in resultados if r.ok]
+    falhas = [(r.endpoint,) for r in resultados if not r.ok and r.conta_falha and not r.expirada]
+    expiradas = [(r.endpoint,) for r in resultados if not r.ok and r.expirada]
+    if not (sucesso or falhas or expiradas or logs):
+        return
+
     conn = None
     try:
         conn = get_connection()
         cursor = conn.cursor()
         
-        # Incrementar contador de falhas
-        cursor.execute(f"""
-            UPDATE push_subscriptions
-            SET falhas_consecutivas = falhas_consecutivas + 1,
-                ativo = CASE WHEN falhas_consecutivas >= 2 THEN 0 ELSE ativo END
-            WHERE endpoint = {SQL_PLACEHOLDER}
-        """, (endpoint,))
+        if sucesso:
+            cursor.executemany(f"""
+                UPDATE push_subscriptions
+                SET falhas_consecutivas = 0,
+                    ultima_notificacao = CURRENT_TIMESTAMP
+                WHERE endpoint = {SQL_PLACEHOLDER}
+            """, sucesso)
+        if falhas:
+            # Incrementar contador de falhas
+            cursor.executemany(f"""
+                UPDATE push_subscriptions
+                SET falhas_consecutivas = falhas_consecutivas + 1,
+                    ativo = CASE WHEN falhas_consecutivas >= 2 THEN 0 ELSE ativo END
+                WHERE endpoint = {SQL_PLACEHOLDER}
+            """, falhas)
+        if expiradas:
+            cursor.executemany(f"""
+                UPDATE push_subscriptions
+                SET falhas_consecutivas = falhas_consecutivas + 1, ativo = 0
+                WHERE endpoint = {SQL_PLACEHOLDER}
+            """, expiradas)
+        if logs:
+            cursor.executemany(f"""
+                INSERT INTO push_notifications_log 
+                (usuario, titulo, mensagem, tipo, dados_extras, status, erro)
+                VALUES ({SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, 
+                        {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER})
+            """, logs)
         conn.commit()
         
     except Exception as e:
-        logger.error(f"Erro ao marcar subscription inválida: {e}")
+        logger.error(f"Erro ao gravar resultados de push: {e}")
+        if conn:
+            conn.rollback()
     finally:
         if conn:
             return_connection(conn)
 
 
+def marcar_subscription_invalida(endpoint: str) -> None:
+    """
+    Marca uma subscription como inválida após falhas consecutivas.
+    Após 3 falhas, a subscription é desativada.
+    """
+    _gravar_resultados([ResultadoWebPush(None, endpoint, ok=False, conta_falha=True)], [])
+
+
 def resetar_falhas_subscription(endpoint: str) -> None:
     """Reseta o contador de falhas após envio bem-sucedido."""
-    conn = None
+    _gravar_resultados([ResultadoWebPush(None, endpoint, ok=True)], [])
+
+
+# ============================================
+# ENVIO DE NOTIFICAÇÕES
+# ============================================
+
+def _obter_sessao_http() -> requests.Session:
+    """Sessão HTTP compartilhada (conexões keep-alive com FCM/Mozilla/Apple)."""
+    global _sessao_http
+    with _sessao_lock:
+        if _sessao_http is None:
+            sessao = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=WEBPUSH_FANOUT_MAX_WORKERS)
+            sessao.mount("https://", adapter)
+            sessao.mount("http://", adapter)
+            _sessao_http = sessao
+        return _sessao_http
+
+
+def _montar_payload(
+    titulo: str,
+    mensagem: str,
+    url: str = '/',
+    tag: Optional[str] = None,
+    dados_extras: Optional[Dict] = None,
+    require_interaction: bool = False
+) -> str:
+    """Payload JSON da notificação (serializado uma vez por envio em massa)."""
+    return json.dumps({
+        'title': titulo,
+        'body': mensagem,
+        'icon': '/static/icon-192.png',
+        'badge': '/static/icon-192.png',
+        'url': url,
+        'tag': tag or 'ponto-exsa',
+        'requireInteraction': require_interaction,
+        'data': dados_extras or {}
+    })
+
+
+def _enviar_webpush(usuario: Optional[str], subscription: Dict, payload: str) -> ResultadoWebPush:
+    """Criptografa e envia um payload; não grava nada no banco."""
+    endpoint = subscription['endpoint']
+    if not aguardar_vez("webpush"):
+        # Não conta como falha da subscription: o envio nem saiu.
+        return ResultadoWebPush(usuario, endpoint, ok=False, erro="Limite de taxa do WebPush excedido")
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
+        # Construir subscription info
+        subscription_info = {
+            'endpoint': endpoint,
+            'keys': subscription.get('keys', {
+                'p256dh': subscription.get('p256dh'),
+                'auth': subscription.get('auth')
+            })
+        }
         
-        cursor.execute(f"""
-            UPDATE push_subscriptions
-            SET falhas_consecutivas = 0,
-                ultima_notificacao = NOW()
-            WHERE endpoint = {SQL_PLACEHOLDER}
-        """, (endpoint,))
-        conn.commit()
+        extras = {'requests_session': _obter_sessao_http()} if _ACEITA_SESSAO else {}
+        webpush(
+            subscription_info=subscription_info,
+            data=payload,
+            vapid_private_key=VAPID_PRIVATE_KEY,
+            vapid_claims={'sub': VAPID_CLAIM_EMAIL},
+            timeout=PUSH_TIMEOUT_SECONDS,
+            **extras
+        )
+        registrar_chamada_externa(True)
+        return ResultadoWebPush(usuario, endpoint, ok=True)
+        
+    except WebPushException as e:
+        registrar_chamada_externa(False)
+        error_msg = str(e)
+        logger.error(f"Erro WebPush: {error_msg}")
+        
+        # Verificar se subscription expirou ou é inválida
+        if e.response is not None and e.response.status_code in [404, 410]:
+            return ResultadoWebPush(usuario, endpoint, ok=False, conta_falha=True, expirada=True,
+                                    erro="Subscription expirada ou inválida")
+        return ResultadoWebPush(usuario, endpoint, ok=False, conta_falha=True,
+                                erro=f"Erro ao enviar: {error_msg}")
         
     except Exception as e:
-        logger.error(f"Erro ao resetar falhas: {e}")
-    finally:
-        if conn:
-            return_connection(conn)
+        registrar_chamada_externa(False)
+        logger.error(f"Erro ao enviar push: {e}")
+        return ResultadoWebPush(usuario, endpoint, ok=False, erro=f"Erro: {str(e)}")
 
 
-# ============================================
-# ENVIO DE NOTIFICAÇÕES
-# ============================================
+def entregar_webpush(alvos: List[Tuple[str, Dict]], payload: str) -> List[ResultadoWebPush]:
+    """
+    Envia o mesmo payload a várias subscriptions em paralelo.
+    
+    A criptografia (por subscription) e o POST rodam em até
+    ``WEBPUSH_FANOUT_MAX_WORKERS`` threads; nada é gravado no banco aqui —
+    quem chama aplica os resultados com ``_gravar_resultados`` de uma vez.
+    
+    Args:
+        alvos: Lista de (usuario, subscription)
+        payload: JSON já serializado (``_montar_payload``)
+    
+    Returns:
+        Resultados na mesma ordem de ``alvos``
+    """
+    if not alvos:
+        return []
+    if len(alvos) == 1:
+        return [_enviar_webpush(alvos[0][0], alvos[0][1], payload)]
+    
+    workers = min(WEBPUSH_FANOUT_MAX_WORKERS, len(alvos))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="webpush") as executor:
+        # copy_context: a telemetria do job atual também conta as chamadas das threads
+        futuros = [
+            executor.submit(contextvars.copy_context().run, _enviar_webpush, usuario, sub, payload)
+            for usuario, sub in alvos
+        ]
+        return [f.result() for f in futuros]
+
 
 def enviar_push_para_subscription(
     subscription: Dict,
@@ -310,57 +485,53 @@ def enviar_push_para_subscription(
     if not is_push_configured():
         return False, "VAPID keys não configuradas"
     
-    try:
-        # Montar payload da notificação
-        payload = {
-            'title': titulo,
-            'body': mensagem,
-            'icon': '/static/icon-192.png',
-            'badge': '/static/icon-192.png',
-            'url': url,
-            'tag': tag or 'ponto-exsa',
-            'requireInteraction': require_interaction,
-            'data': dados_extras or {}
-        }
-        
-        # Construir subscription info
-        subscription_info = {
-            'endpoint': subscription['endpoint'],
-            'keys': subscription.get('keys', {
-                'p256dh': subscription.get('p256dh'),
-                'auth': subscription.get('auth')
-            })
-        }
-        
-        # Enviar via webpush
-        response = webpush(
-            subscription_info=subscription_info,
-            data=json.dumps(payload),
-            vapid_private_key=VAPID_PRIVATE_KEY,
-            vapid_claims={'sub': VAPID_CLAIM_EMAIL}
-        )
-        
-        # Resetar contador de falhas
-        resetar_falhas_subscription(subscription['endpoint'])
-        
+    payload = _montar_payload(titulo, mensagem, url, tag, dados_extras, require_interaction)
+    resultado = _enviar_webpush(None, subscription, payload)
+    _gravar_resultados([resultado], [])
+    
+    if resultado.ok:
         logger.info(f"Push enviado com sucesso: {titulo}")
         return True, "Notificação enviada com sucesso"
-        
-    except WebPushException as e:
-        error_msg = str(e)
-        logger.error(f"Erro WebPush: {error_msg}")
-        
-        # Verificar se subscription expirou ou é inválida
-        if e.response and e.response.status_code in [404, 410]:
-            marcar_subscription_invalida(subscription['endpoint'])
-            return False, "Subscription expirada ou inválida"
-        
-        marcar_subscription_invalida(subscription['endpoint'])
-        return False, f"Erro ao enviar: {error_msg}"
-        
-    except Exception as e:
-        logger.error(f"Erro ao enviar push: {e}")
-        return False, f"Erro: {str(e)}"
+    return False, resultado.erro
+
+
+def _enviar_e_registrar(
+    subscriptions_por_usuario: Dict[str, List[Dict]],
+    titulo: str,
+    mensagem: str,
+    tipo: str,
+    url: str,
+    dados_extras: Optional[Dict]
+) -> Dict[str, Tuple[int, int]]:
+    """Entrega a todos os dispositivos em paralelo e grava estado + logs numa escrita só."""
+    alvos = [(usuario, sub) for usuario, subs in subscriptions_por_usuario.items() for sub in subs]
+    if not alvos:
+        return {}
+    
+    if is_push_configured():
+        payload = _montar_payload(titulo, mensagem, url, dados_extras=dados_extras)
+        resultados = entregar_webpush(alvos, payload)
+    else:
+        motivo = "pywebpush não instalado" if not WEBPUSH_AVAILABLE else "VAPID keys não configuradas"
+        resultados = [ResultadoWebPush(usuario, sub['endpoint'], ok=False, erro=motivo) for usuario, sub in alvos]
+    
+    contagem: Dict[str, Tuple[int, int]] = {}
+    primeiro_erro: Dict[str, str] = {}
+    for r in resultados:
+        enviados, total = contagem.get(r.usuario, (0, 0))
+        contagem[r.usuario] = (enviados + (1 if r.ok else 0), total + 1)
+        if r.erro:
+            primeiro_erro.setdefault(r.usuario, r.erro)
+    
+    dados_json = json.dumps(dados_extras) if dados_extras else None
+    logs = [
+        (usuario, titulo, mensagem, tipo, dados_json,
+         'enviado' if enviados > 0 else 'falhou',
+         None if enviados > 0 else primeiro_erro.get(usuario))
+        for usuario, (enviados, _total) in contagem.items()
+    ]
+    _gravar_resultados(resultados, logs)
+    return contagem
 
 
 def enviar_notificacao_para_usuario(
@@ -372,7 +543,7 @@ def enviar_notificacao_para_usuario(
     dados_extras: Optional[Dict] = None
 ) -> Tuple[int, int]:
     """
-    Envia notificação push para todos os dispositivos de um usuário.
+    Envia notificação push para todos os dispositivos de um usuário (em paralelo).
     
     Args:
         usuario: Username do usuário
@@ -391,25 +562,8 @@ def enviar_notificacao_para_usuario(
         logger.warning(f"Nenhuma subscription encontrada para: {usuario}")
         return 0, 0
     
-    enviados = 0
-    total = len(subscriptions)
-    
-    for sub in subscriptions:
-        sucesso, msg = enviar_push_para_subscription(
-            subscription=sub,
-            titulo=titulo,
-            mensagem=mensagem,
-            url=url,
-            dados_extras=dados_extras
-        )
-        if sucesso:
-            enviados += 1
-    
-    # Registrar no log
-    registrar_notificacao_log(usuario, titulo, mensagem, tipo, dados_extras, 
-                              'enviado' if enviados > 0 else 'falhou')
-    
-    return enviados, total
+    contagem = _enviar_e_registrar({usuario: subscriptions}, titulo, mensagem, tipo, url, dados_extras)
+    return contagem.get(usuario, (0, len(subscriptions)))
 
 
 def enviar_notificacao_para_todos(
@@ -422,6 +576,9 @@ def enviar_notificacao_para_todos(
     """
     Envia notificação push para todos os usuários (ou lista filtrada).
     
+    Todas as subscriptions são lidas numa consulta, os envios saem em
+    paralelo e o estado/log é gravado numa única transação no fim.
+    
     Args:
         titulo: Título da notificação
         mensagem: Corpo da mensagem
@@ -437,47 +594,43 @@ def enviar_notificacao_para_todos(
         conn = get_connection()
         cursor = conn.cursor()
         
+        consulta = """
+            SELECT usuario, endpoint, p256dh, auth FROM push_subscriptions
+            WHERE ativo = 1
+        """
         if filtro_usuarios:
             placeholders = ', '.join([SQL_PLACEHOLDER] * len(filtro_usuarios))
-            cursor.execute(f"""
-                SELECT DISTINCT usuario FROM push_subscriptions
-                WHERE ativo = 1 AND usuario IN ({placeholders})
-            """, tuple(filtro_usuarios))
+            cursor.execute(consulta + f" AND usuario IN ({placeholders})", tuple(filtro_usuarios))
         else:
-            cursor.execute("SELECT DISTINCT usuario FROM push_subscriptions WHERE ativo = 1")
-        
-        usuarios = [row[0] for row in cursor.fetchall()]
-        
-        resultados = {
-            'total_usuarios': len(usuarios),
-            'enviados': 0,
-            'falhas': 0,
-            'usuarios_notificados': []
-        }
-        
-        for usuario in usuarios:
-            enviados, total = enviar_notificacao_para_usuario(
-                usuario=usuario,
-                titulo=titulo,
-                mensagem=mensagem,
-                tipo=tipo,
-                url=url
-            )
-            
-            if enviados > 0:
-                resultados['enviados'] += 1
-                resultados['usuarios_notificados'].append(usuario)
-            else:
-                resultados['falhas'] += 1
-        
-        return resultados
-        
+            cursor.execute(consulta)
+        rows = cursor.fetchall()
     except Exception as e:
         logger.error(f"Erro ao enviar para todos: {e}")
         return {'error': str(e)}
     finally:
         if conn:
             return_connection(conn)
+    
+    subscriptions_por_usuario: Dict[str, List[Dict]] = {}
+    for usuario, endpoint, p256dh, auth in rows:
+        subscriptions_por_usuario.setdefault(usuario, []).append(
+            {'endpoint': endpoint, 'keys': {'p256dh': p256dh, 'auth': auth}}
+        )
+    
+    try:
+        contagem = _enviar_e_registrar(subscriptions_por_usuario, titulo, mensagem, tipo, url, None)
+    except Exception as e:
+        logger.error(f"Erro ao enviar para todos: {e}")
+        return {'error': str(e)}
+    
+    notificados = [usuario for usuario, (enviados, _total) in contagem.items() if enviados > 0]
+    return {
+        'total_usuarios': len(subscriptions_por_usuario),
+        'enviados': len(notificados),
+        'falhas': len(subscriptions_por_usuario) - len(notificados),
+        'usuarios_notificados': notificados,
+        'dispositivos': sum(total for _enviados, total in contagem.values()),
+    }
 
 
 # ============================================
@@ -494,27 +647,8 @@ def registrar_notificacao_log(
     erro: Optional[str] = None
 ) -> None:
     """Registra uma notificação no log para auditoria."""
-    conn = None
-    try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        dados_json = json.dumps(dados_extras) if dados_extras else None
-        
-        cursor.execute(f"""
-            INSERT INTO push_notifications_log 
-            (usuario, titulo, mensagem, tipo, dados_extras, status, erro)
-            VALUES ({SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, 
-                    {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER}, {SQL_PLACEHOLDER})
-        """, (usuario, titulo, mensagem, tipo, dados_json, status, erro))
-        
-        conn.commit()
-        
-    except Exception as e:
-        logger.error(f"Erro ao registrar log de notificação: {e}")
-    finally:
-        if conn:
-            return_connection(conn)
+    dados_json = json.dumps(dados_extras) if dados_extras else None
+    _gravar_resultados([], [(usuario, titulo, mensagem, tipo, dados_json, status, erro)])
 
 
 # ============================================
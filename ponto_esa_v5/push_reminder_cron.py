@@ -15,6 +15,7 @@ Pode ser executado:
 @version: 1.0.0
 """
 
+import importlib.util
 import os
 import sys
 import logging
@@ -24,7 +25,7 @@ from typing import List, Dict, Tuple, Optional
 # Adicionar diretório ao path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from constants import agora_br_naive
+from constants import agora_br_naive, REMINDER_HORARIOS_PADRAO, REMINDER_WHEEL_MISFIRE_SECONDS
 
 # Tentar importar pytz para timezone
 try:
@@ -43,7 +44,11 @@ logger = logging.getLogger(__name__)
 # Importar módulos do sistema
 try:
     from database import get_connection, return_connection, SQL_PLACEHOLDER
-    from push_scheduler import enviar_notificacao as enviar_notificacao_ntfy
+    from push_scheduler import (
+        enviar_notificacao as enviar_notificacao_ntfy,
+        enviar_notificacoes_em_lote,
+        ensure_push_schema_once,
+    )
     from push_notifications import (
         push_system,
         notificar_esqueceu_entrada,
@@ -54,6 +59,16 @@ try:
         notificar_lembrete_aprovacao_urgente,
         notificar_resumo_diario_aprovador
     )
+    from leader_election import EleicaoLider
+    from schema_probe import tabela_existe
+    from job_telemetry import instrumentar_scheduler
+    from reminder_wheel import (
+        obter_roda,
+        agenda_carregada,
+        carregar_agenda,
+        descarregar_agenda,
+        recarregar_alterados,
+    )
 except ImportError as e:
     logger.error(f"Erro ao importar módulos: {e}")
     sys.exit(1)
@@ -68,6 +83,60 @@ def _enviar_ntfy_usuario(usuario: str, titulo: str, mensagem: str, emoji: str =
         return 0
 
 
+def _enviar_ntfy_lote(topicos: Dict[str, Optional[str]], titulo: str, mensagem: str, emoji: str = "🔔") -> List[str]:
+    """Envia o mesmo lembrete em paralelo; retorna os usuários notificados
+    (inclusive os adiados para a outbox pelo limite de taxa do ntfy).
+
+    Args:
+        topicos: ``{usuario: topic}`` já resolvido na consulta de seleção
+            (None usa o tópico determinístico).
+    """
+    if not topicos:
+        return []
+    try:
+        resultados = enviar_notificacoes_em_lote(list(topicos), titulo, mensagem, emoji, topicos=topicos)
+    except Exception as e:
+        logger.error("Erro ao enviar ntfy em lote: %s", e)
+        return []
+    for usuario, resultado in resultados.items():
+        if not resultado.ok and not resultado.adiado:
+            logger.warning("Falha ao enviar ntfy para %s: %s", usuario, resultado.erro)
+    return [usuario for usuario, resultado in resultados.items() if resultado.ok or resultado.adiado]
+
+
+def _flag_config(tem_config, valor) -> bool:
+    """Flag de config_lembretes_push, como em ``obter_config_lembretes``.
+
+    Sem linha de configuração vale o padrão (True); com linha, NULL vale False.
+    """
+    return bool(valor) if tem_config else True
+
+
+def _colunas_config(alias: str, *colunas: str) -> Tuple[str, str]:
+    """``(colunas, JOIN)`` de config_lembretes_push para um SELECT por usuário.
+
+    A primeira coluna diz se o usuário tem linha de configuração. Em bancos
+    sem a tabela as colunas vêm NULL e todos ficam com os padrões.
+    """
+    if tabela_existe('config_lembretes_push') is False:
+        return ", ".join(["NULL"] * (len(colunas) + 1)), ""
+    return (
+        ", ".join(["c.usuario", *(f"c.{coluna}" for coluna in colunas)]),
+        f"LEFT JOIN config_lembretes_push c ON c.usuario = {alias}.usuario",
+    )
+
+
+# Um tópico por usuário: várias inscrições ativas (dispositivos) não duplicam linhas
+_JOIN_TOPICO = """
+    LEFT JOIN (
+        SELECT usuario, MAX(topic) AS topic
+        FROM push_subscriptions
+        WHERE CAST(ativo AS TEXT) IN ('1', 't', 'true', 'TRUE')
+        GROUP BY usuario
+    ) ps ON ps.usuario = {alias}.usuario
+"""
+
+
 def get_datetime_br() -> datetime:
     """Retorna datetime atual no fuso de Brasília."""
     if TIMEZONE_BR:
@@ -126,6 +195,79 @@ def obter_usuarios_ativos_com_jornada() -> List[Dict]:
             return_connection(conn)
 
 
+def obter_destinatarios_lembrete_ponto(usuarios: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Seleciona, numa única consulta, os dados que os jobs de lembrete de
+    entrada/saída precisam de cada usuário ativo: configuração de lembretes,
+    pontos de entrada/saída de hoje e tópico ntfy.
+
+    Args:
+        usuarios: restringe a consulta a estes usuários (os que venceram na
+            agenda de lembretes); None consulta todos os ativos.
+
+    Returns:
+        Lista de dicts com usuario, lembrete_entrada, lembrete_saida,
+        dias_semana, entrou, saiu e topic
+    """
+    conn = None
+    try:
+        ensure_push_schema_once()
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        hoje = get_date_br()
+        # Intervalo (em vez de DATE(data_hora)) permite usar o índice de data_hora
+        inicio, fim = hoje.strftime('%Y-%m-%d'), (hoje + timedelta(days=1)).strftime('%Y-%m-%d')
+        params = [inicio, fim]
+        filtro_usuarios = ""
+        filtro_registros = ""
+        if usuarios is not None:
+            if not usuarios:
+                return []
+            marcadores = ", ".join([SQL_PLACEHOLDER] * len(usuarios))
+            filtro_usuarios = f" AND u.usuario IN ({marcadores})"
+            filtro_registros = f" AND usuario IN ({marcadores})"
+            params = [inicio, fim, *usuarios, *usuarios]
+
+        colunas_config, join_config = _colunas_config('u', 'lembrete_entrada', 'lembrete_saida', 'dias_semana')
+        cursor.execute(f"""
+            SELECT u.usuario, {colunas_config},
+                   COALESCE(r.entradas, 0), COALESCE(r.saidas, 0), ps.topic
+            FROM usuarios u
+            {join_config}
+            {_JOIN_TOPICO.format(alias='u')}
+            LEFT JOIN (
+                SELECT usuario,
+                       SUM(CASE WHEN LOWER(tipo) IN ('início', 'inicio', 'entrada') THEN 1 ELSE 0 END) AS entradas,
+                       SUM(CASE WHEN LOWER(tipo) = 'fim' THEN 1 ELSE 0 END) AS saidas
+                FROM registros_ponto
+                WHERE data_hora >= {SQL_PLACEHOLDER} AND data_hora < {SQL_PLACEHOLDER}{filtro_registros}
+                GROUP BY usuario
+            ) r ON r.usuario = u.usuario
+            WHERE u.ativo = 1{filtro_usuarios}
+        """, params)
+
+        return [
+            {
+                'usuario': row[0],
+                'lembrete_entrada': _flag_config(row[1], row[2]),
+                'lembrete_saida': _flag_config(row[1], row[3]),
+                'dias_semana': [int(d) for d in (row[4] or '1,2,3,4,5').split(',')],
+                'entrou': int(row[5] or 0) > 0,
+                'saiu': int(row[6] or 0) > 0,
+                'topic': row[7],
+            }
+            for row in cursor.fetchall()
+        ]
+
+    except Exception as e:
+        logger.error(f"Erro ao selecionar destinatários de lembrete: {e}")
+        return []
+    finally:
+        if conn:
+            return_connection(conn)
+
+
 def verificar_registro_entrada_hoje(usuario: str) -> bool:
     """
     Verifica se o usuário já registrou entrada hoje.
@@ -201,17 +343,23 @@ def obter_horas_extras_ativas() -> List[Dict]:
     Obtém lista de horas extras em andamento.
     
     Returns:
-        Lista de dicts com usuario, data_inicio, minutos_decorridos
+        Lista de dicts com usuario, data_inicio, minutos_decorridos,
+        lembrete_hora_extra (config do usuário) e topic (ntfy, se inscrito)
     """
     conn = None
     try:
+        ensure_push_schema_once()
         conn = get_connection()
         cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT usuario, data_inicio, hora_inicio
-            FROM horas_extras_ativas
-            WHERE status = 'em_execucao'
+        # Config de lembrete e tópico ntfy no mesmo SELECT (sem consulta por usuário)
+        colunas_config, join_config = _colunas_config('h', 'lembrete_hora_extra')
+        cursor.execute(f"""
+            SELECT h.usuario, h.data_inicio, h.hora_inicio, {colunas_config}, ps.topic
+            FROM horas_extras_ativas h
+            {join_config}
+            {_JOIN_TOPICO.format(alias='h')}
+            WHERE h.status = 'em_execucao'
         """)
         
         agora = get_datetime_br().replace(tzinfo=None)
@@ -234,7 +382,9 @@ def obter_horas_extras_ativas() -> List[Dict]:
             horas_extras.append({
                 'usuario': usuario,
                 'data_inicio': data_inicio,
-                'minutos_decorridos': minutos
+                'minutos_decorridos': minutos,
+                'lembrete_hora_extra': _flag_config(row[3], row[4]),
+                'topic': row[5],
             })
         
         return horas_extras
@@ -334,138 +484,104 @@ def eh_feriado() -> bool:
 # JOBS DE LEMBRETE
 # ============================================
 
-def job_lembrete_entrada() -> Dict:
+MENSAGENS_LEMBRETE = {
+    'entrada': ("Lembrete de Entrada", "Bom dia! Nao esqueça de registrar sua entrada.", "🌅"),
+    'saida': ("Lembrete de Saida", "Nao esqueça de registrar sua saida de hoje.", "🏠"),
+}
+
+
+def _agora_naive() -> datetime:
+    """Horário de Brasília sem tzinfo (a agenda de lembretes compara naive)."""
+    return get_datetime_br().replace(tzinfo=None)
+
+
+def carregar_agenda_lembretes(horarios_padrao: Dict[str, Optional[List[str]]]) -> int:
+    """Carrega a agenda de lembretes por usuário (chamado ao assumir a liderança).
+
+    Args:
+        horarios_padrao: ``{'entrada': [...], 'saida': [...]}`` para quem não
+            tem horário pessoal; ``None`` desliga o tipo.
+    """
+    return carregar_agenda(horarios_padrao, _agora_naive())
+
+
+def executar_lembretes_agendados() -> Dict:
     """
-    Verifica e envia lembretes de entrada para usuários que esqueceram.
-    Deve ser executado ~15 minutos após horário de entrada padrão.
+    Execução avulsa (cron externo ou linha de comando) dos lembretes de
+    entrada/saída via ``job_lembretes_agendados``.
+
+    Num processo sem agenda carregada, a agenda parte do início da janela de
+    tolerância, então os lembretes vencidos nela ainda são enviados.
     
     Returns:
         Dict com estatísticas do job
     """
-    logger.info("Iniciando job de lembrete de entrada...")
-    
-    # Verificar se é dia útil
-    if not eh_dia_util() or eh_feriado():
-        logger.info("Hoje não é dia útil ou é feriado. Pulando lembretes de entrada.")
-        return {'status': 'skipped', 'reason': 'not_workday'}
-    
-    resultados = {
-        'verificados': 0,
-        'lembretes_enviados': 0,
-        'ja_registraram': 0,
-        'erros': 0,
-        'usuarios_notificados': []
-    }
-    
-    usuarios = obter_usuarios_ativos_com_jornada()
-    
-    for user in usuarios:
-        resultados['verificados'] += 1
-        
-        try:
-            # Verificar configurações do usuário
-            config = verificar_config_lembretes(user['usuario'])
-            
-            if not config['lembrete_entrada']:
-                continue
-            
-            # Verificar se é dia de trabalho para este usuário
-            dia_semana = get_datetime_br().isoweekday()
-            if dia_semana not in config['dias_semana']:
-                continue
-            
-            # Verificar se já registrou entrada
-            if verificar_registro_entrada_hoje(user['usuario']):
-                resultados['ja_registraram'] += 1
-                continue
-            
-            # Enviar lembrete
-            enviados = _enviar_ntfy_usuario(
-                user['usuario'],
-                "Lembrete de Entrada",
-                "Bom dia! Nao esqueça de registrar sua entrada.",
-                "🌅",
-            )
-
-            if enviados > 0:
-                resultados['lembretes_enviados'] += 1
-                resultados['usuarios_notificados'].append(user['usuario'])
-                logger.info(f"Lembrete de entrada enviado para: {user['usuario']}")
-            
-        except Exception as e:
-            resultados['erros'] += 1
-            logger.error(f"Erro ao processar usuário {user['usuario']}: {e}")
-    
-    logger.info(f"Job de entrada concluído: {resultados['lembretes_enviados']} lembretes enviados")
-    return resultados
+    if not agenda_carregada():
+        inicio = _agora_naive() - timedelta(seconds=REMINDER_WHEEL_MISFIRE_SECONDS)
+        carregar_agenda(REMINDER_HORARIOS_PADRAO, inicio)
+    return job_lembretes_agendados()
 
 
-def job_lembrete_saida() -> Dict:
+def job_lembretes_agendados() -> Dict:
     """
-    Verifica e envia lembretes de saída para usuários que esqueceram.
-    Deve ser executado ~15 minutos após horário de saída padrão.
+    Dispara os lembretes de entrada/saída que vencem neste minuto.
+    Executado a cada minuto: consulta só os usuários vencidos na agenda
+    (``reminder_wheel``), não todos os usuários ativos.
     
     Returns:
         Dict com estatísticas do job
     """
-    logger.info("Iniciando job de lembrete de saída...")
-    
-    if not eh_dia_util() or eh_feriado():
-        logger.info("Hoje não é dia útil ou é feriado. Pulando lembretes de saída.")
-        return {'status': 'skipped', 'reason': 'not_workday'}
-    
+    agora = _agora_naive()
     resultados = {
-        'verificados': 0,
+        'vencidos': 0,
+        'perdidos': 0,
         'lembretes_enviados': 0,
         'ja_registraram': 0,
-        'nao_entraram': 0,
         'erros': 0,
         'usuarios_notificados': []
     }
-    
-    usuarios = obter_usuarios_ativos_com_jornada()
-    
-    for user in usuarios:
-        resultados['verificados'] += 1
-        
-        try:
-            config = verificar_config_lembretes(user['usuario'])
-            
-            if not config['lembrete_saida']:
-                continue
-            
-            dia_semana = get_datetime_br().isoweekday()
-            if dia_semana not in config['dias_semana']:
+    if not agenda_carregada():
+        return {'status': 'skipped', 'reason': 'agenda_nao_carregada'}
+
+    try:
+        recarregar_alterados(agora)
+    except Exception as e:
+        logger.warning(f"Agenda de lembretes não recarregada: {e}")
+
+    devidos, resultados['perdidos'] = obter_roda().vencidos(agora)
+    usuarios = sorted({u for lista in devidos.values() for u in lista})
+    resultados['vencidos'] = len(usuarios)
+    if not usuarios:
+        return resultados
+
+    if eh_feriado():
+        logger.info("Hoje é feriado. Pulando %d lembretes agendados.", len(usuarios))
+        return {'status': 'skipped', 'reason': 'feriado', 'vencidos': len(usuarios)}
+
+    dados = {user['usuario']: user for user in obter_destinatarios_lembrete_ponto(usuarios)}
+    for tipo, lista in devidos.items():
+        destinatarios = {}
+        for usuario in lista:
+            user = dados.get(usuario)
+            if user is None or not user[f'lembrete_{tipo}']:
                 continue
-            
-            # Verificar se registrou entrada (só lembrar se trabalhou)
-            if not verificar_registro_entrada_hoje(user['usuario']):
-                resultados['nao_entraram'] += 1
+            # Saída só para quem entrou hoje; entrada/saída já registrada não precisa de lembrete.
+            if tipo == 'saida' and not user['entrou']:
                 continue
-            
-            # Verificar se já registrou saída
-            if verificar_registro_saida_hoje(user['usuario']):
+            if user['entrou' if tipo == 'entrada' else 'saiu']:
                 resultados['ja_registraram'] += 1
                 continue
-            
-            # Enviar lembrete
-            enviados = _enviar_ntfy_usuario(
-                user['usuario'],
-                "Lembrete de Saida",
-                "Nao esqueça de registrar sua saida de hoje.",
-                "🏠",
-            )
+            destinatarios[usuario] = user['topic']
 
-            if enviados > 0:
-                resultados['lembretes_enviados'] += 1
-                resultados['usuarios_notificados'].append(user['usuario'])
-                logger.info(f"Lembrete de saída enviado para: {user['usuario']}")
-            
-        except Exception as e:
-            resultados['erros'] += 1
-            logger.error(f"Erro ao processar usuário {user['usuario']}: {e}")
-    
-    logger.info(f"Job de saída concluído: {resultados['lembretes_enviados']} lembretes enviados")
+        notificados = _enviar_ntfy_lote(destinatarios, *MENSAGENS_LEMBRETE[tipo])
+        resultados['lembretes_enviados'] += len(notificados)
+        resultados['usuarios_notificados'].extend(notificados)
+        resultados['erros'] += len(destinatarios) - len(notificados)
+
+    logger.info(
+        "Lembretes agendados: %d vencidos, %d enviados, %d perdidos",
+        resultados['vencidos'], resultados['lembretes_enviados'], resultados['perdidos'],
+    )
     return resultados
 
 
@@ -493,45 +609,28 @@ def job_alerta_hora_extra() -> Dict:
     ALERTA_60_MIN = 60
     ALERTA_90_MIN = 90
     
+    # Agrupa por mensagem (mesmos minutos = mesmo texto) para enviar cada grupo em lote
+    grupos: Dict[Tuple[str, str], Dict[str, Optional[str]]] = {}
     for he in horas_extras:
-        try:
-            minutos = he['minutos_decorridos']
-            usuario = he['usuario']
-            
-            config = verificar_config_lembretes(usuario)
-            
-            if not config['lembrete_hora_extra']:
-                continue
-            
-            # Enviar alerta nos marcos de 60 e 90 minutos
-            # (Na prática, verificar se está próximo desses valores)
-            if ALERTA_60_MIN - 5 <= minutos <= ALERTA_60_MIN + 5:
-                enviados = _enviar_ntfy_usuario(
-                    usuario,
-                    "Alerta de Hora Extra",
-                    f"Voce esta em hora extra ha {minutos} minutos. Avalie se ja pode encerrar.",
-                    "⏱️",
-                )
-                if enviados > 0:
-                    resultados['alertas_enviados'] += 1
-                    resultados['usuarios_alertados'].append(usuario)
-                    logger.info(f"Alerta de 1h de HE enviado para: {usuario}")
-            
-            elif ALERTA_90_MIN - 5 <= minutos <= ALERTA_90_MIN + 5:
-                enviados = _enviar_ntfy_usuario(
-                    usuario,
-                    "Alerta de Hora Extra",
-                    f"Voce esta em hora extra ha {minutos} minutos. Lembre-se de finalizar quando terminar.",
-                    "⚠️",
-                )
-                if enviados > 0:
-                    resultados['alertas_enviados'] += 1
-                    resultados['usuarios_alertados'].append(usuario)
-                    logger.info(f"Alerta de 1h30 de HE enviado para: {usuario}")
-            
-        except Exception as e:
-            resultados['erros'] += 1
-            logger.error(f"Erro ao processar HE de {he['usuario']}: {e}")
+        if not he['lembrete_hora_extra']:
+            continue
+
+        minutos = he['minutos_decorridos']
+        # Enviar alerta nos marcos de 60 e 90 minutos
+        # (Na prática, verificar se está próximo desses valores)
+        if ALERTA_60_MIN - 5 <= minutos <= ALERTA_60_MIN + 5:
+            chave = (f"Voce esta em hora extra ha {minutos} minutos. Avalie se ja pode encerrar.", "⏱️")
+        elif ALERTA_90_MIN - 5 <= minutos <= ALERTA_90_MIN + 5:
+            chave = (f"Voce esta em hora extra ha {minutos} minutos. Lembre-se de finalizar quando terminar.", "⚠️")
+        else:
+            continue
+        grupos.setdefault(chave, {})[he['usuario']] = he['topic']
+
+    for (mensagem, emoji), destinatarios in grupos.items():
+        notificados = _enviar_ntfy_lote(destinatarios, "Alerta de Hora Extra", mensagem, emoji)
+        resultados['alertas_enviados'] += len(notificados)
+        resultados['usuarios_alertados'].extend(notificados)
+        resultados['erros'] += len(destinatarios) - len(notificados)
     
     logger.info(f"Job de HE concluído: {resultados['alertas_enviados']} alertas enviados")
     return resultados
@@ -896,18 +995,9 @@ def executar_todos_jobs() -> Dict:
         'jobs': {}
     }
     
-    # Job de entrada (executar entre 8:15 e 9:30)
+    # Lembretes de entrada/saída vencidos (horário de cada usuário)
     agora = get_time_br()
-    if time(8, 15) <= agora <= time(9, 30):
-        resultados['jobs']['entrada'] = job_lembrete_entrada()
-    else:
-        resultados['jobs']['entrada'] = {'status': 'skipped', 'reason': 'outside_window'}
-    
-    # Job de saída (executar entre 17:15 e 18:30)
-    if time(17, 15) <= agora <= time(18, 30):
-        resultados['jobs']['saida'] = job_lembrete_saida()
-    else:
-        resultados['jobs']['saida'] = {'status': 'skipped', 'reason': 'outside_window'}
+    resultados['jobs']['lembretes'] = executar_lembretes_agendados()
     
     # Job de hora extra (executar a cada hora entre 18:00 e 22:00)
     if time(18, 0) <= agora <= time(22, 0):
@@ -936,46 +1026,65 @@ def executar_todos_jobs() -> Dict:
 # SCHEDULER (APScheduler - opcional)
 # ============================================
 
-def iniciar_scheduler():
+_scheduler = None
+_eleicao = None
+
+
+def iniciar_scheduler() -> bool:
     """
     Inicia o scheduler de jobs usando APScheduler.
     Requer: pip install apscheduler
+    
+    Só o processo líder (``leader_election``) executa os jobs; os demais
+    aguardam como seguidores e assumem se o líder cair.
+    
+    Returns:
+        True se a eleição foi iniciada (líder ou seguidor)
     """
-    try:
-        from apscheduler.schedulers.background import BackgroundScheduler
-        from apscheduler.triggers.cron import CronTrigger
-    except ImportError:
+    global _eleicao
+    if importlib.util.find_spec("apscheduler") is None:
         logger.error("APScheduler não instalado. Execute: pip install apscheduler")
-        return None
+        return False
     
-    scheduler = BackgroundScheduler(timezone='America/Sao_Paulo')
+    if _eleicao is None:
+        _eleicao = EleicaoLider("push_reminder_cron", _iniciar_jobs, _parar_jobs)
+    _eleicao.iniciar()
+    return True
+
+
+def parar_scheduler():
+    """Para os jobs (se líder) e encerra a eleição."""
+    if _eleicao is not None:
+        _eleicao.parar()
+    _parar_jobs()
+
+
+def _parar_jobs():
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.shutdown(wait=False)
+        _scheduler = None
+        logger.info("Scheduler de lembretes parado")
+    # Sem a liderança a agenda em memória envelhece; o próximo líder recarrega.
+    descarregar_agenda()
+
+
+def _iniciar_jobs() -> bool:
+    """Cria e inicia o scheduler com os jobs (chamado ao assumir a liderança)."""
+    global _scheduler
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.triggers.cron import CronTrigger
     
-    # Job de lembrete de entrada - 8:15, 8:30, 9:00 (dias úteis)
-    scheduler.add_job(
-        job_lembrete_entrada,
-        CronTrigger(hour='8', minute='15,30', day_of_week='mon-fri'),
-        id='lembrete_entrada_1',
-        name='Lembrete de Entrada (8:15/8:30)'
-    )
-    scheduler.add_job(
-        job_lembrete_entrada,
-        CronTrigger(hour='9', minute='0', day_of_week='mon-fri'),
-        id='lembrete_entrada_2',
-        name='Lembrete de Entrada (9:00)'
-    )
+    scheduler = BackgroundScheduler(timezone='America/Sao_Paulo')
     
-    # Job de lembrete de saída - 17:15, 17:30, 18:00 (dias úteis)
-    scheduler.add_job(
-        job_lembrete_saida,
-        CronTrigger(hour='17', minute='15,30', day_of_week='mon-fri'),
-        id='lembrete_saida_1',
-        name='Lembrete de Saída (17:15/17:30)'
-    )
+    # Lembretes de entrada/saída no horário de cada usuário; sem horário
+    # pessoal: REMINDER_HORARIOS_PADRAO (dias úteis)
+    carregar_agenda_lembretes(REMINDER_HORARIOS_PADRAO)
     scheduler.add_job(
-        job_lembrete_saida,
-        CronTrigger(hour='18', minute='0', day_of_week='mon-fri'),
-        id='lembrete_saida_2',
-        name='Lembrete de Saída (18:00)'
+        job_lembretes_agendados,
+        CronTrigger(minute='*'),
+        id='lembretes_agendados',
+        name='Lembretes de Entrada/Saída (agenda por usuário)'
     )
     
     # Job de alerta de hora extra - a cada 30 minutos entre 18:00 e 22:00
@@ -1010,10 +1119,12 @@ def iniciar_scheduler():
         name='Lembrete Fim do Dia para Aprovadores (17:00)'
     )
     
+    instrumentar_scheduler(scheduler)
     scheduler.start()
+    _scheduler = scheduler
     logger.info("Scheduler de lembretes iniciado")
     
-    return scheduler
+    return True
 
 
 # ============================================
@@ -1024,7 +1135,7 @@ if __name__ == '__main__':
     import argparse
     
     parser = argparse.ArgumentParser(description='Sistema de Lembretes Automáticos - Ponto ExSA')
-    parser.add_argument('--job', choices=['entrada', 'saida', 'hora_extra', 'aprovadores', 'aprovadores_urgente', 'todos'],
+    parser.add_argument('--job', choices=['lembretes', 'hora_extra', 'aprovadores', 'aprovadores_urgente', 'todos'],
                         help='Executar job específico')
     parser.add_argument('--scheduler', action='store_true',
                         help='Iniciar scheduler em background')
@@ -1066,22 +1177,19 @@ if __name__ == '__main__':
         
     elif args.scheduler:
         print("Iniciando scheduler de lembretes...")
-        scheduler = iniciar_scheduler()
-        if scheduler:
-            print("Scheduler rodando. Pressione Ctrl+C para parar.")
+        if iniciar_scheduler():
+            print("Scheduler rodando (executa os jobs só enquanto for o líder). Pressione Ctrl+C para parar.")
             try:
                 while True:
                     import time as t
                     t.sleep(60)
             except KeyboardInterrupt:
                 print("\nParando scheduler...")
-                scheduler.shutdown()
+                parar_scheduler()
         
     elif args.job:
-        if args.job == 'entrada':
-            resultado = job_lembrete_entrada()
-        elif args.job == 'saida':
-            resultado = job_lembrete_saida()
+        if args.job == 'lembretes':
+            resultado = executar_lembretes_agendados()
         elif args.job == 'hora_extra':
             resultado = job_alerta_hora_extra()
         elif args.job == 'aprovadores':
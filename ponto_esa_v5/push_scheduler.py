@@ -8,15 +8,16 @@ Todas as operações de banco usam o pool centralizado de ``database.py``.
 import os
 import hashlib
 import re
-import requests
 import threading
-from datetime import date
+import time
+from datetime import date, timedelta
 from contextlib import contextmanager
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 
 from app_logger import get_logger, log_db_error
+from constants import agora_br_naive
 
 logger = get_logger(__name__)
 
@@ -28,6 +29,36 @@ try:
 except ImportError:
     from ponto_esa_v5.database import get_connection, return_connection, SQL_PLACEHOLDER
 
+try:
+    from pending_counters import sincronizar_contadores
+except ImportError:
+    from ponto_esa_v5.pending_counters import sincronizar_contadores
+
+try:
+    from ntfy_client import publicar, publicar_em_lote, publicar_varios
+except ImportError:
+    from ponto_esa_v5.ntfy_client import publicar, publicar_em_lote, publicar_varios
+
+try:
+    from notification_outbox import enfileirar_notificacao
+except ImportError:
+    from ponto_esa_v5.notification_outbox import enfileirar_notificacao
+
+try:
+    from leader_election import EleicaoLider
+except ImportError:
+    from ponto_esa_v5.leader_election import EleicaoLider
+
+try:
+    from job_telemetry import instrumentar_scheduler
+except ImportError:
+    from ponto_esa_v5.job_telemetry import instrumentar_scheduler
+
+try:
+    from reminder_wheel import recarregar_usuario as recarregar_lembretes_usuario
+except ImportError:
+    from ponto_esa_v5.reminder_wheel import recarregar_usuario as recarregar_lembretes_usuario
+
 # URL base do ntfy.sh (gratuito e público)
 NTFY_URL = "https://ntfy.sh"
 
@@ -150,10 +181,49 @@ def _get_topic_from_db_or_default(usuario: str) -> str:
     return get_topic_for_user(usuario)
 
 
+def _topicos_por_usuario(usuarios: list) -> dict:
+    """Resolve os tópicos de vários usuários com uma consulta (lotes de 500).
+
+    Usuários sem subscription (ou em caso de erro) recebem o tópico determinístico.
+    """
+    topicos = {}
+    try:
+        ensure_push_schema_once()
+        with _db() as conn:
+            cursor = conn.cursor()
+            for i in range(0, len(usuarios), 500):
+                lote = usuarios[i:i + 500]
+                cursor.execute(
+                    f"SELECT usuario, topic FROM push_subscriptions WHERE usuario IN ({_ph(len(lote))})",
+                    tuple(lote),
+                )
+                for usuario, topic in cursor.fetchall():
+                    if topic and usuario not in topicos:
+                        topicos[usuario] = str(topic).strip()
+            cursor.close()
+    except Exception as e:
+        logger.debug("Erro ao buscar topics em lote: %s", e)
+
+    return {usuario: topicos.get(usuario) or get_topic_for_user(usuario) for usuario in usuarios}
+
+
 # ---------------------------------------------------------------------------
 # Envio de notificação via ntfy
 # ---------------------------------------------------------------------------
 
+def _montar_envio(titulo: str, mensagem: str, emoji: str):
+    """Retorna (corpo, headers) do envio ntfy."""
+    # Header HTTP não aceita emoji em latin-1; emoji vai no corpo.
+    title_header = _header_latin1_safe(titulo) or "Notificacao"
+    body_text = f"{emoji} {mensagem}" if emoji else mensagem
+    headers = {
+        "Title": title_header,
+        "Priority": "high",
+        "Tags": "clock,calendar",
+        "Click": os.getenv("APP_URL", "https://ponto-exsa.onrender.com"),
+    }
+    return body_text.encode("utf-8"), headers
+
 def enviar_notificacao(usuario: str, titulo: str, mensagem: str, emoji: str = "📋") -> bool:
     """Envia uma notificação push para o usuário via ntfy.sh.
 
@@ -173,31 +243,88 @@ def enviar_notificacao(usuario: str, titulo: str, mensagem: str, emoji: str = "
     topic = _get_topic_from_db_or_default(usuario)
     url = f"{NTFY_URL}/{topic}"
 
-    try:
-        # Header HTTP não aceita emoji em latin-1; emoji vai no corpo.
-        title_header = _header_latin1_safe(titulo) or "Notificacao"
-        body_text = f"{emoji} {mensagem}" if emoji else mensagem
-        response = requests.post(
-            url,
-            data=body_text.encode("utf-8"),
-            headers={
-                "Title": title_header,
-                "Priority": "high",
-                "Tags": "clock,calendar",
-                "Click": os.getenv("APP_URL", "https://ponto-exsa.onrender.com"),
-            },
-            timeout=10,
-        )
-        if response.status_code == 200:
-            logger.info("[Push] Notificação enviada para %s: %s", usuario, mensagem[:80])
-            return True
+    corpo, headers = _montar_envio(titulo, mensagem, emoji)
+    resultado = publicar(url, corpo, headers)
+    if resultado.ok:
+        logger.info("[Push] Notificação enviada para %s: %s", usuario, mensagem[:80])
+        return True
 
-        logger.error("[Push] Erro ao enviar para %s: HTTP %s", usuario, response.status_code)
-        return False
+    logger.error("[Push] Erro ao enviar para %s: %s", usuario, resultado.erro)
+    return False
 
-    except Exception as e:
-        logger.error("[Push] Exceção ao enviar para %s: %s", usuario, e)
-        return False
+
+def enviar_notificacoes_em_lote(
+    usuarios: list, titulo: str, mensagem: str, emoji: str = "📋", topicos: dict = None,
+    espera_max: float = None,
+) -> dict:
+    """Envia a mesma notificação para vários usuários em paralelo.
+
+    Os tópicos são resolvidos numa única consulta (ou recebidos prontos em
+    ``topicos``, ex.: de um JOIN com ``push_subscriptions``) e os envios
+    compartilham conexões keep-alive (ver ``ntfy_client``). Com
+    ``espera_max=0`` (envio pela UI) quem o limite de taxa não libera na hora
+    vai para a outbox em vez de segurar a requisição.
+
+    Returns:
+        ``{usuario: ResultadoEnvio}`` com o resultado de cada destinatário.
+    """
+    usuarios = list(dict.fromkeys(u for u in usuarios if u))
+    if not usuarios or not titulo:
+        return {}
+
+    if topicos is None:
+        topicos = _topicos_por_usuario(usuarios)
+    topicos = {u: topicos.get(u) or get_topic_for_user(u) for u in usuarios}
+    corpo, headers = _montar_envio(titulo, mensagem, emoji)
+    resultados = publicar_em_lote(
+        {u: f"{NTFY_URL}/{topicos[u]}" for u in usuarios}, corpo, headers, espera_max=espera_max
+    )
+    _adiar_na_outbox(resultados, {u: (titulo, mensagem, emoji) for u in usuarios})
+    return resultados
+
+
+def enviar_notificacoes_individuais(envios: dict, topicos: dict = None) -> dict:
+    """Envia notificações diferentes por usuário, em paralelo.
+
+    Args:
+        envios: ``{usuario: (titulo, mensagem, emoji)}``.
+        topicos: ``{usuario: topic}`` já resolvido (None = consulta em lote).
+
+    Returns:
+        ``{usuario: ResultadoEnvio}``.
+    """
+    if not envios:
+        return {}
+
+    usuarios = list(envios)
+    if topicos is None:
+        topicos = _topicos_por_usuario(usuarios)
+    preparados = {}
+    for usuario, (titulo, mensagem, emoji) in envios.items():
+        corpo, headers = _montar_envio(titulo, mensagem, emoji)
+        topic = topicos.get(usuario) or get_topic_for_user(usuario)
+        preparados[usuario] = (f"{NTFY_URL}/{topic}", corpo, headers)
+    resultados = publicar_varios(preparados)
+    _adiar_na_outbox(resultados, envios)
+    return resultados
+
+
+def _adiar_na_outbox(resultados: dict, envios: dict) -> None:
+    """Passa para a outbox os envios que o limite de taxa do ntfy não liberou.
+
+    Args:
+        resultados: ``{usuario: ResultadoEnvio}`` do lote.
+        envios: ``{usuario: (titulo, mensagem, emoji)}``.
+
+    Quem não pôde ser enfileirado perde ``adiado`` e conta como falha.
+    """
+    for usuario, resultado in resultados.items():
+        if not resultado.adiado:
+            continue
+        titulo, mensagem, emoji = envios[usuario]
+        payload = {"titulo": titulo, "mensagem": mensagem, "emoji": emoji}
+        if not enfileirar_notificacao("ntfy", usuario, payload):
+            resultado.adiado = False
 
 
 # ---------------------------------------------------------------------------
@@ -488,6 +615,8 @@ def atualizar_horarios_usuario(
             conn.commit()
             cursor.close()
         logger.info("[Push] Horários atualizados para %s", usuario)
+        # Os demais processos percebem a mudança por data_atualizacao.
+        recarregar_lembretes_usuario(usuario, agora_br_naive())
         return True
     except Exception as e:
         log_db_error(__name__, "atualizar_horarios_usuario", e)
@@ -591,17 +720,10 @@ def enviar_aviso_geral(gestor: str, titulo: str, mensagem: str, destinatarios: s
 
         logger.info("[Push] Enviando aviso para %d destinatário(s): %s", len(lista_destino), lista_destino)
 
-        # Enviar para cada destinatário (usa tópico ntfy direto, sem depender de subscription)
-        enviados = 0
-        for usuario in lista_destino:
-            try:
-                ok = enviar_notificacao(usuario, f"📢 {titulo}", mensagem, "📢")
-                if ok:
-                    enviados += 1
-                else:
-                    logger.warning("[Push] Falha ao enviar para %s", usuario)
-            except Exception as e:
-                logger.error("[Push] Erro ao enviar para %s: %s", usuario, e)
+        # Envio concorrente (tópico ntfy direto, sem depender de subscription); disparado
+        # pela tela do gestor, não espera o limite de taxa: o excedente vai para a outbox
+        resultados = enviar_notificacoes_em_lote(lista_destino, f"📢 {titulo}", mensagem, "📢", espera_max=0)
+        enviados = _contar_entregas(resultados)
 
         logger.info("[Push] Aviso enviado para %d de %d usuários", enviados, len(lista_destino))
         return enviados
@@ -635,6 +757,7 @@ def enviar_mensagem_direta(remetente: str, destinatario: str, mensagem: str) ->
                 INSERT INTO mensagens_diretas (remetente, destinatario, mensagem)
                 VALUES ({_ph(3)})
             """, (remetente, destinatario, mensagem))
+            sincronizar_contadores(cursor, "mensagens_diretas", chaves=[destinatario])
 
             conn.commit()
             cursor.close()
@@ -685,6 +808,7 @@ def marcar_mensagem_lida(mensagem_id: int) -> bool:
                 f"UPDATE mensagens_diretas SET lida = TRUE WHERE id = {SQL_PLACEHOLDER}",
                 (mensagem_id,),
             )
+            sincronizar_contadores(cursor, "mensagens_diretas", ids=[mensagem_id])
             conn.commit()
             cursor.close()
         return True
@@ -793,149 +917,211 @@ def verificar_aniversarios() -> None:
         log_db_error(__name__, "verificar_aniversarios", e)
 
 
-def verificar_inconsistencias_ponto() -> None:
-    """Verifica registros de ponto inconsistentes (executado às 18h)."""
+def _contar_entregas(resultados: dict) -> int:
+    """Conta os envios entregues ou adiados para a outbox e registra as falhas no log."""
+    for usuario, resultado in resultados.items():
+        if resultado.adiado:
+            logger.info("[Push] Envio para %s adiado para a outbox (limite de taxa)", usuario)
+        elif not resultado.ok:
+            logger.warning("[Push] Falha ao enviar para %s: %s", usuario, resultado.erro)
+    return sum(1 for resultado in resultados.values() if resultado.ok or resultado.adiado)
+
+
+# Uma linha por usuário com inscrição ativa: vários dispositivos (endpoints)
+# do mesmo usuário não multiplicam as linhas dos JOINs.
+_INSCRICOES_ATIVAS = """
+    SELECT usuario, MAX(topic) AS topic
+    FROM push_subscriptions
+    WHERE CAST(ativo AS TEXT) IN ('1', 't', 'true', 'TRUE')
+    GROUP BY usuario
+"""
+
+
+def verificar_inconsistencias_ponto() -> dict:
+    """Verifica registros de ponto inconsistentes (executado às 18h).
+
+    As inscrições ativas entram no JOIN das consultas de detecção; a conexão
+    é devolvida antes de qualquer envio HTTP, feito em paralelo.
+
+    Returns:
+        Telemetria do job: contagens, ``duracao_ms`` e ``conexao_ms``.
+    """
+    inicio = time.perf_counter()
+    telemetria = {"sem_registro": 0, "incompletos": 0, "enviados": 0, "duracao_ms": 0.0, "conexao_ms": 0.0}
     try:
         hoje = date.today()
+        # Intervalo (em vez de DATE(data_hora)) permite usar o índice de data_hora
+        dia_inicio, dia_fim = hoje.isoformat(), (hoje + timedelta(days=1)).isoformat()
+
+        inicio_conexao = time.perf_counter()
         with _db() as conn:
             cursor = conn.cursor()
 
             cursor.execute(f"""
-                SELECT u.usuario, u.nome_completo
+                SELECT u.usuario, ps.topic
                 FROM usuarios u
-                LEFT JOIN registros_ponto r ON u.usuario = r.usuario
-                    AND DATE(r.data_hora) = {SQL_PLACEHOLDER}
+                JOIN ({_INSCRICOES_ATIVAS}) ps ON ps.usuario = u.usuario
                 WHERE u.ativo = 1
                   AND u.tipo = 'funcionario'
-                  AND r.id IS NULL
-            """, (hoje,))
+                  AND NOT EXISTS (
+                      SELECT 1 FROM registros_ponto r
+                      WHERE r.usuario = u.usuario
+                        AND r.data_hora >= {SQL_PLACEHOLDER} AND r.data_hora < {SQL_PLACEHOLDER}
+                  )
+            """, (dia_inicio, dia_fim))
             sem_registro = cursor.fetchall()
 
-            for usuario, _nome in sem_registro:
-                cursor.execute(
-                    f"SELECT ativo FROM push_subscriptions WHERE usuario = {SQL_PLACEHOLDER}",
-                    (usuario,),
-                )
-                result = cursor.fetchone()
-                if result and _is_ativo_enabled(result[0]):
-                    enviar_notificacao(
-                        usuario,
-                        "⚠️ Registro Pendente",
-                        f"Você ainda não registrou o ponto hoje ({hoje.strftime('%d/%m/%Y')}).",
-                        "⚠️",
-                    )
-
+            # Batidas contadas antes do JOIN: cada dispositivo inscrito não conta de novo
             cursor.execute(f"""
-                SELECT r.usuario, COUNT(*) as qtd, u.nome_completo
-                FROM registros_ponto r
+                SELECT r.usuario, r.qtd, ps.topic
+                FROM (
+                    SELECT usuario, COUNT(*) AS qtd
+                    FROM registros_ponto
+                    WHERE data_hora >= {SQL_PLACEHOLDER} AND data_hora < {SQL_PLACEHOLDER}
+                    GROUP BY usuario
+                    HAVING COUNT(*) % 2 = 1
+                ) r
                 JOIN usuarios u ON r.usuario = u.usuario
-                WHERE DATE(r.data_hora) = {SQL_PLACEHOLDER}
-                GROUP BY r.usuario, u.nome_completo
-                HAVING MOD(COUNT(*), 2) = 1
-            """, (hoje,))
+                JOIN ({_INSCRICOES_ATIVAS}) ps ON ps.usuario = r.usuario
+            """, (dia_inicio, dia_fim))
             registros_impares = cursor.fetchall()
 
-            for usuario, qtd, _nome in registros_impares:
-                cursor.execute(
-                    f"SELECT ativo FROM push_subscriptions WHERE usuario = {SQL_PLACEHOLDER}",
-                    (usuario,),
-                )
-                result = cursor.fetchone()
-                if result and _is_ativo_enabled(result[0]):
-                    enviar_notificacao(
-                        usuario,
-                        "⚠️ Registro Incompleto",
-                        f"Você tem {qtd} registro(s) hoje - falta registrar saída/entrada!",
-                        "⚠️",
-                    )
-
             cursor.close()
-        logger.info(
-            "[Push] Inconsistências: %d sem registro, %d incompletos",
-            len(sem_registro),
-            len(registros_impares),
-        )
+        telemetria["conexao_ms"] = (time.perf_counter() - inicio_conexao) * 1000
+
+        # Conexão já devolvida ao pool: envios HTTP em paralelo
+        envios, topicos = {}, {}
+        for usuario, topic in sem_registro:
+            envios[usuario] = (
+                "⚠️ Registro Pendente",
+                f"Você ainda não registrou o ponto hoje ({hoje.strftime('%d/%m/%Y')}).",
+                "⚠️",
+            )
+            topicos[usuario] = topic
+        for usuario, qtd, topic in registros_impares:
+            envios[usuario] = (
+                "⚠️ Registro Incompleto",
+                f"Você tem {qtd} registro(s) hoje - falta registrar saída/entrada!",
+                "⚠️",
+            )
+            topicos[usuario] = topic
+
+        telemetria["sem_registro"] = len(sem_registro)
+        telemetria["incompletos"] = len(registros_impares)
+        telemetria["enviados"] = _contar_entregas(enviar_notificacoes_individuais(envios, topicos))
 
     except Exception as e:
         log_db_error(__name__, "verificar_inconsistencias_ponto", e)
 
+    telemetria["duracao_ms"] = (time.perf_counter() - inicio) * 1000
+    logger.info(
+        "[Push] Inconsistências: %d sem registro, %d incompletos, %d enviados "
+        "(%.0f ms, conexão %.0f ms)",
+        telemetria["sem_registro"],
+        telemetria["incompletos"],
+        telemetria["enviados"],
+        telemetria["duracao_ms"],
+        telemetria["conexao_ms"],
+    )
+    return telemetria
 
-def notificar_gestor_solicitacao(gestor: str, tipo: str, solicitante: str, descricao: str) -> bool:
-    """Notifica o gestor sobre nova solicitação de funcionário via push."""
-    try:
-        with _db() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                f"SELECT ativo FROM push_subscriptions WHERE usuario = {SQL_PLACEHOLDER}",
-                (gestor,),
-            )
-            result = cursor.fetchone()
-            cursor.close()
-
-        if result and _is_ativo_enabled(result[0]):
-            emojis = {"hora_extra": "🕐", "atestado": "📋", "correcao": "🔧", "ferias": "🏖️"}
-            emoji = emojis.get(tipo, "📢")
-            enviar_notificacao(
-                gestor,
-                f"{emoji} Nova Solicitação",
-                f"{solicitante} enviou uma solicitação de {tipo}: {descricao}",
-                emoji,
-            )
-            logger.info("[Push] Gestor %s notificado sobre %s de %s", gestor, tipo, solicitante)
-            return True
 
-    except Exception as e:
-        log_db_error(__name__, "notificar_gestor_solicitacao", e)
+def notificar_gestor_solicitacao(gestor: str, tipo: str, solicitante: str, descricao: str, cursor=None) -> bool:
+    """Notifica o gestor sobre nova solicitação de funcionário via push.
 
-    return False
+    O envio é assíncrono (``notification_outbox``); a inscrição do gestor é
+    verificada na entrega. Com ``cursor``, a linha da outbox é gravada na
+    transação da solicitação e só existe se ela for commitada; o chamador
+    chama ``despertar_worker()`` depois do ``commit``.
 
+    Returns:
+        True se a notificação foi enfileirada.
+    """
+    emojis = {"hora_extra": "🕐", "atestado": "📋", "correcao": "🔧", "ferias": "🏖️"}
+    emoji = emojis.get(tipo, "📢")
+    enfileirada = enfileirar_notificacao(
+        "ntfy",
+        gestor,
+        {
+            "titulo": f"{emoji} Nova Solicitação",
+            "mensagem": f"{solicitante} enviou uma solicitação de {tipo}: {descricao}",
+            "emoji": emoji,
+            "somente_inscritos": True,
+        },
+        cursor=cursor,
+    )
+    if enfileirada:
+        logger.info("[Push] Notificação ao gestor %s sobre %s de %s enfileirada", gestor, tipo, solicitante)
+    return enfileirada
+
+
+def enviar_resumo_pendencias_gestor() -> dict:
+    """Envia resumo diário de pendências para gestores (executado às 8h).
+
+    Gestores inscritos e suas contagens vêm de uma única consulta; a conexão
+    é devolvida antes dos envios, feitos em paralelo.
 
-def enviar_resumo_pendencias_gestor() -> None:
-    """Envia resumo diário de pendências para gestores (executado às 8h)."""
+    Returns:
+        Telemetria do job: contagens, ``duracao_ms`` e ``conexao_ms``.
+    """
+    inicio = time.perf_counter()
+    telemetria = {"gestores": 0, "com_pendencias": 0, "enviados": 0, "duracao_ms": 0.0, "conexao_ms": 0.0}
     try:
+        inicio_conexao = time.perf_counter()
         with _db() as conn:
             cursor = conn.cursor()
 
-            cursor.execute("""
-                SELECT p.usuario
-                FROM push_subscriptions p
+            cursor.execute(f"""
+                SELECT p.usuario, p.topic, COALESCE(he.total, 0),
+                       (SELECT COUNT(*) FROM atestado_horas WHERE status = 'pendente'),
+                       (SELECT COUNT(*) FROM solicitacoes_correcao_registro WHERE status = 'pendente')
+                FROM ({_INSCRICOES_ATIVAS}) p
                 JOIN usuarios u ON p.usuario = u.usuario
-                                WHERE CAST(p.ativo AS TEXT) IN ('1', 't', 'true', 'TRUE')
-                                    AND u.tipo = 'gestor'
+                LEFT JOIN (
+                    SELECT aprovador_solicitado, COUNT(*) AS total
+                    FROM solicitacoes_horas_extras
+                    WHERE status = 'pendente'
+                    GROUP BY aprovador_solicitado
+                ) he ON he.aprovador_solicitado = p.usuario
+                WHERE u.tipo = 'gestor'
             """)
             gestores = cursor.fetchall()
 
-            for (gestor,) in gestores:
-                cursor.execute(
-                    f"SELECT COUNT(*) FROM solicitacoes_horas_extras WHERE status = 'pendente' AND aprovador_solicitado = {SQL_PLACEHOLDER}",
-                    (gestor,),
-                )
-                he = cursor.fetchone()[0]
-
-                cursor.execute("SELECT COUNT(*) FROM atestado_horas WHERE status = 'pendente'")
-                at = cursor.fetchone()[0]
-
-                cursor.execute("SELECT COUNT(*) FROM solicitacoes_correcao_registro WHERE status = 'pendente'")
-                co = cursor.fetchone()[0]
-
-                total = he + at + co
-                if total > 0:
-                    partes = []
-                    if he:
-                        partes.append(f"• {he} hora(s) extra(s)")
-                    if at:
-                        partes.append(f"• {at} atestado(s)")
-                    if co:
-                        partes.append(f"• {co} correção(ões)")
-                    msg = f"Você tem {total} pendência(s):\n" + "\n".join(partes)
-                    enviar_notificacao(gestor, "📋 Resumo de Pendências", msg, "📋")
-
             cursor.close()
-        logger.info("[Push] Resumo enviado para %d gestores", len(gestores))
+        telemetria["conexao_ms"] = (time.perf_counter() - inicio_conexao) * 1000
+
+        envios, topicos = {}, {}
+        for gestor, topic, he, at, co in gestores:
+            total = he + at + co
+            if total > 0:
+                partes = []
+                if he:
+                    partes.append(f"• {he} hora(s) extra(s)")
+                if at:
+                    partes.append(f"• {at} atestado(s)")
+                if co:
+                    partes.append(f"• {co} correção(ões)")
+                msg = f"Você tem {total} pendência(s):\n" + "\n".join(partes)
+                envios[gestor] = ("📋 Resumo de Pendências", msg, "📋")
+                topicos[gestor] = topic
+
+        telemetria["gestores"] = len(gestores)
+        telemetria["com_pendencias"] = len(envios)
+        telemetria["enviados"] = _contar_entregas(enviar_notificacoes_individuais(envios, topicos))
 
     except Exception as e:
         log_db_error(__name__, "enviar_resumo_pendencias_gestor", e)
 
+    telemetria["duracao_ms"] = (time.perf_counter() - inicio) * 1000
+    logger.info(
+        "[Push] Resumo enviado para %d de %d gestores (%.0f ms, conexão %.0f ms)",
+        telemetria["enviados"],
+        telemetria["gestores"],
+        telemetria["duracao_ms"],
+        telemetria["conexao_ms"],
+    )
+    return telemetria
+
 
 # ---------------------------------------------------------------------------
 # Consultas de histórico
@@ -1008,16 +1194,31 @@ def excluir_ferias(ferias_id: int) -> bool:
 
 _scheduler = None
 _scheduler_lock = threading.Lock()
+_eleicao = None
 
 
 def iniciar_scheduler() -> None:
-    """Inicia o scheduler de lembretes (thread-safe, idempotente)."""
+    """Inicia o scheduler de lembretes (thread-safe, idempotente).
+
+    Só o processo líder executa os jobs; os demais aguardam como seguidores.
+    """
+    global _eleicao
+
+    with _scheduler_lock:
+        if _eleicao is None:
+            _eleicao = EleicaoLider("push_scheduler", _iniciar_jobs, _parar_jobs)
+        eleicao = _eleicao
+    eleicao.iniciar()
+
+
+def _iniciar_jobs() -> bool:
+    """Sobe os jobs de lembrete (chamado ao assumir a liderança)."""
     global _scheduler
 
     with _scheduler_lock:
         if _scheduler is not None:
             logger.info("[Push] Scheduler já está rodando")
-            return
+            return True
 
         criar_tabela_subscriptions()
 
@@ -1071,12 +1272,21 @@ def iniciar_scheduler() -> None:
             replace_existing=True,
         )
 
+        instrumentar_scheduler(_scheduler)
         _scheduler.start()
         logger.info("[Push] Scheduler de lembretes iniciado!")
+        return True
 
 
 def parar_scheduler() -> None:
-    """Para o scheduler de forma segura."""
+    """Para o scheduler de forma segura e cede a liderança."""
+    if _eleicao is not None:
+        _eleicao.parar()
+    _parar_jobs()
+
+
+def _parar_jobs() -> None:
+    """Para os jobs deste processo (perdeu a liderança ou encerrando)."""
     global _scheduler
     with _scheduler_lock:
         if _scheduler:
@@ -249,7 +249,7 @@ def salvar_preferencias_push(usuario: str, prefs: Dict) -> bool:
                 lembrete_entrada = EXCLUDED.lembrete_entrada,
                 lembrete_saida = EXCLUDED.lembrete_saida,
                 lembrete_hora_extra = EXCLUDED.lembrete_hora_extra,
-                atualizado_em = CURRENT_TIMESTAMP
+                data_atualizacao = CURRENT_TIMESTAMP
         """, (
             usuario,
             1 if prefs.get('lembrete_entrada', True) else 0,
@@ -0,0 +1,212 @@
+"""
+Limitador de taxa para APIs externas - Ponto ExSA v5.0
+
+Nada limitava as chamadas ao Nominatim (~1 req/s), ao ntfy, aos serviços de
+WebPush e ao SMTP: uma rajada de endereços sem cache ou um aviso geral podia
+bloquear o IP do servidor. Cada destino tem um balde de tokens
+(``RATE_LIMIT_POLITICAS``) com ``taxa`` tokens/s e capacidade ``rajada``.
+
+O estado do balde fica num arquivo em ``RATE_LIMIT_DIR`` protegido por
+``flock`` (``msvcrt.locking`` no Windows), então o limite vale para todas as
+threads e processos do host — o mesmo escopo dos limites dos provedores, que
+contam por IP de origem. Quem não encontra token reserva o próximo (o saldo
+fica negativo) e dorme até a sua vez: a fila é atendida em ordem, sem
+disputa a cada intervalo, e o saldo negativo é a profundidade da fila.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from constants import RATE_LIMIT_DIR, RATE_LIMIT_POLITICAS
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PoliticaLimite:
+    """Taxa sustentada (tokens/s), rajada máxima e espera máxima por um token."""
+
+    taxa: float
+    rajada: int = 1
+    espera_max: float = 30.0
+
+
+class BaldeTokens:
+    """Balde de tokens compartilhado por threads e, com ``arquivo``, por processos."""
+
+    def __init__(self, nome: str, politica: PoliticaLimite, arquivo: Optional[str] = None):
+        self.nome = nome
+        self.politica = politica
+        self.arquivo = arquivo
+        self._lock = threading.Lock()
+        # Estado em memória (sem arquivo): (tokens, instante da última leitura)
+        self._tokens = float(politica.rajada)
+        self._atualizado = time.time()
+        # Métricas deste processo
+        self._aguardando = 0
+        self._adquiridos = 0
+        self._recusados = 0
+        self._esperas = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+
+    @contextmanager
+    def _estado(self):
+        """Lê e grava ``[tokens, atualizado]`` com exclusão entre threads e processos."""
+        with self._lock:
+            if self.arquivo is None:
+                estado = [self._tokens, self._atualizado]
+                yield estado
+                self._tokens, self._atualizado = estado
+                return
+
+            os.makedirs(os.path.dirname(self.arquivo) or ".", exist_ok=True)
+            fd = os.open(self.arquivo, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                try:
+                    tokens, atualizado = os.read(fd, 64).decode().split()
+                    estado = [float(tokens), float(atualizado)]
+                except ValueError:
+                    # Arquivo novo ou corrompido: balde cheio.
+                    estado = [float(self.politica.rajada), time.time()]
+                yield estado
+                dados = f"{estado[0]:.6f} {estado[1]:.6f}\n".encode()
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, dados)
+            finally:
+                if fcntl is None:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+                os.close(fd)  # fechar também solta o flock
+
+    def _reservar(self, tokens: float, espera_max: float) -> Optional[float]:
+        """Reserva ``tokens``; retorna a espera até poder usá-los (None = excede ``espera_max``)."""
+        with self._estado() as estado:
+            agora = time.time()
+            saldo = min(float(self.politica.rajada), estado[0] + max(0.0, agora - estado[1]) * self.politica.taxa)
+            espera = max(0.0, (tokens - saldo) / self.politica.taxa)
+            if espera > espera_max:
+                estado[0], estado[1] = saldo, agora
+                return None
+            estado[0], estado[1] = saldo - tokens, agora
+            return espera
+
+    def adquirir(self, tokens: float = 1, espera_max: Optional[float] = None) -> bool:
+        """Bloqueia até haver ``tokens`` disponíveis.
+
+        Returns:
+            False se a vez chegaria só depois de ``espera_max`` segundos
+            (padrão da política); nesse caso nada é consumido.
+        """
+        espera_max = self.politica.espera_max if espera_max is None else espera_max
+        espera = self._reservar(tokens, espera_max)
+        if espera is None:
+            with self._lock:
+                self._recusados += 1
+            logger.warning("Limite de taxa de '%s' excedido: chamada descartada", self.nome)
+            return False
+
+        if espera > 0:
+            with self._lock:
+                self._aguardando += 1
+            try:
+                time.sleep(espera)
+            finally:
+                with self._lock:
+                    self._aguardando -= 1
+        with self._lock:
+            self._adquiridos += 1
+            if espera > 0:
+                self._esperas += 1
+                self._espera_total += espera
+                self._espera_max = max(self._espera_max, espera)
+        return True
+
+    def fila(self) -> float:
+        """Tokens já reservados além do saldo (chamadas na fila, em todos os processos)."""
+        with self._estado() as estado:
+            pendente = estado[0] + max(0.0, time.time() - estado[1]) * self.politica.taxa
+        return max(0.0, -pendente)
+
+    def metricas(self) -> Dict:
+        try:
+            fila = self.fila()
+        except OSError:
+            fila = None
+        with self._lock:
+            return {
+                "destino": self.nome,
+                "taxa_por_s": self.politica.taxa,
+                "rajada": self.politica.rajada,
+                "aguardando": self._aguardando,
+                "fila": None if fila is None else round(fila, 2),
+                "adquiridos": self._adquiridos,
+                "recusados": self._recusados,
+                "esperas": self._esperas,
+                "espera_media_ms": round(self._espera_total / self._esperas * 1000, 1) if self._esperas else 0.0,
+                "espera_max_ms": round(self._espera_max * 1000, 1),
+            }
+
+
+_baldes: Dict[str, BaldeTokens] = {}
+_baldes_lock = threading.Lock()
+
+
+def obter_limitador(destino: str) -> Optional[BaldeTokens]:
+    """Balde do ``destino`` conforme ``RATE_LIMIT_POLITICAS`` (None se não há política)."""
+    balde = _baldes.get(destino)
+    if balde is not None:
+        return balde
+    config = RATE_LIMIT_POLITICAS.get(destino)
+    if config is None:
+        return None
+    with _baldes_lock:
+        if destino not in _baldes:
+            arquivo = os.path.join(RATE_LIMIT_DIR, f"{destino}.ratelimit") if RATE_LIMIT_DIR else None
+            _baldes[destino] = BaldeTokens(destino, PoliticaLimite(**config), arquivo)
+        return _baldes[destino]
+
+
+def aguardar_vez(destino: str, espera_max: Optional[float] = None) -> bool:
+    """Espera a vez de chamar ``destino``; False se o limite não liberou a tempo."""
+    balde = obter_limitador(destino)
+    if balde is None:
+        return True
+    try:
+        return balde.adquirir(espera_max=espera_max)
+    except OSError as e:
+        # Sem acesso ao arquivo de estado: não travar o envio por isso.
+        logger.warning("Limitador de '%s' indisponível: %s", destino, e)
+        return True
+
+
+def metricas_limitadores() -> List[Dict]:
+    """Profundidade de fila e esperas de cada destino já usado neste processo."""
+    with _baldes_lock:
+        baldes = list(_baldes.values())
+    return [balde.metricas() for balde in baldes]
+
+
+__all__ = [
+    "PoliticaLimite",
+    "BaldeTokens",
+    "obter_limitador",
+    "aguardar_vez",
+    "metricas_limitadores",
+]
@@ -0,0 +1,395 @@
+"""
+Agenda de lembretes por usuário - Ponto ExSA v5.0
+
+Os lembretes de entrada/saída eram cron fixos que, a cada disparo, varriam
+todos os usuários e filtravam depois: o horário pessoal
+(``horario_lembrete_entrada``/``horario_lembrete_saida`` em
+``config_lembretes_push``) era ignorado. Aqui o próximo lembrete de cada
+usuário fica numa fila de prioridade (heap) e o job de minuto em minuto só
+retira os vencidos, então o trabalho por minuto é proporcional a quem vence
+naquele minuto, não ao total de usuários.
+
+A agenda é recarregada de forma incremental: só as linhas de
+``config_lembretes_push`` com ``data_atualizacao`` novo (ou o usuário
+alterado no próprio processo, via ``recarregar_usuario``). Criação,
+exclusão, renomeação e (des)ativação de usuários disparam uma recarga
+completa: um trigger grava em ``usuarios.versao_agenda`` um valor novo a
+cada INSERT ou UPDATE de ``usuario``/``ativo``, e a marca é
+``(COUNT(*), SUM(versao_agenda))``.
+"""
+
+import heapq
+import logging
+import threading
+from datetime import datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from constants import REMINDER_WHEEL_MISFIRE_SECONDS
+
+try:
+    from database import get_connection, return_connection, SQL_PLACEHOLDER, USE_POSTGRESQL
+except ImportError:
+    from ponto_esa_v5.database import get_connection, return_connection, SQL_PLACEHOLDER, USE_POSTGRESQL
+
+logger = logging.getLogger(__name__)
+
+TIPOS_LEMBRETE = ("entrada", "saida")
+DIAS_UTEIS = (1, 2, 3, 4, 5)
+
+
+def parse_horario(valor) -> Optional[time]:
+    """Converte ``time``/'HH:MM'/'HH:MM:SS' (TIME do PG ou TEXT do SQLite)."""
+    if valor is None:
+        return None
+    if isinstance(valor, time):
+        return valor.replace(second=0, microsecond=0)
+    try:
+        partes = str(valor).strip().split(":")
+        return time(int(partes[0]), int(partes[1]))
+    except (ValueError, IndexError):
+        logger.warning("Horário de lembrete inválido: %r", valor)
+        return None
+
+
+def proximo_disparo(horarios: Sequence[time], dias_semana: Iterable[int], a_partir_de: datetime) -> Optional[datetime]:
+    """Primeiro minuto >= ``a_partir_de`` em que algum dos ``horarios`` cai num dos ``dias_semana``.
+
+    ``dias_semana`` usa ``isoweekday`` (1 = segunda ... 7 = domingo).
+    """
+    dias = set(dias_semana)
+    base = a_partir_de.replace(second=0, microsecond=0)
+    for delta in range(8):
+        dia = base.date() + timedelta(days=delta)
+        if dia.isoweekday() not in dias:
+            continue
+        candidatos = [datetime.combine(dia, h) for h in horarios if datetime.combine(dia, h) >= base]
+        if candidatos:
+            return min(candidatos)
+    return None
+
+
+class RodaLembretes:
+    """Fila de prioridade com o próximo lembrete de cada (usuário, tipo).
+
+    Reagendar um usuário incrementa sua versão; entradas antigas do heap são
+    descartadas quando chegam ao topo (remoção preguiçosa).
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, str, str, int]] = []
+        self._agenda: Dict[Tuple[str, str], Tuple[Tuple[time, ...], Tuple[int, ...]]] = {}
+        self._versao: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._agenda)
+
+    def _empilhar(self, chave: Tuple[str, str], a_partir_de: datetime) -> None:
+        horarios, dias = self._agenda[chave]
+        quando = proximo_disparo(horarios, dias, a_partir_de)
+        if quando is not None:
+            heapq.heappush(self._heap, (quando, chave[0], chave[1], self._versao[chave]))
+
+    def agendar(self, usuario: str, tipo: str, horarios: Sequence[time],
+                dias_semana: Iterable[int], agora: datetime) -> None:
+        """(Re)agenda o lembrete ``tipo`` de ``usuario``; sem horários, remove."""
+        chave = (usuario, tipo)
+        with self._lock:
+            self._versao[chave] = self._versao.get(chave, 0) + 1
+            if not horarios:
+                self._agenda.pop(chave, None)
+                return
+            self._agenda[chave] = (tuple(horarios), tuple(dias_semana))
+            self._empilhar(chave, agora)
+
+    def remover(self, usuario: str) -> None:
+        for tipo in TIPOS_LEMBRETE:
+            self.agendar(usuario, tipo, (), (), datetime.min)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._heap.clear()
+            self._agenda.clear()
+            self._versao.clear()
+
+    def proximo(self) -> Optional[datetime]:
+        """Instante do próximo lembrete válido (ou None se a agenda está vazia)."""
+        with self._lock:
+            while self._heap:
+                quando, usuario, tipo, versao = self._heap[0]
+                if self._versao.get((usuario, tipo)) == versao:
+                    return quando
+                heapq.heappop(self._heap)
+        return None
+
+    def vencidos(self, agora: datetime) -> Tuple[Dict[str, List[str]], int]:
+        """Retira os lembretes vencidos até ``agora`` e agenda a próxima ocorrência.
+
+        Lembretes atrasados além de ``REMINDER_WHEEL_MISFIRE_SECONDS`` (ex.: o
+        líder ficou fora do ar) são pulados em vez de disparados fora de hora.
+
+        Returns:
+            ``({tipo: [usuarios]}, perdidos)``.
+        """
+        devidos: Dict[str, List[str]] = {tipo: [] for tipo in TIPOS_LEMBRETE}
+        perdidos = 0
+        limite_atraso = timedelta(seconds=REMINDER_WHEEL_MISFIRE_SECONDS)
+        seguinte = agora.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        with self._lock:
+            while self._heap and self._heap[0][0] <= agora:
+                quando, usuario, tipo, versao = heapq.heappop(self._heap)
+                chave = (usuario, tipo)
+                if self._versao.get(chave) != versao:
+                    continue
+                if agora - quando > limite_atraso:
+                    perdidos += 1
+                else:
+                    devidos[tipo].append(usuario)
+                self._empilhar(chave, seguinte)
+        return devidos, perdidos
+
+
+_roda = RodaLembretes()
+_estado_lock = threading.Lock()
+_horarios_padrao: Dict[str, Optional[Tuple[time, ...]]] = {}
+_carregada = False
+_marca_config = None
+_marca_usuarios = None
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+def obter_roda() -> RodaLembretes:
+    return _roda
+
+
+def agenda_carregada() -> bool:
+    return _carregada
+
+
+def descarregar_agenda() -> None:
+    """Esvazia a agenda e as marcas de recarga (perda da liderança, testes)."""
+    global _carregada, _marca_config, _marca_usuarios
+    with _estado_lock:
+        _roda.limpar()
+        _horarios_padrao.clear()
+        _carregada = False
+        _marca_config = None
+        _marca_usuarios = None
+
+
+def _agendar_linha(row, agora: datetime) -> None:
+    """Agenda os lembretes de uma linha ``(usuario, ativo, tem_config, flags..., horarios..., dias)``."""
+    usuario, ativo, tem_config, flag_entrada, flag_saida, h_entrada, h_saida, dias = row
+    if not ativo:
+        _roda.remover(usuario)
+        return
+    dias_semana = [int(d) for d in (dias or "1,2,3,4,5").split(",") if d.strip()] if tem_config else DIAS_UTEIS
+    for tipo, flag, horario in (("entrada", flag_entrada, h_entrada), ("saida", flag_saida, h_saida)):
+        padrao = _horarios_padrao.get(tipo)
+        # Com configuração, flag NULL desliga (mesma regra de obter_destinatarios_lembrete_ponto).
+        if padrao is None or (tem_config and not flag):
+            # Tipo desligado globalmente ou pelo usuário.
+            _roda.agendar(usuario, tipo, (), (), agora)
+            continue
+        pessoal = parse_horario(horario) if tem_config else None
+        _roda.agendar(usuario, tipo, (pessoal,) if pessoal else padrao, dias_semana, agora)
+
+
+_SELECT_AGENDA = """
+    SELECT u.usuario, CASE WHEN u.ativo = 1 THEN 1 ELSE 0 END,
+           CASE WHEN c.usuario IS NULL THEN 0 ELSE 1 END,
+           c.lembrete_entrada, c.lembrete_saida,
+           c.horario_lembrete_entrada, c.horario_lembrete_saida, c.dias_semana
+    FROM usuarios u
+    LEFT JOIN config_lembretes_push c ON c.usuario = u.usuario
+"""
+
+
+def _criar_schema(cursor) -> None:
+    """DDL idempotente de ``usuarios.versao_agenda`` e do trigger que a renova."""
+    if USE_POSTGRESQL:
+        cursor.execute("ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS versao_agenda BIGINT NOT NULL DEFAULT 0")
+        cursor.execute("CREATE SEQUENCE IF NOT EXISTS usuarios_versao_agenda_seq")
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION usuarios_renovar_versao_agenda() RETURNS trigger AS $$
+            BEGIN
+                NEW.versao_agenda := nextval('usuarios_versao_agenda_seq');
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        cursor.execute("DROP TRIGGER IF EXISTS trg_usuarios_versao_agenda ON usuarios")
+        cursor.execute("""
+            CREATE TRIGGER trg_usuarios_versao_agenda BEFORE INSERT OR UPDATE OF usuario, ativo ON usuarios
+            FOR EACH ROW EXECUTE PROCEDURE usuarios_renovar_versao_agenda()
+        """)
+        return
+    cursor.execute("PRAGMA table_info(usuarios)")
+    if 'versao_agenda' not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute("ALTER TABLE usuarios ADD COLUMN versao_agenda INTEGER NOT NULL DEFAULT 0")
+    for sufixo, evento in (('i', 'INSERT'), ('u', 'UPDATE OF usuario, ativo')):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_usuarios_versao_agenda_{sufixo} AFTER {evento} ON usuarios
+            BEGIN
+                UPDATE usuarios SET versao_agenda = (SELECT MAX(versao_agenda) FROM usuarios) + 1
+                WHERE id = NEW.id;
+            END
+        """)
+
+
+def ensure_reminder_schema_once() -> None:
+    """Cria a coluna de versão e o trigger uma vez por processo."""
+    global _schema_ready
+    if _schema_ready:
+        return
+
+    with _schema_lock:
+        if _schema_ready:
+            return
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            _criar_schema(cursor)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            return_connection(conn)
+        _schema_ready = True
+
+
+def _marca_usuarios_atual(cursor):
+    # SUM e não MAX: no PostgreSQL uma transação com versão menor pode
+    # confirmar depois de uma maior, e ainda assim muda a soma
+    cursor.execute("SELECT COUNT(*), COALESCE(SUM(versao_agenda), 0) FROM usuarios")
+    return tuple(cursor.fetchone())
+
+
+def carregar_agenda(horarios_padrao: Dict[str, Optional[Sequence[str]]], agora: datetime) -> int:
+    """Carga completa da agenda (início do líder ou mudança no cadastro de usuários).
+
+    Args:
+        horarios_padrao: ``{tipo: ['HH:MM', ...]}`` para quem não tem horário
+            pessoal; ``None`` desliga o tipo para todos.
+        agora: horário de Brasília (naive).
+
+    Returns:
+        Número de lembretes agendados.
+    """
+    global _carregada, _marca_config, _marca_usuarios
+    ensure_reminder_schema_once()
+    with _estado_lock:
+        _horarios_padrao.clear()
+        for tipo in TIPOS_LEMBRETE:
+            lista = horarios_padrao.get(tipo)
+            _horarios_padrao[tipo] = (
+                None if lista is None else tuple(h for h in map(parse_horario, lista) if h)
+            )
+
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(_SELECT_AGENDA + " WHERE u.ativo = 1")
+            linhas = cursor.fetchall()
+            cursor.execute("SELECT MAX(data_atualizacao) FROM config_lembretes_push")
+            _marca_config = cursor.fetchone()[0]
+            _marca_usuarios = _marca_usuarios_atual(cursor)
+            cursor.close()
+        finally:
+            return_connection(conn)
+
+        _roda.limpar()
+        for row in linhas:
+            _agendar_linha(row, agora)
+        _carregada = True
+
+    logger.info("Agenda de lembretes carregada: %d lembretes de %d usuários", len(_roda), len(linhas))
+    return len(_roda)
+
+
+def recarregar_alterados(agora: datetime) -> int:
+    """Reagenda só as configurações alteradas desde a última leitura.
+
+    Returns:
+        Número de usuários reagendados (-1 se houve recarga completa).
+    """
+    global _marca_config
+    if not _carregada:
+        return 0
+
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        marca_usuarios = _marca_usuarios_atual(cursor)
+        if marca_usuarios != _marca_usuarios:
+            cursor.close()
+            recarga_completa = True
+        else:
+            recarga_completa = False
+            # ">=": duas alterações no mesmo segundo não se perdem (reagendar é idempotente).
+            if _marca_config is None:
+                cursor.execute(_SELECT_AGENDA + " WHERE c.usuario IS NOT NULL")
+            else:
+                cursor.execute(
+                    _SELECT_AGENDA + f" WHERE c.data_atualizacao >= {SQL_PLACEHOLDER}",
+                    (_marca_config,),
+                )
+            linhas = cursor.fetchall()
+            cursor.execute("SELECT MAX(data_atualizacao) FROM config_lembretes_push")
+            nova_marca = cursor.fetchone()[0]
+            cursor.close()
+    finally:
+        return_connection(conn)
+
+    if recarga_completa:
+        padrao = {t: None if h is None else [x.strftime("%H:%M") for x in h] for t, h in _horarios_padrao.items()}
+        carregar_agenda(padrao, agora)
+        return -1
+
+    with _estado_lock:
+        for row in linhas:
+            _agendar_linha(row, agora)
+        _marca_config = nova_marca
+    return len(linhas)
+
+
+def recarregar_usuario(usuario: str, agora: datetime) -> None:
+    """Reagenda ``usuario`` já (no processo que mantém a agenda)."""
+    if not _carregada:
+        return
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute(_SELECT_AGENDA + f" WHERE u.usuario = {SQL_PLACEHOLDER}", (usuario,))
+        row = cursor.fetchone()
+        cursor.close()
+    except Exception as e:
+        # O próximo ciclo pega a alteração por data_atualizacao.
+        logger.warning("Lembretes de %s não reagendados agora: %s", usuario, e)
+        return
+    finally:
+        if conn:
+            return_connection(conn)
+    with _estado_lock:
+        if row is None:
+            _roda.remover(usuario)
+        else:
+            _agendar_linha(row, agora)
+
+
+__all__ = [
+    "TIPOS_LEMBRETE",
+    "RodaLembretes",
+    "parse_horario",
+    "proximo_disparo",
+    "obter_roda",
+    "agenda_carregada",
+    "carregar_agenda",
+    "descarregar_agenda",
+    "ensure_reminder_schema_once",
+    "recarregar_alterados",
+    "recarregar_usuario",
+]
@@ -0,0 +1,191 @@
+"""
+Sondagem de schema - Ponto ExSA v5.0
+
+Consultas com variante legada (``_execute_select_with_legacy_fallback``,
+inserts de ``solicitacoes_correcao_registro``, checagens de "tabela existe")
+descobriam o schema por tentativa e erro a cada rerun, dobrando as idas ao
+banco em instalações antigas. Aqui o catálogo de tabelas/colunas é lido uma
+única vez por processo e quem consulta escolhe a variante certa antes de
+executar.
+
+Ausências também ficam em cache: uma tabela/coluna que falta é reconsultada
+no catálogo (só aquela tabela) no máximo uma vez a cada
+``SCHEMA_PROBE_NEGATIVO_TTL_SECONDS``, então bancos antigos não voltam ao
+catálogo a cada rerun. ``invalidar_schema()`` (chamado após as migrações do
+próprio processo) descarta tudo; migrações de outro processo aparecem quando
+o prazo vence.
+
+As funções retornam ``None`` quando o schema não pôde ser sondado; nesse caso
+o chamador mantém a detecção por erro como rede de segurança.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, FrozenSet, Optional
+
+from constants import SCHEMA_PROBE_NEGATIVO_TTL_SECONDS
+
+try:
+    from database import get_connection, return_connection, USE_POSTGRESQL
+except ImportError:
+    from ponto_esa_v5.database import get_connection, return_connection, USE_POSTGRESQL
+
+logger = logging.getLogger(__name__)
+
+_schema: Optional[Dict[str, FrozenSet[str]]] = None
+_schema_lock = threading.Lock()
+# tabela -> instante (monotonic) da última reconsulta que não achou o que faltava
+_ausencias: Dict[str, float] = {}
+
+
+def _ler_catalogo(cursor) -> Dict[str, FrozenSet[str]]:
+    """Lê ``{tabela: colunas}`` do catálogo do banco (nomes em minúsculas)."""
+    colunas: Dict[str, set] = {}
+    if USE_POSTGRESQL:
+        cursor.execute("""
+            SELECT table_name, column_name
+            FROM information_schema.columns
+            WHERE table_schema = current_schema()
+        """)
+        for tabela, coluna in cursor.fetchall():
+            colunas.setdefault(str(tabela).lower(), set()).add(str(coluna).lower())
+    else:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        for (tabela,) in cursor.fetchall():
+            cursor.execute(f'PRAGMA table_info("{tabela}")')
+            colunas[str(tabela).lower()] = {str(row[1]).lower() for row in cursor.fetchall()}
+    return {tabela: frozenset(cols) for tabela, cols in colunas.items()}
+
+
+def obter_schema() -> Optional[Dict[str, FrozenSet[str]]]:
+    """Retorna o catálogo sondado (uma consulta por processo) ou None se falhar."""
+    global _schema
+    if _schema is not None:
+        return _schema
+
+    with _schema_lock:
+        if _schema is not None:
+            return _schema
+        try:
+            conn = get_connection()
+            try:
+                cursor = conn.cursor()
+                _schema = _ler_catalogo(cursor)
+                cursor.close()
+            finally:
+                return_connection(conn)
+            logger.info("Schema sondado: %d tabelas", len(_schema))
+        except Exception as e:
+            logger.warning("Não foi possível sondar o schema: %s", e)
+            return None
+    return _schema
+
+
+def _ler_tabela(cursor, tabela: str) -> Optional[FrozenSet[str]]:
+    """Colunas de uma tabela no catálogo, ou None se ela não existe."""
+    if USE_POSTGRESQL:
+        cursor.execute(
+            """
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = %s
+            """,
+            (tabela,),
+        )
+        indice = 0
+    else:
+        cursor.execute(f'PRAGMA table_info("{tabela}")')
+        indice = 1  # (cid, name, type, ...)
+    colunas = frozenset(str(row[indice]).lower() for row in cursor.fetchall())
+    return colunas or None
+
+
+def _ausencia_recente(tabela: str) -> bool:
+    """True se ``tabela`` já foi reconsultada sem sucesso dentro do prazo do cache negativo."""
+    instante = _ausencias.get(tabela)
+    return instante is not None and time.monotonic() - instante < SCHEMA_PROBE_NEGATIVO_TTL_SECONDS
+
+
+def _reconsultar_tabela(tabela: str) -> Optional[FrozenSet[str]]:
+    """Relê uma tabela ausente/incompleta no cache; atualiza o cache se ela existir agora.
+
+    Raises:
+        Exception: se o catálogo não pôde ser lido.
+    """
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        colunas = _ler_tabela(cursor, tabela)
+        cursor.close()
+    finally:
+        return_connection(conn)
+    if colunas is not None:
+        with _schema_lock:
+            if _schema is not None:
+                _schema[tabela] = colunas
+    return colunas
+
+
+def _registrar_reconsulta(tabela: str, encontrou: bool) -> None:
+    with _schema_lock:
+        if encontrou:
+            _ausencias.pop(tabela, None)
+        else:
+            _ausencias[tabela] = time.monotonic()
+
+
+def tabela_existe(tabela: str) -> Optional[bool]:
+    """True/False conforme o catálogo; None se o schema não pôde ser sondado."""
+    schema = obter_schema()
+    if schema is None:
+        return None
+    tabela = tabela.lower()
+    if tabela in schema:
+        return True
+    if _ausencia_recente(tabela):
+        return False
+    try:
+        existe = _reconsultar_tabela(tabela) is not None
+    except Exception as e:
+        logger.debug("Não foi possível reconsultar a tabela %s: %s", tabela, e)
+        return None
+    _registrar_reconsulta(tabela, existe)
+    return existe
+
+
+def tem_colunas(tabela: str, *colunas: str) -> Optional[bool]:
+    """True se ``tabela`` existe e possui todas as ``colunas``; None se desconhecido."""
+    schema = obter_schema()
+    if schema is None:
+        return None
+    tabela = tabela.lower()
+    procuradas = [coluna.lower() for coluna in colunas]
+    existentes = schema.get(tabela)
+    if existentes is not None and all(coluna in existentes for coluna in procuradas):
+        return True
+    if _ausencia_recente(tabela):
+        return False
+    try:
+        existentes = _reconsultar_tabela(tabela)
+    except Exception as e:
+        logger.debug("Não foi possível reconsultar a tabela %s: %s", tabela, e)
+        return None
+    encontrou = existentes is not None and all(coluna in existentes for coluna in procuradas)
+    _registrar_reconsulta(tabela, encontrou)
+    return encontrou
+
+
+def invalidar_schema() -> None:
+    """Descarta o catálogo e as ausências (após migrações/ALTER TABLE); a próxima consulta ressonda."""
+    global _schema
+    with _schema_lock:
+        _schema = None
+        _ausencias.clear()
+
+
+__all__ = [
+    "obter_schema",
+    "tabela_existe",
+    "tem_colunas",
+    "invalidar_schema",
+]
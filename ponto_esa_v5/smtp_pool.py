@@ -0,0 +1,245 @@
+"""
+Pool de sessões SMTP - Ponto ExSA v5.0
+
+``enviar_email`` abria uma conexão nova (handshake TLS + AUTH) para cada
+mensagem. Aqui as sessões ficam abertas e são reutilizadas:
+
+- ``SessaoSMTP`` mantém uma conexão autenticada, reconecta quando o servidor
+  derruba a sessão (421, desconexão, erro de rede) e recicla a conexão após
+  ``SMTP_MAX_MENSAGENS_POR_SESSAO`` mensagens ou ``SMTP_IDLE_SECONDS`` ociosa;
+- ``PoolSMTP`` empresta até ``SMTP_POOL_SIZE`` sessões entre threads e
+  ``enviar_lote()`` envia N mensagens numa única sessão.
+"""
+
+import logging
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from constants import (
+    SMTP_IDLE_SECONDS,
+    SMTP_MAX_MENSAGENS_POR_SESSAO,
+    SMTP_POOL_SIZE,
+    SMTP_TIMEOUT_SECONDS,
+)
+
+try:
+    from job_telemetry import registrar_chamada_externa
+except ImportError:
+    from ponto_esa_v5.job_telemetry import registrar_chamada_externa
+
+try:
+    from rate_limiter import aguardar_vez
+except ImportError:
+    from ponto_esa_v5.rate_limiter import aguardar_vez
+
+logger = logging.getLogger(__name__)
+
+PORTA_SSL = 465
+
+# (remetente, destinatários, mensagem já serializada)
+Envio = Tuple[str, Sequence[str], str]
+
+
+class LimiteTaxaSMTP(smtplib.SMTPException):
+    """O limite de taxa (``RATE_LIMIT_POLITICAS['smtp']``) não liberou o envio a tempo."""
+
+
+class SessaoSMTP:
+    """Uma conexão SMTP autenticada, aberta sob demanda e reaproveitada."""
+
+    def __init__(self, host: str, porta: int, usuario: str = "", senha: str = "",
+                 starttls: bool = True, timeout: float = SMTP_TIMEOUT_SECONDS):
+        self.host = host
+        self.porta = porta
+        self.usuario = usuario
+        self.senha = senha
+        self.starttls = starttls
+        self.timeout = timeout
+        self.conexoes = 0
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._enviadas = 0
+        self._ultimo_uso = 0.0
+
+    @property
+    def conectada(self) -> bool:
+        return self._smtp is not None
+
+    def _abrir_ssl(self, porta: int) -> smtplib.SMTP:
+        return smtplib.SMTP_SSL(self.host, porta, context=ssl.create_default_context(), timeout=self.timeout)
+
+    def _abrir(self) -> smtplib.SMTP:
+        if self.porta == PORTA_SSL:
+            return self._abrir_ssl(self.porta)
+        if not self.starttls:
+            return smtplib.SMTP(self.host, self.porta, timeout=self.timeout)
+        smtp = None
+        try:
+            smtp = smtplib.SMTP(self.host, self.porta, timeout=self.timeout)
+            smtp.starttls(context=ssl.create_default_context())
+            return smtp
+        except OSError as tls_err:
+            # TLS falhou (ex: Network unreachable na porta 587) — tentar SSL na 465
+            logger.warning("TLS porta %d falhou (%s), tentando SSL porta 465...", self.porta, tls_err)
+            if smtp is not None:
+                smtp.close()
+            return self._abrir_ssl(PORTA_SSL)
+
+    def conectar(self) -> None:
+        self.fechar()
+        smtp = self._abrir()
+        try:
+            if self.usuario:
+                smtp.login(self.usuario, self.senha)
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp = smtp
+        self._enviadas = 0
+        self._ultimo_uso = time.monotonic()
+        self.conexoes += 1
+
+    def fechar(self) -> None:
+        if self._smtp is None:
+            return
+        smtp, self._smtp = self._smtp, None
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    def _precisa_reconectar(self) -> bool:
+        return (
+            self._smtp is None
+            or self._enviadas >= SMTP_MAX_MENSAGENS_POR_SESSAO
+            or time.monotonic() - self._ultimo_uso > SMTP_IDLE_SECONDS
+        )
+
+    def enviar(self, remetente: str, destinatarios: Sequence[str], mensagem: str) -> None:
+        """Envia uma mensagem; se a sessão caiu, reconecta e tenta uma vez mais.
+
+        Raises:
+            smtplib.SMTPException / OSError: falha definitiva (auth, destinatário recusado...).
+            LimiteTaxaSMTP: o limite de taxa do provedor não liberou a tempo.
+        """
+        if not aguardar_vez("smtp"):
+            raise LimiteTaxaSMTP("limite de taxa do SMTP excedido")
+        for tentativa in (1, 2):
+            if self._precisa_reconectar():
+                self.conectar()
+            try:
+                self._smtp.sendmail(remetente, list(destinatarios), mensagem)
+            except smtplib.SMTPResponseException as e:
+                # 421: o servidor encerrou a sessão (limite/ociosidade) — reconectar.
+                if e.smtp_code != 421 or tentativa == 2:
+                    registrar_chamada_externa(False)
+                    raise
+                self._descartar(e)
+            except smtplib.SMTPServerDisconnected as e:
+                if tentativa == 2:
+                    registrar_chamada_externa(False)
+                    raise
+                self._descartar(e)
+            except smtplib.SMTPException:
+                registrar_chamada_externa(False)
+                raise
+            except OSError as e:
+                if tentativa == 2:
+                    registrar_chamada_externa(False)
+                    raise
+                self._descartar(e)
+            else:
+                self._enviadas += 1
+                self._ultimo_uso = time.monotonic()
+                registrar_chamada_externa(True)
+                return
+
+    def _descartar(self, erro: Exception) -> None:
+        logger.info("Sessão SMTP com %s perdida (%s); reconectando", self.host, erro)
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None:
+            smtp.close()
+
+
+class PoolSMTP:
+    """Sessões SMTP compartilhadas entre threads (no máximo ``tamanho`` abertas)."""
+
+    def __init__(self, host: str, porta: int, usuario: str = "", senha: str = "",
+                 starttls: bool = True, tamanho: int = SMTP_POOL_SIZE):
+        self._parametros = dict(host=host, porta=porta, usuario=usuario, senha=senha, starttls=starttls)
+        self._livres: "queue.LifoQueue[SessaoSMTP]" = queue.LifoQueue()
+        self._vagas = threading.BoundedSemaphore(max(1, tamanho))
+        self._sessoes: List[SessaoSMTP] = []
+        self._lock = threading.Lock()
+        self._fechado = False
+
+    @property
+    def conexoes(self) -> int:
+        """Total de conexões abertas desde a criação do pool (inclui reconexões)."""
+        with self._lock:
+            return sum(s.conexoes for s in self._sessoes)
+
+    @contextmanager
+    def sessao(self):
+        """Empresta uma sessão (a mais recente primeiro, que tende a estar viva)."""
+        self._vagas.acquire()
+        try:
+            try:
+                sessao = self._livres.get_nowait()
+            except queue.Empty:
+                sessao = SessaoSMTP(**self._parametros)
+                with self._lock:
+                    self._sessoes.append(sessao)
+            try:
+                yield sessao
+            finally:
+                if self._fechado:
+                    sessao.fechar()
+                else:
+                    self._livres.put(sessao)
+        finally:
+            self._vagas.release()
+
+    def enviar(self, remetente: str, destinatarios: Sequence[str], mensagem: str) -> None:
+        with self.sessao() as sessao:
+            sessao.enviar(remetente, destinatarios, mensagem)
+
+    def enviar_lote(self, envios: Iterable[Envio]) -> List[Optional[Exception]]:
+        """Envia todas as mensagens numa única sessão.
+
+        Returns:
+            Para cada envio, ``None`` (enviado) ou a exceção da falha. Erro de
+            autenticação interrompe o lote: os envios restantes recebem o mesmo erro.
+        """
+        envios = list(envios)
+        resultados: List[Optional[Exception]] = []
+        with self.sessao() as sessao:
+            for remetente, destinatarios, mensagem in envios:
+                try:
+                    sessao.enviar(remetente, destinatarios, mensagem)
+                    resultados.append(None)
+                except smtplib.SMTPAuthenticationError as e:
+                    resultados.extend([e] * (len(envios) - len(resultados)))
+                    break
+                except (smtplib.SMTPException, OSError) as e:
+                    resultados.append(e)
+        return resultados
+
+    def fechar(self) -> None:
+        self._fechado = True
+        while True:
+            try:
+                self._livres.get_nowait().fechar()
+            except queue.Empty:
+                break
+
+
+__all__ = [
+    "LimiteTaxaSMTP",
+    "SessaoSMTP",
+    "PoolSMTP",
+]
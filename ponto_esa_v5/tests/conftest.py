@@ -0,0 +1,41 @@
+"""Fixtures compartilhadas dos testes (SQLite temporário no lugar do banco principal)."""
+
+import sqlite3
+import sys
+
+import pytest
+
+from ponto_esa_v5 import rate_limiter
+
+
+@pytest.fixture
+def apontar_sqlite(monkeypatch):
+    """
+    Aponta ``get_connection``/``return_connection`` de módulos para um SQLite.
+
+    ``apontar_sqlite(banco, *modulos)``: ``banco`` é o caminho do arquivo ou
+    uma função de conexão. ``return_connection`` fecha a conexão (não há
+    pool), ``_schema_ready`` volta a False e, onde existirem,
+    ``USE_POSTGRESQL``/``SQL_PLACEHOLDER`` ficam no dialeto SQLite. Tudo é
+    desfeito pelo ``monkeypatch`` ao fim do teste.
+    """
+    def apontar(banco, *modulos):
+        conectar = banco if callable(banco) else (lambda: sqlite3.connect(banco))
+        for modulo in modulos:
+            monkeypatch.setattr(modulo, "get_connection", conectar)
+            monkeypatch.setattr(modulo, "return_connection", lambda conn: conn.close())
+            for nome, valor in (("_schema_ready", False), ("USE_POSTGRESQL", False), ("SQL_PLACEHOLDER", "?")):
+                if hasattr(modulo, nome):
+                    monkeypatch.setattr(modulo, nome, valor)
+        return conectar
+
+    return apontar
+
+
+@pytest.fixture(autouse=True)
+def baldes_em_tmp(tmp_path, monkeypatch):
+    """Arquivos do limitador de taxa em ``tmp_path`` (nunca em database/ da árvore)."""
+    # Importado como pacote ou pelo nome curto (sys.path em ponto_esa_v5/)
+    for modulo in {rate_limiter, sys.modules.get("rate_limiter")} - {None}:
+        monkeypatch.setattr(modulo, "RATE_LIMIT_DIR", str(tmp_path / "ratelimit"))
+        monkeypatch.setattr(modulo, "_baldes", {})
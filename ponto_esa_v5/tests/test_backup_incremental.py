@@ -0,0 +1,186 @@
+"""Testes do backup incremental (marcas d'água + log de alterações) em SQLite temporário."""
+
+import gzip
+import json
+import sqlite3
+
+import pytest
+
+from ponto_esa_v5 import backup_incremental as bi
+from ponto_esa_v5 import backup_postgresql as bp
+
+_ESQUEMA = """
+    CREATE TABLE registros_ponto (id INTEGER PRIMARY KEY, usuario TEXT, data_hora TEXT, tipo TEXT);
+    CREATE TABLE configuracoes (chave TEXT PRIMARY KEY, valor TEXT);
+"""
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch, apontar_sqlite):
+    estado = {"banco": str(tmp_path / "ponto.db")}
+    conn = sqlite3.connect(estado["banco"])
+    conn.executescript(_ESQUEMA)
+    conn.executemany(
+        "INSERT INTO registros_ponto (usuario, data_hora, tipo) VALUES (?, ?, 'Início')",
+        [(f"func{i % 50}", f"2026-03-{i % 28 + 1:02d} 08:00") for i in range(5000)],
+    )
+    conn.execute("INSERT INTO configuracoes VALUES ('tolerancia', '10')")
+    conn.commit()
+    conn.close()
+
+    apontar_sqlite(lambda: sqlite3.connect(estado["banco"]), bp, bi)
+    monkeypatch.setattr(bp, "VALID_TABLE_NAMES", None)
+    gerenciador = bp.PostgreSQLBackupManager(backup_dir=str(tmp_path / "backups"))
+    gerenciador.tables_to_backup = ["registros_ponto", "configuracoes"]
+    monkeypatch.setattr(bi, "backup_manager", gerenciador)
+    return estado
+
+
+def _alterar_dia(caminho, dia, excluir_id):
+    conn = sqlite3.connect(caminho)
+    conn.execute("INSERT INTO registros_ponto (usuario, data_hora, tipo) VALUES ('func1', ?, 'Fim')", (dia,))
+    conn.execute("UPDATE registros_ponto SET tipo = 'Corrigido' WHERE id = 10")
+    conn.execute("DELETE FROM registros_ponto WHERE id = ?", (excluir_id,))
+    conn.execute("UPDATE configuracoes SET valor = ? WHERE chave = 'tolerancia'", (dia[-2:],))
+    conn.commit()
+    conn.close()
+
+
+def _conteudo(caminho):
+    conn = sqlite3.connect(caminho)
+    dados = (
+        conn.execute("SELECT * FROM registros_ponto ORDER BY id").fetchall(),
+        conn.execute("SELECT * FROM configuracoes").fetchall(),
+    )
+    conn.close()
+    return dados
+
+
+def test_delta_leva_so_o_que_mudou_e_cadeia_restaura_igual(banco, tmp_path):
+    completo = bi.executar_backup_agendado(deltas_por_completo=3)
+    _alterar_dia(banco["banco"], "2026-04-01", 20)
+    delta1 = bi.executar_backup_agendado(deltas_por_completo=3)
+    _alterar_dia(banco["banco"], "2026-04-02", 21)
+    delta2 = bi.executar_backup_agendado(deltas_por_completo=3)
+
+    assert "ponto_esa_backup_" in completo and "ponto_esa_delta_" in delta1 and delta1 != delta2
+    with gzip.open(delta2, "rt", encoding="utf-8") as f:
+        linhas = [json.loads(linha) for linha in f]
+    cabecalho = next(linha for linha in linhas if linha.get("tabela") == "registros_ponto")
+    assert cabecalho["excluir"] == [21]  # 20 já saiu no delta anterior
+    # 1 inserção + 1 alteração (a de id 10 se repete) + configuracoes inteira
+    assert sum(isinstance(linha, list) for linha in linhas) == 3
+
+    cadeia = bi.ler_manifesto()["cadeias"][-1]
+    assert [d["linhas"] for d in cadeia["deltas"]] == [3, 3]
+    assert cadeia["deltas"][-1]["tamanho"] * 20 < cadeia["completo"]["tamanho"]
+
+    esperado = _conteudo(banco["banco"])
+    banco["banco"] = str(tmp_path / "restaurado.db")
+    sqlite3.connect(banco["banco"]).executescript(_ESQUEMA)
+
+    progresso = []
+    ok, mensagem = bi.restaurar_cadeia(progresso=lambda feitos, total, arquivo: progresso.append((feitos, total)))
+    assert ok, mensagem
+    assert progresso == [(1, 3), (2, 3), (3, 3)]
+    assert _conteudo(banco["banco"]) == esperado
+
+
+def test_novo_completo_apos_limite_de_deltas_e_poda_do_log(banco):
+    bi.executar_backup_agendado(deltas_por_completo=1)
+    _alterar_dia(banco["banco"], "2026-04-01", 20)
+    assert "ponto_esa_delta_" in bi.executar_backup_agendado(deltas_por_completo=1)
+    _alterar_dia(banco["banco"], "2026-04-02", 21)
+    assert "ponto_esa_backup_" in bi.executar_backup_agendado(deltas_por_completo=1)
+
+    assert [len(c["deltas"]) for c in bi.ler_manifesto()["cadeias"]] == [1, 0]
+    conn = sqlite3.connect(banco["banco"])
+    # O completo novo já contém tudo o que o log registrou até ele
+    assert conn.execute("SELECT COUNT(*) FROM backup_alteracoes").fetchone() == (0,)
+    conn.close()
+
+
+def test_delta_atualiza_mae_no_lugar_sem_violar_chave_estrangeira(banco, tmp_path, monkeypatch):
+    conn = sqlite3.connect(banco["banco"])
+    conn.execute("CREATE TABLE auditoria_correcoes (id INTEGER PRIMARY KEY, registro_id INTEGER REFERENCES registros_ponto (id))")
+    conn.execute("INSERT INTO auditoria_correcoes (registro_id) VALUES (10)")
+    conn.commit()
+    conn.close()
+    bi.backup_manager.tables_to_backup = ["registros_ponto", "auditoria_correcoes", "configuracoes"]
+
+    def conectar():
+        conn = sqlite3.connect(banco["banco"])
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    for modulo in (bp, bi):
+        monkeypatch.setattr(modulo, "get_connection", conectar)
+    bi.executar_backup_agendado()
+    _alterar_dia(banco["banco"], "2026-04-01", 20)  # altera a mãe (id 10) da auditoria
+    bi.executar_backup_agendado()
+
+    esperado = _conteudo(banco["banco"])
+    banco["banco"] = str(tmp_path / "restaurado.db")
+    conn = sqlite3.connect(banco["banco"])
+    conn.executescript(_ESQUEMA + "CREATE TABLE auditoria_correcoes (id INTEGER PRIMARY KEY, registro_id INTEGER REFERENCES registros_ponto (id));")
+    conn.close()
+
+    ok, mensagem = bi.restaurar_cadeia()
+    assert ok, mensagem
+    assert _conteudo(banco["banco"]) == esperado
+
+
+def test_linha_confirmada_fora_de_ordem_entra_no_proximo_delta(banco, tmp_path, monkeypatch):
+    # id 4990 "reservado" por uma transação que só confirma depois do completo
+    conn = sqlite3.connect(banco["banco"])
+    atrasada = conn.execute("SELECT * FROM registros_ponto WHERE id = 4990").fetchone()
+    conn.execute("DELETE FROM registros_ponto WHERE id = 4990")
+    conn.commit()
+    conn.close()
+
+    bi.ensure_backup_incremental_schema_once()
+    monkeypatch.setattr(bi, "USE_POSTGRESQL", True)  # lacunas só são lidas no PostgreSQL
+    bi.executar_backup_agendado()
+    assert bi.ler_manifesto()["cadeias"][-1]["completo"]["lacunas"]["registros_ponto"] == [4990]
+
+    conn = sqlite3.connect(banco["banco"])
+    conn.execute("INSERT INTO registros_ponto VALUES (?, ?, ?, ?)", atrasada)
+    conn.commit()
+    conn.close()
+    bi.executar_backup_agendado()
+
+    esperado = _conteudo(banco["banco"])
+    banco["banco"] = str(tmp_path / "restaurado.db")
+    sqlite3.connect(banco["banco"]).executescript(_ESQUEMA)
+    ok, mensagem = bi.restaurar_cadeia()
+    assert ok, mensagem
+    assert _conteudo(banco["banco"]) == esperado
+
+
+def test_restauracao_no_lugar_recomeca_a_cadeia_sem_apagar_o_restaurado(banco, tmp_path):
+    bi.executar_backup_agendado(deltas_por_completo=3)
+    _alterar_dia(banco["banco"], "2026-04-01", 20)
+    bi.executar_backup_agendado(deltas_por_completo=3)
+    esperado = _conteudo(banco["banco"])
+
+    # Restaurar por cima do banco atual: os triggers registram cada linha apagada
+    ok, mensagem = bi.restaurar_cadeia(limpar=True)
+    assert ok, mensagem
+    assert _conteudo(banco["banco"]) == esperado
+    conn = sqlite3.connect(banco["banco"])
+    assert conn.execute("SELECT COUNT(*) FROM backup_alteracoes").fetchone() == (0,)
+    conn.close()
+    assert bi.ler_manifesto()["reiniciar"] is True
+
+    # O próximo elo é um completo; a cadeia nova segue com deltas normalmente
+    assert "ponto_esa_backup_" in bi.executar_backup_agendado(deltas_por_completo=3)
+    assert "reiniciar" not in bi.ler_manifesto()
+    _alterar_dia(banco["banco"], "2026-04-02", 21)
+    assert "ponto_esa_delta_" in bi.executar_backup_agendado(deltas_por_completo=3)
+
+    esperado = _conteudo(banco["banco"])
+    banco["banco"] = str(tmp_path / "restaurado.db")
+    sqlite3.connect(banco["banco"]).executescript(_ESQUEMA)
+    ok, mensagem = bi.restaurar_cadeia()
+    assert ok, mensagem
+    assert _conteudo(banco["banco"]) == esperado
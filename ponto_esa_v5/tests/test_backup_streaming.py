@@ -0,0 +1,184 @@
+"""Testes do backup NDJSON em streaming (SQLite temporário no lugar do PostgreSQL)."""
+
+import gzip
+import json
+import sqlite3
+import tracemalloc
+
+import pytest
+
+from ponto_esa_v5 import backup_postgresql as bp
+
+
+def _criar_banco(caminho, linhas, com_upload=True):
+    conn = sqlite3.connect(caminho)
+    conn.executescript("""
+        CREATE TABLE usuarios (id INTEGER PRIMARY KEY, usuario TEXT UNIQUE, nome_completo TEXT);
+        CREATE TABLE uploads (id INTEGER PRIMARY KEY, usuario TEXT, conteudo BLOB, data_upload TEXT);
+    """)
+    conn.executemany(
+        "INSERT INTO usuarios (usuario, nome_completo) VALUES (?, ?)",
+        [(f"func{i}", f"Funcionário Ção {i} " + "x" * 200) for i in range(linhas)],
+    )
+    if com_upload:
+        conn.execute(
+            "INSERT INTO uploads (usuario, conteudo, data_upload) VALUES (?, ?, ?)",
+            ("func1", bytes(range(256)), "2026-01-02T08:00:00"),
+        )
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def backup(tmp_path, monkeypatch, apontar_sqlite):
+    estado = {"banco": str(tmp_path / "ponto.db")}
+    apontar_sqlite(lambda: sqlite3.connect(estado["banco"]), bp)
+    monkeypatch.setattr(bp, "VALID_TABLE_NAMES", None)
+    gerenciador = bp.PostgreSQLBackupManager(backup_dir=str(tmp_path / "backups"))
+    return gerenciador, estado
+
+
+def test_ndjson_ida_e_volta_sem_perda(backup, tmp_path):
+    gerenciador, estado = backup
+    _criar_banco(estado["banco"], 1200)
+
+    caminho = gerenciador.export_to_json(compress=True)
+    assert caminho.endswith(".ndjson.gz")
+    with gzip.open(caminho, "rt", encoding="utf-8") as f:
+        linhas = [json.loads(linha) for linha in f]
+    assert "metadata" in linhas[0] and linhas[-1]["fim"] is True
+    assert {"fim_tabela": "usuarios", "linhas": 1200} in linhas
+    assert [b["type"] for b in gerenciador.get_backup_list()] == ["NDJSON (comprimido)"]
+
+    # Restaurar num banco vazio com o mesmo esquema
+    estado["banco"] = str(tmp_path / "restaurado.db")
+    _criar_banco(estado["banco"], 0, com_upload=False)
+
+    ok, mensagem = gerenciador.restore_from_json(caminho)
+    assert ok and "Restauração completa" in mensagem
+
+    conn = sqlite3.connect(estado["banco"])
+    assert conn.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0] == 1200
+    assert conn.execute("SELECT conteudo, data_upload FROM uploads").fetchone() == (
+        bytes(range(256)), "2026-01-02T08:00:00"
+    )
+    conn.close()
+
+
+def test_pico_de_memoria_nao_cresce_com_o_banco(backup, tmp_path):
+    gerenciador, estado = backup
+    picos = []
+    for linhas in (2000, 8000):
+        estado["banco"] = str(tmp_path / f"ponto_{linhas}.db")
+        _criar_banco(estado["banco"], linhas)
+        tracemalloc.start()
+        assert gerenciador.export_to_json(compress=True)
+        picos.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    # 4x mais linhas (~1,6 MB a mais de dados) sem aumento relevante do pico
+    assert picos[1] < picos[0] * 1.5
+
+
+def test_restauracao_por_niveis_de_dependencia_com_progresso(backup, tmp_path):
+    gerenciador, estado = backup
+    esquema = """
+        CREATE TABLE registros_ponto (id INTEGER PRIMARY KEY, usuario TEXT);
+        CREATE TABLE auditoria_correcoes (
+            id INTEGER PRIMARY KEY, registro_id INTEGER REFERENCES registros_ponto (id)
+        );
+        CREATE TABLE feriados (id INTEGER PRIMARY KEY, descricao TEXT);
+    """
+    conn = sqlite3.connect(estado["banco"])
+    conn.executescript(esquema)
+    conn.executemany("INSERT INTO registros_ponto (usuario) VALUES (?)", [(f"func{i}",) for i in range(50)])
+    conn.executemany("INSERT INTO auditoria_correcoes (registro_id) VALUES (?)", [(i,) for i in range(1, 51)])
+    conn.execute("INSERT INTO feriados (descricao) VALUES ('Natal')")
+    conn.commit()
+    conn.close()
+    # A filha vem antes da mãe no backup
+    gerenciador.tables_to_backup = ["auditoria_correcoes", "feriados", "registros_ponto"]
+
+    exportadas = []
+    caminho = gerenciador.export_to_json(progresso=lambda feitas, total, t: exportadas.append((feitas, total)))
+    assert exportadas == [(1, 3), (2, 3), (3, 3)]
+
+    estado["banco"] = str(tmp_path / "restaurado.db")
+    conn = sqlite3.connect(estado["banco"])
+    conn.executescript(esquema)
+    conn.execute("INSERT INTO feriados (descricao) VALUES ('Antigo')")
+    conn.commit()
+    conn.close()
+
+    ordem = []
+    ok, mensagem = gerenciador.restore_from_json(
+        caminho, clear_existing=True, progresso=lambda feitas, total, t: ordem.append(t)
+    )
+    assert ok and "Restauração completa" in mensagem
+    assert ordem.index("registros_ponto") < ordem.index("auditoria_correcoes") and len(ordem) == 3
+
+    conn = sqlite3.connect(estado["banco"])
+    assert conn.execute("SELECT COUNT(*) FROM auditoria_correcoes").fetchone() == (50,)
+    assert conn.execute("SELECT descricao FROM feriados").fetchall() == [("Natal",)]
+    conn.close()
+
+
+def test_falha_na_carga_preserva_os_dados_antigos(backup, tmp_path):
+    gerenciador, estado = backup
+    esquema = """
+        CREATE TABLE registros_ponto (id INTEGER PRIMARY KEY, usuario TEXT);
+        CREATE TABLE auditoria_correcoes (
+            id INTEGER PRIMARY KEY, registro_id INTEGER REFERENCES registros_ponto (id)
+        );
+        CREATE TABLE feriados (id INTEGER PRIMARY KEY, descricao TEXT);
+    """
+    conn = sqlite3.connect(estado["banco"])
+    conn.executescript(esquema)
+    conn.executemany("INSERT INTO registros_ponto (usuario) VALUES (?)", [("func1",), ("func2",)])
+    conn.execute("INSERT INTO auditoria_correcoes (registro_id) VALUES (1)")
+    conn.execute("INSERT INTO feriados (descricao) VALUES ('Natal')")
+    conn.commit()
+    conn.close()
+    gerenciador.tables_to_backup = ["registros_ponto", "auditoria_correcoes", "feriados"]
+    caminho = gerenciador.export_to_json()
+
+    # Destino recusa a linha de feriados: só esse grupo fica como estava
+    estado["banco"] = str(tmp_path / "restaurado.db")
+    conn = sqlite3.connect(estado["banco"])
+    conn.executescript(esquema.replace("descricao TEXT", "descricao TEXT CHECK (descricao <> 'Natal')"))
+    conn.execute("INSERT INTO registros_ponto (usuario) VALUES ('antigo')")
+    conn.execute("INSERT INTO feriados (descricao) VALUES ('Antigo')")
+    conn.commit()
+    conn.close()
+
+    ok, mensagem = gerenciador.restore_from_json(caminho, clear_existing=True)
+    assert not ok and "feriados" in mensagem
+
+    conn = sqlite3.connect(estado["banco"])
+    assert conn.execute("SELECT descricao FROM feriados").fetchall() == [("Antigo",)]
+    assert conn.execute("SELECT usuario FROM registros_ponto ORDER BY id").fetchall() == [("func1",), ("func2",)]
+    conn.close()
+
+
+def test_formato_legado_desfaz_tudo_se_uma_tabela_falha(backup, tmp_path):
+    gerenciador, estado = backup
+    conn = sqlite3.connect(estado["banco"])
+    conn.executescript("""
+        CREATE TABLE usuarios (id INTEGER PRIMARY KEY, usuario TEXT);
+        CREATE TABLE feriados (id INTEGER PRIMARY KEY, descricao TEXT CHECK (descricao <> 'Natal'));
+        INSERT INTO usuarios (usuario) VALUES ('antigo');
+    """)
+    conn.commit()
+    conn.close()
+    caminho = tmp_path / "legado.json"
+    caminho.write_text(json.dumps({"data": {
+        "usuarios": [{"id": 1, "usuario": "func1"}],
+        "feriados": [{"id": 1, "descricao": "Natal"}],
+    }}), encoding="utf-8")
+
+    ok, mensagem = gerenciador.restore_from_json(str(caminho), clear_existing=True)
+    assert not ok
+
+    conn = sqlite3.connect(estado["banco"])
+    assert conn.execute("SELECT usuario FROM usuarios").fetchall() == [("antigo",)]
+    conn.close()
@@ -0,0 +1,182 @@
+"""Testes do backup_system: backup SQLite do BackupManager e log de auditoria do AuditLogger."""
+
+import gzip
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from ponto_esa_v5 import backup_system as bs
+
+_RAIZ = Path(__file__).resolve().parents[2]
+
+_PROCESSO = """
+import sys
+from ponto_esa_v5 import backup_system as bs
+
+bs.AUDIT_LOG_MAX_BYTES = 5000
+bs.AUDIT_LOG_ARQUIVOS_ANTIGOS = 1000
+auditoria = bs.AuditLogger(sys.argv[1])
+for n in range(150):
+    auditoria.log_action(sys.argv[2], "registro", {"n": n})
+"""
+
+
+@pytest.fixture
+def gerenciador(tmp_path):
+    banco = str(tmp_path / "ponto.db")
+    conn = sqlite3.connect(banco)
+    conn.execute("CREATE TABLE registros_ponto (id INTEGER PRIMARY KEY, usuario TEXT, data_hora TEXT, obs TEXT)")
+    conn.executemany(
+        "INSERT INTO registros_ponto (usuario, data_hora, obs) VALUES (?, ?, ?)",
+        [(f"func{i % 50}", f"2026-03-{i % 28 + 1:02d} 08:00", "x" * 200) for i in range(20000)],
+    )
+    conn.commit()
+    conn.close()
+    return bs.BackupManager(db_path=banco, backup_dir=str(tmp_path / "backups"))
+
+
+def _abrir_backup(caminho, destino):
+    with gzip.open(caminho, "rb") as f_in, open(destino, "wb") as f_out:
+        f_out.write(f_in.read())
+    return sqlite3.connect(destino)
+
+
+def test_backup_online_com_escritor_ativo_e_integro(gerenciador, tmp_path, monkeypatch):
+    monkeypatch.setattr(bs, "SQLITE_BACKUP_PAGINAS_POR_PASSO", 16)
+    monkeypatch.setattr(bs, "SQLITE_BACKUP_MAX_REINICIOS", 3)
+    parar = threading.Event()
+    escritas = []
+
+    def escritor():
+        conn = sqlite3.connect(gerenciador.db_path, timeout=30)
+        while not parar.is_set():
+            conn.execute("INSERT INTO registros_ponto (usuario, data_hora) VALUES ('func1', '2026-04-01 08:00')")
+            conn.commit()
+            escritas.append(1)
+            parar.wait(0.002)
+        conn.close()
+
+    thread = threading.Thread(target=escritor)
+    thread.start()
+    try:
+        caminho = gerenciador.create_backup()
+    finally:
+        parar.set()
+        thread.join()
+
+    assert caminho and caminho.endswith(".db.gz") and escritas
+    assert not [f for f in os.listdir(gerenciador.backup_dir) if f.endswith(".parcial")]
+    copia = _abrir_backup(caminho, str(tmp_path / "copia.db"))
+    assert copia.execute("PRAGMA integrity_check").fetchone() == ("ok",)
+    assert copia.execute("SELECT COUNT(*) FROM registros_ponto").fetchone()[0] >= 20000
+    copia.close()
+
+
+def test_vacuum_into_gera_copia_compacta_e_restaura(gerenciador, tmp_path):
+    conn = sqlite3.connect(gerenciador.db_path)
+    conn.execute("DELETE FROM registros_ponto WHERE id > 1000")
+    conn.commit()
+    conn.close()
+
+    online = gerenciador.create_backup(compress=False)
+    compacto = gerenciador.create_backup(compress=False, modo="vacuum")
+    assert os.path.getsize(compacto) * 5 < os.path.getsize(online)
+
+    conn = sqlite3.connect(gerenciador.db_path)
+    conn.execute("DELETE FROM registros_ponto")
+    conn.commit()
+    conn.close()
+    assert gerenciador.restore_backup(compacto)
+    conn = sqlite3.connect(gerenciador.db_path)
+    assert conn.execute("SELECT COUNT(*) FROM registros_ponto").fetchone() == (1000,)
+    conn.close()
+
+    with pytest.raises(ValueError):
+        gerenciador.create_backup(modo="copia")
+
+
+def test_audit_log_jsonl_indexado_com_rotacao(tmp_path, monkeypatch):
+    monkeypatch.setattr(bs, "AUDIT_LOG_MAX_BYTES", 20000)
+    monkeypatch.setattr(bs, "AUDIT_LOG_ARQUIVOS_ANTIGOS", 2)
+    caminho = str(tmp_path / "logs" / "audit.log")
+    auditoria = bs.AuditLogger(caminho)
+
+    threads = [
+        threading.Thread(target=lambda u=u: [auditoria.log_action(u, "registro", {"n": n}) for n in range(100)])
+        for u in ("func1", "func2", 7)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    arquivos = sorted(os.listdir(tmp_path / "logs"))
+    assert "audit.log" in arquivos and len([a for a in arquivos if a[len("audit.log."):].isdigit()]) == 2
+    for nome in arquivos:
+        if nome.startswith("audit.log") and not nome.startswith("audit.log.idx"):
+            with open(tmp_path / "logs" / nome, encoding="utf-8") as f:
+                assert all(json.loads(linha)["action"] == "registro" for linha in f)
+
+    recentes = auditoria.get_user_logs(7, limit=5)
+    assert [log["details"]["n"] for log in recentes] == [95, 96, 97, 98, 99]
+    assert auditoria.get_user_logs("7") == []
+    assert len(auditoria.get_all_logs(limit=50)) == 50
+
+    # O índice é derivado: apagado, é refeito a partir dos arquivos
+    retidos = len(auditoria.get_all_logs(limit=10000))
+    auditoria._indice.close()
+    for nome in os.listdir(tmp_path / "logs"):
+        if nome.startswith("audit.log.idx"):
+            os.remove(tmp_path / "logs" / nome)
+    refeito = bs.AuditLogger(caminho)
+    assert len(refeito.get_all_logs(limit=10000)) == retidos
+    assert refeito.get_user_logs(7, limit=5) == recentes
+
+
+def test_audit_log_converte_array_json_antigo(tmp_path):
+    caminho = tmp_path / "audit.log"
+    antigos = [{"user_id": "func1", "action": "login"}, {"user_id": "func2", "action": "login"}]
+    caminho.write_text(json.dumps(antigos, indent=2), encoding="utf-8")
+
+    auditoria = bs.AuditLogger(str(caminho))
+    auditoria.log_action("func1", "logout")
+
+    assert [log["action"] for log in auditoria.get_user_logs("func1")] == ["login", "logout"]
+    assert len(caminho.read_text(encoding="utf-8").splitlines()) == 3
+
+
+def test_audit_log_rotacao_entre_processos(tmp_path):
+    caminho = str(tmp_path / "logs" / "audit.log")
+    ambiente = dict(os.environ, PYTHONPATH=str(_RAIZ))
+    processos = [
+        subprocess.Popen([sys.executable, "-c", _PROCESSO, caminho, f"func{i}"], cwd=tmp_path, env=ambiente)
+        for i in range(3)
+    ]
+    assert all(p.wait(timeout=120) == 0 for p in processos)
+
+    linhas = []
+    for nome in os.listdir(tmp_path / "logs"):
+        if nome == "audit.log" or nome[len("audit.log."):].isdigit():
+            with open(tmp_path / "logs" / nome, encoding="utf-8") as f:
+                linhas += [json.loads(linha) for linha in f]
+    # Nenhuma linha perdida nem arquivo rodado por cima de outro
+    assert sorted((log["user_id"], log["details"]["n"]) for log in linhas) == sorted(
+        (f"func{i}", n) for i in range(3) for n in range(150)
+    )
+    assert len(bs.AuditLogger(caminho).get_all_logs(limit=10000)) == 450
+
+
+def test_audit_log_so_cria_arquivos_no_primeiro_uso(tmp_path, monkeypatch):
+    monkeypatch.setattr(bs, "AUDIT_LOG_FILE", str(tmp_path / "auditoria" / "audit.log"))
+    auditoria = bs.AuditLogger()
+    assert not (tmp_path / "auditoria").exists()
+
+    auditoria.log_action("func1", "login")
+    assert {"audit.log", "audit.log.idx", "audit.log.lock"} <= set(os.listdir(tmp_path / "auditoria"))
+    assert [log["action"] for log in auditoria.get_user_logs("func1")] == ["login"]
@@ -0,0 +1,65 @@
+"""Testes do cálculo agregado do snapshot do dashboard (SQLite em memória)."""
+
+import sqlite3
+from datetime import date
+
+from ponto_esa_v5.dashboard_snapshot import calcular_metricas_dashboard
+
+
+def _criar_schema(cursor):
+    cursor.execute("CREATE TABLE usuarios (usuario TEXT, tipo TEXT, ativo INTEGER)")
+    cursor.execute("CREATE TABLE registros_ponto (usuario TEXT, data_hora TEXT, tipo TEXT)")
+    cursor.execute("CREATE TABLE ausencias (usuario TEXT, tipo TEXT, status TEXT, data_inicio TEXT)")
+    cursor.execute("CREATE TABLE solicitacoes_horas_extras (usuario TEXT, status TEXT)")
+
+
+def test_metricas_agregadas_do_dia_e_da_semana():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    _criar_schema(cursor)
+
+    cursor.executemany(
+        "INSERT INTO usuarios VALUES (?, ?, ?)",
+        [("ana", "funcionario", 1), ("bob", "funcionario", 1),
+         ("carla", "funcionario", 0), ("gestor", "gestor", 1)],
+    )
+    cursor.executemany(
+        "INSERT INTO registros_ponto VALUES (?, ?, ?)",
+        [
+            ("ana", "2026-03-10 08:00:00", "inicio"),
+            ("ana", "2026-03-10 17:00:00", "fim"),
+            ("bob", "2026-03-10 09:00:00", "inicio"),
+            ("ana", "2026-03-08 08:00:00", "inicio"),
+            ("bob", "2026-03-01 08:00:00", "inicio"),  # fora da janela de 7 dias
+        ],
+    )
+    cursor.executemany(
+        "INSERT INTO ausencias VALUES (?, ?, ?, ?)",
+        [
+            ("ana", "Atestado Médico", "aprovado", "2026-03-02"),
+            ("bob", "Atestado Médico", "pendente", "2026-03-05"),
+            ("bob", "Férias", "aprovado", "2026-03-09"),
+            ("ana", "Férias", "aprovado", "2026-02-20"),  # mês anterior
+        ],
+    )
+    cursor.executemany(
+        "INSERT INTO solicitacoes_horas_extras VALUES (?, ?)",
+        [("ana", "pendente"), ("bob", "aprovado")],
+    )
+
+    dados = calcular_metricas_dashboard(cursor, date(2026, 3, 10))
+
+    assert dados["total_usuarios"] == 2
+    assert dados["registros_hoje"] == 3
+    assert dados["presentes_hoje"] == 2
+    assert dados["ausencias_pendentes"] == 1
+    assert dados["horas_extras_pendentes"] == 1
+    assert dados["pendencias_total"] == 2
+    assert dados["atestados_mes"] == 2
+    assert dados["atestados_aprovados"] == 1
+    assert dados["ausencias_por_tipo"] == {"Atestado Médico": 2, "Férias": 1}
+    assert dados["ausencias_status"] == {"aprovado": 2, "pendente": 1}
+
+    semana = dados["registros_semana"]
+    assert semana["datas"][0] == "04/03" and semana["datas"][-1] == "10/03"
+    assert semana["valores"] == [0, 0, 0, 0, 1, 0, 3]
@@ -0,0 +1,63 @@
+"""Testes da telemetria de jobs (job_runs em SQLite temporário)."""
+
+import sqlite3
+
+import pytest
+
+from ponto_esa_v5 import job_telemetry as jt
+
+
+@pytest.fixture
+def banco(tmp_path, apontar_sqlite):
+    caminho = str(tmp_path / "jobs.db")
+
+    def _conectar():
+        conn = sqlite3.connect(caminho)
+        jt._observar_conexao(conn)  # o que get_connection faria
+        return conn
+
+    return apontar_sqlite(_conectar, jt)
+
+
+def test_execucao_registra_duracao_consultas_e_chamadas(banco):
+    def job():
+        conn = banco()
+        conn.execute("SELECT 1")
+        conn.execute("SELECT 2")
+        conn.close()
+        jt.registrar_chamada_externa(True)
+        jt.registrar_chamada_externa(False)
+        return {"enviados": 1}
+
+    assert jt.medir_job("lembrete", "Lembrete", job)() == {"enviados": 1}
+
+    def job_falha():
+        raise RuntimeError("ntfy fora")
+
+    with pytest.raises(RuntimeError):
+        jt.medir_job("lembrete", "Lembrete", job_falha)()
+    jt.medir_job("lembrete", "Lembrete", lambda: {"status": "skipped"})()
+
+    conn = banco()
+    linhas = conn.execute(
+        "SELECT status, consultas_db, chamadas_externas, chamadas_ok, chamadas_falha, erro FROM job_runs ORDER BY id"
+    ).fetchall()
+    conn.close()
+    assert linhas[0] == ("ok", 2, 2, 1, 1, None)
+    assert linhas[1][0] == "erro" and "ntfy fora" in linhas[1][5]
+    assert linhas[2][0] == "ignorado"
+
+
+def test_percentis_e_eventos_perdidos(banco):
+    inicio = jt.agora_br_naive()
+    for duracao in (10, 20, 30, 40, 1000):
+        jt.registrar_execucao("resumo", "Resumo", jt.STATUS_OK, inicio, duracao)
+    jt.registrar_execucao("resumo", "Resumo", jt.STATUS_PERDIDO, inicio)
+
+    (resumo,) = jt.obter_estatisticas_jobs()
+    assert resumo["execucoes"] == 5 and resumo["perdidos"] == 1
+    assert resumo["p50_ms"] == 30
+    assert resumo["p95_ms"] == pytest.approx(808.0)
+
+    (serie,) = jt.obter_percentis_diarios()
+    assert serie["job"] == "Resumo" and serie["p50_ms"] == 30
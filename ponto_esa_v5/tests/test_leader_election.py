@@ -0,0 +1,90 @@
+"""Testes da eleição de líder com trava em arquivo (vários processos locais)."""
+
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from ponto_esa_v5.leader_election import EleicaoLider, TravaArquivo
+
+_RAIZ = Path(__file__).resolve().parents[2]
+
+_PROCESSO = """
+import os, sys, time
+from ponto_esa_v5.leader_election import EleicaoLider, TravaArquivo
+
+trava, registro = sys.argv[1], sys.argv[2]
+
+def assumir():
+    with open(registro, "a") as f:
+        f.write(f"{os.getpid()}\\n")
+    return True
+
+EleicaoLider("teste", assumir, lambda: None, trava=TravaArquivo(trava),
+             renovar_a_cada=0.05, tentar_a_cada=0.05).iniciar()
+time.sleep(60)
+"""
+
+
+def _lideres(registro: Path):
+    return registro.read_text().split() if registro.exists() else []
+
+
+def _esperar(condicao, timeout=15.0):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if condicao():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_um_unico_lider_entre_processos_e_failover(tmp_path):
+    trava, registro = tmp_path / "jobs.leader.lock", tmp_path / "lideres.txt"
+    processos = [
+        subprocess.Popen([sys.executable, "-c", _PROCESSO, str(trava), str(registro)], cwd=_RAIZ)
+        for _ in range(3)
+    ]
+    try:
+        assert _esperar(lambda: len(_lideres(registro)) == 1)
+        time.sleep(0.5)  # vários ciclos de disputa: seguidores continuam ociosos
+        lider = int(_lideres(registro)[0])
+        assert _lideres(registro) == [str(lider)]
+
+        next(p for p in processos if p.pid == lider).kill()
+
+        assert _esperar(lambda: len(_lideres(registro)) == 2)
+        time.sleep(0.5)
+        novo = int(_lideres(registro)[1])
+        assert len(_lideres(registro)) == 2
+        assert novo != lider and novo in {p.pid for p in processos}
+    finally:
+        for p in processos:
+            p.kill()
+            p.wait()
+
+
+def test_parar_cede_a_lideranca(tmp_path):
+    eventos = []
+    caminho = str(tmp_path / "jobs.leader.lock")
+
+    def eleicao(nome):
+        return EleicaoLider(
+            nome,
+            lambda: eventos.append(f"{nome}:assumiu") or True,
+            lambda: eventos.append(f"{nome}:perdeu"),
+            trava=TravaArquivo(caminho),
+            renovar_a_cada=0.05,
+            tentar_a_cada=0.05,
+        )
+
+    a, b = eleicao("a"), eleicao("b")
+    assert a.iniciar() is True
+    assert b.iniciar() is False
+    assert open(caminho).read().split()[0] == str(os.getpid())
+
+    a.parar()
+    assert _esperar(lambda: b.e_lider, timeout=5)
+    b.parar()
+    assert eventos == ["a:assumiu", "a:perdeu", "b:assumiu", "b:perdeu"]
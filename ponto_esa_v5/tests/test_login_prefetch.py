@@ -0,0 +1,24 @@
+"""Testes do prefetch pós-login (sem Streamlit)."""
+
+from ponto_esa_v5.login_prefetch import consumir, iniciar_prefetch
+
+
+def test_valor_pre_carregado_e_consumido_uma_unica_vez():
+    chamadas = []
+    prefetch = iniciar_prefetch("ana", {"jornada": lambda: chamadas.append("prefetch") or "pre"})
+
+    assert consumir(prefetch, "jornada", lambda: "direto") == "pre"
+    assert consumir(prefetch, "jornada", lambda: "direto") == "direto"
+    assert chamadas == ["prefetch"]
+    assert set(prefetch.tempos_ms) == {"jornada"}
+
+
+def test_erro_no_prefetch_cai_para_consulta_direta():
+    def _falha():
+        raise RuntimeError("banco indisponível")
+
+    prefetch = iniciar_prefetch("ana", {"hora_extra_ativa": _falha})
+
+    assert consumir(prefetch, "hora_extra_ativa", lambda: None) is None
+    assert "hora_extra_ativa" in prefetch.erros
+    assert consumir(None, "qualquer", lambda: 42) == 42
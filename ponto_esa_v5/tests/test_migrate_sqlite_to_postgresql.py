@@ -0,0 +1,35 @@
+"""Testes das partes da migração SQLite → PostgreSQL que não dependem do servidor."""
+
+from datetime import datetime
+from decimal import Decimal
+
+from ponto_esa_v5.tools import migrate_sqlite_to_postgresql as mig
+
+
+def test_buffer_copy_escapa_texto_binario_e_nulos():
+    buffer = mig.linhas_para_copy([
+        (1, "linha\tcom\ttab", None),
+        (2, "quebra\nde linha \\ barra", b"\x00\xff"),
+    ])
+    assert buffer.read() == (
+        "1\tlinha\\tcom\\ttab\t\\N\n"
+        "2\tquebra\\nde linha \\\\ barra\t\\\\x00ff\n"
+    )
+
+
+def test_checksum_igual_com_tipos_de_cada_banco_e_ordem_diferente():
+    # Como o SQLite devolve...
+    sqlite = [[(1, "func1", "2026-03-02 08:00:00", 1, 8, b"ab"), (2, "func2", "2026-03-02", 0, 7.5, None)]]
+    # ...e como o PostgreSQL devolve as mesmas linhas, em outra ordem e em dois lotes
+    postgres = [
+        [(2, "func2", datetime(2026, 3, 2).date(), False, Decimal("7.5"), None)],
+        [(1, "func1", datetime(2026, 3, 2, 8, 0), True, 8.0, memoryview(b"ab"))],
+    ]
+    assert mig.checksum_linhas(sqlite) == mig.checksum_linhas(postgres)
+    assert mig.checksum_linhas(sqlite) != mig.checksum_linhas([[sqlite[0][0]]])
+
+
+def test_niveis_por_chave_estrangeira():
+    tabelas = ["auditoria_correcoes", "usuarios", "registros_ponto", "feriados"]
+    pares = [("auditoria_correcoes", "registros_ponto"), ("registros_ponto", "usuarios"), ("x", "usuarios")]
+    assert mig._niveis(tabelas, pares) == [["usuarios", "feriados"], ["registros_ponto"], ["auditoria_correcoes"]]
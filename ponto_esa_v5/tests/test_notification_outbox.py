@@ -0,0 +1,162 @@
+"""Testes da notification_outbox (SQLite temporário, entregadores simulados)."""
+
+import sqlite3
+import time
+
+import pytest
+
+from ponto_esa_v5 import notification_outbox as outbox
+
+
+@pytest.fixture
+def banco(tmp_path, apontar_sqlite):
+    caminho = str(tmp_path / "outbox.db")
+    apontar_sqlite(caminho, outbox)
+    return caminho
+
+
+def _linhas(caminho):
+    conn = sqlite3.connect(caminho)
+    try:
+        return {
+            destinatario: (status, tentativas)
+            for destinatario, status, tentativas in conn.execute(
+                "SELECT destinatario, status, tentativas FROM notification_outbox"
+            )
+        }
+    finally:
+        conn.close()
+
+
+def test_enfileira_na_transacao_do_chamador_com_dedup(banco):
+    outbox.ensure_outbox_schema_once()
+    conn = sqlite3.connect(banco)
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE pedidos (id INTEGER PRIMARY KEY)")
+    cursor.execute("INSERT INTO pedidos DEFAULT VALUES")
+    for _ in range(2):
+        assert outbox.enfileirar_notificacao("ntfy", "gestor", {"titulo": "Novo"}, chave_dedup="pedido:1", cursor=cursor)
+    conn.rollback()
+    conn.close()
+
+    # Rollback do negócio desfaz também a notificação.
+    assert _linhas(banco) == {}
+
+    conn = sqlite3.connect(banco)
+    cursor = conn.cursor()
+    for _ in range(2):
+        outbox.enfileirar_notificacao("ntfy", "gestor", {"titulo": "Novo"}, chave_dedup="pedido:1", cursor=cursor)
+    conn.commit()
+    conn.close()
+    assert _linhas(banco) == {"gestor": ("pendente", 0)}
+
+
+def test_worker_entrega_descarta_e_reagenda_com_backoff(banco, monkeypatch):
+    def _ntfy(destinatario, payload):
+        if destinatario == "sem_push":
+            raise outbox.EntregaDescartada("sem inscrição")
+        return destinatario == "ana"
+
+    monkeypatch.setitem(outbox._ENTREGADORES, "ntfy", _ntfy)
+    for usuario in ("ana", "bob", "sem_push"):
+        assert outbox.enfileirar_notificacao("ntfy", usuario, {"titulo": "Oi"})
+
+    assert outbox.processar_outbox() == {"enviado": 1, "descartado": 1, "reagendado": 1, "falhou": 0}
+    assert _linhas(banco) == {"ana": ("enviado", 0), "bob": ("pendente", 1), "sem_push": ("descartado", 0)}
+
+    # bob só volta a ser tentado depois do backoff.
+    assert outbox.processar_outbox() == {"enviado": 0, "descartado": 0, "reagendado": 0, "falhou": 0}
+
+
+def test_notificacao_e_push_entram_na_transacao_do_negocio(banco, monkeypatch):
+    from ponto_esa_v5 import notifications
+
+    outbox.ensure_outbox_schema_once()
+    conn = sqlite3.connect(banco)
+    conn.execute("CREATE TABLE Notificacoes (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, title TEXT, "
+                 "message TEXT, type TEXT, read INTEGER, extra_data TEXT)")
+    conn.execute("CREATE TABLE pedidos (id INTEGER PRIMARY KEY)")
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(notifications, "USE_POSTGRESQL", False)
+    gerenciador = notifications.NotificationManager()
+
+    for confirmar in (False, True):
+        conn = sqlite3.connect(banco)
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO pedidos DEFAULT VALUES")
+        gerenciador.add_notification("gestor", {"title": "Nova solicitação", "type": "solicitacao"}, cursor=cursor)
+        conn.commit() if confirmar else conn.rollback()
+        conn.close()
+        if not confirmar:
+            assert _linhas(banco) == {}
+
+    conn = sqlite3.connect(banco)
+    (notificacao_id,) = conn.execute("SELECT id FROM Notificacoes").fetchone()
+    assert conn.execute("SELECT chave_dedup FROM notification_outbox").fetchall() == [(f"notificacao:{notificacao_id}",)]
+    conn.close()
+
+
+def test_resultado_de_reserva_expirada_nao_sobrescreve_o_novo_lote(banco, monkeypatch):
+    entregas = []
+
+    def _ntfy(destinatario, payload):
+        # Enquanto este worker entrega, a reserva expira e outro worker reserva a linha.
+        conn = sqlite3.connect(banco)
+        conn.execute("UPDATE notification_outbox SET lote = 'outro', status = 'enviando'")
+        conn.commit()
+        conn.close()
+        entregas.append(destinatario)
+        return False
+
+    monkeypatch.setitem(outbox._ENTREGADORES, "ntfy", _ntfy)
+    outbox.enfileirar_notificacao("ntfy", "ana", {"titulo": "Oi"})
+
+    assert outbox.processar_outbox()["reagendado"] == 1
+    assert entregas == ["ana"]
+    conn = sqlite3.connect(banco)
+    assert conn.execute("SELECT status, tentativas, lote FROM notification_outbox").fetchall() == [
+        ("enviando", 0, "outro")
+    ]
+    conn.close()
+
+
+def test_purgar_apaga_so_entregues_e_descartadas_antigas(banco, monkeypatch):
+    for usuario in ("ana", "bob", "sem_push", "nova"):
+        outbox.enfileirar_notificacao("ntfy", usuario, {"titulo": "Oi"})
+    conn = sqlite3.connect(banco)
+    conn.execute("UPDATE notification_outbox SET criado_em = '2000-01-01 00:00:00' WHERE destinatario != 'nova'")
+    conn.execute("UPDATE notification_outbox SET status = 'enviado' WHERE destinatario IN ('ana', 'nova')")
+    conn.execute("UPDATE notification_outbox SET status = 'descartado' WHERE destinatario = 'sem_push'")
+    conn.commit()
+    conn.close()
+
+    assert outbox.purgar_outbox(dias=7) == 2
+    assert _linhas(banco) == {"bob": ("pendente", 0), "nova": ("enviado", 0)}
+
+
+def test_despertar_durante_o_ciclo_nao_se_perde(monkeypatch):
+    ciclos = []
+
+    def _processar():
+        ciclos.append(len(ciclos))
+        if len(ciclos) == 1:
+            outbox.despertar_worker()  # enfileirado enquanto o lote era entregue
+        else:
+            outbox._parar.set()  # como parar_worker_outbox
+            outbox.despertar_worker()
+        return {}
+
+    monkeypatch.setattr(outbox, "processar_outbox", _processar)
+    monkeypatch.setattr(outbox, "OUTBOX_POLL_SECONDS", 30)
+    outbox._parar.clear()
+    inicio = time.monotonic()
+    try:
+        outbox._loop_worker()
+    finally:
+        outbox._parar.clear()
+        outbox._despertar.clear()
+
+    # O segundo ciclo começou sem esperar o intervalo de polling.
+    assert ciclos == [0, 1]
+    assert time.monotonic() - inicio < 5
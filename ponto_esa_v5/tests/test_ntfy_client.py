@@ -0,0 +1,67 @@
+"""Testes do despacho concorrente do ntfy contra um servidor HTTP local."""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ponto_esa_v5 import ntfy_client
+from ponto_esa_v5.ntfy_client import publicar_em_lote
+
+
+class _NtfyLocal(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    recebidos = []
+
+    def do_POST(self):
+        corpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        _NtfyLocal.recebidos.append((self.path, self.headers.get("Title"), corpo))
+        status = 500 if self.path.endswith("falha") else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_lote_retorna_resultado_por_destinatario():
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _NtfyLocal)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{servidor.server_port}"
+    try:
+        urls = {f"user{i}": f"{base}/topico-{i}" for i in range(10)}
+        urls["quebrado"] = f"{base}/topico-falha"
+
+        resultados = publicar_em_lote(urls, "📢 oi".encode("utf-8"), {"Title": "Aviso"}, max_workers=4)
+    finally:
+        servidor.shutdown()
+
+    assert list(resultados) == list(urls)
+    assert all(resultados[f"user{i}"].ok for i in range(10))
+    assert not resultados["quebrado"].ok and resultados["quebrado"].status == 500
+    assert len(_NtfyLocal.recebidos) == 11
+    assert all(titulo == "Aviso" and corpo == "📢 oi".encode("utf-8") for _, titulo, corpo in _NtfyLocal.recebidos)
+
+
+def test_limite_de_taxa_esgotado_marca_adiado_sem_enviar(monkeypatch):
+    vezes = iter([True, False, False])
+    esperas = []
+
+    def _aguardar_vez(destino, espera_max=None):
+        esperas.append(espera_max)
+        return next(vezes)
+
+    monkeypatch.setattr(ntfy_client, "aguardar_vez", _aguardar_vez)
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _NtfyLocal)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{servidor.server_port}"
+    _NtfyLocal.recebidos = []
+    try:
+        resultados = publicar_em_lote(
+            {f"user{i}": f"{base}/t{i}" for i in range(3)}, b"oi", {}, max_workers=1, espera_max=0
+        )
+    finally:
+        servidor.shutdown()
+
+    assert [(r.ok, r.adiado) for r in resultados.values()] == [(True, False), (False, True), (False, True)]
+    assert len(_NtfyLocal.recebidos) == 1
+    assert esperas == [0, 0, 0]  # envio da UI não espera o limite
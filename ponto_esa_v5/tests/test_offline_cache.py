@@ -0,0 +1,93 @@
+"""Testes do cache offline limitado (LRU, cotas por namespace e expiração)."""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from ponto_esa_v5 import offline_system as off
+
+
+@pytest.fixture
+def offline(tmp_path, monkeypatch, apontar_sqlite):
+    monkeypatch.chdir(tmp_path)
+    relogio = {"agora": datetime(2026, 3, 2, 8, 0, 0)}
+    monkeypatch.setattr(off, "agora_br_naive", lambda: relogio["agora"])
+    apontar_sqlite(str(tmp_path / "principal.db"), off)
+    sistema = off.OfflineSystem()
+    sistema.relogio = relogio
+    return sistema
+
+
+def _avancar(offline, segundos=61):
+    offline.relogio["agora"] += timedelta(seconds=segundos)
+
+
+def test_lru_respeita_cota_do_namespace_e_limite_de_itens(offline, monkeypatch):
+    monkeypatch.setattr(off, "OFFLINE_CACHE_COTAS_BYTES", {"projetos": 300})
+    monkeypatch.setattr(off, "OFFLINE_CACHE_MAX_ITENS", 5)
+    valor = "x" * 98  # 100 bytes em JSON
+
+    for i in range(3):
+        offline.cache_data(f"projetos:{i}", valor)
+        _avancar(offline)
+    offline.get_cached_data("projetos:0")  # o mais antigo passa a ser o mais recente
+    _avancar(offline)
+    offline.cache_data("projetos:3", valor)
+
+    # Estourou a cota: poda os menos usados até 90% dela (270 bytes → ficam 2)
+    assert [offline.get_cached_data(f"projetos:{i}") is not None for i in range(4)] == [True, False, False, True]
+
+    # Outro namespace não disputa a cota de projetos, mas o total de itens é global
+    for i in range(4):
+        _avancar(offline)
+        offline.cache_data(f"usuarios:{i}", {"nome": f"func{i}"})
+    stats = offline.get_cache_stats()
+    # 6 > 5 itens: poda até 4 a partir dos acessos mais antigos (os dois de projetos)
+    assert stats["itens"] == 4 and stats["bytes"] == 68
+    assert stats["por_namespace"] == {
+        "usuarios": {"itens": 4, "bytes": 68, "cota_bytes": off.OFFLINE_CACHE_COTA_PADRAO_BYTES},
+    }
+    assert stats["evictions"] == 4
+
+
+def test_expiracao_em_massa_e_taxa_de_acerto(offline):
+    offline.cache_data("feriados:2026", ["2026-04-21"], expires_minutes=5)
+    offline.cache_data("config:tolerancia", 10, expires_minutes=120)
+
+    assert offline.get_cached_data("feriados:2026") == ["2026-04-21"]
+    _avancar(offline, 6 * 60)
+    assert offline.get_cached_data("feriados:2026") is None
+    offline.cleanup_old_cache()
+
+    stats = offline.get_cache_stats()
+    assert stats["itens"] == 1 and stats["bytes"] == 2
+    assert (stats["hits"], stats["misses"], stats["taxa_acerto"]) == (1, 1, 0.5)
+
+
+def test_itens_anteriores_ao_lru_recebem_o_acesso_da_gravacao(tmp_path, monkeypatch, apontar_sqlite):
+    monkeypatch.chdir(tmp_path)
+    apontar_sqlite(str(tmp_path / "principal.db"), off)
+    (tmp_path / "database").mkdir()
+    conn = sqlite3.connect(tmp_path / "database" / "offline_ponto_esa.db")
+    conn.executescript("""
+        CREATE TABLE cache_dados (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, chave TEXT UNIQUE NOT NULL, valor TEXT,
+            expires_at TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        INSERT INTO cache_dados (chave, valor, expires_at, updated_at)
+        VALUES ('projetos:antigo', '"x"', '2099-01-01 00:00:00', '2026-03-01 10:00:00');
+        INSERT INTO cache_dados (chave, valor, expires_at, updated_at)
+        VALUES ('projetos:sem_data', '"y"', '2099-01-01 00:00:00', NULL);
+    """)
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(off, "agora_br_naive", lambda: datetime(2026, 3, 2, 8, 0, 0))
+
+    off.OfflineSystem()
+
+    conn = sqlite3.connect(tmp_path / "database" / "offline_ponto_esa.db")
+    assert dict(conn.execute("SELECT chave, last_access_at FROM cache_dados")) == {
+        "projetos:antigo": "2026-03-01 10:00:00", "projetos:sem_data": "2026-03-02 08:00:00",
+    }
+    conn.close()
@@ -0,0 +1,89 @@
+"""Testes do monitor de conectividade do modo offline (sondas simuladas)."""
+
+import threading
+import time
+
+from ponto_esa_v5 import offline_system as off
+
+
+def test_backoff_offline_e_reconexao_dispara_uma_vez(monkeypatch):
+    respostas = iter([False, False, False, True, True])
+    sondagens = []
+
+    def sonda():
+        sondagens.append(1)
+        resposta = next(respostas)
+        if not resposta:
+            raise OSError("sem rota")
+        return resposta
+
+    monitor = off.MonitorConectividade(sondar=sonda, intervalo=30, backoff_base=5, backoff_max=12)
+    reconexoes = []
+    monitor.ao_reconectar(lambda: reconexoes.append(monitor.online))
+
+    esperas = []
+    for _ in range(5):
+        monitor.sondar()
+        esperas.append(monitor.proxima_espera())
+    assert esperas == [5, 10, 12, 30, 30]
+    assert reconexoes == [True]
+
+    # A UI só lê o estado guardado: nenhuma sondagem nova
+    monkeypatch.setattr(off, "_monitor", monitor)
+    assert off.OfflineSystem.is_online(None) is True
+    assert len(sondagens) == 5
+
+
+def test_thread_sonda_em_background_e_avisa_a_volta(monkeypatch):
+    online = threading.Event()
+    monitor = off.MonitorConectividade(sondar=online.is_set, intervalo=0.01, backoff_base=0.01, backoff_max=0.02)
+    voltou = threading.Event()
+    monitor.ao_reconectar(voltou.set)
+    monkeypatch.setattr(off, "_monitor", monitor)
+
+    monitor.iniciar()
+    try:
+        while monitor.online is None:
+            time.sleep(0.005)
+        inicio = time.perf_counter()
+        assert off.OfflineSystem.is_online(None) is False
+        assert time.perf_counter() - inicio < 0.01
+
+        online.set()
+        assert voltou.wait(2)
+        assert off.OfflineSystem.is_online(None) is True
+    finally:
+        monitor.parar()
+
+
+def test_pedido_durante_a_sondagem_antecipa_a_proxima_e_parar_encerra():
+    sondagens = []
+
+    def sonda():
+        sondagens.append(1)
+        if len(sondagens) == 1:
+            monitor.verificar_agora()  # chega com a sondagem em andamento
+        return True
+
+    monitor = off.MonitorConectividade(sondar=sonda, intervalo=30)
+    monitor.iniciar()
+    try:
+        limite = time.monotonic() + 2
+        while len(sondagens) < 2 and time.monotonic() < limite:
+            time.sleep(0.005)
+        assert len(sondagens) == 2
+    finally:
+        monitor.parar()
+    monitor._thread.join(2)
+    assert not monitor._thread.is_alive()
+
+
+def test_auto_sync_repetido_registra_um_callback(tmp_path, monkeypatch):
+    monitor = off.MonitorConectividade(sondar=lambda: True)
+    monkeypatch.setattr(off, "_monitor", monitor)
+    monkeypatch.setattr(off, "_sync_thread", None)
+    monkeypatch.setattr(off, "OfflineSystem", lambda: None)
+
+    primeira = off.auto_sync()
+    assert off.auto_sync() is primeira and off.auto_sync() is primeira
+    assert len(monitor._callbacks) == 1
@@ -0,0 +1,181 @@
+"""Testes da sincronização em lote do modo offline (SQLite temporário como banco principal)."""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from ponto_esa_v5 import offline_system as off
+
+
+@pytest.fixture
+def sistema(tmp_path, monkeypatch, apontar_sqlite):
+    monkeypatch.chdir(tmp_path)
+    principal = str(tmp_path / "principal.db")
+    conn = sqlite3.connect(principal)
+    conn.create_function("falhar", 0, lambda: 0)
+    conn.executescript("""
+        CREATE TABLE registros_ponto (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, usuario TEXT NOT NULL, data_hora TIMESTAMP NOT NULL,
+            tipo TEXT NOT NULL, modalidade TEXT, projeto TEXT, atividade TEXT, localizacao TEXT
+        );
+        CREATE TABLE ausencias (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, usuario TEXT NOT NULL, data_inicio DATE NOT NULL,
+            data_fim DATE NOT NULL, tipo TEXT NOT NULL, motivo TEXT, arquivo_comprovante TEXT
+        );
+        CREATE TRIGGER falha_simulada BEFORE INSERT ON ausencias WHEN falhar()
+        BEGIN SELECT RAISE(ABORT, 'queda no meio do lote'); END;
+    """)
+    conn.close()
+
+    estado = {"conexoes": 0, "inserts": 0, "falhar": False}
+
+    def conectar():
+        estado["conexoes"] += 1
+        conn = sqlite3.connect(principal)
+        conn.create_function("falhar", 0, lambda: int(estado["falhar"]))
+
+        def rastrear(sql):
+            if sql.startswith("INSERT INTO registros_ponto"):
+                estado["inserts"] += 1
+
+        conn.set_trace_callback(rastrear)
+        return conn
+
+    apontar_sqlite(conectar, off)
+    monkeypatch.setattr(off, "_monitor", off.MonitorConectividade(sondar=lambda: True))
+    sistema = off.OfflineSystem()
+    monkeypatch.setattr(sistema, "is_online", lambda: True)
+    estado["principal"] = principal
+    return sistema, estado
+
+
+def _contar(caminho, tabela):
+    conn = sqlite3.connect(caminho)
+    total = conn.execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0]
+    conn.close()
+    return total
+
+
+def test_mil_batidas_em_uma_transacao_e_um_insert(sistema):
+    offline, estado = sistema
+    for i in range(1000):
+        offline.save_offline_registro("func1", "2026-03-02", "Início", f"08:{i % 60:02d}", "Presencial", "P1", "Campo")
+    offline.save_offline_ausencia("func1", "2026-03-03", None, "Férias", "Descanso")
+    estado["conexoes"] = estado["inserts"] = 0
+
+    sucesso, mensagem = offline.sync_to_online()
+
+    assert sucesso and mensagem == "Sincronizados: 1001, Erros: 0"
+    # Uma conexão para a DDL única de uuid_cliente e uma para o lote; 1.000 batidas num INSERT
+    assert estado["conexoes"] == 2 and estado["inserts"] == 1
+    assert _contar(estado["principal"], "registros_ponto") == 1000
+    conn = sqlite3.connect(estado["principal"])
+    assert conn.execute("SELECT data_hora FROM registros_ponto ORDER BY id LIMIT 1").fetchone() == ("2026-03-02 08:00:00",)
+    assert conn.execute("SELECT data_fim FROM ausencias").fetchone() == ("2026-03-03",)
+    conn.close()
+    assert offline.get_sync_status()["total_pendentes"] == 0
+    assert offline.load_sync_queue() == []
+
+
+def _vencer_fila(offline):
+    conn = sqlite3.connect(offline.offline_db_path)
+    conn.execute("UPDATE sync_queue SET next_attempt_at = '2000-01-01 00:00:00'")
+    conn.commit()
+    conn.close()
+
+
+def test_reenvio_idempotente_e_falha_nao_marca_nada(sistema):
+    offline, estado = sistema
+    for i in range(10):
+        offline.save_offline_registro("func2", "2026-03-02", "Fim", f"17:0{i}", "Remoto", "P2", "Relatório")
+    offline.save_offline_ausencia("func2", "2026-03-03", "2026-03-04", "Atestado", "Consulta")
+
+    estado["falhar"] = True
+    assert offline.sync_to_online()[0] is False
+    assert _contar(estado["principal"], "registros_ponto") == 0
+    assert offline.get_sync_status()["total_pendentes"] == 11
+
+    estado["falhar"] = False
+    _vencer_fila(offline)
+    assert offline.sync_to_online() == (True, "Sincronizados: 11, Erros: 0")
+
+    # Marcação perdida depois do commit online: o reenvio não duplica nada
+    conn = sqlite3.connect(offline.offline_db_path)
+    conn.execute("UPDATE registros_offline SET synced = 0")
+    conn.commit()
+    conn.close()
+    off.OfflineSystem()  # reenfileira pendentes sem item na fila
+    assert offline.sync_to_online() == (True, "Sincronizados: 10, Erros: 0")
+    assert _contar(estado["principal"], "registros_ponto") == 10
+    assert _contar(estado["principal"], "ausencias") == 1
+
+
+def test_fila_com_backoff_e_importacao_do_json_antigo(sistema, monkeypatch):
+    offline, estado = sistema
+    relogio = {"agora": datetime(2026, 3, 2, 8, 0, 0)}
+    monkeypatch.setattr(off, "agora_br_naive", lambda: relogio["agora"])
+    offline.save_offline_ausencia("func3", "2026-03-03", None, "Férias", "Descanso")
+
+    estado["falhar"] = True
+    assert offline.sync_to_online()[0] is False
+    assert offline.load_sync_queue()[0]["attempts"] == 1
+    # Ainda não venceu: nada é tentado
+    assert offline.sincronizar_pendentes() == {"registro": 0, "ausencia": 0}
+    relogio["agora"] += timedelta(seconds=30)
+    assert offline.sync_to_online()[0] is False
+    item = offline.load_sync_queue()[0]
+    assert item["attempts"] == 2 and item["next_attempt_at"] == "2026-03-02 08:01:30"
+
+    estado["falhar"] = False
+    relogio["agora"] += timedelta(seconds=60)
+    assert offline.sync_to_online() == (True, "Sincronizados: 1, Erros: 0")
+    assert offline.load_sync_queue() == []
+
+    # Fila no formato antigo (JSON) é importada para a tabela
+    conn = sqlite3.connect(offline.offline_db_path)
+    conn.execute("INSERT INTO ausencias_offline (user_id, data_inicio, tipo, uuid) VALUES ('func3', '2026-03-09', 'Férias', 'u1')")
+    item_id = conn.execute("SELECT MAX(id) FROM ausencias_offline").fetchone()[0]
+    conn.commit()
+    conn.close()
+    with open(offline.sync_queue_path, "w") as f:
+        json.dump([{"tipo": "ausencia", "item_id": item_id, "attempts": 2}], f)
+    recarregado = off.OfflineSystem()
+    assert not os.path.exists(offline.sync_queue_path)
+    assert [(i["item_id"], i["attempts"]) for i in recarregado.load_sync_queue()] == [(item_id, 2)]
+
+
+def test_fila_concorrente_nao_perde_itens(sistema):
+    offline, estado = sistema
+    parar = threading.Event()
+    erros = []
+
+    def gravar(usuario):
+        try:
+            for i in range(100):
+                offline.save_offline_registro(usuario, "2026-03-02", "Início", f"08:{i % 60:02d}", "Presencial", "P", "A")
+        except Exception as e:  # pragma: no cover - o teste falha abaixo
+            erros.append(e)
+
+    def sincronizar():
+        while not parar.is_set():
+            offline.sync_to_online()
+
+    sincronizador = threading.Thread(target=sincronizar)
+    sincronizador.start()
+    gravadores = [threading.Thread(target=gravar, args=(f"func{n}",)) for n in range(4)]
+    for thread in gravadores:
+        thread.start()
+    for thread in gravadores:
+        thread.join()
+    parar.set()
+    sincronizador.join()
+    offline.sync_to_online()
+
+    assert not erros
+    assert _contar(estado["principal"], "registros_ponto") == 400
+    assert offline.get_sync_status()["queue_size"] == 0
+    assert offline.get_sync_status()["total_pendentes"] == 0
@@ -3,18 +3,25 @@
 import hashlib
 import sys
 import os
+import threading
+from concurrent.futures import Future
 
 import pytest
 
 # Garantir que o módulo ponto_esa_v5 esteja acessível
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import password_utils
 from password_utils import (
     hash_password,
     verify_password,
+    verify_and_upgrade,
+    calibrar_custo_bcrypt,
     _is_bcrypt,
     _verify_sha256_legacy,
+    _rounds_do_hash,
 )
+from constants import BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS
 
 
 class TestHashPassword:
@@ -95,3 +102,66 @@ class TestVerifyPassword:
         h = hash_password("")
         assert verify_password("", h) is True
         assert verify_password("nao_vazia", h) is False
+
+
+class TestCustoAdaptativo:
+    """Testes da calibração do custo bcrypt."""
+
+    def test_calibracao_respeita_limites(self):
+        assert calibrar_custo_bcrypt(alvo_ms=0.001) == BCRYPT_MIN_ROUNDS
+        assert BCRYPT_MIN_ROUNDS <= calibrar_custo_bcrypt() <= BCRYPT_MAX_ROUNDS
+
+    def test_piso_nao_fica_abaixo_do_default_do_bcrypt(self):
+        assert BCRYPT_MIN_ROUNDS >= 12
+
+    def test_extrai_rounds_do_hash(self):
+        assert _rounds_do_hash("$2b$12$abcdef") == 12
+        assert _rounds_do_hash("sem_formato") == 0
+
+
+class TestPoolSaturado:
+    """Timeout do pool não faz o mesmo hash rodar duas vezes."""
+
+    def _executar_com_pool(self, monkeypatch, rodando):
+        futuro = Future()
+        if rodando:
+            futuro.set_running_or_notify_cancel()
+            threading.Timer(0.2, futuro.set_result, ("do_pool",)).start()
+
+        class PoolLento:
+            def submit(self, func, *args):
+                return futuro
+
+        chamadas = []
+        monkeypatch.setattr(password_utils, "_get_pool", lambda: PoolLento())
+        monkeypatch.setattr(password_utils, "PASSWORD_VERIFY_TIMEOUT_SECONDS", 0.05)
+        resultado = password_utils._executar_bcrypt(lambda: chamadas.append(1) or "local")
+        return resultado, chamadas, futuro
+
+    def test_tarefa_em_execucao_e_aguardada(self, monkeypatch):
+        resultado, chamadas, _ = self._executar_com_pool(monkeypatch, rodando=True)
+        assert resultado == "do_pool" and chamadas == []
+
+    def test_tarefa_na_fila_e_cancelada_e_calculada_localmente(self, monkeypatch):
+        resultado, chamadas, futuro = self._executar_com_pool(monkeypatch, rodando=False)
+        assert resultado == "local" and chamadas == [1] and futuro.cancelled()
+
+
+class TestUpgradeAssincrono:
+    """verify_and_upgrade agenda o upgrade sem gravar no banco na thread do login."""
+
+    def test_sha256_valido_agenda_upgrade(self, monkeypatch):
+        agendados = []
+        monkeypatch.setattr(password_utils, "_agendar_upgrade",
+                            lambda plain, antigo, usuario: agendados.append((antigo, usuario)))
+        sha = hashlib.sha256(b"legado").hexdigest()
+        assert verify_and_upgrade("legado", sha, "ana") is True
+        assert agendados == [(sha, "ana")]
+
+    def test_senha_incorreta_nao_agenda_upgrade(self, monkeypatch):
+        agendados = []
+        monkeypatch.setattr(password_utils, "_agendar_upgrade",
+                            lambda *a: agendados.append(a))
+        sha = hashlib.sha256(b"legado").hexdigest()
+        assert verify_and_upgrade("errada", sha, "ana") is False
+        assert agendados == []
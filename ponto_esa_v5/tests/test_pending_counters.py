@@ -0,0 +1,97 @@
+"""Testes da manutenção transacional de ``pending_counters`` (SQLite em memória)."""
+
+import sqlite3
+
+from ponto_esa_v5.pending_counters import chaves_afetadas, sincronizar_contadores
+
+
+def _contadores(cursor):
+    cursor.execute("SELECT chave, tipo, total FROM pending_counters WHERE total > 0")
+    return {(chave, tipo): total for chave, tipo, total in cursor.fetchall()}
+
+
+def test_sincroniza_na_transacao_e_zera_pendencias_resolvidas():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    cursor.execute(
+        "CREATE TABLE solicitacoes_horas_extras "
+        "(id INTEGER PRIMARY KEY, usuario TEXT, aprovador_solicitado TEXT, status TEXT)"
+    )
+    cursor.executemany(
+        "INSERT INTO solicitacoes_horas_extras (usuario, aprovador_solicitado, status) VALUES (?, ?, ?)",
+        [("ana", "gestor", "pendente"), ("bob", "gestor", "pendente"), ("ana", "chefe", "aprovado")],
+    )
+
+    assert sincronizar_contadores(cursor, "solicitacoes_horas_extras", chaves=["gestor", "chefe"]) is True
+    assert _contadores(cursor) == {("gestor", "he_aprovar"): 2}
+
+    cursor.execute("UPDATE solicitacoes_horas_extras SET status = 'aprovado' WHERE usuario = 'bob'")
+    sincronizar_contadores(cursor, "solicitacoes_horas_extras", ids=[2])
+    conn.commit()
+    assert _contadores(cursor) == {("gestor", "he_aprovar"): 1}
+
+    cursor.execute("UPDATE solicitacoes_horas_extras SET status = 'aprovado'")
+    sincronizar_contadores(cursor, "solicitacoes_horas_extras", ids=[1])
+    assert _contadores(cursor) == {}
+
+
+def test_recalcula_so_as_chaves_afetadas_e_ajusta_o_global():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE atestado_horas (id INTEGER PRIMARY KEY, usuario TEXT, status TEXT)")
+    cursor.executemany(
+        "INSERT INTO atestado_horas (usuario, status) VALUES (?, ?)",
+        [("ana", "pendente"), ("ana", "pendente"), ("bob", "pendente")],
+    )
+    sincronizar_contadores(cursor, "atestado_horas", chaves=["ana", "bob"])
+    assert _contadores(cursor) == {
+        ("ana", "atestados_usuario"): 2, ("bob", "atestados_usuario"): 1, ("*", "atestados_pendentes"): 3,
+    }
+
+    # Linha de outra chave alterada por fora: só a chave sincronizada é recontada
+    cursor.execute("UPDATE atestado_horas SET status = 'aprovado' WHERE usuario = 'bob'")
+    cursor.execute("UPDATE atestado_horas SET status = 'aprovado' WHERE id = 1")
+    consultas = []
+    conn.set_trace_callback(consultas.append)
+    sincronizar_contadores(cursor, "atestado_horas", ids=[1])
+    conn.set_trace_callback(None)
+
+    assert _contadores(cursor) == {
+        ("ana", "atestados_usuario"): 1, ("bob", "atestados_usuario"): 1, ("*", "atestados_pendentes"): 2,
+    }
+    assert all("GROUP BY usuario" not in sql or "IN (" in sql for sql in consultas)
+
+
+def test_falha_no_contador_nao_desfaz_a_mudanca_de_negocio():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE mensagens_diretas (id INTEGER PRIMARY KEY, remetente TEXT, mensagem TEXT)")
+    cursor.execute("INSERT INTO mensagens_diretas (remetente, mensagem) VALUES ('ana', 'oi')")
+
+    # Tabela sem a coluna 'destinatario': o SELECT do contador falha.
+    assert sincronizar_contadores(cursor, "mensagens_diretas", ids=[1]) is False
+    conn.commit()
+
+    cursor.execute("SELECT COUNT(*) FROM mensagens_diretas")
+    assert cursor.fetchone()[0] == 1
+
+
+def test_chaves_resolvidas_antes_do_delete_zeram_o_contador():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    cursor.execute(
+        "CREATE TABLE horas_extras_ativas (id INTEGER PRIMARY KEY, usuario TEXT, aprovador TEXT, status TEXT)"
+    )
+    cursor.execute(
+        "INSERT INTO horas_extras_ativas (usuario, aprovador, status) VALUES ('ana', 'gestor', 'aguardando_aprovacao')"
+    )
+    sincronizar_contadores(cursor, "horas_extras_ativas", chaves=["gestor"])
+    assert _contadores(cursor) == {("gestor", "he_ativas_aguardando"): 1}
+
+    # Depois do DELETE a linha não existe mais: por ids nada seria recontado.
+    chaves = chaves_afetadas(cursor, "horas_extras_ativas", [1])
+    cursor.execute("DELETE FROM horas_extras_ativas WHERE id = 1")
+    assert sincronizar_contadores(cursor, "horas_extras_ativas", chaves=chaves) is True
+
+    assert chaves == ["gestor"]
+    assert _contadores(cursor) == {}
@@ -0,0 +1,110 @@
+"""Testes do envio WebPush em paralelo com gravação em lote (SQLite temporário)."""
+
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from ponto_esa_v5 import push_notifications as pn
+
+
+class _FalhaPush(Exception):
+    def __init__(self, status):
+        super().__init__(f"status {status}")
+        self.response = SimpleNamespace(status_code=status)
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch, apontar_sqlite):
+    caminho = str(tmp_path / "push.db")
+    conn = sqlite3.connect(caminho)
+    conn.executescript("""
+        CREATE TABLE push_subscriptions (
+            id INTEGER PRIMARY KEY, usuario TEXT, endpoint TEXT UNIQUE, p256dh TEXT, auth TEXT,
+            user_agent TEXT, device_info TEXT, data_criacao TIMESTAMP, ativo INTEGER DEFAULT 1,
+            ultima_notificacao TIMESTAMP, falhas_consecutivas INTEGER DEFAULT 0
+        );
+        CREATE TABLE push_notifications_log (
+            id INTEGER PRIMARY KEY, usuario TEXT, titulo TEXT, mensagem TEXT, tipo TEXT,
+            dados_extras TEXT, status TEXT, erro TEXT
+        );
+    """)
+    conn.executemany(
+        "INSERT INTO push_subscriptions (usuario, endpoint, p256dh, auth) VALUES (?, ?, 'k', 'a')",
+        [(f"u{i % 100}", f"https://push.exemplo/{i}") for i in range(300)],
+    )
+    conn.execute("UPDATE push_subscriptions SET falhas_consecutivas = 2 WHERE endpoint = 'https://push.exemplo/1'")
+    conn.commit()
+    conn.close()
+
+    conexoes = []
+
+    def _conectar():
+        conexoes.append(1)
+        return sqlite3.connect(caminho)
+
+    apontar_sqlite(_conectar, pn)
+    monkeypatch.setattr(pn, "WEBPUSH_AVAILABLE", True)
+    monkeypatch.setattr(pn, "VAPID_PUBLIC_KEY", "pub")
+    monkeypatch.setattr(pn, "VAPID_PRIVATE_KEY", "priv")
+    monkeypatch.setattr(pn, "WebPushException", _FalhaPush, raising=False)
+    monkeypatch.setattr(pn, "aguardar_vez", lambda destino, espera_max=None: True)
+    return caminho, conexoes
+
+
+def test_broadcast_paralelo_grava_estado_e_log_de_uma_vez(banco, monkeypatch):
+    caminho, conexoes = banco
+    simultaneos, pico = [0], [0]
+    lock = threading.Lock()
+
+    def webpush_lento(subscription_info, **kwargs):
+        with lock:
+            simultaneos[0] += 1
+            pico[0] = max(pico[0], simultaneos[0])
+        time.sleep(0.02)  # latência do serviço de push
+        with lock:
+            simultaneos[0] -= 1
+        final = subscription_info["endpoint"].rsplit("/", 1)[1]
+        if final in ("0", "1"):
+            raise _FalhaPush(410 if final == "0" else 500)
+
+    monkeypatch.setattr(pn, "webpush", webpush_lento, raising=False)
+
+    inicio = time.perf_counter()
+    resumo = pn.enviar_notificacao_para_todos("Aviso", "Reunião às 15h")
+    decorrido = time.perf_counter() - inicio
+
+    assert resumo["dispositivos"] == 300 and resumo["enviados"] == 100
+    assert pico[0] > 1 and decorrido < 300 * 0.02 / 2  # bem abaixo do tempo sequencial
+    assert len(conexoes) == 2  # uma leitura + uma escrita para o lote todo
+
+    conn = sqlite3.connect(caminho)
+    estado = dict(conn.execute(
+        "SELECT endpoint, ativo || ':' || falhas_consecutivas FROM push_subscriptions "
+        "WHERE endpoint IN ('https://push.exemplo/0', 'https://push.exemplo/1', 'https://push.exemplo/2')"
+    ).fetchall())
+    logs = conn.execute("SELECT COUNT(*), SUM(status = 'enviado') FROM push_notifications_log").fetchone()
+    conn.close()
+    assert estado == {
+        "https://push.exemplo/0": "0:1",  # 410: desativada na hora
+        "https://push.exemplo/1": "0:3",  # 3ª falha consecutiva
+        "https://push.exemplo/2": "1:0",
+    }
+    assert logs == (100, 100)
+
+
+def test_usuario_sem_envio_confirmado_registra_falha(banco, monkeypatch):
+    caminho, _conexoes = banco
+
+    def webpush_falho(subscription_info, **kwargs):
+        raise _FalhaPush(500)
+
+    monkeypatch.setattr(pn, "webpush", webpush_falho, raising=False)
+
+    assert pn.enviar_notificacao_para_usuario("u5", "Teste", "Olá") == (0, 3)
+    conn = sqlite3.connect(caminho)
+    status, erro = conn.execute("SELECT status, erro FROM push_notifications_log").fetchone()
+    conn.close()
+    assert status == "falhou" and "status 500" in erro
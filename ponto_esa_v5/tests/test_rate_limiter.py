@@ -0,0 +1,58 @@
+"""Testes do limitador de taxa (balde de tokens em arquivo, threads e processos)."""
+
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from ponto_esa_v5.rate_limiter import BaldeTokens, PoliticaLimite
+
+_RAIZ = Path(__file__).resolve().parents[2]
+
+_PROCESSO = """
+import sys, time
+from ponto_esa_v5.rate_limiter import BaldeTokens, PoliticaLimite
+
+balde = BaldeTokens("teste", PoliticaLimite(taxa=20, rajada=1), sys.argv[1])
+for _ in range(5):
+    balde.adquirir()
+    print(time.time(), flush=True)
+"""
+
+
+def test_limite_vale_entre_processos(tmp_path):
+    arquivo = str(tmp_path / "teste.ratelimit")
+    processos = [
+        subprocess.Popen([sys.executable, "-c", _PROCESSO, arquivo], cwd=_RAIZ, stdout=subprocess.PIPE, text=True)
+        for _ in range(3)
+    ]
+    instantes = sorted(float(linha) for p in processos for linha in p.communicate(timeout=30)[0].split())
+
+    assert len(instantes) == 15
+    # 15 chamadas a 20/s com rajada 1: ao menos 14 intervalos de 50 ms no total
+    assert instantes[-1] - instantes[0] >= 14 / 20 * 0.9
+
+
+def test_threads_fila_e_espera_maxima(tmp_path):
+    balde = BaldeTokens("nominatim", PoliticaLimite(taxa=10, rajada=2, espera_max=5), str(tmp_path / "n.ratelimit"))
+    threads = [threading.Thread(target=balde.adquirir) for _ in range(6)]
+    inicio = time.monotonic()
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    assert balde.metricas()["aguardando"] >= 3
+    assert balde.fila() > 2
+    for t in threads:
+        t.join()
+    # 2 da rajada + 4 a 10/s
+    assert time.monotonic() - inicio >= 0.35
+
+    metricas = balde.metricas()
+    assert metricas["adquiridos"] == 6 and metricas["esperas"] == 4
+    assert 250 <= metricas["espera_max_ms"] <= 450
+
+    # Vez só chegaria depois de espera_max: recusa sem consumir token
+    balde.adquirir(tokens=2)
+    assert balde.adquirir(espera_max=0.01) is False
+    assert balde.metricas()["recusados"] == 1
@@ -0,0 +1,108 @@
+"""Testes da agenda de lembretes por usuário (SQLite temporário)."""
+
+import sqlite3
+from datetime import datetime, time
+
+import pytest
+
+from ponto_esa_v5 import reminder_wheel as rw
+
+SEGUNDA = datetime(2026, 10, 19, 7, 0)
+
+
+def test_proximo_disparo_respeita_horarios_e_dias():
+    assert rw.proximo_disparo([time(8, 15)], [1, 2, 3, 4, 5], SEGUNDA) == datetime(2026, 10, 19, 8, 15)
+    # Sexta depois do horário -> segunda seguinte
+    assert rw.proximo_disparo([time(8, 15)], [1, 2, 3, 4, 5], datetime(2026, 10, 23, 9, 0)) == datetime(2026, 10, 26, 8, 15)
+    assert rw.proximo_disparo([time(8, 15), time(9, 0)], [1], datetime(2026, 10, 19, 8, 16)) == datetime(2026, 10, 19, 9, 0)
+    assert rw.proximo_disparo([time(8, 15)], [], SEGUNDA) is None
+
+
+def test_roda_dispara_so_vencidos_e_reagenda():
+    roda = rw.RodaLembretes()
+    roda.agendar("ana", "entrada", [time(8, 0)], [1, 2, 3, 4, 5], SEGUNDA)
+    roda.agendar("bia", "entrada", [time(9, 30)], [1, 2, 3, 4, 5], SEGUNDA)
+    roda.agendar("bia", "entrada", [time(8, 0)], [1, 2, 3, 4, 5], SEGUNDA)  # versão antiga descartada
+
+    assert roda.vencidos(datetime(2026, 10, 19, 7, 59)) == ({"entrada": [], "saida": []}, 0)
+    devidos, perdidos = roda.vencidos(datetime(2026, 10, 19, 8, 0, 5))
+    assert sorted(devidos["entrada"]) == ["ana", "bia"] and perdidos == 0
+    assert roda.vencidos(datetime(2026, 10, 19, 9, 30)) == ({"entrada": [], "saida": []}, 0)
+    assert roda.proximo() == datetime(2026, 10, 20, 8, 0)
+
+    # Líder fora do ar por horas: lembrete atrasado é pulado, não disparado.
+    assert roda.vencidos(datetime(2026, 10, 20, 15, 0)) == ({"entrada": [], "saida": []}, 2)
+
+
+@pytest.fixture
+def banco(tmp_path, apontar_sqlite):
+    caminho = str(tmp_path / "lembretes.db")
+    conn = sqlite3.connect(caminho)
+    conn.executescript("""
+        CREATE TABLE usuarios (id INTEGER PRIMARY KEY, usuario TEXT UNIQUE, ativo INTEGER);
+        CREATE TABLE config_lembretes_push (
+            usuario TEXT UNIQUE, lembrete_entrada INTEGER DEFAULT 1, lembrete_saida INTEGER DEFAULT 1,
+            horario_lembrete_entrada TIME DEFAULT '08:15', horario_lembrete_saida TIME DEFAULT '17:15',
+            dias_semana TEXT DEFAULT '1,2,3,4,5', data_atualizacao TIMESTAMP
+        );
+        INSERT INTO usuarios (usuario, ativo) VALUES ('ana', 1), ('bia', 1), ('caio', 0);
+        INSERT INTO config_lembretes_push (usuario, horario_lembrete_entrada, data_atualizacao)
+            VALUES ('ana', '07:45', '2026-10-18 10:00:00');
+    """)
+    conn.commit()
+    conn.close()
+    apontar_sqlite(caminho, rw)
+    rw.descarregar_agenda()
+    yield caminho
+    rw.descarregar_agenda()
+
+
+def test_carga_e_recarga_incremental(banco):
+    total = rw.carregar_agenda({"entrada": ["08:30"], "saida": None}, SEGUNDA)
+    assert total == 2  # só entrada (saída desligada); caio inativo
+
+    devidos, _ = rw.obter_roda().vencidos(datetime(2026, 10, 19, 7, 45))
+    assert devidos["entrada"] == ["ana"]  # horário pessoal
+    devidos, _ = rw.obter_roda().vencidos(datetime(2026, 10, 19, 8, 30))
+    assert devidos["entrada"] == ["bia"]  # horário padrão
+
+    conn = sqlite3.connect(banco)
+    conn.execute(
+        "INSERT INTO config_lembretes_push (usuario, horario_lembrete_entrada, data_atualizacao) "
+        "VALUES ('bia', '09:10', '2026-10-19 08:40:00')"
+    )
+    conn.commit()
+    conn.close()
+
+    assert rw.recarregar_alterados(datetime(2026, 10, 19, 8, 41)) == 2  # ana (mesma marca) + bia
+    devidos, _ = rw.obter_roda().vencidos(datetime(2026, 10, 19, 9, 10))
+    assert devidos["entrada"] == ["bia"]
+
+
+def test_flag_nula_desliga_e_descarga_zera_a_agenda(banco):
+    conn = sqlite3.connect(banco)
+    conn.execute("UPDATE config_lembretes_push SET lembrete_entrada = NULL WHERE usuario = 'ana'")
+    conn.commit()
+    conn.close()
+
+    assert rw.carregar_agenda({"entrada": ["08:30"], "saida": None}, SEGUNDA) == 1
+    devidos, _ = rw.obter_roda().vencidos(datetime(2026, 10, 19, 8, 30))
+    assert devidos["entrada"] == ["bia"]
+
+    rw.descarregar_agenda()
+    assert not rw.agenda_carregada() and len(rw.obter_roda()) == 0
+    assert rw.recarregar_alterados(datetime(2026, 10, 19, 8, 41)) == 0
+
+
+def test_edicao_de_usuario_com_mesmo_total_e_id_recarrega_tudo(banco):
+    rw.carregar_agenda({"entrada": ["08:30"], "saida": None}, SEGUNDA)
+
+    # Mesmo número de ativos e mesmo MAX(id): só a versão denuncia a mudança
+    conn = sqlite3.connect(banco)
+    conn.execute("UPDATE usuarios SET usuario = 'beatriz' WHERE usuario = 'bia'")
+    conn.commit()
+    conn.close()
+
+    assert rw.recarregar_alterados(datetime(2026, 10, 19, 7, 10)) == -1
+    devidos, _ = rw.obter_roda().vencidos(datetime(2026, 10, 19, 8, 30))
+    assert devidos["entrada"] == ["beatriz"]
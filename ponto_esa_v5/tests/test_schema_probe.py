@@ -0,0 +1,92 @@
+"""Testes da sondagem de schema (SQLite temporário)."""
+
+import sqlite3
+
+from ponto_esa_v5 import schema_probe
+
+
+def test_sonda_uma_vez_e_ressonda_apos_invalidar(tmp_path, apontar_sqlite):
+    caminho = str(tmp_path / "probe.db")
+    conn = sqlite3.connect(caminho)
+    conn.execute("CREATE TABLE solicitacoes_correcao_registro (id INTEGER PRIMARY KEY, usuario TEXT)")
+    conn.commit()
+
+    aberturas = []
+
+    def _conectar():
+        aberturas.append(1)
+        return sqlite3.connect(caminho)
+
+    apontar_sqlite(_conectar, schema_probe)
+    schema_probe.invalidar_schema()
+
+    assert schema_probe.tem_colunas("solicitacoes_correcao_registro", "usuario") is True
+    assert schema_probe.tabela_existe("solicitacoes_correcao_registro") is True
+    assert len(aberturas) == 1
+
+    conn.execute("ALTER TABLE solicitacoes_correcao_registro ADD COLUMN tipo_solicitacao TEXT")
+    conn.commit()
+    schema_probe.invalidar_schema()
+
+    assert schema_probe.tem_colunas("solicitacoes_correcao_registro", "TIPO_SOLICITACAO") is True
+    assert len(aberturas) == 2
+    schema_probe.invalidar_schema()
+
+
+def test_ausencia_fica_em_cache_ate_invalidar_ou_vencer(tmp_path, apontar_sqlite, monkeypatch):
+    caminho = str(tmp_path / "probe.db")
+    conn = sqlite3.connect(caminho)
+    conn.execute("CREATE TABLE solicitacoes_correcao_registro (id INTEGER PRIMARY KEY, usuario TEXT)")
+    conn.commit()
+    aberturas = []
+
+    def _conectar():
+        aberturas.append(1)
+        return sqlite3.connect(caminho)
+
+    apontar_sqlite(_conectar, schema_probe)
+    schema_probe.invalidar_schema()
+
+    for _ in range(3):
+        assert schema_probe.tabela_existe("horas_extras_ativas") is False
+        assert schema_probe.tem_colunas("solicitacoes_correcao_registro", "tipo_solicitacao") is False
+    # Catálogo + uma reconsulta por tabela ausente; os reruns seguintes não vão ao banco
+    assert len(aberturas) == 3
+
+    # Migração aplicada por outro processo: aparece quando o prazo do cache negativo vence
+    conn.execute("CREATE TABLE horas_extras_ativas (id INTEGER PRIMARY KEY, usuario TEXT)")
+    conn.execute("ALTER TABLE solicitacoes_correcao_registro ADD COLUMN tipo_solicitacao TEXT")
+    conn.commit()
+    assert schema_probe.tabela_existe("horas_extras_ativas") is False
+    monkeypatch.setattr(schema_probe, "SCHEMA_PROBE_NEGATIVO_TTL_SECONDS", 0)
+    assert schema_probe.tabela_existe("horas_extras_ativas") is True
+    assert schema_probe.tem_colunas("solicitacoes_correcao_registro", "tipo_solicitacao") is True
+    assert "horas_extras_ativas" in schema_probe.obter_schema()
+    schema_probe.invalidar_schema()
+
+
+def test_invalidar_descarta_as_ausencias(tmp_path, apontar_sqlite):
+    caminho = str(tmp_path / "probe.db")
+    apontar_sqlite(caminho, schema_probe)
+    schema_probe.invalidar_schema()
+    assert schema_probe.tabela_existe("horas_extras_ativas") is False
+
+    conn = sqlite3.connect(caminho)
+    conn.execute("CREATE TABLE horas_extras_ativas (id INTEGER PRIMARY KEY, usuario TEXT)")
+    conn.commit()
+    conn.close()
+    assert schema_probe.tabela_existe("horas_extras_ativas") is False
+    schema_probe.invalidar_schema()  # como após uma migração do próprio processo
+    assert schema_probe.tabela_existe("horas_extras_ativas") is True
+    schema_probe.invalidar_schema()
+
+
+def test_falha_na_sondagem_retorna_desconhecido(monkeypatch):
+    def _falha():
+        raise RuntimeError("banco indisponível")
+
+    monkeypatch.setattr(schema_probe, "get_connection", _falha)
+    schema_probe.invalidar_schema()
+
+    assert schema_probe.tabela_existe("usuarios") is None
+    assert schema_probe.tem_colunas("usuarios", "senha") is None
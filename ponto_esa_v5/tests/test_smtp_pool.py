@@ -0,0 +1,132 @@
+"""Testes do pool SMTP contra um servidor SMTP local mínimo (stand-in)."""
+
+import socketserver
+import threading
+
+import pytest
+
+from ponto_esa_v5 import email_notifications as en
+from ponto_esa_v5 import smtp_pool
+from ponto_esa_v5.smtp_pool import PoolSMTP
+
+
+class _ServidorSMTP(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, derrubar_a_cada=0):
+        self.conexoes = 0
+        self.mensagens = []
+        self.derrubar_a_cada = derrubar_a_cada
+        super().__init__(("127.0.0.1", 0), _Sessao)
+
+
+class _Sessao(socketserver.StreamRequestHandler):
+    def _responder(self, linha):
+        self.wfile.write(linha.encode() + b"\r\n")
+
+    def handle(self):
+        servidor = self.server
+        servidor.conexoes += 1
+        recebidas = 0
+        self._responder("220 teste ESMTP")
+        for linha in self.rfile:
+            comando = linha.strip().upper()
+            if comando.startswith(b"EHLO"):
+                self.wfile.write(b"250-teste\r\n250-AUTH PLAIN\r\n250 8BITMIME\r\n")
+            elif comando.startswith(b"AUTH"):
+                self._responder("235 ok")
+            elif comando == b"DATA":
+                self._responder("354 fim com .")
+                corpo = []
+                for dado in self.rfile:
+                    if dado == b".\r\n":
+                        break
+                    corpo.append(dado)
+                servidor.mensagens.append(b"".join(corpo))
+                recebidas += 1
+                self._responder("250 aceita")
+                if servidor.derrubar_a_cada and recebidas == servidor.derrubar_a_cada:
+                    return  # servidor encerra a sessão sem aviso
+            elif comando == b"QUIT":
+                self._responder("221 tchau")
+                return
+            else:
+                self._responder("250 ok")
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    # Mede a reutilização da sessão, não o limite de taxa do provedor.
+    monkeypatch.setattr(smtp_pool, "aguardar_vez", lambda destino, espera_max=None: True)
+    srv = _ServidorSMTP()
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_lote_usa_uma_sessao_e_reconecta_quando_cai(servidor):
+    pool = PoolSMTP("127.0.0.1", servidor.server_address[1], "u", "s", starttls=False)
+    envios = [("rh@exsa.com", [f"f{i}@exsa.com"], f"Subject: {i}\r\n\r\nmsg {i}") for i in range(100)]
+
+    assert pool.enviar_lote(envios) == [None] * 100
+    assert servidor.conexoes == 1 and len(servidor.mensagens) == 100
+
+    servidor.derrubar_a_cada = 3
+    assert pool.enviar_lote(envios[:5]) == [None] * 5
+    pool.fechar()
+    assert len(servidor.mensagens) == 105
+    # 100 mensagens: sessão reciclada; depois caiu após 3 e foi reaberta
+    assert servidor.conexoes == 3
+
+
+def test_enviar_emails_em_lote_e_cache_de_templates(servidor, monkeypatch):
+    monkeypatch.setattr(en, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(en, "SMTP_PORT", servidor.server_address[1])
+    monkeypatch.setattr(en, "SMTP_USER", "rh@exsa.com")
+    monkeypatch.setattr(en, "SMTP_PASSWORD", "segredo")
+    monkeypatch.setattr(en, "SMTP_STARTTLS", False)
+
+    en._template_renderizado.cache_clear()
+    envios = []
+    for nome in ("Ana", "Bia", "Caio"):
+        assunto, html = en.template_lembrete_entrada(nome)
+        envios.append({"destinatario": f"{nome.lower()}@exsa.com", "assunto": assunto, "corpo_html": html})
+    envios.append({"destinatario": "", "assunto": "x", "corpo_html": "x"})
+
+    resultados = en.enviar_emails_em_lote(envios)
+    en.fechar_pool_smtp()
+
+    assert [ok for ok, _ in resultados] == [True, True, True, False]
+    assert servidor.conexoes == 1 and len(servidor.mensagens) == 3
+    assert en._template_renderizado.cache_info().hits == 2
+    assert "Bom dia, Bia!" in en.template_lembrete_entrada("Bia")[1]
+
+
+def test_resumo_de_gestores_em_uma_sessao_e_anexo_grande_recusado(servidor, monkeypatch, tmp_path):
+    monkeypatch.setattr(en, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(en, "SMTP_PORT", servidor.server_address[1])
+    monkeypatch.setattr(en, "SMTP_USER", "rh@exsa.com")
+    monkeypatch.setattr(en, "SMTP_PASSWORD", "segredo")
+    monkeypatch.setattr(en, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(en, "_contatos_usuarios", lambda usuarios: {
+        u: (f"{u}@exsa.com", u.title()) for u in usuarios if u != "sem_email"
+    })
+
+    resultados = en.notificar_gestores_pendencias_email_em_lote({
+        "gestor1": {"horas_extras": 2}, "gestor2": {"atestados": 1},
+        "sem_email": {"correcoes": 1}, "em_dia": {"horas_extras": 0},
+    })
+    assert {g: ok for g, (ok, _) in resultados.items()} == {
+        "gestor1": True, "gestor2": True, "sem_email": False, "em_dia": False,
+    }
+    assert servidor.conexoes == 1 and len(servidor.mensagens) == 2
+
+    monkeypatch.setattr(en, "EMAIL_ANEXO_MAX_BYTES", 1024)
+    arquivo = tmp_path / "backup.zip"
+    arquivo.write_bytes(b"x" * 2048)
+    ok, mensagem = en.enviar_email("rh@exsa.com", "Backup", "<p>x</p>", anexos=[{"nome": "backup.zip", "caminho": str(arquivo)}])
+    en.fechar_pool_smtp()
+    assert not ok and "excede o limite" in mensagem
+    assert len(servidor.mensagens) == 2
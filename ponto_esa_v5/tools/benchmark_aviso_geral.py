@@ -0,0 +1,84 @@
+"""Benchmark do aviso geral contra um servidor ntfy local (stand-in).
+
+Uso:
+    python tools/benchmark_aviso_geral.py [--destinatarios 300] [--latencia-ms 50] [--workers 16]
+
+Sobe um servidor HTTP local que imita o ntfy (responde 200 após
+``--latencia-ms``) e compara o envio antigo (``requests.post`` sequencial,
+uma conexão por envio) com ``ntfy_client.publicar_em_lote`` (sessão
+keep-alive compartilhada e paralelismo limitado).
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ntfy_client  # noqa: E402
+import rate_limiter  # noqa: E402
+
+
+def _servidor_ntfy(latencia_s):
+    conexoes = []
+
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            conexoes.append(1)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latencia_s)
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, conexoes
+
+
+def main():
+    # Mede a reutilização de conexões, não o limite de taxa do provedor.
+    rate_limiter.RATE_LIMIT_POLITICAS.clear()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--destinatarios", type=int, default=300)
+    parser.add_argument("--latencia-ms", type=int, default=50, help="Latência simulada do ntfy")
+    parser.add_argument("--workers", type=int, default=16, help="Envios simultâneos")
+    args = parser.parse_args()
+
+    servidor, conexoes = _servidor_ntfy(args.latencia_ms / 1000)
+    base = f"http://127.0.0.1:{servidor.server_port}"
+    urls = {f"user{i}": f"{base}/ponto-exsa-{i:08d}" for i in range(args.destinatarios)}
+    corpo, headers = "📢 Aviso de teste".encode("utf-8"), {"Title": "Aviso"}
+
+    inicio = time.perf_counter()
+    ok = sum(requests.post(url, data=corpo, headers=headers, timeout=10).status_code == 200 for url in urls.values())
+    sequencial = time.perf_counter() - inicio
+    print(f"Sequencial (requests.post): {ok}/{len(urls)} em {sequencial:.2f} s | {len(conexoes)} conexões")
+
+    conexoes.clear()
+    inicio = time.perf_counter()
+    resultados = ntfy_client.publicar_em_lote(urls, corpo, headers, max_workers=args.workers)
+    lote = time.perf_counter() - inicio
+    ok = sum(r.ok for r in resultados.values())
+    print(f"Lote ({args.workers} workers, keep-alive): {ok}/{len(urls)} em {lote:.2f} s | {len(conexoes)} conexões")
+    print(f"Aceleração: {sequencial / lote:.1f}x")
+
+    servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
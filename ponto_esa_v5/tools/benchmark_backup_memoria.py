@@ -0,0 +1,109 @@
+"""Benchmark do pico de memória (RSS) do backup JSON em função do tamanho do banco.
+
+Uso:
+    python tools/benchmark_backup_memoria.py [--linhas 20000 80000 320000]
+
+Para cada tamanho cria um banco SQLite com ``registros_ponto`` e roda, cada um
+num subprocesso próprio (para medir o ``ru_maxrss`` isolado):
+
+- o export antigo: ``fetchall`` por tabela + ``json.dumps(indent=2)`` + gzip;
+- ``PostgreSQLBackupManager.export_to_json`` (NDJSON em streaming).
+
+O export antigo cresce linearmente com o banco; o streaming fica estável.
+"""
+import argparse
+import gzip
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _RAIZ)
+
+
+def _criar_banco(caminho, linhas):
+    conn = sqlite3.connect(caminho)
+    conn.execute("""
+        CREATE TABLE registros_ponto (
+            id INTEGER PRIMARY KEY, usuario TEXT, data_hora TEXT, tipo TEXT,
+            modalidade TEXT, projeto TEXT, atividade TEXT, localizacao TEXT
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO registros_ponto (usuario, data_hora, tipo, modalidade, projeto, atividade, localizacao) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            (f"func{i % 300}", f"2026-03-{i % 28 + 1:02d} 08:{i % 60:02d}:00", "Início", "Presencial",
+             f"Projeto {i % 40}", "Atividade de campo " * 6, f"-23.55{i % 1000:03d}, -46.63{i % 1000:03d}")
+            for i in range(linhas)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _export_antigo(banco, destino):
+    conn = sqlite3.connect(banco)
+    cursor = conn.execute("SELECT * FROM registros_ponto")
+    colunas = [d[0] for d in cursor.description]
+    dados = {"registros_ponto": [dict(zip(colunas, row)) for row in cursor.fetchall()]}
+    conn.close()
+    with gzip.open(destino, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"metadata": {}, "data": dados}, ensure_ascii=False, indent=2, default=str))
+
+
+def _export_streaming(banco, destino):
+    import backup_postgresql as bp
+
+    bp.get_connection = lambda: sqlite3.connect(banco)
+    bp.return_connection = lambda c: c.close()
+    bp.USE_POSTGRESQL = False
+    gerenciador = bp.PostgreSQLBackupManager(backup_dir=destino)
+    gerenciador.tables_to_backup = ["registros_ponto"]
+    assert gerenciador.export_to_json(compress=True)
+
+
+def _filho(modo, banco, destino):
+    linha_base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    (_export_antigo if modo == "antigo" else _export_streaming)(banco, destino)
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss em KB no Linux (bytes no macOS)
+    escala = 1024 if sys.platform == "darwin" else 1
+    print(pico // escala, (pico - linha_base) // escala)
+
+
+def _medir(modo, banco, destino):
+    saida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--filho", modo, banco, destino],
+        cwd=_RAIZ, capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return int(saida[0]) / 1024, int(saida[1]) / 1024
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == "--filho":
+        _filho(*sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--linhas", type=int, nargs="+", default=[20000, 80000, 320000])
+    args = parser.parse_args()
+
+    print(f"{'linhas':>8} {'banco MB':>9} | {'antigo RSS MB':>14} {'(+export)':>10} | {'NDJSON RSS MB':>14} {'(+export)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for linhas in args.linhas:
+            banco = os.path.join(tmp, f"ponto_{linhas}.db")
+            _criar_banco(banco, linhas)
+            antigo = _medir("antigo", banco, os.path.join(tmp, f"antigo_{linhas}.json.gz"))
+            streaming = _medir("streaming", banco, os.path.join(tmp, f"ndjson_{linhas}"))
+            tamanho = os.path.getsize(banco) / 1024 / 1024
+            print(f"{linhas:>8} {tamanho:>9.1f} | {antigo[0]:>14.1f} {antigo[1]:>+10.1f} | "
+                  f"{streaming[0]:>14.1f} {streaming[1]:>+10.1f}")
+
+
+if __name__ == "__main__":
+    main()
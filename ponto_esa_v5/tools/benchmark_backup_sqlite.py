@@ -0,0 +1,142 @@
+"""Benchmark do backup do banco SQLite com um escritor ativo.
+
+Uso:
+    python tools/benchmark_backup_sqlite.py [--linhas 50000 200000] [--intervalo-ms 5]
+
+Para cada tamanho cria um banco com ``registros_ponto`` e, com uma thread
+gravando um registro por commit a cada ``--intervalo-ms``, mede:
+
+- o backup antigo: ``shutil.copy2`` do arquivo em uso + gzip relendo a cópia;
+- ``BackupManager.create_backup()`` (API de backup online em passos + gzip);
+- ``BackupManager.create_backup(modo='vacuum')`` (``VACUUM INTO`` + gzip).
+
+Para cada um: tempo total do backup, a maior espera de um commit do escritor
+durante o backup (e o p99), quantos commits passaram e se a cópia passa no
+``PRAGMA integrity_check`` — a cópia do arquivo em uso pode sair rasgada.
+"""
+import argparse
+import gzip
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _RAIZ)
+
+
+def _criar_banco(caminho, linhas):
+    conn = sqlite3.connect(caminho)
+    conn.execute("""
+        CREATE TABLE registros_ponto (
+            id INTEGER PRIMARY KEY, usuario TEXT, data_hora TEXT, tipo TEXT,
+            modalidade TEXT, projeto TEXT, atividade TEXT, localizacao TEXT
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO registros_ponto (usuario, data_hora, tipo, modalidade, projeto, atividade, localizacao) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            (f"func{i % 300}", f"2026-03-{i % 28 + 1:02d} 08:{i % 60:02d}:00", "Início", "Presencial",
+             f"Projeto {i % 40}", "Atividade de campo " * 6, f"-23.55{i % 1000:03d}, -46.63{i % 1000:03d}")
+            for i in range(linhas)
+        ),
+    )
+    # Remove uma parte para deixar páginas livres (o que o VACUUM INTO compacta)
+    conn.execute("DELETE FROM registros_ponto WHERE id % 4 = 0")
+    conn.commit()
+    conn.close()
+
+
+def _backup_antigo(banco, diretorio):
+    destino = os.path.join(diretorio, "antigo.db")
+    shutil.copy2(banco, destino)
+    with open(destino, 'rb') as f_in, gzip.open(destino + ".gz", 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(destino)
+    return destino + ".gz"
+
+
+def _integra(caminho_gz, diretorio):
+    destino = os.path.join(diretorio, "verificar.db")
+    with gzip.open(caminho_gz, "rb") as f_in, open(destino, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    conn = sqlite3.connect(destino)
+    try:
+        return conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    except sqlite3.DatabaseError:
+        return False
+    finally:
+        conn.close()
+        os.remove(destino)
+
+
+def _medir(executar, banco, intervalo):
+    """Roda ``executar`` com um escritor ativo; devolve (caminho, segundos, esperas)."""
+    parar = threading.Event()
+    esperas = []
+
+    def escritor():
+        conn = sqlite3.connect(banco, timeout=60)
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            conn.execute("INSERT INTO registros_ponto (usuario, data_hora, tipo) "
+                         "VALUES ('func1', '2026-04-01 08:00:00', 'Início')")
+            conn.commit()
+            esperas.append(time.perf_counter() - inicio)
+            parar.wait(intervalo)
+        conn.close()
+
+    thread = threading.Thread(target=escritor)
+    thread.start()
+    time.sleep(0.2)
+    del esperas[:]
+    inicio = time.perf_counter()
+    try:
+        caminho = executar()
+    finally:
+        duracao = time.perf_counter() - inicio
+        parar.set()
+        thread.join()
+    return caminho, duracao, esperas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--linhas", type=int, nargs="+", default=[50000, 200000])
+    parser.add_argument("--intervalo-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # As instâncias globais do módulo criam backups/ e logs/ no diretório atual
+        os.chdir(tmp)
+        from backup_system import BackupManager
+
+        print(f"{'linhas':>7} {'banco MB':>9} {'modo':>8} | {'tempo s':>8} {'MB final':>9} | "
+              f"{'espera máx ms':>13} {'p99 ms':>7} {'commits':>8} | íntegro")
+        for linhas in args.linhas:
+            banco = os.path.join(tmp, f"ponto_{linhas}.db")
+            _criar_banco(banco, linhas)
+            gerenciador = BackupManager(db_path=banco, backup_dir=os.path.join(tmp, f"backups_{linhas}"))
+            modos = [
+                ("antigo", lambda: _backup_antigo(banco, tmp)),
+                ("online", gerenciador.create_backup),
+                ("vacuum", lambda: gerenciador.create_backup(modo='vacuum')),
+            ]
+            tamanho = os.path.getsize(banco) / 1024 / 1024
+            for nome, executar in modos:
+                caminho, duracao, esperas = _medir(executar, banco, args.intervalo_ms / 1000)
+                esperas.sort()
+                maxima = esperas[-1] * 1000 if esperas else 0.0
+                p99 = esperas[int(len(esperas) * 0.99)] * 1000 if esperas else 0.0
+                print(f"{linhas:>7} {tamanho:>9.1f} {nome:>8} | {duracao:>8.2f} "
+                      f"{os.path.getsize(caminho) / 1024 / 1024:>9.1f} | {maxima:>13.1f} {p99:>7.1f} "
+                      f"{len(esperas):>8} | {'sim' if _integra(caminho, tmp) else 'NÃO'}")
+        os.chdir(_RAIZ)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Benchmark da verificação de senha sob logins concorrentes.
+
+Uso:
+    python tools/benchmark_login.py [--concorrencia 50] [--workers 4]
+
+Dispara ``--concorrencia`` verificações bcrypt simultâneas (uma thread por
+login, como sessões Streamlit distintas) e imprime p50/p95/máx. Com
+``--workers 0`` a verificação roda na própria thread (comportamento antigo).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _medir(password_utils, hashed, concorrencia):
+    def _login(_):
+        inicio = time.perf_counter()
+        assert password_utils.verify_password('senha_benchmark', hashed)
+        return (time.perf_counter() - inicio) * 1000
+
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        return sorted(executor.map(_login, range(concorrencia)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--concorrencia', type=int, default=50, help='Logins simultâneos')
+    parser.add_argument('--workers', type=int, default=None, help='Processos do pool (0 = sem pool)')
+    args = parser.parse_args()
+
+    if args.workers is not None:
+        os.environ['PASSWORD_VERIFY_MAX_WORKERS'] = str(args.workers)
+
+    import password_utils  # depende do env acima
+
+    password_utils.iniciar_pool_senhas()
+    hashed = password_utils.hash_password('senha_benchmark')
+    print(f'Custo bcrypt: {password_utils._rounds()} rounds | workers: {password_utils._max_workers()}')
+
+    tempos = _medir(password_utils, hashed, args.concorrencia)
+    p95 = tempos[max(0, int(round(0.95 * len(tempos))) - 1)]
+    print(f'{len(tempos)} logins | p50: {statistics.median(tempos):.0f} ms | p95: {p95:.0f} ms | máx: {tempos[-1]:.0f} ms')
+
+
+# Guarda obrigatória: os workers 'spawn' reimportam este módulo.
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Benchmark do envio de emails em lote contra um servidor SMTP local (stand-in).
+
+Uso:
+    python tools/benchmark_smtp_lote.py [--mensagens 300] [--handshake-ms 80]
+
+Sobe um servidor SMTP local mínimo que atrasa a saudação em ``--handshake-ms``
+(o custo do handshake TLS + AUTH de um provedor real) e compara o envio antigo
+(uma conexão por mensagem) com ``PoolSMTP.enviar_lote`` (uma sessão para o
+lote todo). O resultado é reportado por 100 mensagens.
+"""
+import argparse
+import os
+import smtplib
+import socketserver
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smtp_pool import PoolSMTP  # noqa: E402
+import rate_limiter  # noqa: E402
+
+
+def _servidor_smtp(handshake_s):
+    estado = {"conexoes": 0, "mensagens": 0}
+
+    class _Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            estado["conexoes"] += 1
+            time.sleep(handshake_s)
+            self.wfile.write(b"220 bench ESMTP\r\n")
+            for linha in self.rfile:
+                comando = linha.strip().upper()
+                if comando.startswith(b"EHLO"):
+                    self.wfile.write(b"250-bench\r\n250 AUTH PLAIN\r\n")
+                elif comando.startswith(b"AUTH"):
+                    self.wfile.write(b"235 ok\r\n")
+                elif comando == b"DATA":
+                    self.wfile.write(b"354 fim com .\r\n")
+                    for dado in self.rfile:
+                        if dado == b".\r\n":
+                            break
+                    estado["mensagens"] += 1
+                    self.wfile.write(b"250 aceita\r\n")
+                elif comando == b"QUIT":
+                    self.wfile.write(b"221 tchau\r\n")
+                    return
+                else:
+                    self.wfile.write(b"250 ok\r\n")
+
+    servidor = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _Handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, estado
+
+
+def main():
+    # Mede a reutilização de conexões, não o limite de taxa do provedor.
+    rate_limiter.RATE_LIMIT_POLITICAS.clear()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mensagens", type=int, default=300)
+    parser.add_argument("--handshake-ms", type=int, default=80, help="Custo simulado de conexão + TLS + AUTH")
+    args = parser.parse_args()
+
+    servidor, estado = _servidor_smtp(args.handshake_ms / 1000)
+    porta = servidor.server_address[1]
+    corpo = "Subject: Lembrete\r\n\r\n" + "Registre seu ponto.\r\n" * 40
+    envios = [("rh@exsa.com", [f"func{i}@exsa.com"], corpo) for i in range(args.mensagens)]
+
+    inicio = time.perf_counter()
+    for remetente, destinatarios, mensagem in envios:
+        with smtplib.SMTP("127.0.0.1", porta, timeout=30) as smtp:
+            smtp.login("rh@exsa.com", "segredo")
+            smtp.sendmail(remetente, destinatarios, mensagem)
+    antigo = time.perf_counter() - inicio
+    conexoes_antigo, estado["conexoes"] = estado["conexoes"], 0
+
+    pool = PoolSMTP("127.0.0.1", porta, "rh@exsa.com", "segredo", starttls=False)
+    inicio = time.perf_counter()
+    erros = pool.enviar_lote(envios)
+    lote = time.perf_counter() - inicio
+    pool.fechar()
+
+    por_100 = 100 / args.mensagens
+    print(f"Mensagens: {args.mensagens} | handshake simulado: {args.handshake_ms} ms")
+    print(f"  Uma conexão por email: {antigo * por_100:7.2f} s/100 msgs ({conexoes_antigo} conexões)")
+    print(f"  Lote no pool:          {lote * por_100:7.2f} s/100 msgs ({estado['conexoes']} conexões, "
+          f"{sum(e is not None for e in erros)} falhas)")
+    print(f"  Ganho: {antigo / lote:.1f}x")
+    servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,35 @@
 """
 Script de migração de SQLite para PostgreSQL
 Migra todos os dados do banco SQLite para PostgreSQL
+
+O SQLite é lido em lotes (paginação por ``rowid``) e cada lote é carregado com
+``COPY FROM STDIN`` a partir de um buffer em memória. O progresso de cada
+tabela fica em ``migracao_checkpoint`` no PostgreSQL, gravado na mesma
+transação do lote: uma migração interrompida retoma do último lote
+confirmado. Tabelas sem dependência de chave estrangeira entre si migram em
+paralelo; ao final, contagens e checksums das duas pontas são comparados.
+
+Uso:
+    python tools/migrate_sqlite_to_postgresql.py [--sqlite database/ponto_esa.db]
+        [--workers 4] [--lote 5000] [--recomecar] [--sim] [--apenas-verificar]
 """
 
-import sqlite3
-import psycopg2
+import argparse
+import hashlib
+import io
 import os
-from datetime import datetime
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import psycopg2
+except ImportError:  # só necessário para conectar ao destino
+    psycopg2 = None
 
 # Configuração
 SQLITE_DB = 'database/ponto_esa.db'
@@ -18,176 +41,394 @@ PG_CONFIG = {
     'port': os.getenv('DB_PORT', '5432')
 }
 
-def migrate():
+# Tabelas para migrar (a ordem de carga vem das chaves estrangeiras do destino)
+TABELAS = [
+    'usuarios',
+    'projetos',
+    'registros_ponto',
+    'ausencias',
+    'solicitacoes_horas_extras',
+    'atestado_horas',
+    'atestados_horas',
+    'uploads',
+    'banco_horas',
+    'feriados',
+    'auditoria_correcoes'
+]
+
+LOTE_PADRAO = 5000
+WORKERS_PADRAO = 4
+
+
+def _conectar_pg():
+    if psycopg2 is None:
+        raise RuntimeError("psycopg2 não instalado (pip install psycopg2-binary)")
+    return psycopg2.connect(**PG_CONFIG)
+
+
+# ---------------------------------------------------------------------------
+# Conversões
+# ---------------------------------------------------------------------------
+
+def _valor_copy(valor) -> str:
+    """Valor no formato texto do ``COPY FROM STDIN``."""
+    if valor is None:
+        return '\\N'
+    if isinstance(valor, (bytes, memoryview)):
+        return '\\\\x' + bytes(valor).hex()
+    return (str(valor).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def linhas_para_copy(linhas: Iterable[Sequence]) -> io.StringIO:
+    """Buffer em memória com as linhas no formato do ``COPY``."""
+    buffer = io.StringIO()
+    for linha in linhas:
+        buffer.write('\t'.join(_valor_copy(v) for v in linha))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
+
+
+def _canonico(valor) -> str:
+    """Forma textual comum a SQLite e PostgreSQL para o checksum.
+
+    O SQLite guarda datas como texto e números sem tipo fixo; o PostgreSQL
+    devolve ``datetime``, ``Decimal``, ``bool``, REAL com precisão simples...
+    """
+    if valor is None:
+        return '\\N'
+    if isinstance(valor, bool):
+        return '1' if valor else '0'
+    if isinstance(valor, (int, float, Decimal)):
+        numero = float(valor)
+        if numero.is_integer() and abs(numero) < 1e15:
+            return str(int(numero))
+        return f"{numero:.6g}"
+    if isinstance(valor, (bytes, memoryview)):
+        return bytes(valor).hex()
+    if isinstance(valor, datetime):
+        return valor.replace(tzinfo=None).isoformat(sep=' ')
+    if isinstance(valor, (date, dt_time)):
+        return valor.isoformat()
+    if isinstance(valor, str) and len(valor) >= 10 and valor[4:5] == '-' and valor[7:8] == '-':
+        try:
+            if len(valor) == 10:
+                return date.fromisoformat(valor).isoformat()
+            return datetime.fromisoformat(valor).replace(tzinfo=None).isoformat(sep=' ')
+        except ValueError:
+            pass
+    return str(valor)
+
+
+def checksum_linhas(lotes: Iterable[Sequence[Sequence]]) -> Tuple[int, str]:
+    """Contagem e checksum independente de ordem (soma dos md5 das linhas, mod 2^64)."""
+    total = soma = 0
+    for lote in lotes:
+        for linha in lote:
+            texto = '\x1f'.join(_canonico(v) for v in linha)
+            soma = (soma + int.from_bytes(hashlib.md5(texto.encode('utf-8')).digest()[:8], 'big')) % 2 ** 64
+            total += 1
+    return total, f"{soma:016x}"
+
+
+# ---------------------------------------------------------------------------
+# Esquema e dependências
+# ---------------------------------------------------------------------------
+
+def _colunas_sqlite(conn, tabela: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({tabela})")]
+
+
+def _colunas_pg(cur, tabela: str) -> List[str]:
+    cur.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s
+        ORDER BY ordinal_position
+    """, (tabela,))
+    return [row[0] for row in cur.fetchall()]
+
+
+def _niveis(tabelas: List[str], pares: Iterable[Tuple[str, str]]) -> List[List[str]]:
+    """Agrupa as tabelas em níveis pelas chaves estrangeiras (filha, mãe).
+
+    Um nível só referencia níveis anteriores; as tabelas de um nível migram em
+    paralelo. Um ciclo vai inteiro para o último nível.
+    """
+    pendentes = {t: set() for t in tabelas}
+    for filha, mae in pares:
+        if filha in pendentes and mae in pendentes and filha != mae:
+            pendentes[filha].add(mae)
+    niveis = []
+    while pendentes:
+        nivel = [t for t in tabelas if t in pendentes and not pendentes[t]]
+        if not nivel:
+            niveis.append([t for t in tabelas if t in pendentes])
+            break
+        niveis.append(nivel)
+        for t in nivel:
+            del pendentes[t]
+        for deps in pendentes.values():
+            deps.difference_update(nivel)
+    return niveis
+
+
+def _dependencias_pg(cur) -> List[Tuple[str, str]]:
+    cur.execute("""
+        SELECT filha.relname, mae.relname
+        FROM pg_constraint c
+        JOIN pg_class filha ON filha.oid = c.conrelid
+        JOIN pg_class mae ON mae.oid = c.confrelid
+        WHERE c.contype = 'f' AND filha.relnamespace = current_schema()::regnamespace
+    """)
+    return cur.fetchall()
+
+
+def _garantir_checkpoint(cur) -> None:
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS migracao_checkpoint (
+            tabela TEXT PRIMARY KEY,
+            ultimo_rowid BIGINT NOT NULL DEFAULT 0,
+            linhas BIGINT NOT NULL DEFAULT 0,
+            concluida BOOLEAN NOT NULL DEFAULT FALSE,
+            atualizado_em TIMESTAMP DEFAULT NOW()
+        )
+    """)
+
+
+# ---------------------------------------------------------------------------
+# Migração
+# ---------------------------------------------------------------------------
+
+def _planejar(sqlite_path: str, recomecar: bool) -> Tuple[List[List[str]], Dict[str, List[str]]]:
+    """Tabelas a migrar por nível e colunas comuns às duas pontas.
+
+    Tabelas sem checkpoint são esvaziadas no destino (filhas antes das mães)
+    e ganham checkpoint zerado, na mesma transação.
+    """
+    sqlite_conn = sqlite3.connect(sqlite_path)
+    pg_conn = _conectar_pg()
+    try:
+        cur = pg_conn.cursor()
+        _garantir_checkpoint(cur)
+        if recomecar:
+            cur.execute("DELETE FROM migracao_checkpoint")
+
+        colunas = {}
+        for tabela in TABELAS:
+            origem = _colunas_sqlite(sqlite_conn, tabela)
+            if not origem:
+                print(f"⏭️  Tabela '{tabela}' não existe no SQLite, pulando...")
+                continue
+            destino = set(_colunas_pg(cur, tabela))
+            if not destino:
+                print(f"⏭️  Tabela '{tabela}' não existe no PostgreSQL, pulando...")
+                continue
+            ignoradas = [c for c in origem if c not in destino]
+            if ignoradas:
+                print(f"   ⚠️  '{tabela}': colunas sem correspondente no PostgreSQL ignoradas: {ignoradas}")
+            colunas[tabela] = [c for c in origem if c in destino]
+
+        niveis = _niveis(list(colunas), _dependencias_pg(cur))
+
+        cur.execute("SELECT tabela FROM migracao_checkpoint")
+        iniciadas = {row[0] for row in cur.fetchall()}
+        for nivel in reversed(niveis):
+            for tabela in nivel:
+                if tabela not in iniciadas:
+                    # Limpar tabela no PostgreSQL (cuidado!)
+                    cur.execute(f"DELETE FROM {tabela}")
+                    cur.execute("INSERT INTO migracao_checkpoint (tabela) VALUES (%s)", (tabela,))
+        pg_conn.commit()
+        return niveis, colunas
+    finally:
+        sqlite_conn.close()
+        pg_conn.close()
+
+
+def migrar_tabela(sqlite_path: str, tabela: str, colunas: List[str], lote: int = LOTE_PADRAO) -> int:
+    """Copia ``tabela`` a partir do último checkpoint; retorna o total de linhas no destino."""
+    sqlite_conn = sqlite3.connect(sqlite_path)
+    pg_conn = _conectar_pg()
+    try:
+        cur = pg_conn.cursor()
+        cur.execute(
+            "SELECT ultimo_rowid, linhas, concluida FROM migracao_checkpoint WHERE tabela = %s", (tabela,)
+        )
+        ultimo_rowid, linhas, concluida = cur.fetchone()
+        pg_conn.commit()
+        if concluida:
+            return linhas
+
+        lista = ', '.join(colunas)
+        copy_sql = f"COPY {tabela} ({lista}) FROM STDIN"
+        while True:
+            rows = sqlite_conn.execute(
+                f"SELECT rowid, {lista} FROM {tabela} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (ultimo_rowid, lote),
+            ).fetchall()
+            if not rows:
+                break
+            cur.copy_expert(copy_sql, linhas_para_copy(row[1:] for row in rows))
+            ultimo_rowid = rows[-1][0]
+            linhas += len(rows)
+            # Checkpoint na mesma transação do lote: retomar nunca duplica nem perde linhas
+            cur.execute(
+                "UPDATE migracao_checkpoint SET ultimo_rowid = %s, linhas = %s, atualizado_em = NOW() "
+                "WHERE tabela = %s",
+                (ultimo_rowid, linhas, tabela),
+            )
+            pg_conn.commit()
+
+        if 'id' in colunas:
+            # Resetar sequência do ID no PostgreSQL
+            cur.execute(f"""
+                SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 0) + 1, false)
+                FROM {tabela}
+                WHERE pg_get_serial_sequence(%s, 'id') IS NOT NULL
+            """, (tabela, tabela))
+        cur.execute("UPDATE migracao_checkpoint SET concluida = TRUE WHERE tabela = %s", (tabela,))
+        pg_conn.commit()
+        return linhas
+    except Exception:
+        pg_conn.rollback()
+        raise
+    finally:
+        sqlite_conn.close()
+        pg_conn.close()
+
+
+def migrate(sqlite_path: str = SQLITE_DB, workers: int = WORKERS_PADRAO, lote: int = LOTE_PADRAO,
+            recomecar: bool = False) -> bool:
     """Executa a migração do SQLite para PostgreSQL"""
     print("🚀 Iniciando migração SQLite → PostgreSQL")
-    print(f"📂 Origem: {SQLITE_DB}")
+    print(f"📂 Origem: {sqlite_path}")
     print(f"📊 Destino: {PG_CONFIG['host']}:{PG_CONFIG['port']}/{PG_CONFIG['database']}\n")
-    
+
     # Verificar se o banco SQLite existe
-    if not os.path.exists(SQLITE_DB):
-        print(f"❌ Erro: Banco de dados SQLite não encontrado: {SQLITE_DB}")
+    if not os.path.exists(sqlite_path):
+        print(f"❌ Erro: Banco de dados SQLite não encontrado: {sqlite_path}")
         return False
-    
+
     try:
-        # Conectar nos dois bancos
-        sqlite_conn = sqlite3.connect(SQLITE_DB)
-        sqlite_conn.row_factory = sqlite3.Row
-        pg_conn = psycopg2.connect(**PG_CONFIG)
-        pg_conn.autocommit = False
-        
-        sqlite_cur = sqlite_conn.cursor()
-        pg_cur = pg_conn.cursor()
-        
-        # Tabelas para migrar (em ordem de dependências)
-        tabelas = [
-            'usuarios',
-            'projetos',
-            'registros_ponto',
-            'ausencias',
-            'solicitacoes_horas_extras',
-            'atestado_horas',
-            'atestados_horas',
-            'uploads',
-            'banco_horas',
-            'feriados',
-            'auditoria_correcoes'
-        ]
-        
-        total_registros = 0
-        
-        for tabela in tabelas:
-            try:
-                # Verificar se a tabela existe no SQLite
-                sqlite_cur.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{tabela}'")
-                if not sqlite_cur.fetchone():
-                    print(f"⏭️  Tabela '{tabela}' não existe no SQLite, pulando...")
-                    continue
-                
-                # Buscar todos os dados da tabela
-                sqlite_cur.execute(f"SELECT * FROM {tabela}")
-                rows = sqlite_cur.fetchall()
-                
-                if not rows:
-                    print(f"⚪ Tabela '{tabela}': 0 registros")
-                    continue
-                
-                # Obter nomes das colunas
-                column_names = [description[0] for description in sqlite_cur.description]
-                
-                # Limpar tabela no PostgreSQL (cuidado!)
-                pg_cur.execute(f"DELETE FROM {tabela}")
-                
-                # Inserir dados no PostgreSQL
-                migrados = 0
-                for row in rows:
-                    # Criar placeholders para PostgreSQL (%s)
-                    placeholders = ', '.join(['%s'] * len(row))
-                    columns = ', '.join(column_names)
-                    
-                    try:
-                        pg_cur.execute(
-                            f"INSERT INTO {tabela} ({columns}) VALUES ({placeholders})",
-                            tuple(row)
-                        )
-                        migrados += 1
-                    except Exception as e:
-                        print(f"      ⚠️  Erro ao inserir registro: {e}")
-                        continue
-                
-                # Resetar sequência do ID no PostgreSQL
+        niveis, colunas = _planejar(sqlite_path, recomecar)
+    except Exception as e:
+        print(f"\n❌ Erro ao preparar a migração: {e}")
+        return False
+
+    inicio = time.monotonic()
+    total_registros = 0
+    falhas = []
+    for nivel in niveis:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(nivel)))) as executor:
+            futuros = {executor.submit(migrar_tabela, sqlite_path, t, colunas[t], lote): t for t in nivel}
+            for futuro in as_completed(futuros):
+                tabela = futuros[futuro]
                 try:
-                    pg_cur.execute(f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), COALESCE(MAX(id), 1)) FROM {tabela}")
-                except:
-                    pass  # Tabela pode não ter coluna id
-                
-                print(f"✅ Tabela '{tabela}': {migrados} registros migrados")
-                total_registros += migrados
-                
-            except Exception as e:
-                print(f"❌ Erro na tabela '{tabela}': {e}")
-                continue
-        
-        # Commit final
-        pg_conn.commit()
-        
-        print(f"\n🎉 Migração concluída com sucesso!")
-        print(f"📊 Total de registros migrados: {total_registros}")
-        
-        # Fechar conexões
-        sqlite_conn.close()
-        pg_conn.close()
-        
-        return True
-        
-    except psycopg2.Error as e:
-        print(f"\n❌ Erro no PostgreSQL: {e}")
+                    migrados = futuro.result()
+                    total_registros += migrados
+                    print(f"✅ Tabela '{tabela}': {migrados} registros migrados")
+                except Exception as e:
+                    falhas.append(tabela)
+                    print(f"❌ Erro na tabela '{tabela}': {e} (rode de novo para retomar)")
+        if falhas:
+            # As tabelas dos próximos níveis dependem destas
+            break
+
+    print(f"\n📊 Total de registros migrados: {total_registros} em {time.monotonic() - inicio:.1f} s")
+    if falhas:
+        print(f"❌ Tabelas com erro: {falhas}")
         return False
+    print("🎉 Migração concluída com sucesso!")
+    return True
+
+
+def verify_migration(sqlite_path: str = SQLITE_DB) -> bool:
+    """Verifica se a migração foi bem-sucedida (contagem e checksum de cada tabela)"""
+    print("\n🔍 Verificando migração...")
+
+    try:
+        sqlite_conn = sqlite3.connect(sqlite_path)
+        pg_conn = _conectar_pg()
     except Exception as e:
-        print(f"\n❌ Erro geral: {e}")
+        print(f"❌ Erro na verificação: {e}")
         return False
 
+    print("\nComparação de registros:\n")
+    print(f"{'Tabela':<25} {'SQLite':<10} {'PostgreSQL':<10} {'Checksum':<18} {'Status':<10}")
+    print("-" * 80)
 
-def verify_migration():
-    """Verifica se a migração foi bem-sucedida"""
-    print("\n🔍 Verificando migração...")
-    
+    tudo_ok = True
     try:
-        sqlite_conn = sqlite3.connect(SQLITE_DB)
-        pg_conn = psycopg2.connect(**PG_CONFIG)
-        
-        sqlite_cur = sqlite_conn.cursor()
-        pg_cur = pg_conn.cursor()
-        
-        tabelas = ['usuarios', 'projetos', 'registros_ponto', 'ausencias']
-        
-        print("\nComparação de registros:\n")
-        print(f"{'Tabela':<25} {'SQLite':<10} {'PostgreSQL':<10} {'Status':<10}")
-        print("-" * 60)
-        
-        tudo_ok = True
-        for tabela in tabelas:
-            try:
-                sqlite_cur.execute(f"SELECT COUNT(*) FROM {tabela}")
-                count_sqlite = sqlite_cur.fetchone()[0]
-                
-                pg_cur.execute(f"SELECT COUNT(*) FROM {tabela}")
-                count_pg = pg_cur.fetchone()[0]
-                
-                status = "✅ OK" if count_sqlite == count_pg else "❌ ERRO"
-                if count_sqlite != count_pg:
-                    tudo_ok = False
-                
-                print(f"{tabela:<25} {count_sqlite:<10} {count_pg:<10} {status:<10}")
-            except:
-                print(f"{tabela:<25} {'N/A':<10} {'N/A':<10} {'⚠️ SKIP':<10}")
-        
-        sqlite_conn.close()
-        pg_conn.close()
-        
-        return tudo_ok
-        
+        cur = pg_conn.cursor()
+        for tabela in TABELAS:
+            colunas_origem = _colunas_sqlite(sqlite_conn, tabela)
+            destino = set(_colunas_pg(cur, tabela))
+            colunas = [c for c in colunas_origem if c in destino]
+            if not colunas:
+                print(f"{tabela:<25} {'N/A':<10} {'N/A':<10} {'':<18} {'⚠️ SKIP':<10}")
+                continue
+            lista = ', '.join(colunas)
+
+            origem = sqlite_conn.execute(f"SELECT {lista} FROM {tabela}")
+            count_sqlite, soma_sqlite = checksum_linhas(iter(lambda: origem.fetchmany(LOTE_PADRAO), []))
+
+            pg_cur = pg_conn.cursor(name=f"verificar_{tabela}")  # cursor de servidor: memória constante
+            pg_cur.execute(f"SELECT {lista} FROM {tabela}")
+            count_pg, soma_pg = checksum_linhas(iter(lambda: pg_cur.fetchmany(LOTE_PADRAO), []))
+            pg_cur.close()
+
+            ok = count_sqlite == count_pg and soma_sqlite == soma_pg
+            tudo_ok = tudo_ok and ok
+            status = "✅ OK" if ok else "❌ ERRO"
+            print(f"{tabela:<25} {count_sqlite:<10} {count_pg:<10} {soma_pg:<18} {status:<10}")
+        pg_conn.rollback()
     except Exception as e:
         print(f"❌ Erro na verificação: {e}")
         return False
+    finally:
+        sqlite_conn.close()
+        pg_conn.close()
 
+    return tudo_ok
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Migração SQLite → PostgreSQL (retomável)")
+    parser.add_argument("--sqlite", default=SQLITE_DB, help="Arquivo SQLite de origem")
+    parser.add_argument("--workers", type=int, default=WORKERS_PADRAO, help="Tabelas migradas em paralelo")
+    parser.add_argument("--lote", type=int, default=LOTE_PADRAO, help="Linhas por COPY")
+    parser.add_argument("--recomecar", action="store_true", help="Ignorar checkpoints e migrar do zero")
+    parser.add_argument("--sim", action="store_true", help="Não pedir confirmação")
+    parser.add_argument("--apenas-verificar", action="store_true", help="Só comparar contagens e checksums")
+    args = parser.parse_args(argv)
 
-if __name__ == '__main__':
     print("=" * 60)
     print(" Migração SQLite → PostgreSQL - Ponto ExSA v5.0")
     print("=" * 60)
     print()
-    
-    resposta = input("⚠️  ATENÇÃO: Esta operação irá substituir os dados no PostgreSQL.\nDeseja continuar? (sim/não): ")
-    
-    if resposta.lower() in ['sim', 's', 'yes', 'y']:
-        sucesso = migrate()
-        
-        if sucesso:
-            verify_migration()
-            print("\n✅ Migração completa! Você pode agora usar o PostgreSQL.")
-            print("💡 Configure USE_POSTGRESQL=true no arquivo .env")
-        else:
-            print("\n❌ Migração falhou. Verifique os erros acima.")
+
+    if args.apenas_verificar:
+        sys.exit(0 if verify_migration(args.sqlite) else 1)
+
+    if not args.sim:
+        resposta = input("⚠️  ATENÇÃO: Esta operação irá substituir os dados no PostgreSQL.\nDeseja continuar? (sim/não): ")
+        if resposta.lower() not in ['sim', 's', 'yes', 'y']:
+            print("\n❌ Migração cancelada.")
+            return
+
+    sucesso = migrate(args.sqlite, args.workers, args.lote, args.recomecar)
+
+    if sucesso and verify_migration(args.sqlite):
+        print("\n✅ Migração completa! Você pode agora usar o PostgreSQL.")
+        print("💡 Configure USE_POSTGRESQL=true no arquivo .env")
+    elif sucesso:
+        print("\n❌ Contagens ou checksums divergem. Verifique a tabela acima.")
+        sys.exit(1)
     else:
-        print("\n❌ Migração cancelada.")
+        print("\n❌ Migração falhou. Verifique os erros acima; rode de novo para retomar.")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Restaura uma cadeia de backups incrementais: o último completo + os deltas.
+
+Uso:
+    python tools/restaurar_backup_incremental.py [--cadeia local] [--ate ponto_esa_delta_X.ndjson.gz]
+                                                 [--manter] [--listar]
+
+Usa o manifesto ``backups/manifesto_<cadeia>.json`` e o banco configurado no
+ambiente (DATABASE_URL para PostgreSQL). ``--ate`` para num delta específico
+(restauração para um ponto no tempo); ``--manter`` não esvazia as tabelas
+antes do completo.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backup_incremental import ler_manifesto, restaurar_cadeia  # noqa: E402
+
+
+def _listar(cadeia):
+    cadeias = ler_manifesto(cadeia)['cadeias']
+    if not cadeias:
+        print(f"Nenhum backup na cadeia '{cadeia}'")
+        return
+    completo, deltas = cadeias[-1]['completo'], cadeias[-1]['deltas']
+    print(f"Completo: {os.path.basename(completo['arquivo'])}  {completo['tamanho'] / 1024:.1f} KB  "
+          f"{completo['duracao_s']:.1f} s  ({completo['timestamp']})")
+    for delta in deltas:
+        print(f"  Delta: {os.path.basename(delta['arquivo'])}  {delta['tamanho'] / 1024:.1f} KB  "
+              f"{delta['duracao_s']:.1f} s  {delta['linhas']} linhas, {delta['exclusoes']} exclusões")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cadeia", default="local")
+    parser.add_argument("--ate", help="Último delta a aplicar (nome do arquivo)")
+    parser.add_argument("--manter", action="store_true", help="Não esvaziar as tabelas antes do completo")
+    parser.add_argument("--listar", action="store_true", help="Só mostrar a cadeia")
+    args = parser.parse_args()
+
+    if args.listar:
+        _listar(args.cadeia)
+        return
+
+    sucesso, mensagem = restaurar_cadeia(
+        args.cadeia, ate=args.ate, limpar=not args.manter,
+        progresso=lambda feitos, total, arquivo: print(f"[{feitos}/{total}] {arquivo}"),
+    )
+    print(("✅ " if sucesso else "❌ ") + mensagem)
+    sys.exit(0 if sucesso else 1)
+
+
+if __name__ == "__main__":
+    main()